@@ -522,6 +522,60 @@ def mock_email_service(monkeypatch):
     
     return mock_send
 
+
+# ============================================================================
+# QUERY COUNT FIXTURES (N+1 regression checks)
+# ============================================================================
+
+class QueryCounter:
+    """SQL statements executed on an engine while active"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        from sqlalchemy import event
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        from sqlalchemy import event
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+
+@pytest.fixture
+def count_queries(app):
+    """
+    Count SQL statements run inside a block, optionally failing over a budget
+
+    Usage:
+        with count_queries(max_queries=6) as counter:
+            client.get('/api/v1/crm/leads')
+        assert counter.count == ...
+    """
+    from contextlib import contextmanager
+    from src.extensions import db
+
+    @contextmanager
+    def _count(max_queries=None):
+        counter = QueryCounter(db.engine)
+        with counter:
+            yield counter
+        if max_queries is not None and counter.count > max_queries:
+            listing = '\n'.join(f'  {i + 1}. {s}' for i, s in enumerate(counter.statements))
+            pytest.fail(f'{counter.count} queries executed, budget is {max_queries}:\n{listing}')
+
+    return _count
+
+
 # HELPER FUNCTIONS (For common test patterns)
 # ============================================================================
 
@@ -80,6 +80,78 @@ def seed_db():
     print("✅ Database seeded!")
 
 
+def backfill_drawdowns():
+    """Copy daily_drawdown_history JSONB into challenge_daily_drawdowns"""
+    print("Backfilling daily drawdown history...")
+    with app.app_context():
+        from src.models.challenge_drawdown import ChallengeDailyDrawdown
+        challenges, rows = ChallengeDailyDrawdown.backfill_from_history()
+    print(f"✅ Backfilled {rows} daily rows for {challenges} challenges!")
+
+
+def rebuild_closure():
+    """Recreate the user hierarchy closure table from parent_id"""
+    print("Rebuilding user hierarchy closure table...")
+    with app.app_context():
+        from src.database import db
+        from src.models.user_closure import UserClosure
+        with db.engine.begin() as connection:
+            UserClosure.rebuild(connection)
+    print("✅ User hierarchy closure table rebuilt!")
+
+
+def backfill_analytics(days=365):
+    """Rebuild analytics daily rollups for the last N days"""
+    print(f"Backfilling analytics rollups for the last {days} days...")
+    with app.app_context():
+        from src.services.analytics_rollup_service import AnalyticsRollupService
+        rows = AnalyticsRollupService.backfill(days)
+    print(f"✅ Wrote {rows} rollup rows!")
+
+
+def verify_analytics(days=7):
+    """Compare analytics rollups with raw data and report drift"""
+    print(f"Checking analytics rollups for the last {days} days...")
+    with app.app_context():
+        from src.services.analytics_rollup_service import AnalyticsRollupService
+        result = AnalyticsRollupService.verify(days=days, repair=False)
+    for item in result['drift']:
+        print(f"  {item['date']} {item['scope']}:{item['scope_id']} {item['field']}: "
+              f"stored={item['stored']} actual={item['actual']}")
+    if result['drift']:
+        print(f"❌ {len(result['drift'])} field(s) drifted")
+    else:
+        print("✅ Rollups match raw data!")
+
+
+def rebuild_trade_stats(challenge_id=None):
+    """Recompute per-challenge trade statistics from raw trades"""
+    print("Rebuilding challenge trade statistics...")
+    with app.app_context():
+        from src.database import db
+        from src.models.challenge_trade_stats import ChallengeTradeStats
+        challenges = ChallengeTradeStats.rebuild([challenge_id] if challenge_id else None)
+        db.session.commit()
+    print(f"✅ Rebuilt trade statistics for {challenges} challenges!")
+
+
+def verify_ledger(repair=False):
+    """Compare wallet balances with the ledger journal"""
+    print("Verifying wallet ledger...")
+    with app.app_context():
+        from src.services.ledger_service import LedgerService
+        result = LedgerService.verify(repair=repair)
+    for item in result['drift'][:50]:
+        print(f"  wallet {item['wallet_id']} {item['balance_type']}: stored {item['stored']}, journal {item['journal']}")
+    if result['unbalanced']:
+        print(f"  unbalanced entries: {result['unbalanced'][:50]}")
+    if result['drift'] or result['unbalanced']:
+        print(f"❌ {len(result['drift'])} drifted balance(s), {len(result['unbalanced'])} unbalanced entries"
+              f"{' (balances repaired)' if repair and result['drift'] else ''}")
+    else:
+        print(f"✅ {result['wallets']} wallets match the journal!")
+
+
 def show_help():
     """Show help message"""
     print("""
@@ -91,6 +163,12 @@ Database Management Commands:
   downgrade     Rollback last migration
   reset         Reset database (drop all and recreate)
   seed          Seed database with initial data
+  backfill-drawdowns  Copy JSONB drawdown history into the daily table
+  rebuild-closure     Rebuild the user hierarchy closure table
+  backfill-analytics  Rebuild analytics daily rollups (default 365 days)
+  verify-analytics    Report analytics rollup drift (default 7 days)
+  rebuild-trade-stats Recompute challenge trade statistics (all or one challenge)
+  verify-ledger Compare wallet balances with the journal (--repair to reset them)
   help          Show this help message
 
 Examples:
@@ -100,6 +178,12 @@ Examples:
   python manage.py downgrade
   python manage.py reset
   python manage.py seed
+  python manage.py backfill-drawdowns
+  python manage.py rebuild-closure
+  python manage.py backfill-analytics 90
+  python manage.py verify-analytics 7
+  python manage.py rebuild-trade-stats 42
+  python manage.py verify-ledger --repair
 """)
 
 
@@ -123,6 +207,18 @@ if __name__ == '__main__':
         reset_db()
     elif command == 'seed':
         seed_db()
+    elif command == 'backfill-drawdowns':
+        backfill_drawdowns()
+    elif command == 'rebuild-closure':
+        rebuild_closure()
+    elif command == 'backfill-analytics':
+        backfill_analytics(int(sys.argv[2]) if len(sys.argv) > 2 else 365)
+    elif command == 'verify-analytics':
+        verify_analytics(int(sys.argv[2]) if len(sys.argv) > 2 else 7)
+    elif command == 'rebuild-trade-stats':
+        rebuild_trade_stats(int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    elif command == 'verify-ledger':
+        verify_ledger('--repair' in sys.argv[2:])
     elif command == 'help':
         show_help()
     else:
@@ -0,0 +1,58 @@
+"""Add challenge daily drawdowns table
+
+Revision ID: 008_challenge_daily_drawdowns
+Revises: 20251110_191500
+Create Date: 2026-10-17 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008_challenge_daily_drawdowns'
+down_revision = '20251110_191500'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'challenge_daily_drawdowns',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('challenge_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('starting_balance', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('starting_equity', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('starting_value', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('current_balance', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('current_equity', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('open_pnl', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('closed_pnl', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('max_balance', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('max_equity', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('min_balance', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('min_equity', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('loss_from_start', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('loss_from_peak', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('drawdown_pct', sa.Numeric(precision=10, scale=4), server_default='0'),
+        sa.Column('commissions', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('swaps', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('daily_limit', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('threshold', sa.Numeric(precision=15, scale=2), server_default='0'),
+        sa.Column('calculation_method', sa.String(length=20), nullable=True),
+        sa.Column('timezone', sa.String(length=50), nullable=True),
+        sa.Column('reset_time', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_update', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.ForeignKeyConstraint(['challenge_id'], ['challenges.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('challenge_id', 'date', name='uq_challenge_daily_drawdown_day')
+    )
+    op.create_index('ix_challenge_daily_drawdown_date', 'challenge_daily_drawdowns', ['date'])
+
+
+def downgrade():
+    op.drop_index('ix_challenge_daily_drawdown_date', table_name='challenge_daily_drawdowns')
+    op.drop_table('challenge_daily_drawdowns')
@@ -0,0 +1,48 @@
+"""Add user hierarchy closure table
+
+Revision ID: 009_user_closure
+Revises: 008_challenge_daily_drawdowns
+Create Date: 2026-10-17 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009_user_closure'
+down_revision = '008_challenge_daily_drawdowns'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'user_closure',
+        sa.Column('ancestor_id', sa.Integer(), nullable=False),
+        sa.Column('descendant_id', sa.Integer(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['descendant_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index('ix_user_closure_ancestor_depth', 'user_closure', ['ancestor_id', 'depth'])
+    op.create_index('ix_user_closure_descendant_depth', 'user_closure', ['descendant_id', 'depth'])
+
+    # Backfill from parent_id
+    op.execute("""
+        INSERT INTO user_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM users
+            UNION ALL
+            SELECT tree.ancestor_id, users.id, tree.depth + 1
+            FROM tree JOIN users ON users.parent_id = tree.descendant_id
+        )
+        SELECT ancestor_id, descendant_id, depth FROM tree
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_user_closure_descendant_depth', table_name='user_closure')
+    op.drop_index('ix_user_closure_ancestor_depth', table_name='user_closure')
+    op.drop_table('user_closure')
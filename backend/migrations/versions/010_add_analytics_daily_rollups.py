@@ -0,0 +1,46 @@
+"""Add analytics daily rollups table
+
+Revision ID: 010_analytics_daily_rollups
+Revises: 009_user_closure
+Create Date: 2026-10-17 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '010_analytics_daily_rollups'
+down_revision = '009_user_closure'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'analytics_daily_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('scope', sa.String(length=10), nullable=False),
+        sa.Column('scope_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('revenue', sa.Numeric(precision=15, scale=2), nullable=False, server_default='0'),
+        sa.Column('transactions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('payment_status_counts', postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default='{}'),
+        sa.Column('payment_method_totals', postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default='{}'),
+        sa.Column('registrations', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('active_registrations', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('challenges_created', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('challenges_completed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('challenges_funded', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('challenge_status_counts', postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default='{}'),
+        sa.Column('computed_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('scope', 'scope_id', 'date', name='uq_analytics_daily_rollup')
+    )
+    op.create_index('ix_analytics_daily_rollup_date', 'analytics_daily_rollups', ['date'])
+
+
+def downgrade():
+    op.drop_index('ix_analytics_daily_rollup_date', table_name='analytics_daily_rollups')
+    op.drop_table('analytics_daily_rollups')
@@ -0,0 +1,48 @@
+"""Add challenge trade stats table
+
+Revision ID: 011_challenge_trade_stats
+Revises: 010_analytics_daily_rollups
+Create Date: 2026-10-17 16:00:00
+
+Existing trades are folded in by `python3 manage.py rebuild-trade-stats`
+after upgrading.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '011_challenge_trade_stats'
+down_revision = '010_analytics_daily_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'challenge_trade_stats',
+        sa.Column('challenge_id', sa.Integer(), nullable=False),
+        sa.Column('total_trades', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('winning_trades', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('losing_trades', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('gross_profit', sa.Numeric(precision=15, scale=2), nullable=False, server_default='0'),
+        sa.Column('gross_loss', sa.Numeric(precision=15, scale=2), nullable=False, server_default='0'),
+        sa.Column('sum_profit_squared', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('best_trade', sa.Numeric(precision=15, scale=2), nullable=True),
+        sa.Column('worst_trade', sa.Numeric(precision=15, scale=2), nullable=True),
+        sa.Column('current_streak', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_win_streak', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_loss_streak', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_close_time', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.ForeignKeyConstraint(['challenge_id'], ['challenges.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('challenge_id')
+    )
+    # Rebuilds read closed trades per challenge in close order
+    op.create_index('ix_trades_challenge_close_time', 'trades', ['challenge_id', 'close_time'])
+
+
+def downgrade():
+    op.drop_index('ix_trades_challenge_close_time', table_name='trades')
+    op.drop_table('challenge_trade_stats')
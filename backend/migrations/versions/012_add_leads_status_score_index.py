@@ -0,0 +1,23 @@
+"""Add leads status/score index for the CRM pipeline
+
+Revision ID: 012_leads_status_score
+Revises: 011_challenge_trade_stats
+Create Date: 2026-10-17 17:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '012_leads_status_score'
+down_revision = '011_challenge_trade_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_leads_status_score', 'leads', ['status', 'score', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_leads_status_score', table_name='leads')
@@ -0,0 +1,90 @@
+"""Add double-entry wallet ledger (journal entries and lines)
+
+Revision ID: 013_wallet_ledger
+Revises: 012_leads_status_score
+Create Date: 2026-10-17 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '013_wallet_ledger'
+down_revision = '012_leads_status_score'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'journal_entries',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('entry_type', sa.String(length=50), nullable=False),
+        sa.Column('reference_type', sa.String(length=50), nullable=True),
+        sa.Column('reference_id', sa.Integer(), nullable=True),
+        sa.Column('description', sa.String(length=255), nullable=True),
+        sa.Column('created_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_journal_entries_reference', 'journal_entries', ['reference_type', 'reference_id'])
+
+    op.create_table(
+        'journal_lines',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('entry_id', sa.BigInteger(), nullable=False),
+        sa.Column('account', sa.String(length=64), nullable=False),
+        sa.Column('wallet_id', sa.Integer(), nullable=True),
+        sa.Column('balance_type', sa.String(length=20), nullable=True),
+        sa.Column('amount', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(['entry_id'], ['journal_entries.id']),
+        sa.ForeignKeyConstraint(['wallet_id'], ['wallets.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_journal_lines_entry_id', 'journal_lines', ['entry_id'])
+    op.create_index('ix_journal_lines_wallet', 'journal_lines', ['wallet_id', 'balance_type'])
+
+    op.add_column('transactions', sa.Column('entry_id', sa.BigInteger(), nullable=True))
+    op.create_foreign_key('fk_transactions_entry_id', 'transactions', 'journal_entries', ['entry_id'], ['id'])
+    op.create_index('ix_transaction_wallet_created_at', 'transactions', ['wallet_id', 'created_at'])
+
+    # Opening balances: one entry per non-empty wallet, so the journal sums
+    # to the existing balances and reconciliation starts clean
+    op.execute("""
+        INSERT INTO journal_entries (entry_type, reference_type, reference_id, description, created_at)
+        SELECT 'opening_balance', 'wallet', id, 'Opening balance', now()
+        FROM wallets
+        WHERE main_balance <> 0 OR commission_balance <> 0 OR bonus_balance <> 0
+    """)
+    op.execute("""
+        INSERT INTO journal_lines (entry_id, account, wallet_id, balance_type, amount)
+        SELECT e.id, 'wallet:' || w.id || ':' || b.balance_type, w.id, b.balance_type, b.amount
+        FROM journal_entries e
+        JOIN wallets w ON e.entry_type = 'opening_balance' AND e.reference_type = 'wallet' AND e.reference_id = w.id
+        CROSS JOIN LATERAL (VALUES
+            ('main', w.main_balance),
+            ('commission', w.commission_balance),
+            ('bonus', w.bonus_balance)
+        ) AS b (balance_type, amount)
+        WHERE b.amount <> 0
+    """)
+    op.execute("""
+        INSERT INTO journal_lines (entry_id, account, amount)
+        SELECT e.id, 'system:opening_balances', -(w.main_balance + w.commission_balance + w.bonus_balance)
+        FROM journal_entries e
+        JOIN wallets w ON e.entry_type = 'opening_balance' AND e.reference_type = 'wallet' AND e.reference_id = w.id
+        WHERE w.main_balance + w.commission_balance + w.bonus_balance <> 0
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_transaction_wallet_created_at', table_name='transactions')
+    op.drop_constraint('fk_transactions_entry_id', 'transactions', type_='foreignkey')
+    op.drop_column('transactions', 'entry_id')
+    op.drop_index('ix_journal_lines_wallet', table_name='journal_lines')
+    op.drop_index('ix_journal_lines_entry_id', table_name='journal_lines')
+    op.drop_table('journal_lines')
+    op.drop_index('ix_journal_entries_reference', table_name='journal_entries')
+    op.drop_table('journal_entries')
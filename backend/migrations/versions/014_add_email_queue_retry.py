@@ -0,0 +1,29 @@
+"""Add email queue retry schedule and pending index
+
+Revision ID: 014_email_queue_retry
+Revises: 013_wallet_ledger
+Create Date: 2026-10-17 19:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '014_email_queue_retry'
+down_revision = '013_wallet_ledger'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('email_queue', sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+    op.create_index(
+        'idx_email_queue_pending', 'email_queue', ['id'],
+        postgresql_where=sa.text("status = 'pending'")
+    )
+
+
+def downgrade():
+    op.drop_index('idx_email_queue_pending', table_name='email_queue')
+    op.drop_column('email_queue', 'next_attempt_at')
@@ -0,0 +1,27 @@
+"""Add partial index on unread notifications per user
+
+Revision ID: 015_notifications_unread
+Revises: 014_email_queue_retry
+Create Date: 2026-10-17 20:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '015_notifications_unread'
+down_revision = '014_email_queue_retry'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'idx_notifications_user_unread', 'notifications', ['user_id', 'type'],
+        postgresql_where=sa.text('is_read = false AND is_deleted = false')
+    )
+
+
+def downgrade():
+    op.drop_index('idx_notifications_user_unread', table_name='notifications')
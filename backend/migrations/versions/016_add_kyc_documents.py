@@ -0,0 +1,46 @@
+"""Add kyc_documents table for direct uploads
+
+Revision ID: 016_kyc_documents
+Revises: 015_notifications_unread
+Create Date: 2026-10-17 21:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '016_kyc_documents'
+down_revision = '015_notifications_unread'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'kyc_documents',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('document_type', sa.String(length=30), nullable=False),
+        sa.Column('storage_key', sa.String(length=500), nullable=False),
+        sa.Column('content_type', sa.String(length=100), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('processing_status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('sha256', sa.String(length=64), nullable=True),
+        sa.Column('thumbnail_key', sa.String(length=500), nullable=True),
+        sa.Column('processing_error', sa.String(length=255), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('storage_key')
+    )
+    op.create_index('ix_kyc_documents_user_type', 'kyc_documents', ['user_id', 'document_type'])
+    op.create_index('ix_kyc_documents_sha256', 'kyc_documents', ['sha256'])
+
+
+def downgrade():
+    op.drop_index('ix_kyc_documents_sha256', table_name='kyc_documents')
+    op.drop_index('ix_kyc_documents_user_type', table_name='kyc_documents')
+    op.drop_table('kyc_documents')
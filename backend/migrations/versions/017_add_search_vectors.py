@@ -0,0 +1,55 @@
+"""Add full-text search vectors to blog posts and support articles
+
+Revision ID: 017_search_vectors
+Revises: 016_kyc_documents
+Create Date: 2026-10-17 22:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '017_search_vectors'
+down_revision = '016_kyc_documents'
+branch_labels = None
+depends_on = None
+
+
+BLOG_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(tags, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(excerpt, '')), 'C') || "
+    "setweight(to_tsvector('english', regexp_replace(coalesce(content, ''), '<[^>]*>', ' ', 'g')), 'D')"
+)
+
+ARTICLE_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(tags::text, '') || ' ' || coalesce(meta_keywords, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(excerpt, '')), 'C') || "
+    "setweight(to_tsvector('english', regexp_replace(coalesce(content, ''), '<[^>]*>', ' ', 'g')), 'D')"
+)
+
+
+def upgrade():
+    # Generated columns: existing rows are indexed now, every later
+    # insert/update (publish, edit) recomputes the vector
+    op.add_column('blog_posts', sa.Column(
+        'search_vector', postgresql.TSVECTOR(), sa.Computed(BLOG_SEARCH_VECTOR, persisted=True)
+    ))
+    op.create_index('idx_blog_search_vector', 'blog_posts', ['search_vector'], postgresql_using='gin')
+
+    op.add_column('support_articles', sa.Column(
+        'search_vector', postgresql.TSVECTOR(), sa.Computed(ARTICLE_SEARCH_VECTOR, persisted=True)
+    ))
+    op.create_index(
+        'idx_support_articles_search_vector', 'support_articles', ['search_vector'], postgresql_using='gin'
+    )
+
+
+def downgrade():
+    op.drop_index('idx_support_articles_search_vector', table_name='support_articles')
+    op.drop_column('support_articles', 'search_vector')
+    op.drop_index('idx_blog_search_vector', table_name='blog_posts')
+    op.drop_column('blog_posts', 'search_vector')
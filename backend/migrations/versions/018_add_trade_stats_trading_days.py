@@ -0,0 +1,30 @@
+"""Add trading days to challenge trade stats
+
+Revision ID: 018_trade_stats_trading_days
+Revises: 017_search_vectors
+Create Date: 2026-10-18 10:00:00
+
+Existing rows are filled in by `python3 manage.py rebuild-trade-stats`
+after upgrading.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '018_trade_stats_trading_days'
+down_revision = '017_search_vectors'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('challenge_trade_stats',
+                  sa.Column('trading_days', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('challenge_trade_stats', sa.Column('last_trading_day', sa.Date(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('challenge_trade_stats', 'last_trading_day')
+    op.drop_column('challenge_trade_stats', 'trading_days')
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark tree_path LIKE scans against the user_closure table
+
+Builds a synthetic 10-ary hierarchy in TEMP tables (nothing is written to the
+real users table) and times downline, count, upline and per-level queries
+with both approaches.
+
+Usage: python3 scripts/benchmark_hierarchy.py [num_users] [repeats]
+"""
+
+import sys
+import os
+import time
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from src import create_app, db
+
+
+SETUP = [
+    "CREATE TEMP TABLE bench_users (id INTEGER PRIMARY KEY, parent_id INTEGER, "
+    "tree_path VARCHAR(500), level INTEGER) ON COMMIT PRESERVE ROWS",
+    # Heap layout: user n's parent is (n - 2) / 10 + 1
+    "INSERT INTO bench_users (id, parent_id) "
+    "SELECT n, CASE WHEN n = 1 THEN NULL ELSE (n - 2) / 10 + 1 END FROM generate_series(1, :n) AS n",
+    "WITH RECURSIVE t (id, path, lvl) AS ("
+    "  SELECT id, id::text, 0 FROM bench_users WHERE parent_id IS NULL"
+    "  UNION ALL"
+    "  SELECT u.id, t.path || '/' || u.id, t.lvl + 1 FROM bench_users u JOIN t ON u.parent_id = t.id"
+    ") UPDATE bench_users SET tree_path = t.path, level = t.lvl FROM t WHERE bench_users.id = t.id",
+    "CREATE INDEX ON bench_users (tree_path varchar_pattern_ops)",
+    "CREATE INDEX ON bench_users (parent_id)",
+    "CREATE TEMP TABLE bench_closure (ancestor_id INTEGER, descendant_id INTEGER, depth INTEGER, "
+    "PRIMARY KEY (ancestor_id, descendant_id)) ON COMMIT PRESERVE ROWS",
+    "INSERT INTO bench_closure "
+    "WITH RECURSIVE t (a, d, depth) AS ("
+    "  SELECT id, id, 0 FROM bench_users"
+    "  UNION ALL"
+    "  SELECT t.a, u.id, t.depth + 1 FROM t JOIN bench_users u ON u.parent_id = t.d"
+    ") SELECT a, d, depth FROM t",
+    "CREATE INDEX ON bench_closure (ancestor_id, depth)",
+    "CREATE INDEX ON bench_closure (descendant_id, depth)",
+    "ANALYZE bench_users",
+    "ANALYZE bench_closure",
+]
+
+QUERIES = {
+    'downline': (
+        "SELECT id FROM bench_users WHERE tree_path LIKE "
+        "(SELECT tree_path FROM bench_users WHERE id = :id) || '/%'",
+        "SELECT descendant_id FROM bench_closure WHERE ancestor_id = :id AND depth > 0",
+    ),
+    'downline_count': (
+        "SELECT COUNT(*) FROM bench_users WHERE tree_path LIKE "
+        "(SELECT tree_path FROM bench_users WHERE id = :id) || '/%'",
+        "SELECT COUNT(*) FROM bench_closure WHERE ancestor_id = :id AND depth > 0",
+    ),
+    'counts_by_level': (
+        "SELECT u.level - me.level, COUNT(*) FROM bench_users u, bench_users me "
+        "WHERE me.id = :id AND u.tree_path LIKE me.tree_path || '/%' GROUP BY 1",
+        "SELECT depth, COUNT(*) FROM bench_closure WHERE ancestor_id = :id AND depth > 0 GROUP BY depth",
+    ),
+    'upline': (
+        "WITH RECURSIVE up (id, parent_id) AS ("
+        "  SELECT id, parent_id FROM bench_users WHERE id = :id"
+        "  UNION ALL"
+        "  SELECT u.id, u.parent_id FROM bench_users u JOIN up ON u.id = up.parent_id"
+        ") SELECT id FROM up WHERE id <> :id",
+        "SELECT ancestor_id FROM bench_closure WHERE descendant_id = :id AND depth > 0 ORDER BY depth",
+    ),
+}
+
+
+def timed(connection, sql, params, repeats):
+    connection.execute(text(sql), params).fetchall()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        connection.execute(text(sql), params).fetchall()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def run_benchmark(num_users=100000, repeats=20):
+    """Build the synthetic tree and print timings"""
+    app = create_app()
+
+    with app.app_context():
+        with db.engine.connect() as connection:
+            print(f"🔧 Building {num_users} synthetic users...")
+            start = time.perf_counter()
+            for statement in SETUP:
+                connection.execute(text(statement), {'n': num_users})
+            closure_rows = connection.execute(text("SELECT COUNT(*) FROM bench_closure")).scalar()
+            print(f"   done in {time.perf_counter() - start:.1f}s ({closure_rows} closure rows)")
+
+            # A root-level node, a mid-level node and a leaf
+            probes = {'top': 2, 'mid': 23, 'leaf': num_users}
+
+            print("=" * 72)
+            print(f"{'query':<18}{'node':<8}{'LIKE (ms)':>14}{'closure (ms)':>16}{'speedup':>12}")
+            print("-" * 72)
+            for name, (like_sql, closure_sql) in QUERIES.items():
+                for label, node_id in probes.items():
+                    like_ms = timed(connection, like_sql, {'id': node_id}, repeats)
+                    closure_ms = timed(connection, closure_sql, {'id': node_id}, repeats)
+                    speedup = like_ms / closure_ms if closure_ms else float('inf')
+                    print(f"{name:<18}{label:<8}{like_ms:>14.2f}{closure_ms:>16.2f}{speedup:>11.1f}x")
+            print("=" * 72)
+
+
+if __name__ == '__main__':
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    run_benchmark(users, runs)
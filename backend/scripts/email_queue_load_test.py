@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Load test the email queue consumer against the fake SendGrid sink
+
+Enqueues --emails rows for one user (a broadcast: one subject and body, or
+--unique for a distinct body per row), then drains the queue with
+--workers concurrent consumers, each claiming batches with SKIP LOCKED,
+and prints throughput, request counts and the final queue depth. Nothing
+is delivered; rows are written to the configured database, so point
+DATABASE_URL at a scratch copy.
+
+Usage:
+    python3 scripts/email_queue_load_test.py --user-id ID [--emails N] [--unique]
+        [--workers N] [--batch-size N] [--concurrency N] [--latency-ms MS]
+        [--failure-rate F]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def enqueue(db, EmailQueue, user_id, count, unique):
+    now = datetime.utcnow()
+    rows = [
+        {
+            'user_id': user_id,
+            'to_email': f'loadtest+{n}@example.com',
+            'subject': 'Load test',
+            'body': '',
+            'html_body': f'<p>Message {n}</p>' if unique else '<p>Broadcast</p>',
+            'status': 'pending',
+            'attempts': 0,
+            'max_attempts': 3,
+            'created_at': now,
+            'updated_at': now,
+        }
+        for n in range(count)
+    ]
+    for i in range(0, len(rows), 1000):
+        db.session.execute(EmailQueue.__table__.insert(), rows[i:i + 1000])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--user-id', type=int, required=True, help='Existing user the rows belong to')
+    parser.add_argument('--emails', type=int, default=50000)
+    parser.add_argument('--unique', action='store_true', help='Distinct body per email (no request batching)')
+    parser.add_argument('--workers', type=int, default=2, help='Concurrent queue consumers')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=8, help='SendGrid requests in flight per consumer')
+    parser.add_argument('--latency-ms', type=float, default=50, help='Simulated SendGrid latency per request')
+    parser.add_argument('--failure-rate', type=float, default=0)
+    args = parser.parse_args()
+
+    from src.app import create_app
+    from src.database import db
+    from src.models.notification import EmailQueue
+    from src.services.email_queue_service import EmailQueueService
+    from src.utils.fake_sendgrid import FakeSendGridClient
+
+    app = create_app()
+    client = FakeSendGridClient(latency=args.latency_ms / 1000, failure_rate=args.failure_rate)
+
+    with app.app_context():
+        enqueue(db, EmailQueue, args.user_id, args.emails, args.unique)
+
+    results = []
+
+    def consume():
+        with app.app_context():
+            results.append(EmailQueueService.process(
+                batch_size=args.batch_size,
+                concurrency=args.concurrency,
+                time_budget=float('inf'),
+                client=client
+            ))
+            db.session.remove()
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=consume) for _ in range(args.workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    sent = sum(r['sent'] for r in results)
+    print(f"Enqueued:          {args.emails}")
+    print(f"Sent:              {sent} in {elapsed:.2f}s ({sent / max(elapsed, 1e-9):,.0f} emails/s)")
+    print(f"Retried / failed:  {sum(r['retried'] for r in results)} / {sum(r['failed'] for r in results)}")
+    print(f"Batches:           {sum(r['batches'] for r in results)}")
+    print(f"SendGrid requests: {client.stats()['calls']}")
+    with app.app_context():
+        print(f"Queue:             {EmailQueueService.queue_depth()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Load test the shared rate limiter across worker processes
+
+Starts --workers processes (like gunicorn workers), each with its own Redis
+connection and --threads threads, that all hit one limit for the same client
+as fast as they can for --seconds. Prints how many requests were allowed in
+each window next to the limit; with the shared counters every window allows
+at most the limit no matter how many workers there are. Also prints the
+latency of a limit check. Uses REDIS_URL (default redis://localhost:6379/0)
+and its own scope, so it does not touch real counters.
+
+Usage:
+    python3 scripts/rate_limit_load_test.py [--workers 12] [--threads 4]
+        [--limit "50 per 2 seconds"] [--seconds 10]
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def worker(redis_url, scope, limit, seconds, threads, results):
+    import redis
+    from src import database
+    from src.services import rate_limit_service
+
+    database.redis_client = redis.from_url(redis_url, decode_responses=True)
+    window = rate_limit_service.parse_limit(limit).window
+    allowed = Counter()
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.time() + seconds
+
+    def run():
+        local_allowed, local_latencies = Counter(), []
+        while time.time() < deadline:
+            started = time.perf_counter()
+            result = rate_limit_service.hit(scope, 'client', [limit])
+            local_latencies.append(time.perf_counter() - started)
+            if result.allowed:
+                # Window the server counted it in: the one ending reset_after from now
+                local_allowed[int(round((time.time() + result.reset_after) / window)) - 1] += 1
+        with lock:
+            allowed.update(local_allowed)
+            latencies.extend(local_latencies)
+
+    pool = [threading.Thread(target=run) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put((dict(allowed), latencies, rate_limit_service.get_stats()['fallbacks']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=12)
+    parser.add_argument('--threads', type=int, default=4, help='Threads per worker')
+    parser.add_argument('--limit', default='50 per 2 seconds')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    args = parser.parse_args()
+
+    from src.services.rate_limit_service import parse_limit
+
+    redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    scope = f'loadtest-{uuid.uuid4().hex[:8]}'
+    limit = parse_limit(args.limit)
+
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(redis_url, scope, args.limit, args.seconds, args.threads, results))
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+
+    allowed, latencies, fallbacks = Counter(), [], 0
+    for _ in processes:
+        worker_allowed, worker_latencies, worker_fallbacks = results.get()
+        allowed.update(worker_allowed)
+        latencies.extend(worker_latencies)
+        fallbacks += worker_fallbacks
+    for process in processes:
+        process.join()
+
+    print(f"{args.workers} workers x {args.threads} threads, limit {limit.amount} per {limit.window}s, "
+          f"{len(latencies)} checks, {fallbacks} Redis fallbacks")
+    print(f"\n{'window':<12} {'allowed':>8} {'limit':>6}")
+    # The first and last windows are partial
+    for index in sorted(allowed):
+        print(f"{index:<12} {allowed[index]:>8} {limit.amount:>6}")
+
+    latencies.sort()
+    print(f"\nCheck latency p50 {statistics.median(latencies) * 1000:.2f}ms, "
+          f"p99 {latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000:.2f}ms")
+
+    ok = max(allowed.values(), default=0) <= limit.amount and fallbacks == 0
+    print('\nLimits held across workers' if ok else '\nLIMIT EXCEEDED or Redis unavailable')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Replay recorded MT5 stream messages through the ingestion pipeline
+
+Input is JSON lines, one message per line:
+    {"stream": "position", "t": 0.125, "data": {"login": "...", "ticket": ..., ...}}
+`t` (seconds from the start of the recording) is optional and only used
+when replaying at a fixed speed.
+
+Usage:
+    python3 scripts/replay_mt5_stream.py replay FILE [--speed X] [--queue-size N]
+        [--flush-interval S] [--max-batch N]
+    python3 scripts/replay_mt5_stream.py generate FILE --logins L1,L2 [--messages N]
+        [--positions-per-login N] [--rate MSG_PER_SEC]
+
+--speed 0 (default) replays as fast as the pipeline accepts messages, which
+is what load tests want: the stats show queue depth, time producers spent
+blocked, coalescing and flush latency. Replaying writes to the configured
+database, so point DATABASE_URL at a scratch copy.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def generate(args):
+    """Write a synthetic recording: mostly position ticks, some deals and account updates"""
+    logins = [login.strip() for login in args.logins.split(',') if login.strip()]
+    if not logins:
+        sys.exit('At least one login is required')
+
+    rng = random.Random(args.seed)
+    base_ticket = int(time.time()) * 1000
+    positions = {
+        login: [base_ticket + i * 100 + n for n in range(args.positions_per_login)]
+        for i, login in enumerate(logins)
+    }
+    next_deal = base_ticket + len(logins) * 100 + 1
+    now = datetime.utcnow().isoformat()
+
+    with open(args.file, 'w') as out:
+        for n in range(args.messages):
+            login = rng.choice(logins)
+            roll = rng.random()
+            if roll < 0.85:
+                stream = 'position'
+                data = {
+                    'login': login,
+                    'ticket': rng.choice(positions[login]),
+                    'symbol': 'EURUSD',
+                    'type': 'buy',
+                    'volume': 1.0,
+                    'price_open': 1.1,
+                    'price_current': round(1.1 + rng.uniform(-0.01, 0.01), 5),
+                    'profit': round(rng.uniform(-500, 500), 2),
+                    'time': now,
+                }
+            elif roll < 0.95:
+                stream = 'account'
+                balance = round(rng.uniform(9000, 11000), 2)
+                data = {'login': login, 'balance': balance, 'equity': round(balance + rng.uniform(-200, 200), 2)}
+            else:
+                stream = 'deal'
+                data = {
+                    'login': login,
+                    'ticket': next_deal,
+                    'symbol': 'EURUSD',
+                    'type': 'sell',
+                    'volume': 0.5,
+                    'price': 1.1,
+                    'time': now,
+                }
+                next_deal += 1
+            out.write(json.dumps({'stream': stream, 't': round(n / args.rate, 6), 'data': data}) + '\n')
+
+    print(f"Wrote {args.messages} messages for {len(logins)} logins to {args.file}")
+
+
+async def _replay(pipeline, messages, speed):
+    await pipeline.start()
+    started = time.monotonic()
+    for record in messages:
+        if speed and 't' in record:
+            delay = record['t'] / speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await pipeline.submit(record['stream'], record['data'])
+    submitted = time.monotonic() - started
+    await pipeline.stop()
+    return submitted, time.monotonic() - started
+
+
+def replay(args):
+    from src.app import create_app
+    from src.database import db
+    from src.services.mt5_ingestion import MT5IngestionPipeline
+
+    with open(args.file) as f:
+        messages = [json.loads(line) for line in f if line.strip()]
+
+    app = create_app()
+    events = []
+    pipeline = MT5IngestionPipeline(
+        db.session,
+        emit=lambda event, payload, room=None: events.append(event),
+        app=app,
+        queue_size=args.queue_size,
+        flush_interval=args.flush_interval,
+        max_batch=args.max_batch,
+    )
+
+    submitted, total = asyncio.run(_replay(pipeline, messages, args.speed))
+    stats = pipeline.get_stats()
+
+    print(f"Messages:          {len(messages)}")
+    print(f"Submit time:       {submitted:.2f}s ({len(messages) / max(submitted, 1e-9):,.0f} msg/s)")
+    print(f"Total time:        {total:.2f}s ({len(messages) / max(total, 1e-9):,.0f} msg/s end to end)")
+    print(f"Socket.IO events:  {len(events)}")
+    print(json.dumps(stats, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gen = sub.add_parser('generate', help='Write a synthetic recording')
+    gen.add_argument('file')
+    gen.add_argument('--logins', required=True, help='Comma-separated MT5 logins that exist in the database')
+    gen.add_argument('--messages', type=int, default=100000)
+    gen.add_argument('--positions-per-login', type=int, default=5)
+    gen.add_argument('--rate', type=float, default=5000, help='Recorded messages per second')
+    gen.add_argument('--seed', type=int, default=1)
+
+    rep = sub.add_parser('replay', help='Replay a recording through the pipeline')
+    rep.add_argument('file')
+    rep.add_argument('--speed', type=float, default=0, help='Multiple of recorded speed (0 = as fast as possible)')
+    rep.add_argument('--queue-size', type=int, default=10000)
+    rep.add_argument('--flush-interval', type=float, default=0.25)
+    rep.add_argument('--max-batch', type=int, default=5000)
+
+    args = parser.parse_args()
+    if args.command == 'generate':
+        generate(args)
+    else:
+        replay(args)
+
+
+if __name__ == '__main__':
+    main()
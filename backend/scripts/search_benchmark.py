@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark blog search: full-text index vs the old ILIKE scan
+
+Inserts --posts published posts with generated HTML bodies (author
+--author-id, slugs prefixed 'search-bench-'), then runs every query in
+--queries both ways and prints per-query latency percentiles, plus the
+plan of the first full-text query. The result cache is bypassed so every
+run hits the database. The inserted posts are deleted afterwards unless
+--keep is given; point DATABASE_URL at a scratch copy.
+
+Usage:
+    python3 scripts/search_benchmark.py --author-id ID [--posts N] [--runs N]
+        [--queries "risk management,drawdown,scal"] [--keep]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SLUG_PREFIX = 'search-bench-'
+WORDS = (
+    'trading risk management drawdown position sizing leverage forex futures indices commodities '
+    'strategy breakout momentum scalping swing trend reversal support resistance volatility spread '
+    'evaluation challenge funded account payout profit target consistency discipline journal '
+    'psychology patience entry exit stop loss take profit market session liquidity news calendar'
+).split()
+CATEGORIES = ('trading_strategies', 'risk_management', 'market_analysis', 'prop_trading', 'education', 'news')
+
+
+def paragraph(rng, words=80):
+    return '<p>' + ' '.join(rng.choice(WORDS) for _ in range(words)) + '.</p>'
+
+
+def insert_posts(db, BlogPost, author_id, count, seed=7):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    rows = []
+    for n in range(count):
+        title = ' '.join(rng.choice(WORDS) for _ in range(6)).capitalize()
+        rows.append({
+            'title': title,
+            'slug': f'{SLUG_PREFIX}{n}',
+            'excerpt': ' '.join(rng.choice(WORDS) for _ in range(25)),
+            'content': ''.join(paragraph(rng) for _ in range(rng.randint(8, 20))),
+            'category': rng.choice(CATEGORIES),
+            'tags': ','.join(rng.sample(WORDS, 4)),
+            'author_id': author_id,
+            'status': 'published',
+            'published_at': now - timedelta(minutes=n),
+            'view_count': 0,
+            'featured': False,
+            'reading_time': 5,
+            'created_at': now,
+            'updated_at': now,
+        })
+    for i in range(0, len(rows), 1000):
+        db.session.execute(BlogPost.__table__.insert(), rows[i:i + 1000])
+    db.session.commit()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        'p50': statistics.median(samples) * 1000,
+        'p95': samples[max(int(len(samples) * 0.95) - 1, 0)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--author-id', type=int, required=True, help='Existing user the posts belong to')
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--runs', type=int, default=20, help='Runs per query and method')
+    parser.add_argument('--queries', default='risk management,drawdown,position sizing,scal,funded acc')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated posts')
+    args = parser.parse_args()
+
+    from sqlalchemy import desc, func, or_, text
+    from src.app import create_app
+    from src.database import db
+    from src.models.blog_post import BlogPost
+    from src.services import search_service
+    from src.services.search_service import SEARCH_CONFIG, build_tsquery, invalidate_search
+
+    app = create_app()
+    queries = [q.strip() for q in args.queries.split(',') if q.strip()]
+
+    with app.app_context():
+        started = time.monotonic()
+        insert_posts(db, BlogPost, args.author_id, args.posts)
+        db.session.execute(text('ANALYZE blog_posts'))
+        db.session.commit()
+        invalidate_search('blog')  # core inserts skip the ORM hooks
+        print(f"Inserted {args.posts} posts in {time.monotonic() - started:.1f}s")
+
+        def ilike(q):
+            pattern = f'%{q}%'
+            return BlogPost.query.filter_by(status='published').filter(or_(
+                BlogPost.title.ilike(pattern),
+                BlogPost.excerpt.ilike(pattern),
+                BlogPost.content.ilike(pattern),
+                BlogPost.tags.ilike(pattern)
+            )).order_by(desc(BlogPost.published_at)).limit(10).all()
+
+        def fulltext(q):
+            # Uncached: time the database, not the result cache
+            return search_service._search(
+                BlogPost, BlogPost.query.filter_by(status='published'), build_tsquery(q), 1, 10,
+                lambda post: post.to_dict_summary()
+            )
+
+        try:
+            print(f"\n{'query':<20} {'ilike p50':>10} {'ilike p95':>10} {'fts p50':>10} {'fts p95':>10} {'fts hits':>9}")
+            for q in queries:
+                timings = {}
+                for name, method in (('ilike', ilike), ('fts', fulltext)):
+                    method(q)  # warm up
+                    samples = []
+                    for _ in range(args.runs):
+                        t0 = time.perf_counter()
+                        result = method(q)
+                        samples.append(time.perf_counter() - t0)
+                    timings[name] = percentiles(samples)
+                print(f"{q:<20} {timings['ilike']['p50']:>8.1f}ms {timings['ilike']['p95']:>8.1f}ms "
+                      f"{timings['fts']['p50']:>8.1f}ms {timings['fts']['p95']:>8.1f}ms {result.total:>9}")
+
+            tsquery = func.to_tsquery(SEARCH_CONFIG, build_tsquery(queries[0]))
+            statement = BlogPost.query.with_entities(BlogPost.id).filter(
+                BlogPost.status == 'published', BlogPost.search_vector.op('@@')(tsquery)
+            ).order_by(func.ts_rank_cd(BlogPost.search_vector, tsquery).desc()).limit(10).statement
+            compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+            print(f"\nPlan for '{queries[0]}':")
+            for (line,) in db.session.execute(text(f'EXPLAIN ANALYZE {compiled}')):
+                print(f"  {line}")
+        finally:
+            if not args.keep:
+                BlogPost.query.filter(BlogPost.slug.startswith(SLUG_PREFIX)).delete(synchronize_session=False)
+                db.session.commit()
+                invalidate_search('blog')
+
+
+if __name__ == '__main__':
+    main()
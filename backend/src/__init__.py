@@ -7,9 +7,3 @@ from flask_caching import Cache
 cache = Cache()
 
 
-
-# Initialize limiter
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-limiter = Limiter(key_func=get_remote_address)
-
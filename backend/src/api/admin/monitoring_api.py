@@ -7,9 +7,12 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.database import db
 from src.models.trading_program import Challenge
-from src.models.mt5_account import MT5Account
-from src.models.monitoring import MonitoringEvent, ViolationLog, MonitoringAlert
+from src.models.mt5_models import MT5Account
+from src.models.monitoring_models import MonitoringEvent, ViolationLog, MonitoringAlert
 from src.models.user import User
+from src.models.challenge_drawdown import ChallengeDailyDrawdown
+from src.utils.batch_loader import get_loader, prime_relationships
+from src.services.mt5_snapshot_cache import MT5SnapshotCache
 from datetime import datetime, timedelta
 from sqlalchemy import func, and_, or_
 import logging
@@ -64,6 +67,22 @@ def get_monitored_challenges():
             error_out=False
         )
         
+        # Load users and programs for the page in one query each
+        prime_relationships(pagination.items, 'user', 'program')
+        
+        # Load today's drawdown rows for the page in one query
+        ChallengeDailyDrawdown.prime_cache(
+            (challenge.id, challenge.get_current_date()) for challenge in pagination.items
+        )
+        
+        # Live MT5 balances for the page from the snapshot cache (one lookup,
+        # stale accounts refreshed in the background)
+        accounts = MT5Account.query.filter(
+            MT5Account.challenge_id.in_([challenge.id for challenge in pagination.items])
+        ).all() if pagination.items else []
+        snapshots, _ = MT5SnapshotCache.snapshots_for(accounts)
+        live_by_challenge = {account.challenge_id: snapshots[str(account.mt5_login)] for account in accounts}
+        
         # Build response
         challenges = []
         for challenge in pagination.items:
@@ -95,6 +114,7 @@ def get_monitored_challenges():
                 'initial_balance': float(challenge.initial_balance) if challenge.initial_balance else 0,
                 'current_balance': float(challenge.current_balance) if challenge.current_balance else 0,
                 'daily_stats': daily_stats,
+                'live': live_by_challenge.get(challenge.id),
                 'risk_level': risk_level,
                 'created_at': challenge.created_at.isoformat() if challenge.created_at else None
             })
@@ -145,11 +165,13 @@ def get_challenge_details(challenge_id):
         
         # Get MT5 account
         mt5_account = MT5Account.query.filter_by(challenge_id=challenge_id).first()
+        snapshots, _ = MT5SnapshotCache.snapshots_for([mt5_account] if mt5_account else [])
         
         return jsonify({
             'challenge': challenge.to_dict(),
             'daily_stats': daily_stats,
             'mt5_account': mt5_account.to_dict() if mt5_account else None,
+            'live': snapshots.get(str(mt5_account.mt5_login)) if mt5_account else None,
             'recent_events': [e.to_dict() for e in recent_events],
             'violations': [v.to_dict() for v in violations]
         }), 200
@@ -194,10 +216,14 @@ def get_violations():
         # Get violations
         violations = query.order_by(ViolationLog.created_at.desc()).limit(100).all()
         
+        # Load challenges, then their users and programs, in one query each
+        challenges = get_loader(Challenge).get_many(v.challenge_id for v in violations)
+        prime_relationships(list(challenges.values()), 'user', 'program')
+        
         # Build response
         result = []
         for violation in violations:
-            challenge = Challenge.query.get(violation.challenge_id)
+            challenge = challenges.get(violation.challenge_id)
             result.append({
                 **violation.to_dict(),
                 'challenge': {
@@ -251,6 +277,9 @@ def get_monitoring_stats():
         active_challenges = Challenge.query.filter(
             Challenge.status.in_(['active', 'in_progress'])
         ).all()
+        ChallengeDailyDrawdown.prime_cache(
+            (challenge.id, challenge.get_current_date()) for challenge in active_challenges
+        )
         
         for challenge in active_challenges:
             daily_stats = challenge.get_daily_stats()
@@ -13,15 +13,14 @@ patch_psycopg()
 from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_wtf.csrf import CSRFProtect
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from flask_talisman import Talisman
-from src.extensions import limiter
 from src.config import get_config
 from src.database import db, init_db
+from src.middleware.rate_limiter import init_rate_limiter
 from src.middleware.tenant_middleware import init_tenant_middleware
 import logging
 from prometheus_flask_exporter import PrometheusMetrics
+from src.utils.instrumentation import init_instrumentation
 
 
 def create_app(config_name=None):
@@ -39,6 +38,8 @@ def create_app(config_name=None):
     # Initialize extensions
     # Initialize Prometheus metrics
     metrics = PrometheusMetrics(app, group_by="endpoint")
+    # Per-endpoint SQL, Redis, MT5 and response size (first, so its after_request runs last)
+    init_instrumentation(app)
     init_db(app)
     
     # Initialize hierarchy scoping system
@@ -73,16 +74,9 @@ def create_app(config_name=None):
              "supports_credentials": True
          }})
     
-    # Rate Limiting
+    # Rate Limiting (sliding windows shared by all workers through Redis)
     if app.config.get('RATELIMIT_ENABLED'):
-        limiter = Limiter(
-            app=app,
-            key_func=get_remote_address,
-            storage_uri=app.config.get('RATELIMIT_STORAGE_URL'),
-            default_limits=["5000 per day", "1000 per hour"]
-        )
-        limiter.init_app(app)
-        app.limiter = limiter
+        init_rate_limiter(app)
     
     # Initialize Talisman for security headers (skip in testing)
     import os
@@ -3,6 +3,7 @@ Celery configuration for background tasks
 """
 import os
 from celery import Celery
+from celery.schedules import crontab
 from kombu import Exchange, Queue
 
 # Celery configuration
@@ -52,6 +53,30 @@ celery_app.conf.update(
     task_retry_backoff=True,
     task_retry_backoff_max=600,
     task_retry_jitter=True,
+    
+    # Periodic tasks
+    beat_schedule={
+        'refresh-analytics-rollups': {
+            'task': 'analytics.refresh_rollups',
+            'schedule': 60.0,  # Every minute
+        },
+        'verify-analytics-rollups': {
+            'task': 'analytics.verify_rollups',
+            'schedule': crontab(hour=3, minute=30),  # Nightly
+        },
+        'reconcile-unread-counts': {
+            'task': 'src.tasks.notification_tasks.reconcile_unread_counts',
+            'schedule': 600.0,  # Every 10 minutes
+        },
+        'process-pending-kyc-documents': {
+            'task': 'kyc.process_pending',
+            'schedule': 300.0,  # Every 5 minutes
+        },
+        'verify-ledger-balances': {
+            'task': 'ledger.verify_balances',
+            'schedule': crontab(hour=4, minute=0),  # Nightly
+        },
+    },
 )
 
 # Auto-discover tasks
@@ -29,6 +29,11 @@ class Config:
     # Redis
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
     
+    # Socket.IO message queue, for emitting events from Celery and web workers
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', REDIS_URL)
+    # Push unread-count changes to user:<id> Socket.IO rooms
+    NOTIFICATION_PUSH_ENABLED = os.getenv('NOTIFICATION_PUSH_ENABLED', 'true').lower() == 'true'
+    
     # Flask-Caching configuration
     CACHE_TYPE = 'RedisCache'
     CACHE_REDIS_URL = REDIS_URL
@@ -51,6 +56,7 @@ class Config:
     # SendGrid
     SENDGRID_API_KEY = os.getenv('SENDGRID_API_KEY')
     SENDGRID_FROM_EMAIL = os.getenv('SENDGRID_FROM_EMAIL', 'noreply@marketedgepros.com')
+    EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'sendgrid')  # sendgrid, fake (local sink for load tests)
     
     # MetaTrader (placeholder for future implementation)
     MT_SERVER = os.getenv('MT_SERVER')
@@ -66,7 +72,6 @@ class Config:
     
     # Rate Limiting
     RATELIMIT_ENABLED = True
-    RATELIMIT_STORAGE_URL = REDIS_URL
 
 
 class DevelopmentConfig(Config):
@@ -3,18 +3,9 @@ Flask extensions initialization
 """
 from flask_sqlalchemy import SQLAlchemy
 from flask_mail import Mail
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 
 # Initialize SQLAlchemy
 db = SQLAlchemy()
 
 # Initialize Flask-Mail
 mail = Mail()
-
-# Initialize Flask-Limiter
-limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"  # Use Redis in production
-)
@@ -1,8 +1,7 @@
 """Authentication middleware"""
 from functools import wraps
 from flask import request, jsonify, g
-from src.models import User
-from src.models.token_blacklist import TokenBlacklist
+from src.services.auth_cache_service import AuthCacheService
 import jwt
 from flask import current_app
 from src.constants.roles import Roles
@@ -37,11 +36,11 @@ def jwt_required(f):
             
             # Check if token is blacklisted (revoked)
             jti = data.get('jti')
-            if jti and TokenBlacklist.is_token_revoked(jti):
+            if jti and AuthCacheService.is_token_revoked(jti):
                 return jsonify({'error': 'Token has been revoked'}), 401
             
-            # Get user
-            current_user = User.query.get(data['user_id'])
+            # Get user (cached principal; the full row is loaded on demand)
+            current_user = AuthCacheService.get_principal(data['user_id'])
             if not current_user or not current_user.is_active:
                 return jsonify({'error': 'Invalid or inactive user'}), 401
             
@@ -70,6 +69,27 @@ def jwt_required(f):
     
     return decorated_function
 
+def user_from_token(token):
+    """
+    Active user for a valid, unrevoked access token (None otherwise)
+
+    Same checks as jwt_required, for callers outside a view (e.g. Socket.IO
+    connections).
+    """
+    try:
+        data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
+        jti = data.get('jti')
+        if jti and AuthCacheService.is_token_revoked(jti):
+            return None
+        user = AuthCacheService.get_principal(data['user_id'])
+        if not user or not user.is_active:
+            return None
+        if data.get('token_version', 0) < (getattr(user, 'token_version', 0) or 0):
+            return None
+        return user
+    except Exception:
+        return None
+
 def get_current_user():
     """Get current authenticated user from g object"""
     return g.get('current_user', None)
@@ -1,24 +1,38 @@
 """
 Failed Login Monitoring and Brute Force Protection
-Tracks failed login attempts and implements exponential backoff
+Tracks failed login attempts per IP and blocks IPs that exceed them
+
+Attempts are counted in a sliding window and blocks are keys that expire on
+their own, both shared by all workers through the rate limit service (in
+bounded process memory while Redis is down).
 """
 from datetime import datetime, timedelta
 from flask import request, jsonify
 from functools import wraps
 import logging
 
+from src.services import rate_limit_service
+from src.services.rate_limit_service import RateLimit
+
 # Configure logger
 logger = logging.getLogger(__name__)
 
-# In-memory storage for failed attempts (consider Redis for production)
-failed_attempts = {}
-blocked_ips = {}
-
 # Configuration
 MAX_ATTEMPTS = 5  # Maximum failed attempts before blocking
 BLOCK_DURATION = timedelta(minutes=15)  # How long to block
 ATTEMPT_WINDOW = timedelta(minutes=5)  # Time window to count attempts
 
+FAILURE_SCOPE = 'login_failures'
+BLOCK_SCOPE = 'login'
+# Failed attempts from all IPs, for the admin statistics
+ALL_FAILURES_SCOPE = 'login_failures_all'
+HOUR = 3600
+UNCAPPED = 2 ** 31
+
+
+def _attempt_limit():
+    return RateLimit(MAX_ATTEMPTS, int(ATTEMPT_WINDOW.total_seconds()))
+
 
 def get_client_ip():
     """
@@ -48,17 +62,9 @@ def is_ip_blocked(ip_address):
     Returns:
         tuple: (is_blocked, time_remaining)
     """
-    if ip_address in blocked_ips:
-        block_time = blocked_ips[ip_address]
-        if datetime.utcnow() < block_time:
-            time_remaining = (block_time - datetime.utcnow()).total_seconds()
-            return True, time_remaining
-        else:
-            # Block expired, remove it
-            del blocked_ips[ip_address]
-            if ip_address in failed_attempts:
-                del failed_attempts[ip_address]
-    
+    time_remaining = rate_limit_service.blocked_for(BLOCK_SCOPE, ip_address)
+    if time_remaining > 0:
+        return True, time_remaining
     return False, 0
 
 
@@ -69,28 +75,15 @@ def record_failed_login(ip_address, email=None):
     Args:
         ip_address: The IP address of the attempt
         email: Optional email address used in the attempt
-    """
-    now = datetime.utcnow()
-    
-    # Initialize or get existing attempts for this IP
-    if ip_address not in failed_attempts:
-        failed_attempts[ip_address] = []
     
-    # Add this attempt
-    failed_attempts[ip_address].append({
-        'timestamp': now,
-        'email': email
-    })
-    
-    # Clean old attempts (outside the window)
-    cutoff_time = now - ATTEMPT_WINDOW
-    failed_attempts[ip_address] = [
-        attempt for attempt in failed_attempts[ip_address]
-        if attempt['timestamp'] > cutoff_time
-    ]
+    Returns:
+        bool: True if the IP is now blocked
+    """
+    result = rate_limit_service.hit(FAILURE_SCOPE, ip_address, [_attempt_limit()])
+    rate_limit_service.hit(ALL_FAILURES_SCOPE, 'all', [RateLimit(UNCAPPED, HOUR)])
     
     # Count recent attempts
-    recent_attempts = len(failed_attempts[ip_address])
+    recent_attempts = MAX_ATTEMPTS - result.remaining if result.allowed else MAX_ATTEMPTS
     
     # Log the failed attempt
     logger.warning(
@@ -101,8 +94,9 @@ def record_failed_login(ip_address, email=None):
     
     # Block if exceeded max attempts
     if recent_attempts >= MAX_ATTEMPTS:
-        block_until = now + BLOCK_DURATION
-        blocked_ips[ip_address] = block_until
+        rate_limit_service.block(BLOCK_SCOPE, ip_address, BLOCK_DURATION.total_seconds())
+        rate_limit_service.clear(FAILURE_SCOPE, ip_address, [_attempt_limit().window])
+        block_until = datetime.utcnow() + BLOCK_DURATION
         
         logger.error(
             f"IP {ip_address} blocked due to {recent_attempts} failed login attempts. "
@@ -121,11 +115,8 @@ def record_successful_login(ip_address):
     Args:
         ip_address: The IP address of the successful login
     """
-    if ip_address in failed_attempts:
-        del failed_attempts[ip_address]
-    
-    if ip_address in blocked_ips:
-        del blocked_ips[ip_address]
+    rate_limit_service.clear(FAILURE_SCOPE, ip_address, [_attempt_limit().window])
+    rate_limit_service.unblock(BLOCK_SCOPE, ip_address)
     
     logger.info(f"Successful login from {ip_address}")
 
@@ -174,29 +165,21 @@ def get_failed_attempts_stats():
         dict: Statistics about failed attempts and blocked IPs
     """
     now = datetime.utcnow()
+    blocked = rate_limit_service.blocks(BLOCK_SCOPE)
     
-    # Count active blocks
-    active_blocks = sum(1 for block_time in blocked_ips.values() if block_time > now)
-    
-    # Count recent attempts (last hour)
-    recent_attempts = 0
-    for attempts in failed_attempts.values():
-        recent_attempts += sum(
-            1 for attempt in attempts
-            if attempt['timestamp'] > now - timedelta(hours=1)
-        )
+    # Sliding count of the last hour, read without counting an attempt
+    hourly = rate_limit_service.peek(ALL_FAILURES_SCOPE, 'all', [RateLimit(UNCAPPED, HOUR)])
     
     return {
-        'active_blocks': active_blocks,
-        'recent_attempts_1h': recent_attempts,
-        'total_tracked_ips': len(failed_attempts),
+        'active_blocks': len(blocked),
+        'recent_attempts_1h': UNCAPPED - hourly.remaining,
+        'total_tracked_ips': len(rate_limit_service.identities(FAILURE_SCOPE, _attempt_limit().window)),
         'blocked_ips': [
             {
                 'ip': ip,
-                'blocked_until': block_time.isoformat(),
-                'time_remaining': int((block_time - now).total_seconds())
+                'blocked_until': (now + timedelta(seconds=remaining)).isoformat(),
+                'time_remaining': int(remaining)
             }
-            for ip, block_time in blocked_ips.items()
-            if block_time > now
+            for ip, remaining in blocked.items()
         ]
     }
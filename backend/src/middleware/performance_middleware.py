@@ -7,6 +7,9 @@ from flask import request, make_response
 from functools import wraps
 import time
 
+# Largest response body hashed for an ETag
+ETAG_MAX_BYTES = 64 * 1024
+
 class PerformanceMiddleware:
     """Middleware to add performance optimizations"""
     
@@ -59,8 +62,12 @@ class PerformanceMiddleware:
                 response.cache_control.must_revalidate = True
         
         # Add ETag for GET requests
+        # (a fallback: endpoints with @conditional answer If-None-Match
+        # before rendering; large and uncacheable bodies are not hashed)
         if request.method == 'GET' and response.status_code == 200:
-            if not response.headers.get('ETag'):
+            if (not response.headers.get('ETag') and not response.direct_passthrough
+                    and not response.cache_control.no_store
+                    and (response.content_length or 0) <= ETAG_MAX_BYTES):
                 # Generate ETag from response data
                 import hashlib
                 etag = hashlib.md5(response.get_data()).hexdigest()
@@ -1,17 +1,31 @@
 """
 Rate Limiting Middleware
 Prevents brute force attacks and API abuse
+
+Limits are counted in sliding windows shared by all workers through Redis
+(see rate_limit_service), so "5 per minute" means five requests per client
+across the whole deployment, not per worker.
 """
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-from flask import request
-import os
+from functools import wraps
+import math
+import time
+
+from flask import current_app, g, request
+from werkzeug.exceptions import TooManyRequests
+
+from src.services import rate_limit_service
+
 
 def get_user_identifier():
     """
     Get user identifier for rate limiting
-    Uses JWT user_id if authenticated, otherwise IP address
+    Uses the authenticated user's id, otherwise IP address
     """
+    # User set by token_required / jwt_required (limits applied below them)
+    user = g.get('current_user')
+    if getattr(user, 'id', None):
+        return f"user:{user.id}"
+
     # Try to get user from JWT token
     from flask_jwt_extended import get_jwt_identity
     try:
@@ -20,16 +34,116 @@ def get_user_identifier():
             return f"user:{user_id}"
     except:
         pass
-    
+
     # Fallback to IP address
-    return get_remote_address()
+    return request.remote_addr or '127.0.0.1'
+
+
+class RateLimitExceeded(TooManyRequests):
+    """Raised when a request is over one of its limits"""
+
+    def __init__(self, result):
+        self.result = result
+        super().__init__(
+            description=f"{result.limit.amount} per {result.limit.window} seconds",
+            retry_after=max(1, int(math.ceil(result.reset_after)))
+        )
+
+
+class RateLimiter:
+    """
+    Flask extension applying shared sliding-window rate limits
+
+    Endpoints decorated with limit() are counted per client (key_func) and
+    endpoint; every other endpoint gets default_limits. Limits are strings
+    such as "5 per minute", several separated by ';'. Nothing is enforced
+    on apps that were not initialised or have RATELIMIT_ENABLED = False.
+    """
+
+    def __init__(self, key_func=get_user_identifier, default_limits=None, headers_enabled=True):
+        self.key_func = key_func
+        self.default_limits = rate_limit_service.parse_limits(default_limits or [])
+        self.headers_enabled = headers_enabled
+
+    def init_app(self, app):
+        app.extensions['rate_limiter'] = self
+        # Like a new storage: nothing counted locally before the app existed
+        rate_limit_service.reset_local()
+        if app.config.get('RATELIMIT_DEFAULT'):
+            self.default_limits = rate_limit_service.parse_limits(app.config['RATELIMIT_DEFAULT'])
+        app.before_request(self._check_default_limits)
+        app.after_request(self._add_headers)
+
+    def _enabled(self):
+        return current_app.extensions.get('rate_limiter') is self and current_app.config.get('RATELIMIT_ENABLED', True)
+
+    def check(self, limits, scope, key_func=None):
+        """
+        Count the current request against limits
+
+        Raises:
+            RateLimitExceeded: If any of the limits is exhausted
+        """
+        identity = (key_func or self.key_func)()
+        result = rate_limit_service.hit(scope, identity, limits)
+        previous = g.get('rate_limit_result')
+        if previous is None or not result.allowed or (previous.allowed and result.remaining < previous.remaining):
+            g.rate_limit_result = result
+        if not result.allowed:
+            raise RateLimitExceeded(result)
+
+    def limit(self, limit_value, key_func=None, scope=None):
+        """
+        Decorator limiting an endpoint (replaces the default limits)
+
+        Args:
+            limit_value: Limit string, e.g. "10 per minute"
+            key_func: Client identifier (default: user id or IP)
+            scope: Counter name shared by the decorated endpoints
+                (default: one per endpoint)
+        """
+        limits = rate_limit_service.parse_limits(limit_value)
+
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                if self._enabled():
+                    self.check(limits, scope or request.endpoint, key_func)
+                return f(*args, **kwargs)
+
+            decorated.rate_limited = True
+            return decorated
+        return decorator
+
+    def exempt(self, f):
+        """Decorator exempting an endpoint from the default limits"""
+        f.rate_limited = True
+        return f
+
+    def _check_default_limits(self):
+        if not self.default_limits or request.method == 'OPTIONS' or not self._enabled():
+            return
+        view = current_app.view_functions.get(request.endpoint)
+        if view is None or request.endpoint == 'static' or getattr(view, 'rate_limited', False):
+            return
+        self.check(self.default_limits, request.endpoint)
+
+    def _add_headers(self, response):
+        result = g.get('rate_limit_result')
+        if result is None or not self.headers_enabled:
+            return response
+        response.headers['X-RateLimit-Limit'] = str(result.limit.amount)
+        response.headers['X-RateLimit-Remaining'] = str(max(result.remaining, 0))
+        response.headers['X-RateLimit-Reset'] = str(int(time.time() + result.reset_after))
+        if not result.allowed:
+            response.headers['Retry-After'] = str(max(1, int(math.ceil(result.reset_after))))
+        return response
+
 
 # Initialize limiter
-limiter = Limiter(
+limiter = RateLimiter(
     key_func=get_user_identifier,
-    default_limits=["1000 per day", "200 per hour"],
-    storage_uri="memory://",  # Use Redis in production: redis://localhost:6379
-    strategy="fixed-window",
+    default_limits=["5000 per day", "1000 per hour"],
     headers_enabled=True,
 )
 
@@ -40,26 +154,26 @@ RATE_LIMITS = {
     'auth_register': "3 per hour",  # Prevent spam accounts
     'auth_password_reset': "3 per hour",  # Prevent abuse
     'auth_verify_email': "10 per hour",  # Allow retries but prevent spam
-    
+
     # Payment endpoints - moderate limits
     'payment_create': "10 per hour",  # Prevent payment spam
     'payment_list': "60 per minute",  # Allow frequent checks
-    
+
     # Challenge endpoints - moderate limits
     'challenge_create': "5 per hour",  # Prevent abuse
     'challenge_list': "100 per minute",  # Allow frequent checks
-    
+
     # Withdrawal endpoints - strict limits
     'withdrawal_create': "3 per hour",  # Prevent abuse
     'withdrawal_list': "60 per minute",
-    
+
     # User endpoints - lenient limits
     'user_profile': "100 per minute",  # Allow frequent access
     'user_update': "20 per hour",  # Moderate updates
-    
+
     # Admin endpoints - very strict limits
     'admin_action': "100 per hour",  # Prevent abuse of admin powers
-    
+
     # API general - default limits
     'api_default': "200 per hour",
 }
@@ -68,17 +182,29 @@ def get_rate_limit(endpoint_type):
     """Get rate limit for specific endpoint type"""
     return RATE_LIMITS.get(endpoint_type, RATE_LIMITS['api_default'])
 
+def rate_limit(endpoint_type, key_func=None):
+    """
+    Decorator applying the RATE_LIMITS entry of an endpoint type
+
+    Usage:
+        @auth_bp.route('/login', methods=['POST'])
+        @rate_limit('auth_login')
+        def login():
+            ...
+    """
+    return limiter.limit(get_rate_limit(endpoint_type), key_func=key_func)
+
 def init_rate_limiter(app):
     """Initialize rate limiter with Flask app"""
     limiter.init_app(app)
-    
+
     # Add custom error handler
     @app.errorhandler(429)
     def ratelimit_handler(e):
         return {
             'error': 'Rate limit exceeded',
             'message': 'Too many requests. Please try again later.',
-            'retry_after': e.description
+            'retry_after': getattr(e, 'retry_after', e.description)
         }, 429
-    
+
     return limiter
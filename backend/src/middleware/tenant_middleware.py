@@ -3,78 +3,48 @@ Tenant Middleware for Multi-Tenant Support
 Automatically detects tenant from subdomain or custom domain
 """
 from flask import request, g, abort
-from src.models.tenant import Tenant
+from src.services.tenant_resolver import tenant_resolver
 from functools import wraps
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Requests that never need a tenant
+TENANT_EXEMPT_ENDPOINTS = ('static', 'prometheus_metrics')
+TENANT_EXEMPT_BLUEPRINTS = ('health',)
+
 
 def get_tenant_from_request():
     """
     Get tenant from request based on:
-    1. Custom domain (e.g., client.com)
-    2. Subdomain (e.g., client.marketedgepros.com)
-    3. X-Tenant-ID header (for API testing)
-    4. tenant_id query parameter (for development)
+    1. X-Tenant-ID header (for API testing)
+    2. tenant_id query parameter (for development)
+    3. Custom domain (e.g., client.com)
+    4. Subdomain (e.g., client.marketedgepros.com)
+    5. Default tenant (main platform), then the first active tenant
     
-    Returns:
-        Tenant: Tenant object or None
-    """
-    # Check X-Tenant-ID header (for API testing)
-    tenant_id_header = request.headers.get('X-Tenant-ID')
-    if tenant_id_header:
-        try:
-            tenant = Tenant.query.get(int(tenant_id_header))
-            if tenant and tenant.status == 'active':
-                return tenant
-        except (ValueError, TypeError):
-            pass
-    
-    # Check tenant_id query parameter (for development)
-    tenant_id_param = request.args.get('tenant_id')
-    if tenant_id_param:
-        try:
-            tenant = Tenant.query.get(int(tenant_id_param))
-            if tenant and tenant.status == 'active':
-                return tenant
-        except (ValueError, TypeError):
-            pass
-    
-    # Get host from request
-    host = request.host.lower()
-    
-    # Remove port if present
-    if ':' in host:
-        host = host.split(':')[0]
-    
-    # Check for custom domain
-    tenant = Tenant.query.filter_by(custom_domain=host, status='active').first()
-    if tenant:
-        return tenant
+    Resolved through the in-process tenant resolver, so this normally
+    runs no queries.
     
-    # Check for subdomain
-    # Expected format: subdomain.marketedgepros.com
-    parts = host.split('.')
+    Returns:
+        TenantSnapshot: Read-only tenant or None
+    """
+    tenant_resolver.ensure_listener()
     
-    if len(parts) >= 2:
-        # Extract subdomain (first part)
-        subdomain = parts[0]
-        
-        # Skip common subdomains
-        if subdomain not in ['www', 'api', 'admin', 'app']:
-            tenant = Tenant.query.filter_by(subdomain=subdomain, status='active').first()
-            if tenant:
-                return tenant
+    # Check X-Tenant-ID header (for API testing), then tenant_id query parameter (for development)
+    for tenant_id in (request.headers.get('X-Tenant-ID'), request.args.get('tenant_id')):
+        if tenant_id:
+            try:
+                tenant = tenant_resolver.by_id(int(tenant_id))
+                if tenant:
+                    return tenant
+            except (ValueError, TypeError):
+                pass
     
-    # Default tenant (main platform)
-    # You can configure this in settings
-    default_tenant = Tenant.query.filter_by(subdomain='main', status='active').first()
-    if default_tenant:
-        return default_tenant
+    # Get host from request, without port
+    host = request.host.lower().split(':')[0]
     
-    # If no tenant found, return the first active tenant (fallback)
-    return Tenant.query.filter_by(status='active').first()
+    return tenant_resolver.by_host(host)
 
 
 def tenant_context():
@@ -85,8 +55,10 @@ def tenant_context():
     import os
     from flask import current_app
     
-    # Skip in testing mode
-    if current_app.config.get('TESTING') or os.environ.get('FLASK_TESTING') == 'true':
+    # Skip in testing mode, and for health checks and static files
+    if (current_app.config.get('TESTING') or os.environ.get('FLASK_TESTING') == 'true'
+            or request.endpoint in TENANT_EXEMPT_ENDPOINTS
+            or request.blueprint in TENANT_EXEMPT_BLUEPRINTS):
         g.tenant = None
         g.tenant_id = None
         return
@@ -130,7 +102,7 @@ def get_current_tenant():
     Get current tenant from Flask g context
     
     Returns:
-        Tenant: Current tenant or None
+        TenantSnapshot: Current tenant (read-only) or None
     """
     return getattr(g, 'tenant', None)
 
@@ -212,5 +184,15 @@ def init_tenant_middleware(app):
     def set_tenant_context():
         tenant_context()
     
+    # Index tenants now; with preload_app the workers inherit the index
+    try:
+        from src.database import db
+        with app.app_context():
+            tenant_resolver.warm_up()
+            # Don't hand pooled connections to forked workers
+            db.engine.dispose()
+    except Exception as e:
+        logger.warning(f"Tenant resolver warm-up failed, resolving lazily: {e}")
+    
     logger.info("Tenant middleware initialized")
 
@@ -2,23 +2,30 @@
 Models package
 """
 from src.models.user import User, EmailVerificationToken, PasswordResetToken
+from src.models.user_closure import UserClosure
 from src.models.verification_attempt import VerificationAttempt
 from src.models.tenant import Tenant
 from src.models.trading_program import TradingProgram, ProgramAddOn, Challenge
+from src.models.challenge_drawdown import ChallengeDailyDrawdown
 from src.models.lead import Lead, LeadActivity, LeadNote
 from src.models.agent import Agent
 from src.models.referral import Referral
 from src.models.commission import Commission
 from src.models.withdrawal import Withdrawal
 from src.models.trade import Trade
+from src.models.challenge_trade_stats import ChallengeTradeStats
 from src.models.payment import Payment
 from src.models.payment_approval import PaymentApprovalRequest
 from src.models.wallet import Wallet, Transaction
+from src.models.ledger import JournalEntry, JournalLine
 from src.models.notification import Notification, NotificationPreference, EmailQueue
 from src.models.support_article import SupportArticle
+from src.models.kyc_document import KycDocument
+from src.models.analytics_rollup import AnalyticsDailyRollup
 
 __all__ = [
     'User',
+    'UserClosure',
     'EmailVerificationToken',
     'PasswordResetToken',
     'VerificationAttempt',
@@ -26,11 +33,13 @@ __all__ = [
     'TradingProgram',
     'ProgramAddOn',
     'Challenge',
+    'ChallengeDailyDrawdown',
     'Agent',
     'Referral',
     'Commission',
     'Withdrawal',
     'Trade',
+    'ChallengeTradeStats',
     'Payment',
     'PaymentApprovalRequest',
     'Lead',
@@ -38,10 +47,14 @@ __all__ = [
     'LeadNote',
     'Wallet',
     'Transaction',
+    'JournalEntry',
+    'JournalLine',
     'Notification',
     'NotificationPreference',
     'EmailQueue',
     'SupportArticle',
+    'KycDocument',
+    'AnalyticsDailyRollup',
     'AccountScaling',
     'ScalingTier',
 ]
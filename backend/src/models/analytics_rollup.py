@@ -0,0 +1,150 @@
+"""
+Daily analytics rollup model
+Pre-aggregated payment, registration and challenge facts per day, for the
+whole platform, per tenant and per hierarchy node (the node's whole downline)
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import JSONB
+from src.database import db, get_redis
+from src.utils.session_hooks import collect, on_commit
+
+SCOPE_GLOBAL = 'global'
+SCOPE_TENANT = 'tenant'
+SCOPE_NODE = 'node'
+
+# Redis set of ISO days whose rollups must be recomputed
+DIRTY_DAYS_KEY = 'analytics_rollup:dirty_days'
+
+COUNTER_FIELDS = (
+    'transactions', 'registrations', 'active_registrations',
+    'challenges_created', 'challenges_completed', 'challenges_funded',
+)
+
+
+class AnalyticsDailyRollup(db.Model):
+    """Facts for one scope and one UTC day"""
+
+    __tablename__ = 'analytics_daily_rollups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(10), nullable=False)  # global, tenant, node
+    scope_id = db.Column(db.Integer, nullable=False, default=0)  # tenant ID or user ID (0 for global / no tenant)
+    date = db.Column(db.Date, nullable=False)
+
+    # Payments
+    revenue = db.Column(db.Numeric(15, 2), nullable=False, default=0)  # completed payments only
+    transactions = db.Column(db.Integer, nullable=False, default=0)
+    payment_status_counts = db.Column(JSONB, nullable=False, default=dict)  # {status: count}
+    payment_method_totals = db.Column(JSONB, nullable=False, default=dict)  # {method: {count, amount}}, completed only
+
+    # Users
+    registrations = db.Column(db.Integer, nullable=False, default=0)
+    active_registrations = db.Column(db.Integer, nullable=False, default=0)
+
+    # Challenges (by creation day)
+    challenges_created = db.Column(db.Integer, nullable=False, default=0)
+    challenges_completed = db.Column(db.Integer, nullable=False, default=0)
+    challenges_funded = db.Column(db.Integer, nullable=False, default=0)
+    challenge_status_counts = db.Column(JSONB, nullable=False, default=dict)  # {status: count}
+
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('scope', 'scope_id', 'date', name='uq_analytics_daily_rollup'),
+        db.Index('ix_analytics_daily_rollup_date', 'date'),
+    )
+
+    def __repr__(self):
+        return f'<AnalyticsDailyRollup {self.scope}:{self.scope_id} {self.date}>'
+
+    def to_facts(self):
+        """Convert to the plain facts dict produced by the rollup service"""
+        facts = {field: getattr(self, field) or 0 for field in COUNTER_FIELDS}
+        facts.update({
+            'revenue': float(self.revenue or 0),
+            'payment_status_counts': dict(self.payment_status_counts or {}),
+            'payment_method_totals': dict(self.payment_method_totals or {}),
+            'challenge_status_counts': dict(self.challenge_status_counts or {}),
+        })
+        return facts
+
+    @classmethod
+    def get_range(cls, scope, scope_id, start_date, end_date=None):
+        """Rows for one scope between two dates (inclusive), oldest first"""
+        query = cls.query.filter(
+            cls.scope == scope,
+            cls.scope_id == scope_id,
+            cls.date >= start_date
+        )
+        if end_date is not None:
+            query = query.filter(cls.date <= end_date)
+        return query.order_by(cls.date).all()
+
+
+# ============================================================================
+# Write hooks - mark the affected day dirty once the change is committed
+# ============================================================================
+
+def mark_days_dirty(days):
+    """Queue ISO days for the next rollup refresh"""
+    days = {d.isoformat() if hasattr(d, 'isoformat') else d for d in days if d}
+    redis_client = get_redis()
+    if not days or not redis_client:
+        return False
+    try:
+        redis_client.sadd(DIRTY_DAYS_KEY, *days)
+        return True
+    except Exception:
+        return False
+
+
+# Columns whose changes alter a day's facts
+WATCHED_COLUMNS = {
+    'Payment': ('status', 'amount', 'payment_method', 'user_id'),
+    'Challenge': ('status', 'user_id'),
+    'User': ('is_active', 'tenant_id', 'parent_id'),
+}
+
+
+def _record_dirty_day(session, target):
+    created_at = getattr(target, 'created_at', None) or datetime.utcnow()
+    if session is not None:
+        collect(session, 'analytics_dirty_days').add(created_at.date())
+
+
+def _on_insert_or_delete(mapper, connection, target):
+    _record_dirty_day(db.inspect(target).session, target)
+
+
+def _on_update(mapper, connection, target):
+    state = db.inspect(target)
+    watched = WATCHED_COLUMNS[mapper.class_.__name__]
+    if any(state.attrs[name].history.has_changes() for name in watched):
+        _record_dirty_day(state.session, target)
+
+
+def _register_write_hooks():
+    from src.models.payment import Payment
+    from src.models.trading_program import Challenge
+    from src.models.user import User
+
+    for model in (Payment, Challenge, User):
+        event.listen(model, 'after_insert', _on_insert_or_delete)
+        event.listen(model, 'after_update', _on_update)
+        event.listen(model, 'after_delete', _on_insert_or_delete)
+
+
+@on_commit('analytics_dirty_days')
+def flush_dirty_days_on_commit(days):
+    """Push the days touched by the committed transaction to Redis"""
+    mark_days_dirty(days)
+
+
+_register_write_hooks()
+
+
+def recent_days(count, today=None):
+    """The last `count` UTC days, oldest first"""
+    today = today or datetime.utcnow().date()
+    return [today - timedelta(days=offset) for offset in range(count - 1, -1, -1)]
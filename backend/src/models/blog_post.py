@@ -4,6 +4,17 @@ Blog Post model for content management
 from src.database import db, TimestampMixin
 from datetime import datetime
 from sqlalchemy import Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
+
+
+# Weighted search document: title A, tags B, excerpt C, body text D (tags stripped)
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(tags, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(excerpt, '')), 'C') || "
+    "setweight(to_tsvector('english', regexp_replace(coalesce(content, ''), '<[^>]*>', ' ', 'g')), 'D')"
+)
 
 
 class BlogPost(db.Model, TimestampMixin):
@@ -47,6 +58,9 @@ class BlogPost(db.Model, TimestampMixin):
     # Reading time (in minutes)
     reading_time = db.Column(db.Integer, default=5)
     
+    # Full-text search document, kept current by Postgres on every write
+    search_vector = deferred(db.Column(TSVECTOR, db.Computed(SEARCH_VECTOR_SQL, persisted=True)))
+    
     # Relationships
     author = db.relationship('User', backref='blog_posts')
     
@@ -55,6 +69,7 @@ class BlogPost(db.Model, TimestampMixin):
         Index('idx_blog_status_published', 'status', 'published_at'),
         Index('idx_blog_category_status', 'category', 'status'),
         Index('idx_blog_featured_status', 'featured', 'status'),
+        Index('idx_blog_search_vector', 'search_vector', postgresql_using='gin'),
     )
     
     def __repr__(self):
@@ -0,0 +1,299 @@
+"""
+Per-day challenge drawdown model
+One row per challenge per trading day, replacing the daily_drawdown_history JSONB blob
+"""
+import time
+from datetime import date, datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import undefer
+from src.database import db, TimestampMixin
+
+# Seconds a cached "today" row is trusted by readers (API, violation checks)
+READ_CACHE_TTL = 5
+# Seconds a cached row is trusted by the writer between syncs
+WRITE_CACHE_TTL = 120
+# Upper bound on cached challenges per process
+MAX_CACHE_SIZE = 50000
+# Rows per INSERT statement (stays well under the bind parameter limit)
+UPSERT_CHUNK_SIZE = 1000
+
+# challenge_id -> (day_iso, day_data, cached_at)
+_today_cache = {}
+# Cached in place of day_data when prime_cache() found no row for the day
+_NO_ROW = object()
+
+NUMERIC_FIELDS = (
+    'starting_balance', 'starting_equity', 'starting_value',
+    'current_balance', 'current_equity', 'open_pnl', 'closed_pnl',
+    'max_balance', 'max_equity', 'min_balance', 'min_equity',
+    'loss_from_start', 'loss_from_peak', 'drawdown_pct',
+    'commissions', 'swaps', 'daily_limit', 'threshold',
+)
+
+# Intraday extremes only ever widen, whatever a (possibly stale) writer sends
+HIGH_FIELDS = ('max_balance', 'max_equity')
+LOW_FIELDS = ('min_balance', 'min_equity')
+
+
+def _cache_put(challenge_id, day, day_data):
+    if len(_today_cache) >= MAX_CACHE_SIZE:
+        _today_cache.clear()
+    _today_cache[challenge_id] = (day, day_data, time.monotonic())
+
+
+def _cache_get(challenge_id, day, max_age):
+    entry = _today_cache.get(challenge_id)
+    if not entry or entry[0] != day:
+        return None
+    if max_age is not None and time.monotonic() - entry[2] > max_age:
+        return None
+    return entry[1]
+
+
+def clear_drawdown_cache():
+    """Drop all cached rows (tests, or after a manual correction)"""
+    _today_cache.clear()
+
+
+def _parse_datetime(value):
+    if not value or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+class ChallengeDailyDrawdown(db.Model, TimestampMixin):
+    """Daily drawdown statistics for a challenge"""
+
+    __tablename__ = 'challenge_daily_drawdowns'
+
+    id = db.Column(db.Integer, primary_key=True)
+    challenge_id = db.Column(db.Integer, db.ForeignKey('challenges.id', ondelete='CASCADE'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+
+    # Start of day
+    starting_balance = db.Column(db.Numeric(15, 2), default=0)
+    starting_equity = db.Column(db.Numeric(15, 2), default=0)
+    starting_value = db.Column(db.Numeric(15, 2), default=0)
+
+    # Latest reading
+    current_balance = db.Column(db.Numeric(15, 2), default=0)
+    current_equity = db.Column(db.Numeric(15, 2), default=0)
+    open_pnl = db.Column(db.Numeric(15, 2), default=0)
+    closed_pnl = db.Column(db.Numeric(15, 2), default=0)
+
+    # Intraday extremes
+    max_balance = db.Column(db.Numeric(15, 2), default=0)
+    max_equity = db.Column(db.Numeric(15, 2), default=0)
+    min_balance = db.Column(db.Numeric(15, 2), default=0)
+    min_equity = db.Column(db.Numeric(15, 2), default=0)
+
+    # Losses
+    loss_from_start = db.Column(db.Numeric(15, 2), default=0)
+    loss_from_peak = db.Column(db.Numeric(15, 2), default=0)
+    drawdown_pct = db.Column(db.Numeric(10, 4), default=0)
+    commissions = db.Column(db.Numeric(15, 2), default=0)
+    swaps = db.Column(db.Numeric(15, 2), default=0)
+
+    # Limits
+    daily_limit = db.Column(db.Numeric(15, 2), default=0)
+    threshold = db.Column(db.Numeric(15, 2), default=0)
+
+    # Calculation context
+    calculation_method = db.Column(db.String(20))
+    timezone = db.Column(db.String(50))
+    reset_time = db.Column(db.DateTime(timezone=True))
+    last_update = db.Column(db.DateTime(timezone=True))
+
+    # Relationships
+    challenge = db.relationship('Challenge', backref=db.backref('daily_drawdowns', lazy='dynamic', passive_deletes=True))
+
+    __table_args__ = (
+        db.UniqueConstraint('challenge_id', 'date', name='uq_challenge_daily_drawdown_day'),
+        db.Index('ix_challenge_daily_drawdown_date', 'date'),
+    )
+
+    def __repr__(self):
+        return f'<ChallengeDailyDrawdown {self.challenge_id} {self.date}>'
+
+    def to_day_data(self):
+        """Convert to the day_data dict used by Challenge"""
+        data = {field: float(getattr(self, field) or 0) for field in NUMERIC_FIELDS}
+        data.update({
+            'calculation_method': self.calculation_method,
+            'timezone': self.timezone,
+            'reset_time': self.reset_time.isoformat() if self.reset_time else None,
+            'last_update': self.last_update.isoformat() if self.last_update else None,
+        })
+        return data
+
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'challenge_id': self.challenge_id,
+            'date': self.date.isoformat() if self.date else None,
+            **self.to_day_data()
+        }
+
+    @staticmethod
+    def _row_values(challenge_id, day, day_data):
+        now = datetime.utcnow()
+        values = {field: day_data.get(field, 0) for field in NUMERIC_FIELDS}
+        values.update({
+            'challenge_id': challenge_id,
+            'date': date.fromisoformat(day) if isinstance(day, str) else day,
+            'calculation_method': day_data.get('calculation_method'),
+            'timezone': day_data.get('timezone'),
+            'reset_time': _parse_datetime(day_data.get('reset_time')),
+            'last_update': _parse_datetime(day_data.get('last_update')),
+            'created_at': now,
+            'updated_at': now,
+        })
+        return values
+
+    @classmethod
+    def get_day(cls, challenge_id, day, max_age=READ_CACHE_TTL):
+        """
+        Get day_data for one challenge and day
+
+        Args:
+            challenge_id: Challenge ID
+            day: ISO date string
+            max_age: Seconds a cached row may be reused (None = any age)
+
+        Returns:
+            day_data dict or None
+        """
+        cached = _cache_get(challenge_id, day, max_age)
+        if cached is _NO_ROW:
+            return None
+        if cached is not None:
+            return cached
+
+        row = cls.query.filter_by(challenge_id=challenge_id, date=date.fromisoformat(day)).first()
+        if not row:
+            return None
+
+        day_data = row.to_day_data()
+        _cache_put(challenge_id, day, day_data)
+        return day_data
+
+    @classmethod
+    def prime_cache(cls, keys):
+        """
+        Load many (challenge_id, day) rows in one query
+
+        Args:
+            keys: Iterable of (challenge_id, ISO date string)
+        """
+        keys = set(keys)
+        if not keys:
+            return 0
+
+        challenge_ids = {challenge_id for challenge_id, _ in keys}
+        days = {date.fromisoformat(day) for _, day in keys}
+        rows = cls.query.filter(
+            cls.challenge_id.in_(challenge_ids),
+            cls.date.in_(days)
+        ).all()
+
+        loaded = 0
+        for row in rows:
+            day = row.date.isoformat()
+            if (row.challenge_id, day) in keys:
+                _cache_put(row.challenge_id, day, row.to_day_data())
+                keys.discard((row.challenge_id, day))
+                loaded += 1
+        # Remember the days without a row too, so get_day() does not look each one up again
+        for challenge_id, day in keys:
+            _cache_put(challenge_id, day, _NO_ROW)
+        return loaded
+
+    @classmethod
+    def upsert_many(cls, rows):
+        """
+        Insert or update many day rows in one statement (caller commits)
+
+        Day highs and lows are merged with the stored row, so a writer working
+        from a cached row never narrows them.
+
+        Args:
+            rows: Iterable of (challenge_id, ISO date string, day_data)
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+
+        # The same key twice in one INSERT .. ON CONFLICT is an error; keep the latest
+        latest = {}
+        for challenge_id, day, day_data in rows:
+            latest[(challenge_id, day)] = day_data
+
+        values = [cls._row_values(cid, day, data) for (cid, day), data in latest.items()]
+        for i in range(0, len(values), UPSERT_CHUNK_SIZE):
+            stmt = insert(cls.__table__).values(values[i:i + UPSERT_CHUNK_SIZE])
+            table = cls.__table__
+            update_columns = {
+                name: stmt.excluded[name]
+                for name in values[0]
+                if name not in ('challenge_id', 'date', 'created_at')
+            }
+            for name in HIGH_FIELDS:
+                update_columns[name] = func.greatest(table.c[name], stmt.excluded[name])
+            for name in LOW_FIELDS:
+                update_columns[name] = func.least(table.c[name], stmt.excluded[name])
+            stmt = stmt.on_conflict_do_update(
+                constraint='uq_challenge_daily_drawdown_day',
+                set_=update_columns
+            )
+            db.session.execute(stmt)
+
+        for (challenge_id, day), day_data in latest.items():
+            _cache_put(challenge_id, day, day_data)
+        return len(values)
+
+    @classmethod
+    def upsert(cls, challenge_id, day, day_data):
+        """Insert or update a single day row (caller commits)"""
+        return cls.upsert_many([(challenge_id, day, day_data)])
+
+    @classmethod
+    def backfill_from_history(cls, batch_size=500):
+        """
+        Copy every challenge's daily_drawdown_history JSONB into the table
+
+        Existing rows are overwritten. Commits once per batch of challenges.
+
+        Returns:
+            Tuple of (challenges processed, day rows written)
+        """
+        from src.models.trading_program import Challenge
+
+        challenges_done = 0
+        rows_written = 0
+        last_id = 0
+
+        while True:
+            batch = Challenge.query.options(
+                undefer(Challenge.daily_drawdown_history)
+            ).filter(
+                Challenge.id > last_id
+            ).order_by(Challenge.id).limit(batch_size).all()
+
+            if not batch:
+                break
+
+            rows = []
+            for challenge in batch:
+                history = challenge.daily_drawdown_history or {}
+                for day, day_data in history.items():
+                    if isinstance(day_data, dict):
+                        rows.append((challenge.id, day, day_data))
+
+            rows_written += cls.upsert_many(rows)
+            db.session.commit()
+
+            challenges_done += len(batch)
+            last_id = batch[-1].id
+
+        return challenges_done, rows_written
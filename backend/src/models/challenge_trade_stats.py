@@ -0,0 +1,383 @@
+"""
+Per-challenge trading statistics accumulator
+Running counts, sums, extremes and streaks of closed trades, updated as
+trades close so dashboards read one row instead of scanning every trade
+"""
+from datetime import datetime
+from sqlalchemy import case, event, func
+from sqlalchemy.dialects.postgresql import insert
+from src.database import db
+from src.utils.session_hooks import collect, discard_on_rollback
+
+
+class TradeStatsDelta:
+    """
+    Summary of a sequence of closed trades (in close order)
+
+    Two summaries can be merged, which is what lets the stored row absorb a
+    batch of new closes with one UPSERT. Streak runs are signed: +n for n
+    wins in a row, -n for losses, 0 after a breakeven trade. Trading days are
+    counted as the close dates change, so closes must arrive in order; a
+    close older than the last counted day is left for rebuild().
+    """
+
+    __slots__ = (
+        'total', 'wins', 'losses', 'gross_profit', 'gross_loss', 'sum_sq',
+        'best', 'worst', 'lead', 'trail', 'uniform', 'max_win_run',
+        'max_loss_run', 'last_close_time', 'days', 'first_day', 'last_day',
+    )
+
+    def __init__(self):
+        self.total = 0
+        self.wins = 0
+        self.losses = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.sum_sq = 0.0
+        self.best = None
+        self.worst = None
+        self.lead = 0  # signed run at the start of the sequence
+        self.trail = 0  # signed run at the end of the sequence
+        self.uniform = True  # the whole sequence is a single run
+        self.max_win_run = 0
+        self.max_loss_run = 0
+        self.last_close_time = None
+        self.days = 0  # distinct close dates
+        self.first_day = None
+        self.last_day = None
+
+    def add(self, profit, close_time=None):
+        """Append one closed trade"""
+        profit = float(profit)
+        self.total += 1
+        self.sum_sq += profit * profit
+        self.best = profit if self.best is None else max(self.best, profit)
+        self.worst = profit if self.worst is None else min(self.worst, profit)
+        if close_time is not None and (self.last_close_time is None or close_time > self.last_close_time):
+            self.last_close_time = close_time
+        if close_time is not None:
+            day = close_time.date()
+            if self.last_day is None or day > self.last_day:
+                self.days += 1
+                self.last_day = day
+            if self.first_day is None:
+                self.first_day = day
+
+        if profit > 0:
+            self.wins += 1
+            self.gross_profit += profit
+            run = self.trail + 1 if self.trail > 0 else 1
+        elif profit < 0:
+            self.losses += 1
+            self.gross_loss += profit
+            run = self.trail - 1 if self.trail < 0 else -1
+        else:
+            run = 0
+
+        if self.total == 1:
+            self.lead = run
+        elif self.uniform and run != 0 and (run > 0) == (self.lead > 0) and self.lead != 0:
+            self.lead = run
+        else:
+            self.uniform = False
+        self.trail = run
+        self.max_win_run = max(self.max_win_run, run)
+        self.max_loss_run = max(self.max_loss_run, -run)
+        return self
+
+    def params(self):
+        return {
+            'total': self.total,
+            'wins': self.wins,
+            'losses': self.losses,
+            'gross_profit': round(self.gross_profit, 2),
+            'gross_loss': round(self.gross_loss, 2),
+            'sum_sq': self.sum_sq,
+            'best': self.best,
+            'worst': self.worst,
+            'lead': self.lead,
+            'trail': self.trail,
+            'uniform': self.uniform,
+            'max_win_run': self.max_win_run,
+            'max_loss_run': self.max_loss_run,
+            'last_close_time': self.last_close_time,
+            'days': self.days,
+            'first_day': self.first_day,
+            'last_day': self.last_day,
+        }
+
+
+class ChallengeTradeStats(db.Model):
+    """Closed-trade statistics for one challenge"""
+
+    __tablename__ = 'challenge_trade_stats'
+
+    challenge_id = db.Column(db.Integer, db.ForeignKey('challenges.id', ondelete='CASCADE'), primary_key=True)
+
+    total_trades = db.Column(db.Integer, nullable=False, default=0)
+    winning_trades = db.Column(db.Integer, nullable=False, default=0)
+    losing_trades = db.Column(db.Integer, nullable=False, default=0)
+    gross_profit = db.Column(db.Numeric(15, 2), nullable=False, default=0)  # sum of winning trades
+    gross_loss = db.Column(db.Numeric(15, 2), nullable=False, default=0)  # sum of losing trades (negative)
+    sum_profit_squared = db.Column(db.Float, nullable=False, default=0)  # for the standard deviation
+    best_trade = db.Column(db.Numeric(15, 2))
+    worst_trade = db.Column(db.Numeric(15, 2))
+
+    current_streak = db.Column(db.Integer, nullable=False, default=0)  # +wins / -losses in a row
+    max_win_streak = db.Column(db.Integer, nullable=False, default=0)
+    max_loss_streak = db.Column(db.Integer, nullable=False, default=0)
+
+    last_close_time = db.Column(db.DateTime)
+    trading_days = db.Column(db.Integer, nullable=False, default=0)  # distinct close dates
+    last_trading_day = db.Column(db.Date)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ChallengeTradeStats {self.challenge_id}: {self.total_trades} trades>'
+
+    @property
+    def net_profit(self):
+        return float(self.gross_profit or 0) + float(self.gross_loss or 0)
+
+    def to_dict(self):
+        total = self.total_trades or 0
+        wins = self.winning_trades or 0
+        losses = self.losing_trades or 0
+        gross_profit = float(self.gross_profit or 0)
+        gross_loss = float(self.gross_loss or 0)
+        net = gross_profit + gross_loss
+
+        std_dev = 0
+        if total > 1:
+            variance = (self.sum_profit_squared - net * net / total) / (total - 1)
+            std_dev = max(variance, 0) ** 0.5
+
+        return {
+            'total_trades': total,
+            'winning_trades': wins,
+            'losing_trades': losses,
+            'breakeven_trades': total - wins - losses,
+            'win_rate': round(wins / total * 100, 2) if total else 0,
+            'average_win': round(gross_profit / wins, 2) if wins else 0,
+            'average_loss': round(gross_loss / losses, 2) if losses else 0,
+            'profit_factor': round(gross_profit / abs(gross_loss), 2) if gross_loss else 0,
+            'net_profit': round(net, 2),
+            'average_trade': round(net / total, 2) if total else 0,
+            'std_dev': round(std_dev, 2),
+            'best_trade': float(self.best_trade) if self.best_trade is not None else None,
+            'worst_trade': float(self.worst_trade) if self.worst_trade is not None else None,
+            'current_streak': self.current_streak or 0,
+            'max_win_streak': self.max_win_streak or 0,
+            'max_loss_streak': self.max_loss_streak or 0,
+            'last_close_time': self.last_close_time.isoformat() if self.last_close_time else None,
+        }
+
+    @classmethod
+    def empty_dict(cls):
+        return cls(challenge_id=None).to_dict()
+
+    @classmethod
+    def apply(cls, connection, deltas):
+        """
+        Merge new closes into the stored rows, one UPSERT per challenge
+
+        Args:
+            connection: Connection or session inside the writing transaction
+            deltas: Dict challenge_id -> TradeStatsDelta (closes in order)
+        """
+        table = cls.__table__
+        c = table.c
+        now = datetime.utcnow()
+        for challenge_id, delta in deltas.items():
+            if not delta.total:
+                continue
+            p = delta.params()
+            stmt = insert(table).values(
+                challenge_id=challenge_id,
+                total_trades=p['total'],
+                winning_trades=p['wins'],
+                losing_trades=p['losses'],
+                gross_profit=p['gross_profit'],
+                gross_loss=p['gross_loss'],
+                sum_profit_squared=p['sum_sq'],
+                best_trade=p['best'],
+                worst_trade=p['worst'],
+                current_streak=p['trail'],
+                max_win_streak=p['max_win_run'],
+                max_loss_streak=p['max_loss_run'],
+                last_close_time=p['last_close_time'],
+                trading_days=p['days'],
+                last_trading_day=p['last_day'],
+                updated_at=now,
+            )
+            # A batch that is one run continues the stored streak when the signs match
+            continues_win = (c.current_streak > 0) & (p['lead'] > 0)
+            continues_loss = (c.current_streak < 0) & (p['lead'] < 0)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['challenge_id'],
+                set_={
+                    'total_trades': c.total_trades + p['total'],
+                    'winning_trades': c.winning_trades + p['wins'],
+                    'losing_trades': c.losing_trades + p['losses'],
+                    'gross_profit': c.gross_profit + p['gross_profit'],
+                    'gross_loss': c.gross_loss + p['gross_loss'],
+                    'sum_profit_squared': c.sum_profit_squared + p['sum_sq'],
+                    'best_trade': func.greatest(c.best_trade, p['best']),
+                    'worst_trade': func.least(c.worst_trade, p['worst']),
+                    'current_streak': case(
+                        (continues_win | continues_loss, c.current_streak + p['lead']),
+                        else_=p['trail']
+                    ) if p['uniform'] else p['trail'],
+                    'max_win_streak': func.greatest(
+                        c.max_win_streak, p['max_win_run'],
+                        case((continues_win, c.current_streak + p['lead']), else_=0)
+                    ),
+                    'max_loss_streak': func.greatest(
+                        c.max_loss_streak, p['max_loss_run'],
+                        case((continues_loss, -(c.current_streak + p['lead'])), else_=0)
+                    ),
+                    'last_close_time': func.greatest(c.last_close_time, p['last_close_time']),
+                    # The batch's first day was already counted if the stored row closed on it
+                    'trading_days': c.trading_days + p['days'] - case(
+                        (c.last_trading_day >= p['first_day'], 1), else_=0
+                    ) if p['days'] else c.trading_days,
+                    'last_trading_day': func.greatest(c.last_trading_day, p['last_day']),
+                    'updated_at': now,
+                }
+            )
+            connection.execute(stmt)
+
+    @classmethod
+    def closed_trades_query(cls, challenge_ids=None):
+        """
+        (challenge_id, profit, close_time) of every closed trade, in close order
+
+        Covers manual/simulated trades and trades streamed from MT5.
+        """
+        from src.models.trade import Trade
+        from src.models.mt5_models import MT5Account, MT5Trade
+
+        manual = db.session.query(
+            Trade.challenge_id.label('challenge_id'),
+            Trade.profit.label('profit'),
+            Trade.close_time.label('close_time'),
+        ).filter(Trade.close_time.isnot(None), Trade.profit.isnot(None))
+
+        streamed = db.session.query(
+            MT5Account.challenge_id.label('challenge_id'),
+            MT5Trade.profit.label('profit'),
+            MT5Trade.close_time.label('close_time'),
+        ).join(
+            MT5Account, MT5Account.id == MT5Trade.mt5_account_id
+        ).filter(
+            MT5Trade.status == 'closed', MT5Trade.profit.isnot(None), MT5Account.challenge_id.isnot(None)
+        )
+
+        if challenge_ids is not None:
+            manual = manual.filter(Trade.challenge_id.in_(challenge_ids))
+            streamed = streamed.filter(MT5Account.challenge_id.in_(challenge_ids))
+
+        closes = manual.union_all(streamed).subquery()
+        return db.session.query(
+            closes.c.challenge_id, closes.c.profit, closes.c.close_time
+        ).order_by(closes.c.challenge_id, closes.c.close_time)
+
+    @classmethod
+    def rebuild(cls, challenge_ids=None):
+        """
+        Recompute accumulators from raw trades (caller commits)
+
+        Args:
+            challenge_ids: Challenges to rebuild (None = all)
+
+        Returns:
+            Number of challenges written
+        """
+        deltas = {}
+        for challenge_id, profit, close_time in cls.closed_trades_query(challenge_ids).yield_per(5000):
+            deltas.setdefault(challenge_id, TradeStatsDelta()).add(profit, close_time)
+
+        stale = cls.query
+        if challenge_ids is not None:
+            stale = stale.filter(cls.challenge_id.in_(challenge_ids))
+        stale.delete(synchronize_session=False)
+
+        cls.apply(db.session, deltas)
+        return len(deltas)
+
+    @classmethod
+    def for_challenges(cls, challenge_ids):
+        """Stored rows for several challenges, keyed by challenge ID"""
+        if not challenge_ids:
+            return {}
+        return {row.challenge_id: row for row in cls.query.filter(cls.challenge_id.in_(challenge_ids))}
+
+
+# ============================================================================
+# Write hooks - closes are collected per flush and merged in one statement
+# per challenge before the transaction commits
+# ============================================================================
+
+def _is_closed(trade):
+    return trade.close_time is not None and trade.profit is not None
+
+
+def _on_trade_insert(mapper, connection, target):
+    if _is_closed(target):
+        collect(db.inspect(target).session, 'trade_stats_closes', list).append(
+            (target.challenge_id, target.profit, target.close_time)
+        )
+
+
+def _on_trade_update(mapper, connection, target):
+    state = db.inspect(target)
+    watched = ('profit', 'close_time', 'challenge_id')
+    if not any(state.attrs[name].history.has_changes() for name in watched):
+        return
+
+    was_closed = all(
+        (state.attrs[name].history.deleted or state.attrs[name].history.unchanged or [None])[0] is not None
+        for name in ('profit', 'close_time')
+    )
+    if not was_closed and _is_closed(target) and not state.attrs.challenge_id.history.has_changes():
+        collect(state.session, 'trade_stats_closes', list).append(
+            (target.challenge_id, target.profit, target.close_time)
+        )
+    elif was_closed:
+        # A closed trade was corrected: recompute the challenges involved
+        challenges = collect(state.session, 'trade_stats_rebuild')
+        challenges.add(target.challenge_id)
+        challenges.update(c for c in state.attrs.challenge_id.history.deleted if c)
+
+
+def _on_trade_delete(mapper, connection, target):
+    if _is_closed(target):
+        collect(db.inspect(target).session, 'trade_stats_rebuild').add(target.challenge_id)
+
+
+@event.listens_for(db.session, 'after_flush')
+def apply_trade_stats_after_flush(session, flush_context):
+    closes = session.info.pop('trade_stats_closes', None)
+    rebuild = session.info.pop('trade_stats_rebuild', None)
+    if rebuild:
+        ChallengeTradeStats.rebuild(list(rebuild))
+        closes = [close for close in closes or [] if close[0] not in rebuild]
+    if closes:
+        deltas = {}
+        for challenge_id, profit, close_time in sorted(closes, key=lambda c: (c[0], c[2])):
+            deltas.setdefault(challenge_id, TradeStatsDelta()).add(profit, close_time)
+        ChallengeTradeStats.apply(session, deltas)
+
+
+discard_on_rollback('trade_stats_closes', 'trade_stats_rebuild')
+
+
+def _register_write_hooks():
+    from src.models.trade import Trade
+
+    event.listen(Trade, 'after_insert', _on_trade_insert)
+    event.listen(Trade, 'after_update', _on_trade_update)
+    event.listen(Trade, 'after_delete', _on_trade_delete)
+
+
+_register_write_hooks()
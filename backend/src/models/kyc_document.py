@@ -0,0 +1,54 @@
+"""
+KYC Document model - one row per uploaded KYC file
+The user's kyc_<doc>_* columns describe the current document of each type;
+these rows keep every upload with its storage metadata and the results of
+background processing (hash, thumbnail).
+"""
+from src.database import db, TimestampMixin
+
+
+class KycDocument(db.Model, TimestampMixin):
+    """An uploaded KYC file"""
+
+    __tablename__ = 'kyc_documents'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    document_type = db.Column(db.String(30), nullable=False)  # id_proof, address_proof, selfie, bank_statement
+
+    # Storage
+    storage_key = db.Column(db.String(500), nullable=False, unique=True)
+    content_type = db.Column(db.String(100), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+
+    # Background processing
+    processing_status = db.Column(db.String(20), default='pending', nullable=False)  # pending, processed, failed
+    sha256 = db.Column(db.String(64))
+    thumbnail_key = db.Column(db.String(500))
+    processing_error = db.Column(db.String(255))
+    processed_at = db.Column(db.DateTime)
+
+    # Relationships
+    user = db.relationship('User', backref=db.backref('kyc_documents', lazy='dynamic'))
+
+    __table_args__ = (
+        db.Index('ix_kyc_documents_user_type', 'user_id', 'document_type'),
+        db.Index('ix_kyc_documents_sha256', 'sha256'),
+    )
+
+    def __repr__(self):
+        return f'<KycDocument {self.user_id} {self.document_type}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'document_type': self.document_type,
+            'content_type': self.content_type,
+            'size': self.size,
+            'processing_status': self.processing_status,
+            'sha256': self.sha256,
+            'has_thumbnail': bool(self.thumbnail_key),
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
@@ -9,6 +9,10 @@ class Lead(db.Model, TimestampMixin):
     """Lead model for CRM"""
     
     __tablename__ = 'leads'
+    __table_args__ = (
+        # Pipeline columns: leads of one status by score
+        db.Index('ix_leads_status_score', 'status', 'score', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
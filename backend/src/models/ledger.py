@@ -0,0 +1,85 @@
+"""
+Wallet ledger models
+Append-only double-entry journal behind wallet balances. Every balance
+change is a journal entry whose lines sum to zero; wallet balance columns
+are snapshots of the journal, kept current in the posting transaction.
+"""
+from datetime import datetime
+from src.database import db
+
+
+class JournalEntry(db.Model):
+    """One balanced posting (header); never updated or deleted"""
+
+    __tablename__ = 'journal_entries'
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    entry_type = db.Column(db.String(50), nullable=False)  # deposit, withdrawal, transfer, commission, adjustment, opening_balance
+
+    # Reference
+    reference_type = db.Column(db.String(50))
+    reference_id = db.Column(db.Integer)
+
+    description = db.Column(db.String(255))
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Relationships
+    lines = db.relationship('JournalLine', back_populates='entry', lazy='selectin')
+
+    __table_args__ = (
+        db.Index('ix_journal_entries_reference', 'reference_type', 'reference_id'),
+    )
+
+    def __repr__(self):
+        return f'<JournalEntry {self.id} {self.entry_type}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'entry_type': self.entry_type,
+            'reference_type': self.reference_type,
+            'reference_id': self.reference_id,
+            'description': self.description,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'lines': [line.to_dict() for line in self.lines],
+        }
+
+
+class JournalLine(db.Model):
+    """
+    One leg of a journal entry
+
+    Wallet legs carry wallet_id and balance_type; system legs (cash in/out,
+    commission expense, adjustments) carry only the account name. Amounts
+    are signed: positive credits the account.
+    """
+
+    __tablename__ = 'journal_lines'
+
+    id = db.Column(db.BigInteger, primary_key=True)
+    entry_id = db.Column(db.BigInteger, db.ForeignKey('journal_entries.id'), nullable=False)
+    account = db.Column(db.String(64), nullable=False)  # wallet:<id>:<balance_type> or system:<name>
+    wallet_id = db.Column(db.Integer, db.ForeignKey('wallets.id'))
+    balance_type = db.Column(db.String(20))
+    amount = db.Column(db.Numeric(14, 2), nullable=False)
+
+    # Relationships
+    entry = db.relationship('JournalEntry', back_populates='lines')
+
+    __table_args__ = (
+        db.Index('ix_journal_lines_entry_id', 'entry_id'),
+        db.Index('ix_journal_lines_wallet', 'wallet_id', 'balance_type'),
+    )
+
+    def __repr__(self):
+        return f'<JournalLine {self.account} {self.amount}>'
+
+    def to_dict(self):
+        return {
+            'account': self.account,
+            'wallet_id': self.wallet_id,
+            'balance_type': self.balance_type,
+            'amount': str(self.amount),
+        }
@@ -12,9 +12,10 @@ class Notification(db.Model, TimestampMixin):
     message = db.Column(db.Text, nullable=False)
     data = db.Column(db.JSON, nullable=True)  # Additional data
     priority = db.Column(db.String(20), default='normal')  # low, normal, high, urgent
-    is_read = db.Column(db.Boolean, default=False)
+    # active_history: the unread counter hooks compare against the stored values
+    is_read = db.column_property(db.Column(db.Boolean, default=False), active_history=True)
     read_at = db.Column(db.DateTime, nullable=True)
-    is_deleted = db.Column(db.Boolean, default=False)
+    is_deleted = db.column_property(db.Column(db.Boolean, default=False), active_history=True)
     deleted_at = db.Column(db.DateTime, nullable=True)
     
     # Relationships
@@ -26,6 +27,9 @@ class Notification(db.Model, TimestampMixin):
         Index('idx_notifications_type', 'type'),
         Index('idx_notifications_is_read', 'is_read'),
         Index('idx_notifications_created_at', 'created_at'),
+        # Unread counter fills and reconciliation
+        Index('idx_notifications_user_unread', 'user_id', 'type',
+              postgresql_where=db.text('is_read = false AND is_deleted = false')),
     )
     
     def to_dict(self):
@@ -181,6 +185,7 @@ class EmailQueue(db.Model, TimestampMixin):
     attempts = db.Column(db.Integer, default=0)
     max_attempts = db.Column(db.Integer, default=3)
     error_message = db.Column(db.Text, nullable=True)
+    next_attempt_at = db.Column(db.DateTime, nullable=True)  # Retry backoff; NULL = send now
     sent_at = db.Column(db.DateTime, nullable=True)
     
     # Relationships
@@ -190,6 +195,8 @@ class EmailQueue(db.Model, TimestampMixin):
     __table_args__ = (
         Index('idx_email_queue_status', 'status'),
         Index('idx_email_queue_created_at', 'created_at'),
+        # Claim order of the queue consumer; only pending rows are indexed
+        Index('idx_email_queue_pending', 'id', postgresql_where=db.text("status = 'pending'")),
     )
     
     def to_dict(self):
@@ -2,9 +2,21 @@
 Support Article Model
 """
 from datetime import datetime
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from ..database import db
 
 
+# Weighted search document: title A, tags and keywords B, excerpt C,
+# body text D (tags stripped)
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(tags::text, '') || ' ' || coalesce(meta_keywords, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(excerpt, '')), 'C') || "
+    "setweight(to_tsvector('english', regexp_replace(coalesce(content, ''), '<[^>]*>', ' ', 'g')), 'D')"
+)
+
+
 class SupportArticle(db.Model):
     """Support knowledge base articles"""
     __tablename__ = 'support_articles'
@@ -41,9 +53,16 @@ class SupportArticle(db.Model):
     order = db.Column(db.Integer, default=0)
     featured = db.Column(db.Boolean, default=False)
     
+    # Full-text search document, kept current by Postgres on every write
+    search_vector = deferred(db.Column(TSVECTOR, db.Computed(SEARCH_VECTOR_SQL, persisted=True)))
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('idx_support_articles_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+    
     def to_dict(self, include_content=True):
         data = {
             'id': self.id,
@@ -92,3 +92,28 @@ class Tenant(db.Model, TimestampMixin):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+
+
+# ============================================================================
+# Resolver invalidation - every worker drops its tenant index once a tenant
+# change is committed
+# ============================================================================
+
+from sqlalchemy import event
+from src.utils.session_hooks import collect, on_commit
+
+
+def _mark_tenant_changed(mapper, connection, target):
+    session = db.inspect(target).session
+    if session is not None:
+        collect(session, 'changed_tenants').add(target.id)
+
+
+for _event_name in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Tenant, _event_name, _mark_tenant_changed)
+
+
+@on_commit('changed_tenants')
+def invalidate_tenant_resolver_on_commit(tenant_ids):
+    from src.services.tenant_resolver import tenant_resolver
+    tenant_resolver.publish_invalidation(tenant_ids)
@@ -19,13 +19,16 @@ class TokenBlacklist(db.Model):
     
     @classmethod
     def is_token_revoked(cls, jti):
-        """Check if a token is revoked"""
+        """Check if a token is revoked (database only, see AuthCacheService)"""
         return cls.query.filter_by(jti=jti).first() is not None
     
     @classmethod
     def revoke_token(cls, jti, token_type, user_id, expires_at):
-        """Add a token to the blacklist"""
+        """Add a token to the blacklist and the Redis revocation list"""
+        from src.services.auth_cache_service import AuthCacheService
+        
         if cls.is_token_revoked(jti):
+            AuthCacheService.mark_token_revoked(jti, expires_at)
             return False
         
         blacklisted_token = cls(
@@ -36,14 +39,16 @@ class TokenBlacklist(db.Model):
         )
         db.session.add(blacklisted_token)
         db.session.commit()
+        AuthCacheService.mark_token_revoked(jti, expires_at)
         return True
     
     @classmethod
     def revoke_all_user_tokens(cls, user_id):
         """Revoke all tokens for a user (useful for security incidents)"""
-        from models.user import User
+        from src.models.user import User
         user = User.query.get(user_id)
         if user:
+            # The cached principal is dropped on commit by the User write hooks
             user.token_version = (user.token_version or 0) + 1
             db.session.commit()
             return True
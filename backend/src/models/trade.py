@@ -4,6 +4,9 @@ from src.database import db
 class Trade(db.Model):
     """Individual trade record"""
     __tablename__ = 'trades'
+    __table_args__ = (
+        db.Index('ix_trades_challenge_close_time', 'challenge_id', 'close_time'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     challenge_id = db.Column(db.Integer, db.ForeignKey('challenges.id'), nullable=False)
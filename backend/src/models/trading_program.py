@@ -6,7 +6,7 @@ from sqlalchemy.dialects.postgresql import JSONB
 from decimal import Decimal
 from datetime import datetime, date
 import pytz
-from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy.orm import deferred
 
 # Calculation method constants
 CALC_METHOD_FTMO = 'ftmo'
@@ -193,7 +193,8 @@ class Challenge(db.Model, TimestampMixin):
     
     # Add-ons purchased
     addons = db.Column(JSONB, default=[])
-    daily_drawdown_history = db.Column(JSONB, default={})
+    # Legacy per-day history, superseded by ChallengeDailyDrawdown (kept for backfill)
+    daily_drawdown_history = deferred(db.Column(JSONB, default={}))
     
     # Relationships
     user = db.relationship('User', back_populates='challenges', foreign_keys=[user_id])
@@ -256,14 +257,29 @@ class Challenge(db.Model, TimestampMixin):
         tz = self.get_timezone()
         return datetime.now(tz).date().isoformat()
     
-    def should_reset_daily_data(self):
+    def get_today_drawdown(self, max_age=None):
+        """Get today's day_data from the daily drawdown table"""
+        from src.models.challenge_drawdown import ChallengeDailyDrawdown, READ_CACHE_TTL
+        
+        if self.id is None:
+            return None
+        
+        return ChallengeDailyDrawdown.get_day(
+            self.id,
+            self.get_current_date(),
+            max_age=READ_CACHE_TTL if max_age is None else max_age
+        )
+    
+    def should_reset_daily_data(self, day_data=None):
         """Check if daily data should be reset based on reset time"""
         tz = self.get_timezone()
         reset_time = self.get_reset_time()
         now = datetime.now(tz)
-        today = now.date().isoformat()
         
-        if not self.daily_drawdown_history or today not in self.daily_drawdown_history:
+        if day_data is None:
+            day_data = self.get_today_drawdown()
+        
+        if not day_data:
             return True
         
         reset_datetime = now.replace(
@@ -273,7 +289,6 @@ class Challenge(db.Model, TimestampMixin):
             microsecond=0
         )
         
-        day_data = self.daily_drawdown_history[today]
         last_update = day_data.get('last_update')
         
         if not last_update:
@@ -316,11 +331,11 @@ class Challenge(db.Model, TimestampMixin):
                 return True
         
         # Also check current equity as fallback
-        today = self.get_current_date()
+        day_data = self.get_today_drawdown()
         
         # Get current equity
-        if self.daily_drawdown_history and today in self.daily_drawdown_history:
-            current_equity = self.daily_drawdown_history[today].get('current_equity', self.current_balance)
+        if day_data:
+            current_equity = day_data.get('current_equity', self.current_balance)
         else:
             current_equity = self.current_balance
         
@@ -334,13 +349,11 @@ class Challenge(db.Model, TimestampMixin):
         if not self.program or not self.program.max_daily_loss:
             return False
         
-        today = self.get_current_date()
+        day_data = self.get_today_drawdown()
         
-        if not self.daily_drawdown_history or today not in self.daily_drawdown_history:
+        if not day_data:
             return False
         
-        day_data = self.daily_drawdown_history[today]
-        
         # FIXED: Use equity and threshold (not loss amount!)
         current_equity = day_data.get('current_equity', 0)
         threshold = day_data.get('threshold', 0)
@@ -350,8 +363,16 @@ class Challenge(db.Model, TimestampMixin):
         
         return False
     
-    def update_daily_drawdown(self, current_balance, current_equity=None, open_pnl=0, commissions=0, swaps=0):
-        """FIXED: Track daily drawdown with industry-standard calculations"""
+    def update_daily_drawdown(self, current_balance, current_equity=None, open_pnl=0, commissions=0, swaps=0, persist=True):
+        """
+        FIXED: Track daily drawdown with industry-standard calculations
+        
+        Today's row is upserted into challenge_daily_drawdowns unless persist
+        is False, in which case the caller writes it (e.g. one bulk upsert per
+        sync batch via ChallengeDailyDrawdown.upsert_many).
+        """
+        from src.models.challenge_drawdown import ChallengeDailyDrawdown, WRITE_CACHE_TTL
+        
         today = self.get_current_date()
         
         # Calculate equity if not provided
@@ -365,15 +386,13 @@ class Challenge(db.Model, TimestampMixin):
         commissions = float(commissions)
         swaps = float(swaps)
         
-        # Initialize if needed
-        if not self.daily_drawdown_history:
-            self.daily_drawdown_history = {}
+        day_data = self.get_today_drawdown(max_age=WRITE_CACHE_TTL)
         
         # Check if we need to reset
-        if self.should_reset_daily_data():
+        if self.should_reset_daily_data(day_data or {}):
             starting_value = self.calculate_starting_value(current_balance, current_equity)
             
-            self.daily_drawdown_history[today] = {
+            day_data = {
                 'starting_balance': current_balance,
                 'starting_equity': current_equity,
                 'starting_value': starting_value,
@@ -406,12 +425,13 @@ class Challenge(db.Model, TimestampMixin):
                 daily_limit = starting_value * daily_loss_pct
                 threshold = starting_value - daily_limit
                 
-                self.daily_drawdown_history[today]['daily_limit'] = daily_limit
-                self.daily_drawdown_history[today]['threshold'] = threshold
+                day_data['daily_limit'] = daily_limit
+                day_data['threshold'] = threshold
+        else:
+            # Don't mutate the cached copy
+            day_data = dict(day_data)
         
         # Update today's data
-        day_data = self.daily_drawdown_history[today]
-        
         day_data['current_balance'] = current_balance
         day_data['current_equity'] = current_equity
         day_data['open_pnl'] = open_pnl
@@ -443,8 +463,8 @@ class Challenge(db.Model, TimestampMixin):
         
         day_data['last_update'] = datetime.now(self.get_timezone()).isoformat()
         
-        self.daily_drawdown_history[today] = day_data
-        flag_modified(self, 'daily_drawdown_history')
+        if persist:
+            ChallengeDailyDrawdown.upsert(self.id, today, day_data)
         
         return day_data
     
@@ -488,12 +508,11 @@ class Challenge(db.Model, TimestampMixin):
     def get_daily_stats(self):
         """Get current day's statistics"""
         today = self.get_current_date()
+        day_data = self.get_today_drawdown()
         
-        if not self.daily_drawdown_history or today not in self.daily_drawdown_history:
+        if not day_data:
             return None
         
-        day_data = self.daily_drawdown_history[today]
-        
         threshold = day_data.get('threshold', 0)
         current_equity = day_data.get('current_equity', 0)
         remaining_room = current_equity - threshold if threshold > 0 else 0
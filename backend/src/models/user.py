@@ -83,8 +83,9 @@ class User(db.Model, TimestampMixin, HierarchyScopedMixin):
     
     # Hierarchy (MLM Structure)
     parent_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)  # Who created this user
-    level = db.Column(db.Integer, default=0, nullable=False, index=True)  # Depth in hierarchy (0 = top)
-    tree_path = db.Column(db.String(500), index=True)  # Path in tree: "1/5/23/45" for fast queries
+    # active_history: the move listener needs the stored values even when the caller rewrote them
+    level = db.column_property(db.Column(db.Integer, default=0, nullable=False, index=True), active_history=True)  # Depth in hierarchy (0 = top)
+    tree_path = db.column_property(db.Column(db.String(500), index=True), active_history=True)  # Path in tree: "1/5/23/45" for fast queries
     commission_rate = db.Column(db.Numeric(5, 2), default=0.00)  # Custom commission rate for this user
     referral_code = db.Column(db.String(20), unique=True, nullable=True, index=True)  # Unique referral code for agents/masters
     
@@ -262,22 +263,35 @@ class User(db.Model, TimestampMixin, HierarchyScopedMixin):
     # Hierarchy Methods
     def get_all_descendants(self):
         """Get all users in the downline (recursive)"""
-        if not self.tree_path:
+        from src.models.user_closure import UserClosure
+        if not self.id:
             return []
-        return User.query.filter(User.tree_path.startswith(self.tree_path + '/')).all()
+        return User.query.filter(
+            User.id.in_(UserClosure.descendant_ids_query(self.id, include_self=False))
+        ).all()
     
     def get_direct_children(self):
         """Get only direct children (1 level down)"""
         return self.children
     
     def get_ancestors(self):
-        """Get all users in the upline"""
-        ancestors = []
-        current = self.parent
-        while current:
-            ancestors.append(current)
-            current = current.parent
-        return ancestors
+        """Get all users in the upline, nearest first"""
+        from src.models.user_closure import UserClosure
+        if not self.id:
+            return []
+        return User.query.join(
+            UserClosure, UserClosure.ancestor_id == User.id
+        ).filter(
+            UserClosure.descendant_id == self.id,
+            UserClosure.depth > 0
+        ).order_by(UserClosure.depth).all()
+
+    def is_ancestor_of(self, other):
+        """Check if this user is anywhere in other's upline"""
+        from src.models.user_closure import UserClosure
+        if not self.id or not other or not other.id:
+            return False
+        return UserClosure.is_ancestor(self.id, other.id)
     
     def update_tree_path(self):
         """Update tree_path and level based on parent"""
@@ -302,18 +316,35 @@ class User(db.Model, TimestampMixin, HierarchyScopedMixin):
     
     def get_downline_count(self):
         """Get total count of users in downline"""
-        return len(self.get_all_descendants())
+        from src.models.user_closure import UserClosure
+        if not self.id:
+            return 0
+        return UserClosure.count_descendants(self.id)
+    
+    def get_downline_counts_by_level(self, max_level=None):
+        """Get downline size per relative level (1 = direct children)"""
+        from src.models.user_closure import UserClosure
+        if not self.id:
+            return {}
+        return UserClosure.count_by_depth(self.id, max_depth=max_level or None)
     
     def get_downline_by_level(self, max_level=None):
         """Get downline organized by level"""
+        from src.models.user_closure import UserClosure
+        if not self.id:
+            return {}
+        query = db.session.query(User, UserClosure.depth).join(
+            UserClosure, UserClosure.descendant_id == User.id
+        ).filter(
+            UserClosure.ancestor_id == self.id,
+            UserClosure.depth > 0
+        )
+        if max_level:
+            query = query.filter(UserClosure.depth <= max_level)
+        
         result = {}
-        for user in self.get_all_descendants():
-            level_diff = user.level - self.level
-            if max_level and level_diff > max_level:
-                continue
-            if level_diff not in result:
-                result[level_diff] = []
-            result[level_diff].append(user)
+        for user, depth in query.order_by(UserClosure.depth, User.id).all():
+            result.setdefault(depth, []).append(user)
         return result
     
     def to_dict(self, include_sensitive=False):
@@ -363,9 +394,12 @@ class User(db.Model, TimestampMixin, HierarchyScopedMixin):
                 # Root supermaster - sees everything
                 return None
         
-        # Filter by tree_path - only users in this user's hierarchy
-        # tree_path LIKE 'current_user_path%' means all descendants
-        return cls.tree_path.like(f"{current_user.tree_path}/%") | (cls.tree_path == current_user.tree_path)
+        # Only users in this user's hierarchy (self included), via the closure table
+        from src.models.user_closure import UserClosure
+        user_id = getattr(current_user, 'id', None)
+        if user_id is None:
+            return cls.tree_path.like(f"{current_user.tree_path}/%") | (cls.tree_path == current_user.tree_path)
+        return cls.id.in_(UserClosure.descendant_ids_query(user_id))
 
 
 class EmailVerificationToken(db.Model, TimestampMixin):
@@ -404,6 +438,8 @@ class EmailVerificationToken(db.Model, TimestampMixin):
 # ============================================================================
 
 from sqlalchemy import event
+from sqlalchemy.orm.attributes import get_history, set_committed_value
+from src.utils.session_hooks import collect, on_commit
 
 @event.listens_for(User.parent_id, 'set')
 def prevent_hierarchy_loop(target, value, oldvalue, initiator):
@@ -426,24 +462,131 @@ def prevent_hierarchy_loop(target, value, oldvalue, initiator):
     return value
 
 
+def _stored_value(target, key):
+    """Value of key as stored before this flush, even if it was reassigned"""
+    history = get_history(target, key)
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, key)
+
+
+def _mark_hierarchy_changed(target):
+    """Flag the session so cached hierarchy trees are dropped on commit"""
+    session = db.inspect(target).session
+    if session is not None:
+        session.info['hierarchy_changed'] = True
+
+
+@on_commit('hierarchy_changed')
+def invalidate_hierarchy_trees_on_commit(changed):
+    """Drop cached hierarchy trees once a create/move is committed"""
+    from src.services.hierarchy_tree_service import invalidate_hierarchy_trees
+    invalidate_hierarchy_trees()
+
+
+@event.listens_for(User, 'after_insert')
+def add_user_to_closure(mapper, connection, target):
+    """Link a new user to itself and to every ancestor of its parent"""
+    from src.models.user_closure import UserClosure
+    UserClosure.insert_node(connection, target.id, target.parent_id)
+    _mark_hierarchy_changed(target)
+
+
 @event.listens_for(User, 'after_update')
 def auto_update_tree_path_on_parent_change(mapper, connection, target):
-    """Automatically update tree_path when parent changes"""
+    """Automatically update tree_path and the closure table when parent changes"""
+    from src.models.user_closure import UserClosure
+    
     # Check if parent_id changed
     history = db.inspect(target).attrs.parent_id.history
-    if history.has_changes():
-        # Update this user's tree_path
-        target.update_tree_path()
-        
-        # Update all descendants' tree_paths
-        if target.tree_path:
-            descendants = User.query.filter(
-                User.tree_path.like(f"{target.tree_path}/%")
-            ).all()
-            for descendant in descendants:
-                descendant.update_tree_path()
-                db.session.add(descendant)
+    if not history.has_changes():
+        return
+    
+    # The subtree still carries the stored prefix, whatever update_tree_path() assigned
+    old_path = _stored_value(target, 'tree_path')
+    old_level = _stored_value(target, 'level') or 0
+    
+    # Re-link the whole subtree in the closure table
+    UserClosure.move_subtree(connection, target.id, target.parent_id)
+    _mark_hierarchy_changed(target)
+    
+    # New path/level for the moved user, read straight from the parent row
+    new_path, new_level = str(target.id), 0
+    if target.parent_id is not None:
+        parent_path, parent_level = connection.execute(
+            db.text("SELECT tree_path, level FROM users WHERE id = :id"),
+            {'id': target.parent_id}
+        ).one()
+        new_path = f"{parent_path or target.parent_id}/{target.id}"
+        new_level = (parent_level or 0) + 1
+    
+    # Rewrite the prefix of every path in the subtree in one statement (the
+    # moved row itself may already hold its new values from this flush)
+    connection.execute(
+        db.text(
+            "UPDATE users "
+            "SET tree_path = CASE WHEN id = :id THEN :new_path "
+            "ELSE :new_path || COALESCE(substr(tree_path, :old_len + 1), '') END, "
+            "level = CASE WHEN id = :id THEN :new_level ELSE level + :delta END "
+            "WHERE id IN (SELECT descendant_id FROM user_closure WHERE ancestor_id = :id)"
+        ),
+        {
+            'new_path': new_path,
+            'new_level': new_level,
+            'old_len': len(old_path) if old_path else len(str(target.id)),
+            'delta': new_level - old_level,
+            'id': target.id,
+        }
+    )
+    
+    # Keep already-loaded objects in sync without marking them dirty
+    session = db.inspect(target).session
+    subtree_prefix = f"{old_path}/" if old_path else None
+    set_committed_value(target, 'tree_path', new_path)
+    set_committed_value(target, 'level', new_level)
+    if session is not None and subtree_prefix:
+        for obj in list(session.identity_map.values()):
+            if isinstance(obj, User) and obj is not target and obj.tree_path and obj.tree_path.startswith(subtree_prefix):
+                set_committed_value(obj, 'tree_path', new_path + obj.tree_path[len(old_path):])
+                set_committed_value(obj, 'level', (obj.level or 0) + new_level - old_level)
+
+
+# ============================================================================
+# Cached auth principals - dropped once changes to the cached fields commit
+# ============================================================================
+
+def _mark_principals_stale(target, user_ids):
+    session = db.inspect(target).session
+    if session is not None:
+        collect(session, 'stale_principals').update(user_ids)
+
+
+@event.listens_for(User, 'after_update')
+def mark_principal_stale_on_update(mapper, connection, target):
+    """Queue the user's cached principal (and its subtree's on a move) for invalidation"""
+    from src.models.user_closure import UserClosure
+    from src.services.auth_cache_service import PRINCIPAL_FIELDS
+
+    state = db.inspect(target)
+    if not any(field in state.attrs and state.attrs[field].history.has_changes() for field in PRINCIPAL_FIELDS):
+        return
+
+    user_ids = {target.id}
+    if state.attrs.parent_id.history.has_changes():
+        # Every tree_path in the moved subtree was rewritten
+        user_ids.update(connection.execute(UserClosure.descendant_ids_query(target.id)).scalars())
+    _mark_principals_stale(target, user_ids)
+
+
+@event.listens_for(User, 'after_delete')
+def mark_principal_stale_on_delete(mapper, connection, target):
+    _mark_principals_stale(target, {target.id})
+
 
+@on_commit('stale_principals')
+def invalidate_principals_on_commit(user_ids):
+    from src.services.auth_cache_service import AuthCacheService
+    AuthCacheService.invalidate_principals(user_ids)
 
 
 class PasswordResetToken(db.Model, TimestampMixin):
@@ -0,0 +1,147 @@
+"""
+User hierarchy closure table
+One row per (ancestor, descendant) pair, including each user's self-link at depth 0
+"""
+from sqlalchemy import select, func, text
+from src.database import db
+
+
+class UserClosure(db.Model):
+    """Ancestor/descendant pairs of the user hierarchy"""
+
+    __tablename__ = 'user_closure'
+
+    ancestor_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    descendant_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_user_closure_ancestor_depth', 'ancestor_id', 'depth'),
+        db.Index('ix_user_closure_descendant_depth', 'descendant_id', 'depth'),
+    )
+
+    def __repr__(self):
+        return f'<UserClosure {self.ancestor_id}->{self.descendant_id} ({self.depth})>'
+
+    # ------------------------------------------------------------------
+    # Read helpers
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def descendant_ids_query(cls, user_id, include_self=True, max_depth=None):
+        """Subquery of descendant IDs, for use in `.in_()` filters"""
+        query = select(cls.descendant_id).where(cls.ancestor_id == user_id)
+        if not include_self:
+            query = query.where(cls.depth > 0)
+        if max_depth is not None:
+            query = query.where(cls.depth <= max_depth)
+        return query
+
+    @classmethod
+    def ancestor_ids_query(cls, user_id, include_self=False):
+        """Subquery of ancestor IDs, nearest first"""
+        query = select(cls.ancestor_id).where(cls.descendant_id == user_id)
+        if not include_self:
+            query = query.where(cls.depth > 0)
+        return query.order_by(cls.depth)
+
+    @classmethod
+    def is_ancestor(cls, ancestor_id, descendant_id):
+        """Check if ancestor_id is strictly above descendant_id"""
+        return db.session.query(
+            db.session.query(cls).filter(
+                cls.ancestor_id == ancestor_id,
+                cls.descendant_id == descendant_id,
+                cls.depth > 0
+            ).exists()
+        ).scalar()
+
+    @classmethod
+    def count_descendants(cls, user_id):
+        """Number of users below user_id"""
+        return db.session.query(func.count(cls.descendant_id)).filter(
+            cls.ancestor_id == user_id,
+            cls.depth > 0
+        ).scalar() or 0
+
+    @classmethod
+    def count_by_depth(cls, user_id, max_depth=None):
+        """
+        Downline size bucketed by relative depth
+
+        Returns:
+            Dict of depth (1 = direct children) -> count
+        """
+        query = db.session.query(cls.depth, func.count(cls.descendant_id)).filter(
+            cls.ancestor_id == user_id,
+            cls.depth > 0
+        )
+        if max_depth is not None:
+            query = query.filter(cls.depth <= max_depth)
+        return dict(query.group_by(cls.depth).order_by(cls.depth).all())
+
+    # ------------------------------------------------------------------
+    # Maintenance (called from User mapper events with the flush connection)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def insert_node(connection, user_id, parent_id):
+        """Add the self-link and the links from every ancestor of parent_id"""
+        connection.execute(
+            text(
+                "INSERT INTO user_closure (ancestor_id, descendant_id, depth) "
+                "SELECT :user_id, :user_id, 0"
+            ),
+            {'user_id': user_id}
+        )
+        if parent_id is not None:
+            connection.execute(
+                text(
+                    "INSERT INTO user_closure (ancestor_id, descendant_id, depth) "
+                    "SELECT ancestor_id, :user_id, depth + 1 "
+                    "FROM user_closure WHERE descendant_id = :parent_id"
+                ),
+                {'user_id': user_id, 'parent_id': parent_id}
+            )
+
+    @staticmethod
+    def move_subtree(connection, user_id, new_parent_id):
+        """
+        Re-attach user_id and its whole subtree under new_parent_id
+
+        Drops every link from the old ancestors into the subtree, then links
+        each new ancestor to each subtree node in a single INSERT .. SELECT.
+        """
+        connection.execute(
+            text(
+                "DELETE FROM user_closure "
+                "WHERE descendant_id IN (SELECT descendant_id FROM user_closure WHERE ancestor_id = :user_id) "
+                "AND ancestor_id NOT IN (SELECT descendant_id FROM user_closure WHERE ancestor_id = :user_id)"
+            ),
+            {'user_id': user_id}
+        )
+        if new_parent_id is not None:
+            connection.execute(
+                text(
+                    "INSERT INTO user_closure (ancestor_id, descendant_id, depth) "
+                    "SELECT above.ancestor_id, below.descendant_id, above.depth + below.depth + 1 "
+                    "FROM user_closure AS above CROSS JOIN user_closure AS below "
+                    "WHERE above.descendant_id = :parent_id AND below.ancestor_id = :user_id"
+                ),
+                {'user_id': user_id, 'parent_id': new_parent_id}
+            )
+
+    @staticmethod
+    def rebuild(connection):
+        """Recreate the whole table from users.parent_id"""
+        connection.execute(text("DELETE FROM user_closure"))
+        connection.execute(text(
+            "INSERT INTO user_closure (ancestor_id, descendant_id, depth) "
+            "WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS ("
+            "  SELECT id, id, 0 FROM users"
+            "  UNION ALL"
+            "  SELECT tree.ancestor_id, users.id, tree.depth + 1"
+            "  FROM tree JOIN users ON users.parent_id = tree.descendant_id"
+            ") "
+            "SELECT ancestor_id, descendant_id, depth FROM tree"
+        ))
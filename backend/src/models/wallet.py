@@ -1,7 +1,6 @@
 """
 Wallet model for managing user balances
 """
-from datetime import datetime
 from src.database import db, TimestampMixin
 
 
@@ -21,7 +20,7 @@ class Wallet(db.Model, TimestampMixin):
     # Total available for withdrawal
     @property
     def total_balance(self):
-        return float(self.main_balance) + float(self.commission_balance)
+        return float(self.main_balance + self.commission_balance)
     
     # Metadata
     last_transaction_at = db.Column(db.DateTime)
@@ -37,98 +36,37 @@ class Wallet(db.Model, TimestampMixin):
     )
     
     def add_funds(self, amount, balance_type='main', description=None, reference_type=None, reference_id=None, created_by=None):
-        """Add funds to wallet with race condition protection"""
+        """Credit the wallet through the ledger (caller commits)"""
         if amount <= 0:
             raise ValueError('Amount must be positive')
-        
-        if balance_type not in ['main', 'commission', 'bonus']:
-            raise ValueError('Invalid balance type')
-        
-        # Use SELECT FOR UPDATE to lock the row
-        wallet = db.session.query(Wallet).with_for_update().filter_by(id=self.id).first()
-        
-        # Get current balance
-        if balance_type == 'main':
-            balance_before = float(wallet.main_balance)
-            wallet.main_balance = float(wallet.main_balance) + amount
-            balance_after = float(wallet.main_balance)
-        elif balance_type == 'commission':
-            balance_before = float(wallet.commission_balance)
-            wallet.commission_balance = float(wallet.commission_balance) + amount
-            balance_after = float(wallet.commission_balance)
-        else:  # bonus
-            balance_before = float(wallet.bonus_balance)
-            wallet.bonus_balance = float(wallet.bonus_balance) + amount
-            balance_after = float(wallet.bonus_balance)
-        
-        wallet.last_transaction_at = datetime.utcnow()
-        
-        # Create transaction record
-        transaction = Transaction(
-            wallet_id=self.id,
-            type='deposit',
-            amount=amount,
-            balance_type=balance_type,
-            balance_before=balance_before,
-            balance_after=balance_after,
-            reference_type=reference_type,
-            reference_id=reference_id,
-            description=description,
-            created_by=created_by
-        )
-        db.session.add(transaction)
-        
-        return transaction
+        return self._post(amount, balance_type, description, reference_type, reference_id, created_by)
     
     def deduct_funds(self, amount, balance_type='main', description=None, reference_type=None, reference_id=None, created_by=None):
-        """Deduct funds from wallet with race condition protection and validation"""
+        """Debit the wallet through the ledger, refusing to overdraw (caller commits)"""
         if amount <= 0:
             raise ValueError('Amount must be positive')
+        return self._post(-amount, balance_type, description, reference_type, reference_id, created_by)
+    
+    def _post(self, amount, balance_type, description, reference_type, reference_id, created_by):
+        """Post a wallet leg against the cash account and return its statement row"""
+        from src.services.ledger_service import LedgerService, Leg, Posting, SYSTEM_CASH, to_amount
         
         if balance_type not in ['main', 'commission', 'bonus']:
             raise ValueError('Invalid balance type')
-        
-        # Use SELECT FOR UPDATE to lock the row
-        wallet = db.session.query(Wallet).with_for_update().filter_by(id=self.id).first()
-        
-        # Get current balance and validate
-        if balance_type == 'main':
-            balance_before = float(wallet.main_balance)
-            if balance_before < amount:
-                raise ValueError(f'Insufficient main balance. Available: {balance_before}, Required: {amount}')
-            wallet.main_balance = float(wallet.main_balance) - amount
-            balance_after = float(wallet.main_balance)
-        elif balance_type == 'commission':
-            balance_before = float(wallet.commission_balance)
-            if balance_before < amount:
-                raise ValueError(f'Insufficient commission balance. Available: {balance_before}, Required: {amount}')
-            wallet.commission_balance = float(wallet.commission_balance) - amount
-            balance_after = float(wallet.commission_balance)
-        else:  # bonus
-            balance_before = float(wallet.bonus_balance)
-            if balance_before < amount:
-                raise ValueError(f'Insufficient bonus balance. Available: {balance_before}, Required: {amount}')
-            wallet.bonus_balance = float(wallet.bonus_balance) - amount
-            balance_after = float(wallet.bonus_balance)
-        
-        wallet.last_transaction_at = datetime.utcnow()
-        
-        # Create transaction record
-        transaction = Transaction(
-            wallet_id=self.id,
-            type='withdrawal',
-            amount=amount,
-            balance_type=balance_type,
-            balance_before=balance_before,
-            balance_after=balance_after,
+        amount = to_amount(amount)
+        posting = Posting(
+            entry_type='deposit' if amount > 0 else 'withdrawal',
+            legs=(
+                Leg.wallet(self.user_id, amount, balance_type),
+                Leg.to_system(SYSTEM_CASH, -amount),
+            ),
+            description=description,
             reference_type=reference_type,
             reference_id=reference_id,
-            description=description,
-            created_by=created_by
+            created_by=created_by,
         )
-        db.session.add(transaction)
-        
-        return transaction
+        result, = LedgerService.post([posting], commit=False)
+        return result.transactions[0]
     
     def to_dict(self):
         """Convert to dictionary"""
@@ -153,6 +91,7 @@ class Transaction(db.Model, TimestampMixin):
     
     id = db.Column(db.Integer, primary_key=True)
     wallet_id = db.Column(db.Integer, db.ForeignKey('wallets.id'), nullable=False)
+    entry_id = db.Column(db.BigInteger, db.ForeignKey('journal_entries.id'))  # Journal entry this leg belongs to
     
     # Transaction details
     type = db.Column(db.String(50), nullable=False)  # deposit, withdrawal, commission, bonus, adjustment
@@ -174,6 +113,7 @@ class Transaction(db.Model, TimestampMixin):
     
     # Relationships
     wallet = db.relationship('Wallet', backref='transactions')
+    entry = db.relationship('JournalEntry')
     creator = db.relationship('User', foreign_keys=[created_by])
     
     # Indexes
@@ -181,6 +121,7 @@ class Transaction(db.Model, TimestampMixin):
         db.Index('ix_transaction_wallet_id', 'wallet_id'),
         db.Index('ix_transaction_type', 'type'),
         db.Index('ix_transaction_created_at', 'created_at'),
+        db.Index('ix_transaction_wallet_created_at', 'wallet_id', 'created_at'),
     )
     
     def to_dict(self):
@@ -195,6 +136,7 @@ class Transaction(db.Model, TimestampMixin):
             'balance_after': float(self.balance_after),
             'reference_type': self.reference_type,
             'reference_id': self.reference_id,
+            'entry_id': self.entry_id,
             'description': self.description,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
@@ -13,6 +13,14 @@ from src.utils.decorators import token_required, admin_required
 from src.utils.validators import validate_required_fields, validate_email_format
 from src.utils.error_messages import format_error_response
 from src.utils.hierarchy_scoping import without_hierarchy_scope
+from src.services.hierarchy_tree_service import HierarchyTreeService
+from src.services.kyc_upload_service import document_urls
+from src.utils.instrumentation import (
+    N_PLUS_ONE_THRESHOLD,
+    SLOW_REQUEST_SECONDS,
+    n_plus_one_report,
+    slow_request_traces,
+)
 from datetime import datetime, timedelta
 from sqlalchemy import func, and_, or_
 
@@ -98,6 +106,27 @@ def get_dashboard_stats(current_user):
         return jsonify({'error': str(e)}), 500
 
 
+@admin_bp.route('/performance', methods=['GET'])
+@token_required
+@admin_required
+def get_performance_report(current_user):
+    """Get the worst N+1 query offenders and recent slow request traces"""
+    try:
+        limit = min(request.args.get('limit', 20, type=int), 100)
+
+        return jsonify({
+            'n_plus_one': n_plus_one_report(limit),
+            'slow_requests': slow_request_traces(limit),
+            'thresholds': {
+                'n_plus_one_executions': N_PLUS_ONE_THRESHOLD,
+                'slow_request_seconds': SLOW_REQUEST_SECONDS
+            }
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @admin_bp.route('/users', methods=['GET'])
 @token_required
 @admin_required
@@ -186,60 +215,53 @@ def get_users(current_user):
 @token_required
 @admin_required
 def get_users_tree(current_user):
-    """Get all users in hierarchical tree structure"""
+    """
+    Get all users in hierarchical tree structure
+    
+    Query params:
+        max_depth: Levels to include per root (default: whole tree)
+        cursor: Expand a collapsed node from a previous response
+    """
     try:
-        def build_user_tree(user):
-            """Recursively build user tree with children"""
-            user_data = {
-                'id': user.id,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'role': user.role,
-                'is_active': user.is_active,
-                'is_verified': user.is_verified if hasattr(user, 'is_verified') else False,
-                'kyc_status': user.kyc_status,
-                'phone': user.phone,
-                'country_code': user.country_code,
-                'parent_id': user.parent_id,
-                'level': user.level if hasattr(user, 'level') else 0,
-                'tree_path': user.tree_path if hasattr(user, 'tree_path') else None,
-                'referral_code': user.referral_code if hasattr(user, 'referral_code') else None,
-                'created_at': user.created_at.isoformat() if user.created_at else None,
-                'last_login_at': user.last_login_at.isoformat() if user.last_login_at else None,
-                'children': []
-            }
-            
-            # Get direct children
-            children = User.query.filter_by(parent_id=user.id).order_by(User.created_at.asc()).all()
+        max_depth = request.args.get('max_depth', type=int)
+        cursor = request.args.get('cursor')
+        
+        if cursor:
+            node = HierarchyTreeService.get_snapshot(
+                g.current_user.id, f"admin:{max_depth}:{cursor}",
+                lambda: HierarchyTreeService.expand_node(g.current_user, cursor, max_depth, node='full')
+            )
+            if node is None:
+                return jsonify({'error': 'Invalid cursor'}), 404
+            return jsonify({'users': [node], 'total_users': 1}), 200
+        
+        def build_snapshot():
+            # Get root users (users without parent or with parent_id=None)
+            # For supermaster, this will be the current user
+            # For others, it will be their top-level accessible users
+            root_ids = [row.id for row in User.query.with_entities(User.id).filter(
+                or_(
+                    User.parent_id == None,
+                    User.parent_id == g.current_user.id
+                )
+            ).order_by(User.created_at.asc()).all()]
             
-            # Recursively build children
-            for child in children:
-                user_data['children'].append(build_user_tree(child))
+            # If no root users found, use current user as root
+            if not root_ids:
+                root_ids = [g.current_user.id]
             
-            return user_data
-        
-        # Get root users (users without parent or with parent_id=None)
-        # For supermaster, this will be the current user
-        # For others, it will be their top-level accessible users
-        root_users = User.query.filter(
-            or_(
-                User.parent_id == None,
-                User.parent_id == g.current_user.id
-            )
-        ).order_by(User.created_at.asc()).all()
-        
-        # If no root users found, use current user as root
-        if not root_users:
-            root_users = [g.current_user]
+            # Build every root's tree from one query
+            tree = HierarchyTreeService.build_forest(root_ids, max_depth, node='full')
+            return {
+                'users': tree,
+                'total_users': len(tree)
+            }
         
-        # Build tree for each root user
-        tree = [build_user_tree(user) for user in root_users]
+        snapshot = HierarchyTreeService.get_snapshot(
+            g.current_user.id, f"admin:{max_depth}", build_snapshot
+        )
         
-        return jsonify({
-            'users': tree,
-            'total_users': len(tree)
-        }), 200
+        return jsonify(snapshot), 200
         
     except Exception as e:
         import traceback
@@ -709,6 +731,7 @@ def get_pending_kyc(current_user):
     """Get all pending KYC submissions"""
     try:
         users = User.query.filter_by(kyc_status='pending').all()
+        urls = document_urls(users)
         
         return jsonify({
             'pending_kyc': [{
@@ -717,10 +740,10 @@ def get_pending_kyc(current_user):
                 'first_name': user.first_name,
                 'last_name': user.last_name,
                 'kyc_submitted_at': user.kyc_submitted_at.isoformat() if user.kyc_submitted_at else None,
-                'kyc_id_url': user.kyc_id_url,
-                'kyc_address_url': user.kyc_address_url,
-                'kyc_selfie_url': user.kyc_selfie_url,
-                'kyc_bank_url': user.kyc_bank_url
+                'kyc_id_url': urls[user.id]['id_proof'],
+                'kyc_address_url': urls[user.id]['address_proof'],
+                'kyc_selfie_url': urls[user.id]['selfie'],
+                'kyc_bank_url': urls[user.id]['bank_statement']
             } for user in users]
         }), 200
         
@@ -6,8 +6,7 @@ from src.middleware.csrf_middleware import generate_csrf_token, set_csrf_cookie
 from src.middleware.login_monitor import (
     check_rate_limit, record_failed_login, record_successful_login, get_client_ip
 )
-from src.extensions import limiter
-from src import limiter
+from src.middleware.rate_limiter import limiter, rate_limit
 from src.services.auth_service import AuthService
 from src.services.email_service import EmailService
 from src.utils.decorators import token_required
@@ -23,7 +22,7 @@ auth_bp = Blueprint('auth', __name__)
 
 
 @auth_bp.route("/register", methods=["POST"])
-@limiter.limit("5 per hour")
+@rate_limit('auth_register')
 @validate_schema(RegisterSchema)
 def register():
     """Register a new user"""
@@ -59,7 +58,7 @@ def register():
 
 
 @auth_bp.route('/login', methods=['POST'])
-@limiter.limit("10 per minute")
+@rate_limit('auth_login')
 @validate_schema(LoginSchema)
 def login():
     """Login user"""
@@ -143,7 +142,7 @@ def login():
 
 
 @auth_bp.route("/login/2fa", methods=["POST"])
-@limiter.limit("10 per minute")
+@rate_limit('auth_login')
 def login_2fa():
     """Complete login with 2FA"""
     data = request.get_json()
@@ -395,7 +394,7 @@ def verify_email_with_code():
 
 
 @auth_bp.route("/resend-verification", methods=["POST"])
-@limiter.limit("5 per hour")
+@rate_limit('auth_verify_email')
 def resend_verification():
     """Resend verification code"""
     data = request.get_json()
@@ -423,7 +422,7 @@ def resend_verification():
 
 
 @auth_bp.route("/password/reset-request", methods=["POST"])
-@limiter.limit("5 per hour")
+@rate_limit('auth_password_reset')
 def request_password_reset():
     """Request password reset"""
     data = request.get_json()
@@ -449,7 +448,7 @@ def request_password_reset():
 
 
 @auth_bp.route("/password/reset", methods=["POST"])
-@limiter.limit("5 per hour")
+@rate_limit('auth_password_reset')
 def reset_password():
     """Reset password with token (URL-based)"""
     data = request.get_json()
@@ -508,7 +507,7 @@ def verify_reset_code():
 
 
 @auth_bp.route("/password/reset-with-code", methods=["POST"])
-@limiter.limit("5 per hour")
+@rate_limit('auth_password_reset')
 def reset_password_with_code():
     """Reset password with 6-digit code"""
     data = request.get_json()
@@ -2,9 +2,11 @@
 Blog routes for public and admin access
 """
 from flask import Blueprint, request, jsonify
-from sqlalchemy import or_, desc
+from sqlalchemy import desc
 from src.database import db
 from src.models.blog_post import BlogPost
+from src.services.search_service import SearchService
+from src.utils.conditional_requests import conditional, generation_version, track_changes
 from src.utils.decorators import token_required, admin_required
 import logging
 
@@ -12,12 +14,19 @@ logger = logging.getLogger(__name__)
 
 blog_bp = Blueprint('blog', __name__, url_prefix='/blog')
 
+# Seconds post lists may show outdated view counts and author names
+LIST_REFRESH = 300
+
+track_changes('blog', BlogPost, ignore=('view_count',))
+posts_version = generation_version('blog', refresh=LIST_REFRESH)
+
 
 # ============================================================================
 # PUBLIC ROUTES
 # ============================================================================
 
 @blog_bp.route('/posts', methods=['GET'])
+@conditional(posts_version)
 def get_posts():
     """
     Get list of published blog posts
@@ -98,6 +107,7 @@ def get_post_by_slug(slug):
 
 
 @blog_bp.route('/categories', methods=['GET'])
+@conditional(generation_version('blog'))
 def get_categories():
     """Get list of all categories with post counts"""
     try:
@@ -125,45 +135,36 @@ def search_posts():
     Search blog posts
     Query params:
     - q: Search query (required)
+    - category: Filter by category
     - page: Page number (default: 1)
     - per_page: Posts per page (default: 10)
     """
     try:
         query_text = request.args.get('q', '').strip()
         page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 50)
+        per_page = max(min(request.args.get('per_page', 10, type=int), 50), 1)
         
         if not query_text:
             return jsonify({'error': 'Search query is required'}), 400
         
-        # Search in title, excerpt, and content
-        search_filter = or_(
-            BlogPost.title.ilike(f'%{query_text}%'),
-            BlogPost.excerpt.ilike(f'%{query_text}%'),
-            BlogPost.content.ilike(f'%{query_text}%'),
-            BlogPost.tags.ilike(f'%{query_text}%')
-        )
-        
-        # Build query
-        query = BlogPost.query.filter_by(status='published').filter(search_filter)
-        query = query.order_by(desc(BlogPost.published_at))
-        
-        # Paginate
-        pagination = query.paginate(
+        # Ranked full-text search; the last word also matches as a prefix
+        result = SearchService.search_posts(
+            request.args.get('q', ''),  # unstripped: a trailing space ends the last word
             page=page,
             per_page=per_page,
-            error_out=False
+            category=request.args.get('category')
         )
+        total_pages = -(-result.total // per_page)
         
         return jsonify({
-            'posts': [post.to_dict_summary() for post in pagination.items],
+            'posts': result.results,
             'pagination': {
                 'page': page,
                 'per_page': per_page,
-                'total_posts': pagination.total,
-                'total_pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
+                'total_posts': result.total,
+                'total_pages': total_pages,
+                'has_next': page < total_pages,
+                'has_prev': page > 1
             },
             'query': query_text
         }), 200
@@ -174,6 +175,7 @@ def search_posts():
 
 
 @blog_bp.route('/featured', methods=['GET'])
+@conditional(posts_version)
 def get_featured_posts():
     """Get featured blog posts"""
     try:
@@ -194,6 +196,7 @@ def get_featured_posts():
 
 
 @blog_bp.route('/recent', methods=['GET'])
+@conditional(posts_version)
 def get_recent_posts():
     """Get recent blog posts"""
     try:
@@ -213,6 +216,7 @@ def get_recent_posts():
 
 
 @blog_bp.route('/popular', methods=['GET'])
+@conditional(posts_version)
 def get_popular_posts():
     """Get popular blog posts (by view count)"""
     try:
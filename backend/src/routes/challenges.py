@@ -1,5 +1,5 @@
 from src.services.mt5_challenge_service import mt5_challenge_service
-from src.services.mt5_service import mt5_service
+from src.services.mt5_snapshot_cache import MT5SnapshotCache
 import asyncio
 import logging
 
@@ -11,9 +11,13 @@ from flask import Blueprint, request, jsonify, g
 from src.database import db
 from src.models.trading_program import Challenge
 from src.models.trading_program import TradingProgram as Program
+from src.models.trading_program import TradingProgram
+from src.models.user import User
+from src.models.mt5_models import MT5Account
 from src.models.trade import Trade
 from src.models.payment import Payment
 from src.utils.decorators import token_required, admin_required
+from src.middleware.rate_limiter import rate_limit
 from datetime import datetime
 from sqlalchemy import desc, and_
 
@@ -22,6 +26,7 @@ challenges_bp = Blueprint('challenges', __name__)
 
 @challenges_bp.route('/', methods=['POST'])
 @token_required
+@rate_limit('challenge_create')
 def create_challenge(current_user):
     """Create a new challenge for the user"""
     try:
@@ -353,6 +358,14 @@ def get_all_challenges():
             page=page, per_page=per_page, error_out=False
         )
         
+        # Live MT5 data comes from the snapshot cache; stale entries are
+        # refreshed in one background task instead of calling MT5 per row
+        snapshots, refresh_queued = {}, 0
+        if include_mt5:
+            snapshots, refresh_queued = MT5SnapshotCache.snapshots_for(
+                [mt5_account for _, _, _, mt5_account in pagination.items if mt5_account]
+            )
+        
         challenges_data = []
         
         for challenge, user, program, mt5_account in pagination.items:
@@ -379,8 +392,13 @@ def get_all_challenges():
             initial = float(challenge.initial_balance)
             current = float(challenge.current_balance)
             target = float(challenge.profit_target)
-            profit = current - initial
             
+            snapshot = snapshots.get(str(mt5_account.mt5_login)) if (include_mt5 and mt5_account) else None
+            if snapshot and mt5_account.status == 'active' and snapshot.get('balance') is not None:
+                current = snapshot['balance']
+                challenge_dict['current_balance'] = current
+            
+            profit = current - initial
             challenge_dict['progress'] = {
                 'profit': profit,
                 'profit_percentage': (profit / initial * 100) if initial > 0 else 0,
@@ -390,71 +408,28 @@ def get_all_challenges():
                 'drawdown_percentage': (float(challenge.max_drawdown) / initial * 100) if (challenge.max_drawdown and initial > 0) else 0
             }
             
-            if include_mt5 and mt5_account:
-                try:
-                    if mt5_account.status == 'active':
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        
-                        try:
-                            mt5_data = loop.run_until_complete(
-                                mt5_service.get_account_info(mt5_account.mt5_login)
-                            )
-                            
-                            if mt5_data:
-                                mt5_account.balance = mt5_data.get('balance', mt5_account.balance)
-                                mt5_account.equity = mt5_data.get('equity', mt5_account.equity)
-                                mt5_account.margin = mt5_data.get('margin', mt5_account.margin)
-                                mt5_account.free_margin = mt5_data.get('freeMargin', mt5_account.free_margin)
-                                mt5_account.margin_level = mt5_data.get('marginLevel', mt5_account.margin_level)
-                                
-                                challenge.current_balance = mt5_data.get('balance', challenge.current_balance)
-                                
-                                current = float(mt5_data.get('balance', current))
-                                profit = current - initial
-                                challenge_dict['current_balance'] = current
-                                challenge_dict['progress'] = {
-                                    'profit': profit,
-                                    'profit_percentage': (profit / initial * 100) if initial > 0 else 0,
-                                    'target_percentage': (target / initial * 100) if initial > 0 else 0,
-                                    'progress_percentage': (profit / target * 100) if target > 0 else 0,
-                                    'drawdown': float(challenge.max_drawdown) if challenge.max_drawdown else 0,
-                                    'drawdown_percentage': (float(challenge.max_drawdown) / initial * 100) if (challenge.max_drawdown and initial > 0) else 0
-                                }
-                        finally:
-                            loop.close()
-                    
-                    challenge_dict['mt5_account'] = {
-                        'login': mt5_account.mt5_login,
-                        'balance': float(mt5_account.balance) if mt5_account.balance else 0,
-                        'equity': float(mt5_account.equity) if mt5_account.equity else 0,
-                        'margin': float(mt5_account.margin) if mt5_account.margin else 0,
-                        'free_margin': float(mt5_account.free_margin) if mt5_account.free_margin else 0,
-                        'margin_level': float(mt5_account.margin_level) if mt5_account.margin_level else None,
-                        'status': mt5_account.status,
-                        'server': mt5_account.mt5_server
-                    }
-                except Exception as e:
-                    logger.warning(f"Failed to get MT5 data for challenge {challenge.id}: {e}")
-                    challenge_dict['mt5_account'] = {
-                        'login': mt5_account.mt5_login,
-                        'balance': float(mt5_account.balance) if mt5_account.balance else 0,
-                        'equity': float(mt5_account.equity) if mt5_account.equity else 0,
-                        'status': mt5_account.status,
-                        'error': 'Failed to fetch live data'
-                    }
+            if snapshot:
+                challenge_dict['mt5_account'] = {
+                    'login': mt5_account.mt5_login,
+                    'balance': snapshot.get('balance') or 0,
+                    'equity': snapshot.get('equity') or 0,
+                    'margin': snapshot.get('margin') or 0,
+                    'free_margin': snapshot.get('freeMargin') or 0,
+                    'margin_level': snapshot.get('marginLevel'),
+                    'status': mt5_account.status,
+                    'server': mt5_account.mt5_server,
+                    'fetched_at': snapshot['fetched_at'],
+                    'data_age_seconds': snapshot['data_age_seconds'],
+                    'stale': snapshot['stale']
+                }
             else:
                 challenge_dict['mt5_account'] = None
             
             challenges_data.append(challenge_dict)
         
-        try:
-            db.session.commit()
-        except:
-            db.session.rollback()
-        
         return jsonify({
             'challenges': challenges_data,
+            'mt5_refresh_queued': refresh_queued,
             'pagination': {
                 'page': pagination.page,
                 'per_page': pagination.per_page,
@@ -4,6 +4,7 @@ API endpoints for commission management
 """
 from flask import Blueprint, request, jsonify, g
 from src.utils.decorators import token_required, admin_required
+from src.utils.batch_loader import get_loader, prime_relationships
 from src.services.commission_service import CommissionService
 from src.models import Commission, Agent, User
 from src.database import db
@@ -13,14 +14,14 @@ commissions_bp = Blueprint('commissions', __name__, url_prefix='/api/v1/commissi
 
 @commissions_bp.route('/', methods=['GET'])
 @token_required
-def get_commissions():
+def get_commissions(current_user):
     """Get commissions for current user (if agent) or all (if admin)"""
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     status = request.args.get('status', None)
     
     # Check if user is an agent
-    agent = Agent.query.filter_by(user_id=g.current_user.id).first()
+    agent = Agent.query.filter_by(user_id=current_user.id).first()
     
     if agent:
         # Agent can only see their own commissions
@@ -30,7 +31,7 @@ def get_commissions():
             page=page,
             per_page=per_page
         )
-    elif g.current_user.role in ['supermaster', 'master', 'admin']:
+    elif current_user.role in ['supermaster', 'master', 'admin']:
         # Admin can see all commissions
         query = Commission.query
         
@@ -48,15 +49,22 @@ def get_commissions():
     else:
         return jsonify({'error': 'Unauthorized'}), 403
     
+    # Load agents, challenges, referrals and their users for the page in one query each
+    prime_relationships(pagination.items, 'agent', 'challenge', 'referral')
+    users = get_loader(User).prime(
+        [c.agent.user_id for c in pagination.items if c.agent] +
+        [c.referral.referred_user_id for c in pagination.items if c.referral]
+    )
+    
     # Get detailed commission data
     commissions_data = []
     for commission in pagination.items:
         commission_dict = commission.to_dict()
         
         # Add agent info
-        agent_obj = Agent.query.get(commission.agent_id)
+        agent_obj = commission.agent
         if agent_obj:
-            agent_user = User.query.get(agent_obj.user_id)
+            agent_user = users.get(agent_obj.user_id)
             commission_dict['agent'] = {
                 'id': agent_obj.id,
                 'agent_code': agent_obj.agent_code,
@@ -74,7 +82,7 @@ def get_commissions():
         
         # Add referral info
         if commission.referral:
-            referred_user = User.query.get(commission.referral.referred_user_id)
+            referred_user = users.get(commission.referral.referred_user_id)
             commission_dict['referral'] = {
                 'id': commission.referral.id,
                 'referred_user': {
@@ -216,6 +224,23 @@ def mark_commission_paid(commission_id):
     }), 200
 
 
+@commissions_bp.route('/payout-run', methods=['POST'])
+@admin_required
+def run_commission_payout():
+    """Pay approved commissions into agent wallets (Admin only)"""
+    data = request.get_json(silent=True) or {}
+    
+    result = CommissionService.pay_approved_to_wallets(
+        commission_ids=data.get('commission_ids'),
+        created_by=g.current_user.id
+    )
+    
+    return jsonify({
+        'message': f"Paid {result['paid']} commission(s)",
+        **result
+    }), 200
+
+
 @commissions_bp.route('/summary', methods=['GET'])
 @admin_required
 def get_commissions_summary():
@@ -7,8 +7,10 @@ from src.models.lead import Lead, LeadActivity, LeadNote
 from src.models.user import User
 from src.utils.decorators import token_required
 from src.utils.permissions import PermissionManager
-from datetime import datetime, timedelta
-from sqlalchemy import or_, func
+from src.utils.batch_loader import get_loader
+from src.services.crm_query_service import CRMQueryService, PIPELINE_STATUSES, DEFAULT_COLUMN_SIZE
+from datetime import datetime
+from sqlalchemy import or_
 import logging
 
 crm_bp = Blueprint('crm', __name__)
@@ -66,21 +68,7 @@ def get_leads(current_user):
         # Paginate
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         
-        leads = []
-        for lead in pagination.items:
-            lead_data = lead.to_dict()
-            
-            # Add assigned user info
-            if lead.assigned_to:
-                assigned_user = User.query.get(lead.assigned_to)
-                if assigned_user:
-                    lead_data['assigned_user'] = {
-                        'id': assigned_user.id,
-                        'name': f"{assigned_user.first_name} {assigned_user.last_name}",
-                        'email': assigned_user.email
-                    }
-            
-            leads.append(lead_data)
+        leads = CRMQueryService.serialize_leads(pagination.items, include_email=True)
         
         return jsonify({
             'leads': leads,
@@ -249,6 +237,7 @@ def get_lead_notes(current_user, lead_id):
         # Permission already checked via can_access_crm
         
         notes = LeadNote.query.filter_by(lead_id=lead_id).order_by(LeadNote.created_at.desc()).all()
+        creators = get_loader(User).prime(note.user_id for note in notes)
         
         notes_data = []
         for note in notes:
@@ -260,8 +249,8 @@ def get_lead_notes(current_user, lead_id):
             }
             
             # Add creator info
-            if note.created_by:
-                creator = User.query.get(note.created_by)
+            if note.user_id:
+                creator = creators.get(note.user_id)
                 if creator:
                     note_data['created_by'] = f"{creator.first_name} {creator.last_name}"
             
@@ -574,41 +563,7 @@ def get_crm_stats(current_user):
         if not PermissionManager.can_access_crm(current_user):
             return jsonify({'error': 'Access denied'}), 403
         
-        # Build base query with permission filter
-        base_query = Lead.query
-        base_query = PermissionManager.filter_leads_by_permission(current_user, base_query)
-        
-        # Get counts by status
-        total_leads = base_query.count()
-        new_leads = base_query.filter_by(status='new').count()
-        contacted_leads = base_query.filter_by(status='contacted').count()
-        qualified_leads = base_query.filter_by(status='qualified').count()
-        converted_leads = base_query.filter_by(status='converted').count()
-        lost_leads = base_query.filter_by(status='lost').count()
-        
-        # Get conversion rate
-        conversion_rate = (converted_leads / total_leads * 100) if total_leads > 0 else 0
-        
-        # Get leads created in last 30 days
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        recent_leads = base_query.filter(Lead.created_at >= thirty_days_ago).count()
-        
-        # Get average score
-        avg_score = db.session.query(func.avg(Lead.score)).filter(
-            Lead.id.in_([l.id for l in base_query.all()])
-        ).scalar() or 0
-        
-        return jsonify({
-            'total_leads': total_leads,
-            'new_leads': new_leads,
-            'contacted_leads': contacted_leads,
-            'qualified_leads': qualified_leads,
-            'converted_leads': converted_leads,
-            'lost_leads': lost_leads,
-            'conversion_rate': round(conversion_rate, 2),
-            'recent_leads_30d': recent_leads,
-            'average_score': round(float(avg_score), 2)
-        }), 200
+        return jsonify(CRMQueryService.get_stats(current_user)), 200
         
     except Exception as e:
         logger.error(f'Error getting CRM stats: {str(e)}')
@@ -626,47 +581,19 @@ def get_crm_pipeline(current_user):
         if not PermissionManager.can_access_crm(current_user):
             return jsonify({'error': 'Access denied'}), 403
         
-        # Build base query with permission filter
-        base_query = Lead.query
-        base_query = PermissionManager.filter_leads_by_permission(current_user, base_query)
-        
-        # Group leads by status
-        pipeline = {
-            'new': [],
-            'contacted': [],
-            'qualified': [],
-            'proposal': [],
-            'negotiation': [],
-            'converted': [],
-            'lost': []
-        }
-        
-        # Get all leads
-        leads = base_query.order_by(Lead.score.desc()).all()
-        
-        for lead in leads:
-            status = lead.status or 'new'
-            if status in pipeline:
-                lead_data = lead.to_dict()
-                
-                # Add assigned user info
-                if lead.assigned_to:
-                    assigned_user = User.query.get(lead.assigned_to)
-                    if assigned_user:
-                        lead_data['assigned_user'] = {
-                            'id': assigned_user.id,
-                            'name': f"{assigned_user.first_name} {assigned_user.last_name}"
-                        }
-                
-                pipeline[status].append(lead_data)
-        
-        # Get counts
-        counts = {status: len(leads) for status, leads in pipeline.items()}
+        status = request.args.get('status')
+        if status and status not in PIPELINE_STATUSES:
+            return jsonify({'error': f'Invalid status: {status}'}), 400
+        
+        # Top leads per column; pass status and page to load more of one column
+        pipeline = CRMQueryService.get_pipeline(
+            current_user,
+            per_column=request.args.get('per_column', DEFAULT_COLUMN_SIZE, type=int),
+            status=status,
+            page=request.args.get('page', 1, type=int)
+        )
         
-        return jsonify({
-            'pipeline': pipeline,
-            'counts': counts
-        }), 200
+        return jsonify(pipeline), 200
         
     except Exception as e:
         logger.error(f'Error getting pipeline: {str(e)}')
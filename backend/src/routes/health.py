@@ -5,12 +5,23 @@ Monitors system health: database, Redis, Celery, disk space
 from flask import Blueprint, jsonify
 from src.database import db
 from datetime import datetime
+from importlib import import_module
 import redis
 import os
 import psutil
 
 health_bp = Blueprint('health', __name__)
 
+# Health check name -> (module, attribute path of the function returning its counters)
+COMPONENT_STATS = {
+    'auth_cache': ('src.services.auth_cache_service', 'get_stats'),
+    'storage_urls': ('src.services.storage_service', 'get_url_stats'),
+    'mt5_broker': ('src.services.mt5_broker', 'get_stats'),
+    'rate_limits': ('src.services.rate_limit_service', 'get_stats'),
+    'conditional_requests': ('src.utils.conditional_requests', 'get_stats'),
+    'email_queue': ('src.services.email_queue_service', 'EmailQueueService.get_stats'),
+}
+
 
 @health_bp.route('/health', methods=['GET'])
 def health_check():
@@ -53,6 +64,20 @@ def health_check():
             'message': f'Redis error: {str(e)}'
         }
     
+    # Cache, queue and rate limit counters (totals of this worker; every
+    # worker's are in the *_events_total Prometheus counters)
+    for name, (module_name, function_name) in COMPONENT_STATS.items():
+        try:
+            get_stats = import_module(module_name)
+            for attribute in function_name.split('.'):
+                get_stats = getattr(get_stats, attribute)
+            health_status['checks'][name] = get_stats()
+        except Exception as e:
+            health_status['checks'][name] = {
+                'status': 'unknown',
+                'message': f'{name} check error: {str(e)}'
+            }
+
     # Check Disk Space
     try:
         disk = psutil.disk_usage('/')
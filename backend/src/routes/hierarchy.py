@@ -4,6 +4,7 @@ Hierarchy routes for MLM structure
 from flask import Blueprint, request, jsonify, g
 from src.database import db
 from src.models.user import User
+from src.services.hierarchy_tree_service import HierarchyTreeService
 from src.utils.decorators import token_required
 from datetime import datetime
 from sqlalchemy import or_
@@ -280,40 +281,36 @@ def update_downline_user(user_id):
 @hierarchy_bp.route('/tree', methods=['GET'])
 @token_required
 def get_hierarchy_tree():
-    """Get hierarchical tree structure of downline"""
+    """
+    Get hierarchical tree structure of downline
+    
+    Query params:
+        max_depth: Levels to include, starting with the root (default 5)
+        cursor: Expand a collapsed node from a previous response
+    """
     try:
         current_user = g.current_user
         max_depth = int(request.args.get('max_depth', 5))
+        cursor = request.args.get('cursor')
         
-        def build_tree(user, current_depth=0):
-            """Recursively build tree structure"""
-            if current_depth >= max_depth:
-                return None
-            
-            node = {
-                'id': user.id,
-                'email': user.email,
-                'name': f"{user.first_name} {user.last_name}",
-                'role': user.role,
-                'level': user.level,
-                'is_active': user.is_active,
-                'children_count': len(user.children),
-                'children': []
+        if cursor:
+            tree = HierarchyTreeService.get_snapshot(
+                current_user.id, f"tree:{max_depth}:{cursor}",
+                lambda: HierarchyTreeService.expand_node(current_user, cursor, max_depth)
+            )
+            if tree is None:
+                return jsonify({'error': 'Invalid cursor'}), 404
+            return jsonify({'tree': tree}), 200
+        
+        snapshot = HierarchyTreeService.get_snapshot(
+            current_user.id, f"tree:{max_depth}",
+            lambda: {
+                'tree': HierarchyTreeService.build_tree(current_user.id, max_depth),
+                'total_downline': current_user.get_downline_count()
             }
-            
-            for child in user.children:
-                child_node = build_tree(child, current_depth + 1)
-                if child_node:
-                    node['children'].append(child_node)
-            
-            return node
-        
-        tree = build_tree(current_user)
+        )
         
-        return jsonify({
-            'tree': tree,
-            'total_downline': current_user.get_downline_count()
-        }), 200
+        return jsonify(snapshot), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -10,6 +10,7 @@ from sqlalchemy import desc, or_
 from src.services.storage_service import storage_service
 from src.services.email_service import EmailService
 from src.services.notification_service import NotificationService
+from src.services.kyc_upload_service import KycUploadService, apply_document_to_user, document_urls
 
 kyc_bp = Blueprint('kyc', __name__)
 
@@ -123,26 +124,8 @@ def upload_document(document_type):
                 'error': upload_result.get('error', 'Failed to upload file')
             }), 500
         
-        # Update user's KYC status fields
-        status_field = f'kyc_{document_type}_status'
-        uploaded_field = f'kyc_{document_type}_uploaded_at'
-        url_field = f'kyc_{document_type}_url'
-        
-        if hasattr(user, status_field):
-            setattr(user, status_field, 'pending')
-        if hasattr(user, uploaded_field):
-            setattr(user, uploaded_field, datetime.utcnow())
-        if hasattr(user, url_field):
-            setattr(user, url_field, upload_result['url'])
-        
-        # Update overall KYC status to pending if all required docs are uploaded
-        # Required docs: id_proof, address_proof, selfie
-        if (hasattr(user, 'kyc_id_status') and user.kyc_id_status == 'pending' and
-            hasattr(user, 'kyc_address_status') and user.kyc_address_status == 'pending' and
-            hasattr(user, 'kyc_selfie_status') and user.kyc_selfie_status == 'pending'):
-            user.kyc_status = 'pending'
-        
-        user.updated_at = datetime.utcnow()
+        # Store the key; URLs are presigned when the document is viewed
+        apply_document_to_user(user, document_type, upload_result['key'])
         db.session.commit()
         
         return jsonify({
@@ -160,6 +143,67 @@ def upload_document(document_type):
         return jsonify({'error': str(e)}), 500
 
 
+@kyc_bp.route('/documents/<document_type>/upload-url', methods=['POST'])
+@token_required
+def create_upload_url(document_type):
+    """
+    Presign a direct upload to storage
+    Body: {content_type, size}. Files up to 8 MB get a presigned POST; larger
+    ones a multipart upload with one presigned PUT URL per part.
+    """
+    try:
+        data = request.get_json() or {}
+        size = data.get('size')
+        upload = KycUploadService.start_upload(
+            g.current_user,
+            document_type,
+            data.get('content_type'),
+            int(size) if str(size).isdigit() else None
+        )
+        return jsonify(upload), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@kyc_bp.route('/documents/<document_type>/complete', methods=['POST'])
+@token_required
+def complete_upload(document_type):
+    """
+    Completion callback for a direct upload
+    Body: {key} and, for multipart uploads, {upload_id, parts: [{part_number, etag}]}
+    """
+    try:
+        data = request.get_json() or {}
+        document = KycUploadService.complete_upload(
+            g.current_user,
+            document_type,
+            data.get('key'),
+            upload_id=data.get('upload_id'),
+            parts=data.get('parts')
+        )
+        
+        return jsonify({
+            'message': 'Document uploaded successfully',
+            'document': {
+                'type': document_type,
+                'name': DOCUMENT_TYPES[document_type],
+                'status': 'pending',
+                'uploaded_at': document.created_at.isoformat() if document.created_at else None,
+                'processing_status': document.processing_status
+            }
+        }), 200
+        
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
 @kyc_bp.route('/admin/submissions', methods=['GET'])
 @token_required
 @admin_required
@@ -192,6 +236,9 @@ def get_kyc_submissions():
             ).count()
         }
         
+        # Document URLs for the whole page, signed (or reused) in one batch
+        urls = document_urls(pagination.items)
+        
         return jsonify({
             'statistics': stats,
             'submissions': [{
@@ -205,7 +252,8 @@ def get_kyc_submissions():
                     'address_proof': getattr(user, 'kyc_address_status', 'not_uploaded'),
                     'selfie': getattr(user, 'kyc_selfie_status', 'not_uploaded'),
                     'bank_statement': getattr(user, 'kyc_bank_status', 'not_uploaded')
-                }
+                },
+                'document_urls': urls[user.id]
             } for user in pagination.items],
             'pagination': {
                 'page': pagination.page,
@@ -226,6 +274,7 @@ def get_kyc_submission_details(user_id):
     """Get detailed KYC submission for a specific user"""
     try:
         user = User.query.get_or_404(user_id)
+        urls = document_urls([user])[user.id]
         
         documents = {
             'id_proof': {
@@ -234,7 +283,7 @@ def get_kyc_submission_details(user_id):
                 'status': getattr(user, 'kyc_id_status', 'not_uploaded'),
                 'uploaded_at': getattr(user, 'kyc_id_uploaded_at', None),
                 'notes': getattr(user, 'kyc_id_notes', None),
-                'url': getattr(user, 'kyc_id_url', None)  # File URL
+                'url': urls['id_proof']  # File URL
             },
             'address_proof': {
                 'type': 'address_proof',
@@ -242,7 +291,7 @@ def get_kyc_submission_details(user_id):
                 'status': getattr(user, 'kyc_address_status', 'not_uploaded'),
                 'uploaded_at': getattr(user, 'kyc_address_uploaded_at', None),
                 'notes': getattr(user, 'kyc_address_notes', None),
-                'url': getattr(user, 'kyc_address_url', None)
+                'url': urls['address_proof']
             },
             'selfie': {
                 'type': 'selfie',
@@ -250,7 +299,7 @@ def get_kyc_submission_details(user_id):
                 'status': getattr(user, 'kyc_selfie_status', 'not_uploaded'),
                 'uploaded_at': getattr(user, 'kyc_selfie_uploaded_at', None),
                 'notes': getattr(user, 'kyc_selfie_notes', None),
-                'url': getattr(user, 'kyc_selfie_url', None)
+                'url': urls['selfie']
             },
             'bank_statement': {
                 'type': 'bank_statement',
@@ -258,7 +307,7 @@ def get_kyc_submission_details(user_id):
                 'status': getattr(user, 'kyc_bank_status', 'not_uploaded'),
                 'uploaded_at': getattr(user, 'kyc_bank_uploaded_at', None),
                 'notes': getattr(user, 'kyc_bank_notes', None),
-                'url': getattr(user, 'kyc_bank_url', None)
+                'url': urls['bank_statement']
             }
         }
         
@@ -7,6 +7,9 @@ from src.database import db
 from src.utils.decorators import token_required
 from src.models.mt5_models import MT5Account, MT5Trade, MT5Position
 from src.services.mt5_service import mt5_service
+from src.services.mt5_snapshot_cache import (
+    MT5SnapshotCache, apply_snapshot_to_account, freshness, snapshot_from_mt5
+)
 from src.utils.decorators import admin_required
 import logging
 from datetime import datetime, timedelta
@@ -45,18 +48,13 @@ def get_mt5_account(current_user, account_id):
         if not account:
             return jsonify({'success': False, 'message': 'Account not found'}), 404
         
-        # Get fresh data from MT5 API
-        try:
-            # Note: Sync version - async not supported in Flask routes
-            # mt5_data = await mt5_service.get_account_info(account.mt5_login)
-            # For now, return cached data from database
-            pass
-        except Exception as e:
-            logger.warning(f"Failed to fetch fresh MT5 data: {e}")
+        # Live balances from the snapshot cache (refreshed in the background when stale)
+        snapshots, _ = MT5SnapshotCache.snapshots_for([account])
         
         return jsonify({
             'success': True,
-            'account': account.to_dict(include_password=True)
+            'account': account.to_dict(include_password=True),
+            'live': snapshots.get(str(account.mt5_login))
         }), 200
         
     except Exception as e:
@@ -341,22 +339,22 @@ def sync_account_data(current_user, account_id):
         if not account:
             return jsonify({'success': False, 'message': 'Account not found'}), 404
         
-        # Sync account info (async disabled for Flask compatibility)
-        # mt5_data = await mt5_service.get_account_info(account.mt5_login)
-        # For now, just update timestamp
-        account.updated_at = datetime.utcnow()
-        
-        # In production, this would:
-        # 1. Sync account info from MT5
-        # 2. Sync positions
-        # 3. Sync recent trades
+        # A fresh snapshot is reused; otherwise fetch this one account now
+        snapshot = MT5SnapshotCache.get_many([account.mt5_login]).get(str(account.mt5_login))
+        if not snapshot or freshness(snapshot)['stale']:
+            mt5_data = mt5_service.get_account_info(account.mt5_login)
+            MT5SnapshotCache.put(account.mt5_login, mt5_data)
+            apply_snapshot_to_account(account, mt5_data)
+            snapshot = snapshot_from_mt5(mt5_data)
+        snapshot.update(freshness(snapshot))
         
         db.session.commit()
         
         return jsonify({
             'success': True,
             'message': 'Account data synced successfully',
-            'account': account.to_dict()
+            'account': account.to_dict(),
+            'live': snapshot
         }), 200
         
     except Exception as e:
@@ -1,15 +1,28 @@
+import time
 from flask import Blueprint, request, jsonify
 from src.middleware.auth import jwt_required, admin_required, get_current_user
 from src.services.notification_service import NotificationService
-from src.models.notification import NotificationPreference
+from src.models.notification import Notification, NotificationPreference
 from src.database import db
+from src.utils.conditional_requests import conditional, query_version
 
 notifications_bp = Blueprint('notifications', __name__)
 
+# Unread-count long polling: seconds between checks, longest wait
+LONG_POLL_INTERVAL = 1.0
+LONG_POLL_MAX_WAIT = 30.0
+
+
+def _notifications_version():
+    # Soft deletes and reads update the row, so every change moves updated_at
+    return query_version(Notification.query.filter_by(user_id=get_current_user().id))
+
+
 # ==================== USER ENDPOINTS ====================
 
 @notifications_bp.route('/', methods=['GET'])
 @jwt_required
+@conditional(_notifications_version, private=True)
 def get_notifications():
     """Get user notifications with optional filters"""
     try:
@@ -48,12 +61,28 @@ def get_notifications():
 @notifications_bp.route('/unread-count', methods=['GET'])
 @jwt_required
 def get_unread_count():
-    """Get count of unread notifications"""
+    """
+    Get count of unread notifications
+    
+    Long poll: with ?wait=<seconds>&since=<count> the response is held
+    until the count differs from `since` or the wait (max 30s) is over.
+    """
     try:
         current_user = get_current_user()
-        count = NotificationService.get_unread_count(current_user.id)
+        counts = NotificationService.get_unread_counts(current_user.id)
         
-        return jsonify({'count': count}), 200
+        wait = min(request.args.get('wait', 0, type=float), LONG_POLL_MAX_WAIT)
+        since = request.args.get('since', type=int)
+        if wait > 0 and since is not None:
+            deadline = time.monotonic() + wait
+            while counts['total'] == since and time.monotonic() < deadline:
+                time.sleep(LONG_POLL_INTERVAL)
+                counts = NotificationService.get_unread_counts(current_user.id)
+        
+        return jsonify({
+            'count': counts['total'],
+            'by_type': {t: c for t, c in counts.items() if t != 'total' and c}
+        }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -238,8 +267,9 @@ def admin_broadcast_notification():
         notification_data = data.get('data')
         role = data.get('role')  # Optional: broadcast to specific role
         
-        # Broadcast
-        count = NotificationService.broadcast_notification(
+        # Broadcast in the background
+        from src.tasks.notification_tasks import broadcast_notification_task
+        task = broadcast_notification_task.delay(
             notification_type=notification_type,
             title=title,
             message=message,
@@ -249,9 +279,30 @@ def admin_broadcast_notification():
         )
         
         return jsonify({
-            'message': f'Notification broadcast to {count} users',
-            'count': count
-        }), 200
+            'message': 'Notification broadcast started',
+            'task_id': task.id,
+            'status_url': f'/api/v1/notifications/admin/broadcast/{task.id}'
+        }), 202
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@notifications_bp.route('/admin/broadcast/<task_id>', methods=['GET'])
+@admin_required
+def admin_broadcast_status(task_id):
+    """Progress of a broadcast"""
+    try:
+        from src.tasks.notification_tasks import broadcast_notification_task
+        result = broadcast_notification_task.AsyncResult(task_id)
+        
+        response = {'task_id': task_id, 'state': result.state}
+        if result.state in ('PROGRESS', 'SUCCESS') and isinstance(result.info, dict):
+            response.update(result.info)
+        elif result.state == 'FAILURE':
+            response['error'] = str(result.info)
+        
+        return jsonify(response), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
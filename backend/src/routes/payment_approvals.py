@@ -6,6 +6,7 @@ from flask import Blueprint, request, jsonify, g
 from src.models import PaymentApprovalRequest, User, Challenge, Payment
 from src.services.payment_approval_service import PaymentApprovalService
 from src.utils.decorators import token_required, role_required
+from src.utils.batch_loader import get_loader
 from src.database import db
 
 bp = Blueprint('payment_approvals', __name__, url_prefix='/api/v1/payment-approvals')
@@ -14,20 +15,26 @@ bp = Blueprint('payment_approvals', __name__, url_prefix='/api/v1/payment-approv
 @bp.route('/pending', methods=['GET'])
 @token_required
 @role_required('supermaster')
-def get_pending_approvals():
+def get_pending_approvals(current_user):
     """
     Get all pending payment approval requests (Super Admin only)
     """
     try:
         requests = PaymentApprovalService.get_pending_requests()
         
+        # Load the users and challenges of all requests in one query each
+        users = get_loader(User).prime(
+            user_id for req in requests for user_id in (req.requested_by, req.requested_for)
+        )
+        challenges = get_loader(Challenge).prime(req.challenge_id for req in requests)
+        
         # Enrich with user details
         result = []
         for req in requests:
             req_dict = req.to_dict()
             
             # Add requester details
-            requester = User.query.get(req.requested_by)
+            requester = users.get(req.requested_by)
             if requester:
                 req_dict['requester'] = {
                     'id': requester.id,
@@ -37,7 +44,7 @@ def get_pending_approvals():
                 }
             
             # Add trader details
-            trader = User.query.get(req.requested_for)
+            trader = users.get(req.requested_for)
             if trader:
                 req_dict['trader'] = {
                     'id': trader.id,
@@ -48,7 +55,7 @@ def get_pending_approvals():
             
             # Add challenge details
             if req.challenge_id:
-                challenge = Challenge.query.get(req.challenge_id)
+                challenge = challenges.get(req.challenge_id)
                 if challenge:
                     req_dict['challenge'] = {
                         'id': challenge.id,
@@ -74,12 +81,16 @@ def get_pending_approvals():
 @bp.route('/my-requests', methods=['GET'])
 @token_required
 @role_required('supermaster', 'master')
-def get_my_requests():
+def get_my_requests(current_user):
     """
     Get all approval requests created by current user (Master/Admin only)
     """
     try:
-        requests = PaymentApprovalService.get_requests_by_requester(g.current_user.id)
+        requests = PaymentApprovalService.get_requests_by_requester(current_user.id)
+        
+        users = get_loader(User).prime(
+            user_id for req in requests for user_id in (req.requested_for, req.reviewed_by)
+        )
         
         # Enrich with details
         result = []
@@ -87,7 +98,7 @@ def get_my_requests():
             req_dict = req.to_dict()
             
             # Add trader details
-            trader = User.query.get(req.requested_for)
+            trader = users.get(req.requested_for)
             if trader:
                 req_dict['trader'] = {
                     'id': trader.id,
@@ -97,7 +108,7 @@ def get_my_requests():
             
             # Add reviewer details if reviewed
             if req.reviewed_by:
-                reviewer = User.query.get(req.reviewed_by)
+                reviewer = users.get(req.reviewed_by)
                 if reviewer:
                     req_dict['reviewer'] = {
                         'id': reviewer.id,
@@ -8,6 +8,7 @@ from src.services.payment_service import PaymentService
 from src.models.payment import Payment
 from src.services.email_service import EmailService
 from src.utils.decorators import token_required
+from src.middleware.rate_limiter import rate_limit
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,6 +18,7 @@ payments_bp = Blueprint('payments', __name__)
 
 @payments_bp.route('/', methods=['GET'])
 @token_required
+@rate_limit('payment_list')
 def get_payments(current_user):
     """Get user payments with pagination"""
     try:
@@ -40,6 +42,7 @@ def get_payments(current_user):
 
 @payments_bp.route('/', methods=['POST'])
 @token_required
+@rate_limit('payment_create')
 def create_payment(current_user):
     """Create a general payment"""
     data = request.get_json()
@@ -73,6 +76,7 @@ def create_payment(current_user):
 
 @payments_bp.route('/create-payment-intent', methods=['POST'])
 @token_required
+@rate_limit('payment_create')
 def create_payment_intent(current_user):
     """Create payment intent for challenge purchase"""
     data = request.get_json()
@@ -7,6 +7,7 @@ from src.models.payout_request import PayoutRequest
 from src.models.trading_program import TradingProgram
 from src.extensions import db
 from src.middleware.auth import jwt_required, admin_required
+from src.middleware.rate_limiter import rate_limit
 
 payouts_bp = Blueprint("payouts", __name__, url_prefix="/api/payouts")
 
@@ -44,6 +45,7 @@ def check_payout_eligibility():
 
 @payouts_bp.route("/request", methods=["POST"])
 @jwt_required
+@rate_limit('withdrawal_create')
 def request_payout():
     """Request a new payout"""
     try:
@@ -94,6 +96,7 @@ def request_payout():
 
 @payouts_bp.route("/my-payouts", methods=["GET"])
 @jwt_required
+@rate_limit('withdrawal_list')
 def get_my_payouts():
     """Get all payouts for current user"""
     try:
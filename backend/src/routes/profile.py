@@ -4,6 +4,7 @@ Profile management routes
 from flask import Blueprint, request, jsonify, g
 from src.database import db
 from src.utils.decorators import token_required
+from src.middleware.rate_limiter import rate_limit
 from src.utils.validators import (
     validate_email_format,
     validate_password_strength,
@@ -19,6 +20,7 @@ profile_bp = Blueprint("profile", __name__)
 
 @profile_bp.route("", methods=["GET"])
 @token_required
+@rate_limit('user_profile')
 def get_profile(current_user):
     """Get current user profile"""
     try:
@@ -31,6 +33,7 @@ def get_profile(current_user):
 
 @profile_bp.route("", methods=["PUT"])
 @token_required
+@rate_limit('user_update')
 def update_profile(current_user):
     """Update user profile"""
     data = request.get_json()
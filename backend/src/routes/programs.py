@@ -4,15 +4,14 @@ Trading Programs routes
 from flask import Blueprint, request, jsonify, g
 from src.database import db
 from src.models import TradingProgram, ProgramAddOn, Challenge
+from src.utils.conditional_requests import conditional, query_version
 from src.utils.decorators import token_required, role_required, tenant_required
 
 programs_bp = Blueprint('programs', __name__)
 
 
-@programs_bp.route('/', methods=['GET'])
-def get_programs():
-    """Get all active trading programs"""
-    # Get tenant_id from query params (for white label)
+def _active_programs():
+    """Active programs, of the tenant_id query param if given (for white label)"""
     tenant_id = request.args.get('tenant_id', type=int)
     
     query = TradingProgram.query.filter_by(is_active=True)
@@ -20,7 +19,21 @@ def get_programs():
     if tenant_id:
         query = query.filter_by(tenant_id=tenant_id)
     
-    programs = query.all()
+    return query
+
+
+def _program_version(program_id):
+    return query_version(
+        TradingProgram.query.filter_by(id=program_id),
+        ProgramAddOn.query.filter_by(program_id=program_id, is_active=True)
+    )
+
+
+@programs_bp.route('/', methods=['GET'])
+@conditional(lambda: query_version(_active_programs()))
+def get_programs():
+    """Get all active trading programs"""
+    programs = _active_programs().all()
     
     return jsonify({
         'programs': [p.to_dict() for p in programs]
@@ -28,6 +41,7 @@ def get_programs():
 
 
 @programs_bp.route('/<int:program_id>', methods=['GET'])
+@conditional(_program_version)
 def get_program(program_id):
     """Get specific trading program"""
     program = TradingProgram.query.get_or_404(program_id)
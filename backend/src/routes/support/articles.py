@@ -5,7 +5,8 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.database import db
 from src.models.support_article import SupportArticle
-from src import cache
+from src.services.search_service import SearchService
+from src.utils.conditional_requests import conditional, generation_version, track_changes
 from src.models.user import User
 from src.constants.roles import Roles
 import logging
@@ -15,35 +16,47 @@ logger = logging.getLogger(__name__)
 
 articles_bp = Blueprint('support_articles', __name__)
 
+# Seconds responses are cached and may show outdated view and feedback counts
+CACHE_TIMEOUT = 600
+
+track_changes('articles', SupportArticle, ignore=('views', 'helpful_count', 'not_helpful_count'))
+articles_version = generation_version('articles', refresh=CACHE_TIMEOUT)
+
 
 @articles_bp.route('', methods=['GET'], strict_slashes=False)
 @articles_bp.route('/', methods=['GET'], strict_slashes=False)
-@cache.cached(timeout=600, query_string=True)  # Cache for 10 minutes, include query params
+@conditional(articles_version, cache_timeout=CACHE_TIMEOUT)  # Cached per version and query params
 def get_articles():
     """
     Get all published support articles
-    Query params: category, search, featured
+    Query params: category, search, featured (page, per_page with search)
     """
     try:
+        category = request.args.get('category')
+        if category == 'all':
+            category = None
+        
+        # Search: ranked full-text results, the last word also matching as a prefix
+        search = request.args.get('search', '')
+        if search.strip():
+            result = SearchService.search_articles(
+                search,
+                page=max(request.args.get('page', 1, type=int), 1),
+                per_page=min(request.args.get('per_page', 50, type=int), 100),
+                category=category,
+                featured=request.args.get('featured') == 'true'
+            )
+            return jsonify({
+                'articles': result.results,
+                'total': result.total
+            }), 200
+        
         query = SupportArticle.query.filter_by(status='published')
         
         # Filter by category
-        category = request.args.get('category')
-        if category and category != 'all':
+        if category:
             query = query.filter_by(category=category)
         
-        # Search
-        search = request.args.get('search')
-        if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                db.or_(
-                    SupportArticle.title.ilike(search_term),
-                    SupportArticle.content.ilike(search_term),
-                    SupportArticle.excerpt.ilike(search_term)
-                )
-            )
-        
         # Featured only
         featured = request.args.get('featured')
         if featured == 'true':
@@ -67,7 +80,7 @@ def get_articles():
 
 
 @articles_bp.route('/<slug>', methods=['GET'], strict_slashes=False)
-@cache.cached(timeout=600)  # Cache for 10 minutes (matches Nginx)
+@conditional(articles_version, cache_timeout=CACHE_TIMEOUT)
 def get_article(slug):
     """Get single article by slug"""
     try:
@@ -111,6 +124,7 @@ def article_feedback(article_id):
 
 
 @articles_bp.route('/categories', methods=['GET'])
+@conditional(generation_version('articles'))
 def get_categories():
     """Get all article categories with counts"""
     try:
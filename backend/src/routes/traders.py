@@ -4,22 +4,37 @@ Trader routes for trading operations and account management
 from flask import Blueprint, request, jsonify, g
 from src.database import db
 from src.models.user import User
-from src.models.trading_program import Challenge
+from src.models.trading_program import Challenge, TradingProgram
 from src.models.trade import Trade
+from src.models.challenge_trade_stats import ChallengeTradeStats
 from src.models.withdrawal import Withdrawal
+from src.utils.conditional_requests import conditional, query_version
 from src.utils.decorators import token_required
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_, desc
+from sqlalchemy import func, desc
 
 traders_bp = Blueprint('traders', __name__)
 
 
+def _dashboard_version():
+    user_id = g.current_user.id
+    return query_version(
+        Challenge.query.filter_by(user_id=user_id),
+        # The stats row changes with every close (and every rebuild after a correction)
+        ChallengeTradeStats.query.join(Challenge, ChallengeTradeStats.challenge_id == Challenge.id).filter(
+            Challenge.user_id == user_id
+        ),
+        TradingProgram.query
+    )
+
+
 @traders_bp.route('/dashboard', methods=['GET'])
 @token_required
-def get_trader_dashboard():
+@conditional(_dashboard_version, private=True)
+def get_trader_dashboard(current_user):
     """Get trader dashboard data"""
     try:
-        user_id = g.current_user.id
+        user_id = current_user.id
         
         # Get active challenge
         active_challenge = Challenge.query.filter_by(
@@ -40,42 +55,29 @@ def get_trader_dashboard():
         total_pnl = balance - initial_balance
         total_pnl_percentage = (total_pnl / initial_balance) * 100 if initial_balance > 0 else 0
         
-        # Calculate drawdown (relative to initial balance)
-        max_balance = float(active_challenge.max_balance or initial_balance)
-        current_drawdown = ((max_balance - balance) / initial_balance) * 100 if initial_balance > 0 else 0
-        max_drawdown = float(active_challenge.max_total_drawdown)
-        
-        # Get trading statistics
-        trades = Trade.query.filter_by(challenge_id=active_challenge.id).all()
-        total_trades = len(trades)
-        winning_trades = len([t for t in trades if t.profit > 0])
-        losing_trades = len([t for t in trades if t.profit < 0])
-        win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
-        
-        # Calculate average win/loss
-        wins = [float(t.profit) for t in trades if t.profit > 0]
-        losses = [float(t.profit) for t in trades if t.profit < 0]
-        avg_win = sum(wins) / len(wins) if wins else 0
-        avg_loss = sum(losses) / len(losses) if losses else 0
-        
-        # Calculate profit factor
-        total_wins = sum(wins)
-        total_losses = abs(sum(losses))
-        profit_factor = total_wins / total_losses if total_losses > 0 else 0
-        
-        # Challenge progress
-        profit_target = float(active_challenge.profit_target)
+        # Calculate drawdown (relative to initial balance); limits come from the program
+        program = active_challenge.program
+        current_drawdown = ((initial_balance - balance) / initial_balance) * 100 if initial_balance > 0 else 0
+        max_drawdown = float(program.max_total_loss or 0)
+        
+        # Trading statistics (maintained as trades close)
+        stats = db.session.get(ChallengeTradeStats, active_challenge.id)
+        statistics = stats.to_dict() if stats else ChallengeTradeStats.empty_dict()
+        
+        # Challenge progress (the program's target is a percentage of the initial balance)
+        profit_target = initial_balance * float(program.profit_target or 0) / 100
         profit_achieved = total_pnl
         profit_progress = (profit_achieved / profit_target * 100) if profit_target > 0 else 0
         
-        # Trading days
-        trading_days = active_challenge.trading_days or 0
-        min_trading_days = active_challenge.min_trading_days or 5
+        # Trading days: distinct days with a closed trade
+        trading_days = stats.trading_days if stats else 0
+        min_trading_days = (program.rules or {}).get('min_trading_days') or 5
         days_progress = (trading_days / min_trading_days * 100) if min_trading_days > 0 else 0
         
-        # Recent trades (last 5)
-        recent_trades = Trade.query.filter_by(
-            challenge_id=active_challenge.id
+        # Recent trades (last 5 closed)
+        recent_trades = Trade.query.filter(
+            Trade.challenge_id == active_challenge.id,
+            Trade.close_time.isnot(None)
         ).order_by(desc(Trade.close_time)).limit(5).all()
         
         return jsonify({
@@ -83,7 +85,7 @@ def get_trader_dashboard():
             'challenge': {
                 'id': active_challenge.id,
                 'status': active_challenge.status,
-                'phase': active_challenge.phase,
+                'phase': active_challenge.current_phase,
                 'created_at': active_challenge.created_at.isoformat()
             },
             'account': {
@@ -110,24 +112,16 @@ def get_trader_dashboard():
                     'percentage': round(days_progress, 2)
                 }
             },
-            'statistics': {
-                'total_trades': total_trades,
-                'winning_trades': winning_trades,
-                'losing_trades': losing_trades,
-                'win_rate': round(win_rate, 2),
-                'average_win': round(avg_win, 2),
-                'average_loss': round(avg_loss, 2),
-                'profit_factor': round(profit_factor, 2)
-            },
+            'statistics': statistics,
             'recent_trades': [{
                 'id': trade.id,
                 'symbol': trade.symbol,
                 'type': trade.trade_type,
-                'lots': float(trade.lots),
+                'lots': float(trade.volume),
                 'open_price': float(trade.open_price),
-                'close_price': float(trade.close_price),
-                'profit': float(trade.profit),
-                'pips': float(trade.pips) if trade.pips else 0,
+                'close_price': float(trade.close_price) if trade.close_price is not None else None,
+                'profit': float(trade.profit) if trade.profit is not None else 0,
+                'pips': 0,
                 'open_time': trade.open_time.isoformat(),
                 'close_time': trade.close_time.isoformat() if trade.close_time else None
             } for trade in recent_trades]
@@ -139,10 +133,10 @@ def get_trader_dashboard():
 
 @traders_bp.route('/history', methods=['GET'])
 @token_required
-def get_trading_history():
+def get_trading_history(current_user):
     """Get complete trading history with filters"""
     try:
-        user_id = g.current_user.id
+        user_id = current_user.id
         
         # Get query parameters
         page = request.args.get('page', 1, type=int)
@@ -152,8 +146,7 @@ def get_trading_history():
         period = request.args.get('period')
         
         # Get user's challenges
-        challenges = Challenge.query.filter_by(user_id=user_id).all()
-        challenge_ids = [c.id for c in challenges]
+        challenge_ids = [c.id for c in db.session.query(Challenge.id).filter_by(user_id=user_id)]
         
         # Build query
         query = Trade.query.filter(Trade.challenge_id.in_(challenge_ids))
@@ -174,13 +167,15 @@ def get_trading_history():
                 start_date = datetime.utcnow() - timedelta(days=30)
                 query = query.filter(Trade.close_time >= start_date)
         
-        # Calculate statistics
-        all_trades = query.all()
-        total_trades = len(all_trades)
-        winning_trades = len([t for t in all_trades if t.profit > 0])
-        losing_trades = len([t for t in all_trades if t.profit < 0])
-        total_profit = sum([float(t.profit) for t in all_trades])
-        total_pips = sum([float(t.pips) for t in all_trades if t.pips])
+        # Calculate statistics: one aggregate over the closed trades the list pages through
+        # (the per-challenge accumulators also count streamed MT5 closes, which are not listed here)
+        closed = query.filter(Trade.close_time.isnot(None), Trade.profit.isnot(None))
+        total_trades, winning_trades, losing_trades, total_profit = closed.with_entities(
+            func.count(Trade.id),
+            func.count(Trade.id).filter(Trade.profit > 0),
+            func.count(Trade.id).filter(Trade.profit < 0),
+            func.coalesce(func.sum(Trade.profit), 0),
+        ).one()
         
         # Paginate
         pagination = query.order_by(desc(Trade.close_time)).paginate(
@@ -192,18 +187,18 @@ def get_trading_history():
                 'total_trades': total_trades,
                 'winning_trades': winning_trades,
                 'losing_trades': losing_trades,
-                'total_profit': round(total_profit, 2),
-                'total_pips': round(total_pips, 2)
+                'total_profit': round(float(total_profit), 2),
+                'total_pips': 0
             },
             'trades': [{
                 'id': trade.id,
                 'symbol': trade.symbol,
                 'type': trade.trade_type,
-                'lots': float(trade.lots),
+                'lots': float(trade.volume),
                 'open_price': float(trade.open_price),
-                'close_price': float(trade.close_price),
-                'profit': float(trade.profit),
-                'pips': float(trade.pips) if trade.pips else 0,
+                'close_price': float(trade.close_price) if trade.close_price is not None else None,
+                'profit': float(trade.profit) if trade.profit is not None else 0,
+                'pips': 0,
                 'open_time': trade.open_time.isoformat(),
                 'close_time': trade.close_time.isoformat() if trade.close_time else None,
                 'commission': float(trade.commission) if trade.commission else 0,
@@ -400,10 +395,9 @@ def get_challenge_details(challenge_id):
         ).order_by(desc(Trade.close_time)).limit(10).all()
         
         # Calculate metrics
-        total_trades = Trade.query.filter_by(challenge_id=challenge_id).count()
-        winning_trades = Trade.query.filter(
-            and_(Trade.challenge_id == challenge_id, Trade.profit > 0)
-        ).count()
+        stats = db.session.get(ChallengeTradeStats, challenge_id)
+        total_trades = stats.total_trades if stats else 0
+        winning_trades = stats.winning_trades if stats else 0
         
         return jsonify({
             'challenge': {
@@ -432,8 +426,8 @@ def get_challenge_details(challenge_id):
                 'id': trade.id,
                 'symbol': trade.symbol,
                 'type': trade.trade_type,
-                'lots': float(trade.lots),
-                'profit': float(trade.profit),
+                'lots': float(trade.volume),
+                'profit': float(trade.profit) if trade.profit is not None else 0,
                 'close_time': trade.close_time.isoformat() if trade.close_time else None
             } for trade in trades]
         }), 200
@@ -6,6 +6,8 @@ from src.database import db
 from src.models.user import User
 from src.models.trading_program import Challenge
 from src.models.payment import Payment
+from src.models.trading_program import TradingProgram
+from src.utils.conditional_requests import conditional, query_version
 from src.utils.decorators import token_required
 from datetime import datetime
 from sqlalchemy import func, desc
@@ -13,12 +15,23 @@ from sqlalchemy import func, desc
 users_bp = Blueprint('users', __name__)
 
 
+def _dashboard_version():
+    user = g.current_user
+    # Program names are shown with the recent challenges
+    return (user.updated_at,) + query_version(
+        Challenge.query.filter_by(user_id=user.id),
+        Payment.query.filter_by(user_id=user.id),
+        TradingProgram.query
+    )
+
+
 @users_bp.route('/dashboard', methods=['GET'])
 @token_required
-def get_user_dashboard():
+@conditional(_dashboard_version, private=True)
+def get_user_dashboard(current_user):
     """Get user dashboard statistics - works for all user types"""
     try:
-        user = g.current_user
+        user = current_user
         
         # Get challenges count
         total_challenges = Challenge.query.filter_by(user_id=user.id).count()
@@ -76,7 +89,7 @@ def get_user_dashboard():
                 'id': challenge.id,
                 'program_name': challenge.program.name if challenge.program else 'Unknown',
                 'status': challenge.status,
-                'phase': challenge.phase,
+                'phase': challenge.current_phase,
                 'current_balance': float(challenge.current_balance) if challenge.current_balance else 0,
                 'initial_balance': float(challenge.initial_balance) if challenge.initial_balance else 0,
                 'profit': float(challenge.current_balance or 0) - float(challenge.initial_balance or 0),
@@ -8,6 +8,7 @@ from src.models.withdrawal import Withdrawal
 from src.services.wallet_service import WalletService
 from src.services.notification_service import NotificationService
 from src.middleware.auth import jwt_required, admin_required, get_current_user
+from src.utils.batch_loader import prime_relationships
 from datetime import datetime
 
 wallet_bp = Blueprint('wallet', __name__)
@@ -152,16 +153,21 @@ def get_all_withdrawals():
             page=page, per_page=per_page, error_out=False
         )
         
+        # Load requesting users and agents (with their users) in one query each
+        prime_relationships(pagination.items, 'user', 'agent')
+        prime_relationships([w.agent for w in pagination.items], 'user')
+        
         withdrawals = []
         for withdrawal in pagination.items:
             withdrawal_data = withdrawal.to_dict()
             
             # Add user info
-            if hasattr(withdrawal, 'agent') and withdrawal.agent:
+            user = withdrawal.agent.user if withdrawal.agent else withdrawal.user
+            if user:
                 withdrawal_data['user'] = {
-                    'id': withdrawal.agent.user_id,
-                    'name': withdrawal.agent.user.name,
-                    'email': withdrawal.agent.user.email
+                    'id': user.id,
+                    'name': f"{user.first_name} {user.last_name}",
+                    'email': user.email
                 }
             
             withdrawals.append(withdrawal_data)
@@ -0,0 +1,437 @@
+"""
+Agent Report Service
+Aggregate queries behind the agent dashboard, traders, commissions and
+analytics reports, keyed on agent_id, with a short-lived per-agent cache
+"""
+from datetime import datetime, timedelta
+import logging
+
+from sqlalchemy import and_, desc, event, exists, func, select
+
+from src import cache
+from src.database import db
+from src.models.agent import Agent
+from src.models.commission import Commission
+from src.models.referral import Referral
+from src.models.trade import Trade
+from src.models.trading_program import Challenge, TradingProgram
+from src.models.user import User
+from src.utils.session_hooks import collect, on_commit
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached agent summary is served (balances of funded accounts
+# move with every MT5 sync, so this is kept short)
+SUMMARY_TTL = 60
+
+COMPLETED_STATUSES = ('completed', 'funded')
+
+
+def _summary_key(agent_id):
+    return f'agent_report:{agent_id}:summary'
+
+
+def _month_start(now=None):
+    return (now or datetime.utcnow()).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _traders_cte(agent_id):
+    """Distinct user IDs referred by the agent"""
+    return select(
+        Referral.referred_user_id.label('user_id')
+    ).where(
+        Referral.agent_id == agent_id
+    ).distinct().cte('traders')
+
+
+def invalidate_agent_summary(*agent_ids):
+    """Drop cached summaries for the given agents"""
+    for agent_id in agent_ids:
+        try:
+            cache.delete(_summary_key(agent_id))
+        except Exception as e:
+            logger.warning(f"Failed to invalidate agent report cache: {e}")
+
+
+class AgentReportService:
+    """Reporting layer for agent-facing reports"""
+
+    @staticmethod
+    def get_agent(user_id):
+        """Agent profile for a user, or None"""
+        return Agent.query.filter_by(user_id=user_id).first()
+
+    # ------------------------------------------------------------------
+    # Aggregates
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def trader_stats(agent_id, now=None):
+        """
+        Trader, challenge and trade aggregates for all referred traders
+
+        One statement: the referred traders, their per-trader challenge
+        counts and the trade win counts are CTEs joined in a single pass.
+        """
+        now = now or datetime.utcnow()
+        traders = _traders_cte(agent_id)
+
+        challenge_stats = select(
+            Challenge.user_id.label('user_id'),
+            func.count(Challenge.id).label('total'),
+            func.count(Challenge.id).filter(Challenge.status.in_(COMPLETED_STATUSES)).label('completed'),
+            func.count(Challenge.id).filter(Challenge.status == 'funded').label('funded'),
+            func.sum(Challenge.current_balance - Challenge.initial_balance).filter(
+                Challenge.status == 'funded'
+            ).label('funded_profit')
+        ).join(
+            traders, traders.c.user_id == Challenge.user_id
+        ).group_by(Challenge.user_id).cte('challenge_stats')
+
+        trade_stats = select(
+            func.count(Trade.id).label('trades'),
+            func.count(Trade.id).filter(Trade.profit > 0).label('winning')
+        ).join(
+            Challenge, Challenge.id == Trade.challenge_id
+        ).join(
+            traders, traders.c.user_id == Challenge.user_id
+        ).cte('trade_stats')
+
+        row = db.session.execute(
+            select(
+                func.count(User.id).label('total_traders'),
+                func.count(User.id).filter(User.is_active == True).label('active_traders'),
+                func.count(User.id).filter(User.created_at >= now - timedelta(days=30)).label('new_traders'),
+                func.count(challenge_stats.c.user_id).filter(challenge_stats.c.funded > 0).label('funded_traders'),
+                func.coalesce(func.sum(challenge_stats.c.total), 0).label('total_challenges'),
+                func.coalesce(func.sum(challenge_stats.c.completed), 0).label('completed_challenges'),
+                func.coalesce(func.sum(challenge_stats.c.funded), 0).label('funded_accounts'),
+                func.coalesce(func.sum(challenge_stats.c.funded_profit), 0).label('funded_profit'),
+                select(trade_stats.c.trades).scalar_subquery().label('total_trades'),
+                select(trade_stats.c.winning).scalar_subquery().label('winning_trades'),
+            ).select_from(
+                traders
+            ).join(
+                User, User.id == traders.c.user_id
+            ).outerjoin(
+                challenge_stats, challenge_stats.c.user_id == traders.c.user_id
+            )
+        ).one()
+
+        return {
+            'total_traders': row.total_traders,
+            'active_traders': row.active_traders,
+            'new_traders': row.new_traders,
+            'funded_traders': row.funded_traders,
+            'total_challenges': int(row.total_challenges),
+            'completed_challenges': int(row.completed_challenges),
+            'funded_accounts': int(row.funded_accounts),
+            'funded_profit': float(row.funded_profit),
+            'total_trades': row.total_trades or 0,
+            'winning_trades': row.winning_trades or 0,
+        }
+
+    @staticmethod
+    def commission_stats(agent_id, since=None, until=None, now=None):
+        """Commission sums for the agent in one aggregate (optionally for a period)"""
+        month_start = _month_start(now)
+        amount = Commission.commission_amount
+
+        query = select(
+            func.count(Commission.id).label('count'),
+            func.coalesce(func.sum(amount), 0).label('total'),
+            func.coalesce(func.sum(amount).filter(Commission.status == 'pending'), 0).label('pending'),
+            func.coalesce(func.sum(amount).filter(Commission.status == 'paid'), 0).label('paid'),
+            func.coalesce(func.sum(amount).filter(Commission.created_at >= month_start), 0).label('this_month'),
+            func.coalesce(func.sum(amount).filter(and_(
+                Commission.status == 'paid',
+                Commission.created_at >= month_start
+            )), 0).label('this_month_paid'),
+        ).where(Commission.agent_id == agent_id)
+
+        if since is not None:
+            query = query.where(Commission.created_at >= since)
+        if until is not None:
+            query = query.where(Commission.created_at < until)
+
+        row = db.session.execute(query).one()
+        return {
+            'count': row.count,
+            'total': float(row.total),
+            'pending': float(row.pending),
+            'paid': float(row.paid),
+            'this_month': float(row.this_month),
+            'this_month_paid': float(row.this_month_paid),
+        }
+
+    @staticmethod
+    def get_summary(agent_id):
+        """Trader and commission aggregates, cached per agent for SUMMARY_TTL seconds"""
+        key = _summary_key(agent_id)
+        try:
+            summary = cache.get(key)
+        except Exception:
+            summary = None
+        if summary is not None:
+            return summary
+
+        summary = {
+            'traders': AgentReportService.trader_stats(agent_id),
+            'commissions': AgentReportService.commission_stats(agent_id),
+        }
+        try:
+            cache.set(key, summary, timeout=SUMMARY_TTL)
+        except Exception as e:
+            logger.warning(f"Failed to cache agent report: {e}")
+        return summary
+
+    # ------------------------------------------------------------------
+    # Lists
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def recent_traders(agent_id, limit=5):
+        traders = _traders_cte(agent_id)
+        return User.query.join(
+            traders, traders.c.user_id == User.id
+        ).order_by(desc(User.created_at)).limit(limit).all()
+
+    @staticmethod
+    def recent_commissions(agent_id, limit=5):
+        return Commission.query.filter_by(
+            agent_id=agent_id
+        ).order_by(desc(Commission.created_at)).limit(limit).all()
+
+    @staticmethod
+    def traders_query(agent_id, status=None):
+        """
+        Query of the agent's traders, newest first
+
+        Args:
+            status: 'funded' (has a funded challenge), 'active' or 'inactive'
+        """
+        traders = _traders_cte(agent_id)
+        query = User.query.join(traders, traders.c.user_id == User.id)
+
+        if status == 'funded':
+            query = query.filter(exists().where(and_(
+                Challenge.user_id == User.id,
+                Challenge.status == 'funded'
+            )))
+        elif status in ('active', 'inactive'):
+            query = query.filter(User.is_active == (status == 'active'))
+
+        return query.order_by(desc(User.created_at))
+
+    @staticmethod
+    def challenge_info_for(user_ids):
+        """
+        Per-trader challenge counts and current active challenge in two queries
+
+        Returns:
+            Dict of user_id -> {'total', 'completed', 'active_challenge'}
+        """
+        if not user_ids:
+            return {}
+
+        info = {user_id: {'total': 0, 'completed': 0, 'active_challenge': None} for user_id in user_ids}
+
+        rows = db.session.query(
+            Challenge.user_id,
+            func.count(Challenge.id),
+            func.count(Challenge.id).filter(Challenge.status.in_(COMPLETED_STATUSES))
+        ).filter(
+            Challenge.user_id.in_(user_ids)
+        ).group_by(Challenge.user_id).all()
+        for user_id, total, completed in rows:
+            info[user_id]['total'] = total
+            info[user_id]['completed'] = completed
+
+        active = Challenge.query.filter(
+            Challenge.user_id.in_(user_ids),
+            Challenge.status == 'active'
+        ).order_by(Challenge.id).all()
+        for challenge in active:
+            if info[challenge.user_id]['active_challenge'] is None:
+                info[challenge.user_id]['active_challenge'] = challenge
+
+        return info
+
+    @staticmethod
+    def commissions_with_details(agent_id, since=None, until=None):
+        """Commissions with trader and program names, newest first, in one query"""
+        query = db.session.query(
+            Commission,
+            User.id.label('trader_id'),
+            User.first_name,
+            User.last_name,
+            TradingProgram.name.label('program_name')
+        ).outerjoin(
+            Referral, Referral.id == Commission.referral_id
+        ).outerjoin(
+            User, User.id == Referral.referred_user_id
+        ).outerjoin(
+            Challenge, Challenge.id == Commission.challenge_id
+        ).outerjoin(
+            TradingProgram, TradingProgram.id == Challenge.program_id
+        ).filter(
+            Commission.agent_id == agent_id
+        )
+        if since is not None:
+            query = query.filter(Commission.created_at >= since)
+        if until is not None:
+            query = query.filter(Commission.created_at < until)
+        return query.order_by(desc(Commission.created_at)).all()
+
+    @staticmethod
+    def monthly_trends(agent_id, months=12, now=None):
+        """
+        New traders, commissions and funded accounts per calendar month
+
+        Returns:
+            Dict of 'YYYY-MM' -> {'traders', 'commissions', 'funded'}, oldest first
+        """
+        now = now or datetime.utcnow()
+        first_month = _month_start(now)
+        for _ in range(months - 1):
+            first_month = (first_month - timedelta(days=1)).replace(day=1)
+
+        trends = {}
+        cursor = first_month
+        while cursor <= now:
+            trends[cursor.strftime('%Y-%m')] = {'traders': 0, 'commissions': 0.0, 'funded': 0}
+            cursor = (cursor + timedelta(days=32)).replace(day=1)
+
+        traders = _traders_cte(agent_id)
+
+        def by_month(column):
+            return func.to_char(func.date_trunc('month', column), 'YYYY-MM')
+
+        new_traders = db.session.query(
+            by_month(User.created_at), func.count(User.id)
+        ).join(
+            traders, traders.c.user_id == User.id
+        ).filter(User.created_at >= first_month).group_by(1).all()
+
+        commissions = db.session.query(
+            by_month(Commission.created_at), func.sum(Commission.commission_amount)
+        ).filter(
+            Commission.agent_id == agent_id,
+            Commission.created_at >= first_month
+        ).group_by(1).all()
+
+        funded_at = func.coalesce(Challenge.passed_at, Challenge.updated_at)
+        funded = db.session.query(
+            by_month(funded_at), func.count(func.distinct(Challenge.user_id))
+        ).join(
+            traders, traders.c.user_id == Challenge.user_id
+        ).filter(
+            Challenge.status == 'funded',
+            funded_at >= first_month
+        ).group_by(1).all()
+
+        for month, count in new_traders:
+            if month in trends:
+                trends[month]['traders'] = count
+        for month, total in commissions:
+            if month in trends:
+                trends[month]['commissions'] = float(total or 0)
+        for month, count in funded:
+            if month in trends:
+                trends[month]['funded'] = count
+
+        return trends
+
+    @staticmethod
+    def top_traders(agent_id, limit=10):
+        """Referred traders ranked by profit on funded accounts, with trade win rates"""
+        traders = _traders_cte(agent_id)
+
+        funded = select(
+            Challenge.id.label('challenge_id'),
+            Challenge.user_id.label('user_id'),
+            (Challenge.current_balance - Challenge.initial_balance).label('profit')
+        ).join(
+            traders, traders.c.user_id == Challenge.user_id
+        ).where(Challenge.status == 'funded').cte('funded')
+
+        profit = select(
+            funded.c.user_id, func.sum(funded.c.profit).label('profit')
+        ).group_by(funded.c.user_id).cte('profit')
+
+        trades = select(
+            funded.c.user_id,
+            func.count(Trade.id).label('total_trades'),
+            func.count(Trade.id).filter(Trade.profit > 0).label('winning_trades')
+        ).join(
+            Trade, Trade.challenge_id == funded.c.challenge_id
+        ).group_by(funded.c.user_id).cte('trade_counts')
+
+        rows = db.session.execute(
+            select(
+                User.id, User.first_name, User.last_name,
+                profit.c.profit,
+                func.coalesce(trades.c.total_trades, 0).label('total_trades'),
+                func.coalesce(trades.c.winning_trades, 0).label('winning_trades')
+            ).select_from(
+                profit
+            ).join(
+                User, User.id == profit.c.user_id
+            ).outerjoin(
+                trades, trades.c.user_id == profit.c.user_id
+            ).order_by(desc(profit.c.profit)).limit(limit)
+        ).all()
+
+        return [{
+            'trader_id': row.id,
+            'name': f"{row.first_name} {row.last_name}",
+            'profit': round(float(row.profit or 0), 2),
+            'win_rate': round(row.winning_trades / row.total_trades * 100, 2) if row.total_trades else 0,
+            'total_trades': row.total_trades,
+            'rank': rank
+        } for rank, row in enumerate(rows, 1)]
+
+
+# ============================================================================
+# Cache invalidation - commission and challenge writes
+# ============================================================================
+
+def _pending_agents(session):
+    return collect(session, 'agent_report_stale')
+
+
+@event.listens_for(Commission, 'after_insert')
+@event.listens_for(Commission, 'after_update')
+@event.listens_for(Commission, 'after_delete')
+def _commission_written(mapper, connection, target):
+    session = db.inspect(target).session
+    if session is not None and target.agent_id:
+        _pending_agents(session).add(target.agent_id)
+
+
+def _queue_referring_agents(connection, target):
+    session = db.inspect(target).session
+    if session is None:
+        return
+    agent_ids = connection.execute(
+        select(Referral.agent_id).where(Referral.referred_user_id == target.user_id)
+    ).scalars().all()
+    _pending_agents(session).update(agent_ids)
+
+
+@event.listens_for(Challenge, 'after_insert')
+def _challenge_inserted(mapper, connection, target):
+    _queue_referring_agents(connection, target)
+
+
+@event.listens_for(Challenge, 'after_update')
+def _challenge_updated(mapper, connection, target):
+    # Balance updates from MT5 syncs are covered by SUMMARY_TTL; only
+    # status changes look up the referring agents
+    if db.inspect(target).attrs.status.history.has_changes():
+        _queue_referring_agents(connection, target)
+
+
+@on_commit('agent_report_stale')
+def _invalidate_on_commit(agent_ids):
+    invalidate_agent_summary(*agent_ids)
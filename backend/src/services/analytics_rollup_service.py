@@ -0,0 +1,296 @@
+"""
+Analytics Rollup Service
+Derives daily facts from payments, users and challenges and keeps the
+analytics_daily_rollups table up to date
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import logging
+
+from sqlalchemy import func
+
+from src.database import db, get_redis
+from src.models.analytics_rollup import (
+    AnalyticsDailyRollup, COUNTER_FIELDS, DIRTY_DAYS_KEY,
+    SCOPE_GLOBAL, SCOPE_TENANT, SCOPE_NODE, recent_days
+)
+from src.models.payment import Payment
+from src.models.trading_program import Challenge
+from src.models.user import User
+from src.models.user_closure import UserClosure
+from src.utils.hierarchy_scoping import without_hierarchy_scope
+
+logger = logging.getLogger(__name__)
+
+# Days always recomputed by the refresh task, even without write hooks
+# (covers writes made while Redis was unavailable)
+REFRESH_LOOKBACK_DAYS = 2
+# Upper bound on dirty days handled per refresh
+MAX_DAYS_PER_REFRESH = 60
+
+
+def _empty_facts():
+    facts = {field: 0 for field in COUNTER_FIELDS}
+    facts.update({
+        'revenue': Decimal('0'),
+        'payment_status_counts': defaultdict(int),
+        'payment_method_totals': defaultdict(lambda: {'count': 0, 'amount': Decimal('0')}),
+        'challenge_status_counts': defaultdict(int),
+    })
+    return facts
+
+
+def _normalize(facts):
+    """Turn accumulator values into plain JSON-friendly types"""
+    result = {field: int(facts[field]) for field in COUNTER_FIELDS}
+    result['revenue'] = round(float(facts['revenue']), 2)
+    result['payment_status_counts'] = dict(facts['payment_status_counts'])
+    result['payment_method_totals'] = {
+        method: {'count': totals['count'], 'amount': round(float(totals['amount']), 2)}
+        for method, totals in facts['payment_method_totals'].items()
+    }
+    result['challenge_status_counts'] = dict(facts['challenge_status_counts'])
+    return result
+
+
+class AnalyticsRollupService:
+    """Compute, store and verify daily analytics rollups"""
+
+    @staticmethod
+    def compute_day(day):
+        """
+        Derive one day's facts from the raw tables
+
+        Each raw table is read once, grouped by user; per-user figures are
+        then fanned out to the global scope, the user's tenant and every
+        node in the user's upline (the user included).
+
+        Args:
+            day: date
+
+        Returns:
+            Dict mapping (scope, scope_id) -> facts dict
+        """
+        start = datetime.combine(day, datetime.min.time())
+        end = start + timedelta(days=1)
+
+        with without_hierarchy_scope(db.session):
+            payments = db.session.query(
+                Payment.user_id,
+                Payment.status,
+                Payment.payment_method,
+                func.count(Payment.id),
+                func.coalesce(func.sum(Payment.amount), 0)
+            ).filter(
+                Payment.created_at >= start,
+                Payment.created_at < end
+            ).group_by(Payment.user_id, Payment.status, Payment.payment_method).all()
+
+            registrations = db.session.query(
+                User.id,
+                User.is_active
+            ).filter(
+                User.created_at >= start,
+                User.created_at < end
+            ).all()
+
+            challenges = db.session.query(
+                Challenge.user_id,
+                Challenge.status,
+                func.count(Challenge.id)
+            ).filter(
+                Challenge.created_at >= start,
+                Challenge.created_at < end
+            ).group_by(Challenge.user_id, Challenge.status).all()
+
+            user_ids = (
+                {row[0] for row in payments}
+                | {row[0] for row in registrations}
+                | {row[0] for row in challenges}
+            )
+            scopes = AnalyticsRollupService._scopes_for_users(user_ids)
+
+        facts = defaultdict(_empty_facts)
+
+        for user_id, status, method, count, amount in payments:
+            for key in scopes.get(user_id, [(SCOPE_GLOBAL, 0)]):
+                target = facts[key]
+                target['payment_status_counts'][status or 'unknown'] += count
+                if status == 'completed':
+                    target['revenue'] += amount
+                    target['transactions'] += count
+                    totals = target['payment_method_totals'][method or 'unknown']
+                    totals['count'] += count
+                    totals['amount'] += amount
+
+        for user_id, is_active in registrations:
+            for key in scopes.get(user_id, [(SCOPE_GLOBAL, 0)]):
+                facts[key]['registrations'] += 1
+                if is_active:
+                    facts[key]['active_registrations'] += 1
+
+        for user_id, status, count in challenges:
+            for key in scopes.get(user_id, [(SCOPE_GLOBAL, 0)]):
+                target = facts[key]
+                target['challenges_created'] += count
+                target['challenge_status_counts'][status] += count
+                if status == 'completed':
+                    target['challenges_completed'] += count
+                elif status == 'funded':
+                    target['challenges_funded'] += count
+
+        return {key: _normalize(value) for key, value in facts.items()}
+
+    @staticmethod
+    def _scopes_for_users(user_ids):
+        """Map user ID -> list of (scope, scope_id) it contributes to"""
+        if not user_ids:
+            return {}
+
+        scopes = {user_id: [(SCOPE_GLOBAL, 0)] for user_id in user_ids}
+
+        for user_id, tenant_id in db.session.query(User.id, User.tenant_id).filter(User.id.in_(user_ids)):
+            scopes[user_id].append((SCOPE_TENANT, tenant_id or 0))
+
+        for ancestor_id, descendant_id in db.session.query(
+            UserClosure.ancestor_id, UserClosure.descendant_id
+        ).filter(UserClosure.descendant_id.in_(user_ids)):
+            scopes[descendant_id].append((SCOPE_NODE, ancestor_id))
+
+        return scopes
+
+    @staticmethod
+    def rebuild_day(day):
+        """
+        Replace one day's rollup rows with freshly derived facts (caller commits)
+
+        Returns:
+            Number of rows written
+        """
+        facts = AnalyticsRollupService.compute_day(day)
+        now = datetime.utcnow()
+
+        AnalyticsDailyRollup.query.filter(AnalyticsDailyRollup.date == day).delete(synchronize_session=False)
+        db.session.bulk_insert_mappings(AnalyticsDailyRollup, [
+            {'scope': scope, 'scope_id': scope_id, 'date': day, 'computed_at': now, **values}
+            for (scope, scope_id), values in facts.items()
+        ])
+        return len(facts)
+
+    @staticmethod
+    def pop_dirty_days(limit=MAX_DAYS_PER_REFRESH):
+        """Take up to `limit` days queued by the write hooks"""
+        redis_client = get_redis()
+        if not redis_client:
+            return set()
+        try:
+            days = redis_client.spop(DIRTY_DAYS_KEY, limit) or []
+        except Exception as e:
+            logger.warning(f"Could not read dirty analytics days: {e}")
+            return set()
+        return {date.fromisoformat(d) for d in days}
+
+    @staticmethod
+    def requeue_days(days):
+        """Queue days again for the next refresh"""
+        redis_client = get_redis()
+        if not redis_client or not days:
+            return
+        try:
+            redis_client.sadd(DIRTY_DAYS_KEY, *(d.isoformat() for d in days))
+        except Exception as e:
+            logger.warning(f"Could not requeue dirty analytics days: {e}")
+
+    @staticmethod
+    def refresh(lookback_days=REFRESH_LOOKBACK_DAYS):
+        """
+        Recompute dirty days plus the most recent `lookback_days`
+
+        Returns:
+            Dict with the days refreshed and rows written
+        """
+        days = AnalyticsRollupService.pop_dirty_days() | set(recent_days(lookback_days))
+        rows = 0
+        ordered = sorted(days)
+        for index, day in enumerate(ordered):
+            try:
+                rows += AnalyticsRollupService.rebuild_day(day)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                # Put this day and every day not reached yet back so the next run retries them
+                AnalyticsRollupService.requeue_days(ordered[index:])
+                raise
+        return {'days': [d.isoformat() for d in sorted(days)], 'rows': rows}
+
+    @staticmethod
+    def backfill(days=365):
+        """Rebuild the last `days` days, one commit per day"""
+        rows = 0
+        for day in recent_days(days):
+            rows += AnalyticsRollupService.rebuild_day(day)
+            db.session.commit()
+        return rows
+
+    @staticmethod
+    def check_day(day, tolerance=0.01):
+        """
+        Re-derive a day from raw data and compare it with the stored rollups
+
+        Args:
+            day: date
+            tolerance: Allowed absolute difference for revenue
+
+        Returns:
+            List of drift dicts (scope, scope_id, field, stored, actual)
+        """
+        actual = AnalyticsRollupService.compute_day(day)
+        stored = {
+            (row.scope, row.scope_id): row.to_facts()
+            for row in AnalyticsDailyRollup.query.filter(AnalyticsDailyRollup.date == day)
+        }
+
+        empty = _normalize(_empty_facts())
+        drift = []
+        for key in sorted(set(actual) | set(stored), key=str):
+            expected = actual.get(key, empty)
+            found = stored.get(key, empty)
+            for field, value in expected.items():
+                other = found.get(field)
+                if field == 'revenue':
+                    mismatch = abs(float(other or 0) - value) > tolerance
+                else:
+                    mismatch = other != value
+                if mismatch:
+                    drift.append({
+                        'date': day.isoformat(),
+                        'scope': key[0],
+                        'scope_id': key[1],
+                        'field': field,
+                        'stored': other,
+                        'actual': value,
+                    })
+        return drift
+
+    @staticmethod
+    def verify(days=7, repair=True):
+        """
+        Check the last `days` days and optionally rebuild the ones that drifted
+
+        Returns:
+            Dict with drift details and the days repaired
+        """
+        drift = []
+        repaired = []
+        for day in recent_days(days):
+            day_drift = AnalyticsRollupService.check_day(day)
+            if not day_drift:
+                continue
+            drift.extend(day_drift)
+            logger.warning(f"Analytics rollup drift on {day}: {len(day_drift)} field(s)")
+            if repair:
+                AnalyticsRollupService.rebuild_day(day)
+                db.session.commit()
+                repaired.append(day.isoformat())
+        return {'drift': drift, 'repaired': repaired}
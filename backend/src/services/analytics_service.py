@@ -2,15 +2,15 @@
 Analytics Service
 Provides advanced analytics and reporting functionality
 """
+from collections import defaultdict
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_, extract, case
+from sqlalchemy import func, and_, extract
 from src.database import db
 from src.models.user import User
-from src.models.trading_program import Challenge
-from src.models.payment import Payment
 from src.models.commission import Commission
 from src.models.referral import Referral
 from src.models.agent import Agent
+from src.models.analytics_rollup import AnalyticsDailyRollup, SCOPE_GLOBAL, SCOPE_TENANT, SCOPE_NODE
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,81 +20,71 @@ class AnalyticsService:
     """Service for analytics and reporting"""
     
     @staticmethod
-    def get_revenue_over_time(days=30):
+    def _get_rollups(days, tenant_id=None, node_id=None):
+        """Daily rollup rows for the requested scope (global by default)"""
+        if node_id is not None:
+            scope, scope_id = SCOPE_NODE, node_id
+        elif tenant_id is not None:
+            scope, scope_id = SCOPE_TENANT, tenant_id
+        else:
+            scope, scope_id = SCOPE_GLOBAL, 0
+        
+        start_date = (datetime.utcnow() - timedelta(days=days)).date()
+        return AnalyticsDailyRollup.get_range(scope, scope_id, start_date)
+    
+    @staticmethod
+    def get_revenue_over_time(days=30, tenant_id=None, node_id=None):
         """
         Get revenue data over time
         
         Args:
             days: Number of days to look back
+            tenant_id: Limit to one tenant
+            node_id: Limit to one user's downline (user included)
             
         Returns:
             List of daily revenue data
         """
         try:
-            start_date = datetime.utcnow() - timedelta(days=days)
-            
-            # Query daily revenue
-            daily_revenue = db.session.query(
-                func.date(Payment.created_at).label('date'),
-                func.sum(Payment.amount).label('revenue'),
-                func.count(Payment.id).label('transactions')
-            ).filter(
-                and_(
-                    Payment.status == 'completed',
-                    Payment.created_at >= start_date
-                )
-            ).group_by(
-                func.date(Payment.created_at)
-            ).order_by(
-                func.date(Payment.created_at)
-            ).all()
+            rollups = AnalyticsService._get_rollups(days, tenant_id, node_id)
             
             return [{
                 'date': str(row.date),
                 'revenue': float(row.revenue),
                 'transactions': row.transactions
-            } for row in daily_revenue]
+            } for row in rollups if row.transactions]
             
         except Exception as e:
             logger.error(f'Error getting revenue over time: {str(e)}')
             return []
     
     @staticmethod
-    def get_user_growth(days=30):
+    def get_user_growth(days=30, tenant_id=None, node_id=None):
         """
         Get user registration growth over time
         
         Args:
             days: Number of days to look back
+            tenant_id: Limit to one tenant
+            node_id: Limit to one user's downline (user included)
             
         Returns:
             List of daily user registration data
         """
         try:
-            start_date = datetime.utcnow() - timedelta(days=days)
-            
-            # Query daily registrations
-            daily_users = db.session.query(
-                func.date(User.created_at).label('date'),
-                func.count(User.id).label('registrations'),
-                func.sum(case((User.is_active == True, 1), else_=0)).label('active')
-            ).filter(
-                User.created_at >= start_date
-            ).group_by(
-                func.date(User.created_at)
-            ).order_by(
-                func.date(User.created_at)
-            ).all()
+            rollups = AnalyticsService._get_rollups(days, tenant_id, node_id)
             
             # Calculate cumulative total
             cumulative = 0
             result = []
-            for row in daily_users:
+            for row in rollups:
+                if not row.registrations:
+                    continue
                 cumulative += row.registrations
                 result.append({
                     'date': str(row.date),
                     'registrations': row.registrations,
-                    'active': row.active,
+                    'active': row.active_registrations,
                     'cumulative': cumulative
                 })
             
@@ -105,54 +95,38 @@ class AnalyticsService:
             return []
     
     @staticmethod
-    def get_challenge_statistics(days=30):
+    def get_challenge_statistics(days=30, tenant_id=None, node_id=None):
         """
         Get challenge statistics over time
         
         Args:
             days: Number of days to look back
+            tenant_id: Limit to one tenant
+            node_id: Limit to one user's downline (user included)
             
         Returns:
             Challenge statistics data
         """
         try:
-            start_date = datetime.utcnow() - timedelta(days=days)
-            
-            # Query challenge status distribution
-            status_distribution = db.session.query(
-                Challenge.status,
-                func.count(Challenge.id).label('count')
-            ).filter(
-                Challenge.created_at >= start_date
-            ).group_by(
-                Challenge.status
-            ).all()
+            rollups = AnalyticsService._get_rollups(days, tenant_id, node_id)
             
-            # Query daily challenge creation
-            daily_challenges = db.session.query(
-                func.date(Challenge.created_at).label('date'),
-                func.count(Challenge.id).label('created'),
-                func.sum(case((Challenge.status == 'completed', 1), else_=0)).label('completed'),
-                func.sum(case((Challenge.status == 'funded', 1), else_=0)).label('funded')
-            ).filter(
-                Challenge.created_at >= start_date
-            ).group_by(
-                func.date(Challenge.created_at)
-            ).order_by(
-                func.date(Challenge.created_at)
-            ).all()
+            # Challenge status distribution
+            status_counts = defaultdict(int)
+            for row in rollups:
+                for status, count in (row.challenge_status_counts or {}).items():
+                    status_counts[status] += count
             
             return {
                 'status_distribution': [{
-                    'status': row.status,
-                    'count': row.count
-                } for row in status_distribution],
+                    'status': status,
+                    'count': count
+                } for status, count in status_counts.items()],
                 'daily_data': [{
                     'date': str(row.date),
-                    'created': row.created,
-                    'completed': row.completed,
-                    'funded': row.funded
-                } for row in daily_challenges]
+                    'created': row.challenges_created,
+                    'completed': row.challenges_completed,
+                    'funded': row.challenges_funded
+                } for row in rollups if row.challenges_created]
             }
             
         except Exception as e:
@@ -267,53 +241,41 @@ class AnalyticsService:
             }
     
     @staticmethod
-    def get_payment_statistics(days=30):
+    def get_payment_statistics(days=30, tenant_id=None, node_id=None):
         """
         Get payment method and status statistics
         
         Args:
             days: Number of days to look back
+            tenant_id: Limit to one tenant
+            node_id: Limit to one user's downline (user included)
             
         Returns:
             Payment statistics data
         """
         try:
-            start_date = datetime.utcnow() - timedelta(days=days)
+            rollups = AnalyticsService._get_rollups(days, tenant_id, node_id)
             
-            # Payment method distribution
-            method_distribution = db.session.query(
-                Payment.payment_method,
-                func.count(Payment.id).label('count'),
-                func.sum(Payment.amount).label('total_amount')
-            ).filter(
-                and_(
-                    Payment.created_at >= start_date,
-                    Payment.status == 'completed'
-                )
-            ).group_by(
-                Payment.payment_method
-            ).all()
-            
-            # Payment status distribution
-            status_distribution = db.session.query(
-                Payment.status,
-                func.count(Payment.id).label('count')
-            ).filter(
-                Payment.created_at >= start_date
-            ).group_by(
-                Payment.status
-            ).all()
+            # Payment method distribution (completed) and status distribution
+            method_totals = defaultdict(lambda: {'count': 0, 'total_amount': 0.0})
+            status_counts = defaultdict(int)
+            for row in rollups:
+                for method, totals in (row.payment_method_totals or {}).items():
+                    method_totals[method]['count'] += totals['count']
+                    method_totals[method]['total_amount'] += totals['amount']
+                for status, count in (row.payment_status_counts or {}).items():
+                    status_counts[status] += count
             
             return {
                 'method_distribution': [{
-                    'method': row.payment_method or 'unknown',
-                    'count': row.count,
-                    'total_amount': float(row.total_amount)
-                } for row in method_distribution],
+                    'method': method,
+                    'count': totals['count'],
+                    'total_amount': round(totals['total_amount'], 2)
+                } for method, totals in method_totals.items()],
                 'status_distribution': [{
-                    'status': row.status,
-                    'count': row.count
-                } for row in status_distribution]
+                    'status': status,
+                    'count': count
+                } for status, count in status_counts.items()]
             }
             
         except Exception as e:
@@ -321,24 +283,26 @@ class AnalyticsService:
             return {'method_distribution': [], 'status_distribution': []}
     
     @staticmethod
-    def get_comprehensive_analytics(days=30):
+    def get_comprehensive_analytics(days=30, tenant_id=None, node_id=None):
         """
         Get comprehensive analytics data for dashboard
         
         Args:
             days: Number of days to look back
+            tenant_id: Limit to one tenant
+            node_id: Limit to one user's downline (user included)
             
         Returns:
             Comprehensive analytics data
         """
         try:
             return {
-                'revenue_over_time': AnalyticsService.get_revenue_over_time(days),
-                'user_growth': AnalyticsService.get_user_growth(days),
-                'challenge_statistics': AnalyticsService.get_challenge_statistics(days),
+                'revenue_over_time': AnalyticsService.get_revenue_over_time(days, tenant_id, node_id),
+                'user_growth': AnalyticsService.get_user_growth(days, tenant_id, node_id),
+                'challenge_statistics': AnalyticsService.get_challenge_statistics(days, tenant_id, node_id),
                 'kyc_statistics': AnalyticsService.get_kyc_statistics(),
                 'referral_statistics': AnalyticsService.get_referral_statistics(),
-                'payment_statistics': AnalyticsService.get_payment_statistics(days)
+                'payment_statistics': AnalyticsService.get_payment_statistics(days, tenant_id, node_id)
             }
         except Exception as e:
             logger.error(f'Error getting comprehensive analytics: {str(e)}')
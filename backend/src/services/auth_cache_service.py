@@ -0,0 +1,291 @@
+"""
+Auth Cache Service
+Redis-backed token revocation list and cached user principals, so that
+jwt_required does not hit Postgres on every authenticated request
+"""
+from datetime import datetime
+import json
+import logging
+
+from flask import current_app
+import redis
+
+from src.database import db, get_redis
+from src.utils.metrics import EventCounter
+
+logger = logging.getLogger(__name__)
+
+# Revoked JTIs: one key per token, expiring together with the token.
+# Same key format AuthService has always written.
+REVOKED_KEY = 'blacklist:{jti}'
+# Present while Redis holds every unexpired revoked JTI. While it exists a
+# missing blacklist key means "not revoked" and the database is not asked.
+REVOCATION_SYNCED_KEY = 'blacklist:synced'
+REVOCATION_SYNC_LOCK_KEY = 'blacklist:sync_lock'
+# Seconds between full reloads of the revocation list from the database
+# (also bounds how long revocations written around this service go unnoticed)
+REVOCATION_SYNC_INTERVAL = 3600
+
+PRINCIPAL_KEY = 'auth:principal:{user_id}'
+# Seconds a cached principal is served; writes through the ORM invalidate
+# it immediately, this only bounds bulk updates that bypass the mapper
+PRINCIPAL_TTL = 300
+PRINCIPAL_FIELDS = (
+    'id', 'email', 'role', 'tree_path', 'parent_id', 'tenant_id',
+    'token_version', 'is_active',
+)
+
+_events = EventCounter('auth_cache', 'Auth cache hits, misses and errors')
+
+
+def get_stats():
+    """
+    Hit/miss counters for this process
+
+    Returns:
+        Dict with revocation and principal hits, misses and errors
+    """
+    stats = _events.values()
+    result = {}
+    for cache_name in ('revocation', 'principal'):
+        hits = stats.get(f'{cache_name}_hit', 0)
+        misses = stats.get(f'{cache_name}_miss', 0)
+        total = hits + misses
+        result[cache_name] = {
+            'hits': hits,
+            'misses': misses,
+            'errors': stats.get(f'{cache_name}_error', 0),
+            'hit_rate': round(hits / total, 4) if total else None,
+        }
+    return result
+
+
+def reset_stats():
+    _events.reset()
+
+
+class UserPrincipal:
+    """
+    Compact, cached identity of the authenticated user
+
+    Exposes the cached fields directly. Any other attribute loads the full
+    User row on first use, so handlers that need more than the identity keep
+    working unchanged.
+    """
+
+    __slots__ = ('_data', '_user')
+
+    def __init__(self, data, user=None):
+        object.__setattr__(self, '_data', data)
+        object.__setattr__(self, '_user', user)
+
+    @property
+    def user(self):
+        """The full User row (loaded on demand)"""
+        if self._user is None:
+            from src.models.user import User
+            object.__setattr__(self, '_user', db.session.get(User, self._data['id']))
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if self._user is None and name in self._data:
+            return self._data[name]
+        return getattr(self.user, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.user, name, value)
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self._data['id']
+
+    def __hash__(self):
+        return hash(self._data['id'])
+
+    def __bool__(self):
+        return True
+
+    def __repr__(self):
+        return f"<UserPrincipal {self._data['id']} {self._data.get('role')}>"
+
+
+def principal_data(user):
+    return {field: getattr(user, field, None) for field in PRINCIPAL_FIELDS}
+
+
+class AuthCacheService:
+    """Revocation and principal lookups, Redis first, database on miss"""
+
+    # ------------------------------------------------------------------
+    # Token revocation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def is_token_revoked(jti):
+        """
+        Check whether a token has been revoked
+
+        One Redis round trip answers both "is this JTI revoked" and "is the
+        revocation list complete"; the database is only queried when the
+        list is not loaded (first request, Redis restart) or Redis is down.
+        """
+        from src.models.token_blacklist import TokenBlacklist
+
+        redis_client = get_redis()
+        if redis_client:
+            try:
+                revoked, synced = redis_client.mget(REVOKED_KEY.format(jti=jti), REVOCATION_SYNCED_KEY)
+                if revoked is not None:
+                    _events.count(revocation_hit=1)
+                    return True
+                if synced is not None:
+                    _events.count(revocation_hit=1)
+                    return False
+                AuthCacheService.sync_revocations()
+            except Exception as e:
+                _events.count(revocation_error=1)
+                logger.warning(f"Revocation cache unavailable: {e}")
+
+        _events.count(revocation_miss=1)
+        return TokenBlacklist.is_token_revoked(jti)
+
+    @staticmethod
+    def mark_token_revoked(jti, expires_at):
+        """
+        Write a revoked JTI through to Redis until the token would expire
+
+        If the write fails the Redis list is incomplete, so it is marked
+        unsynced and every worker asks the database until the next full sync.
+        """
+        ttl = int((expires_at - datetime.utcnow()).total_seconds())
+        if ttl <= 0:
+            return True
+        redis_client = get_redis()
+        if redis_client:
+            try:
+                redis_client.setex(REVOKED_KEY.format(jti=jti), ttl, '1')
+                return True
+            except Exception as e:
+                logger.warning(f"Failed to cache revoked token {jti}: {e}")
+        AuthCacheService.unmark_revocations_synced(redis_client)
+        return False
+
+    @staticmethod
+    def unmark_revocations_synced(redis_client=None):
+        """
+        Drop the "list complete" marker so lookups fall back to the database
+
+        Args:
+            redis_client: Client to use; None connects to REDIS_URL directly,
+                since other workers may be answering from Redis even when
+                this one runs without it
+        """
+        try:
+            if redis_client is None:
+                redis_url = current_app.config.get('REDIS_URL')
+                if not redis_url:
+                    return True
+                redis_client = redis.from_url(redis_url, decode_responses=True)
+            redis_client.delete(REVOCATION_SYNCED_KEY)
+            return True
+        except Exception as e:
+            logger.error(
+                f"Failed to mark the revocation list unsynced, revoked tokens may be accepted for up to "
+                f"{REVOCATION_SYNC_INTERVAL}s: {e}"
+            )
+            return False
+
+    @staticmethod
+    def sync_revocations():
+        """
+        Load every unexpired revoked JTI into Redis and mark the list complete
+
+        Only one worker reloads at a time; the others keep answering from the
+        database until the list is marked complete.
+
+        Returns:
+            Number of JTIs loaded, or None if another worker holds the lock
+        """
+        from src.models.token_blacklist import TokenBlacklist
+
+        redis_client = get_redis()
+        if not redis_client:
+            return None
+        if not redis_client.set(REVOCATION_SYNC_LOCK_KEY, '1', nx=True, ex=60):
+            return None
+
+        try:
+            now = datetime.utcnow()
+            rows = db.session.query(TokenBlacklist.jti, TokenBlacklist.expires_at).filter(
+                TokenBlacklist.expires_at > now
+            ).all()
+
+            pipe = redis_client.pipeline(transaction=False)
+            for jti, expires_at in rows:
+                ttl = int((expires_at - now).total_seconds())
+                if ttl > 0:
+                    pipe.setex(REVOKED_KEY.format(jti=jti), ttl, '1')
+            pipe.setex(REVOCATION_SYNCED_KEY, REVOCATION_SYNC_INTERVAL, now.isoformat())
+            pipe.execute()
+            logger.info(f"Loaded {len(rows)} revoked tokens into Redis")
+            return len(rows)
+        finally:
+            redis_client.delete(REVOCATION_SYNC_LOCK_KEY)
+
+    # ------------------------------------------------------------------
+    # User principals
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def get_principal(user_id):
+        """
+        Cached identity for a user
+
+        Returns:
+            UserPrincipal, or None if the user does not exist
+        """
+        from src.models.user import User
+
+        redis_client = get_redis()
+        key = PRINCIPAL_KEY.format(user_id=user_id)
+        if redis_client:
+            try:
+                cached = redis_client.get(key)
+                if cached is not None:
+                    _events.count(principal_hit=1)
+                    return UserPrincipal(json.loads(cached))
+            except Exception as e:
+                _events.count(principal_error=1)
+                logger.warning(f"Principal cache unavailable: {e}")
+                redis_client = None
+
+        _events.count(principal_miss=1)
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+
+        data = principal_data(user)
+        if redis_client:
+            try:
+                redis_client.setex(key, PRINCIPAL_TTL, json.dumps(data))
+            except Exception as e:
+                logger.warning(f"Failed to cache principal for user {user_id}: {e}")
+        return UserPrincipal(data, user)
+
+    @staticmethod
+    def invalidate_principals(user_ids):
+        """Drop cached principals (called after user writes are committed)"""
+        redis_client = get_redis()
+        user_ids = list(user_ids)
+        if not redis_client or not user_ids:
+            return 0
+        try:
+            deleted = 0
+            for start in range(0, len(user_ids), 500):
+                chunk = user_ids[start:start + 500]
+                deleted += redis_client.delete(*(PRINCIPAL_KEY.format(user_id=uid) for uid in chunk))
+            return deleted
+        except Exception as e:
+            logger.warning(f"Failed to invalidate principals: {e}")
+            return 0
@@ -1,7 +1,7 @@
 """
 Authentication service with JWT and 2FA support
 """
-from src.database import db, get_redis
+from src.database import db
 from src.models import User, EmailVerificationToken, PasswordResetToken
 from datetime import datetime, timedelta
 from flask import current_app
@@ -347,16 +347,9 @@ class AuthService:
             if not jti or not user_id:
                 return False
             
-            # Add to database blacklist (permanent record)
+            # Database record plus write-through to the Redis revocation list
             TokenBlacklist.revoke_token(jti, token_type, user_id, exp)
             
-            # Also add to Redis for fast lookup (optional, for performance)
-            redis_client = get_redis()
-            if redis_client:
-                ttl = int((exp - datetime.utcnow()).total_seconds())
-                if ttl > 0:
-                    redis_client.setex(f'blacklist:{jti}', ttl, '1')
-            
             return True
             
         except Exception as e:
@@ -366,7 +359,7 @@ class AuthService:
     @staticmethod
     def is_token_blacklisted(token):
         """Check if token is blacklisted (checks Redis first, then Database)"""
-        from src.models.token_blacklist import TokenBlacklist
+        from src.services.auth_cache_service import AuthCacheService
         import jwt
         
         try:
@@ -382,13 +375,8 @@ class AuthService:
             if not jti:
                 return False
             
-            # Check Redis first (faster)
-            redis_client = get_redis()
-            if redis_client and redis_client.exists(f'blacklist:{jti}'):
-                return True
-            
-            # Check database (fallback)
-            return TokenBlacklist.is_token_revoked(jti)
+            # Redis revocation list first, database on miss
+            return AuthCacheService.is_token_revoked(jti)
             
         except Exception:
             return False
@@ -8,6 +8,7 @@ from datetime import datetime
 from decimal import Decimal
 import logging
 from src.services.notification_service import NotificationService
+from src.services.ledger_service import LedgerService, Leg, Posting, SYSTEM_COMMISSIONS
 
 logger = logging.getLogger(__name__)
 
@@ -216,6 +217,88 @@ class CommissionService:
             logger.error(f"Error marking commission as paid: {str(e)}")
             return None
     
+    @staticmethod
+    def pay_approved_to_wallets(commission_ids=None, created_by=None, batch_size=500):
+        """
+        Pay approved commissions into the agents' wallet commission balances
+        
+        Each chunk is one ledger batch: commissions are claimed with
+        FOR UPDATE SKIP LOCKED (so concurrent runs never pay twice), every
+        payout is posted against the commission expense account and the
+        chunk commits once.
+        
+        Args:
+            commission_ids: Only pay these commissions (default: all approved)
+            created_by: ID of the user running the payout
+            batch_size: Commissions per transaction
+            
+        Returns:
+            Dict with 'paid' count, 'amount' total and 'failed' commission IDs
+        """
+        paid, total, failed = 0, Decimal('0'), []
+        last_id = 0
+        
+        while True:
+            query = Commission.query.filter(
+                Commission.status == 'approved',
+                Commission.id > last_id
+            )
+            if commission_ids is not None:
+                query = query.filter(Commission.id.in_(commission_ids))
+            commissions = query.order_by(Commission.id).limit(batch_size).with_for_update(skip_locked=True).all()
+            if not commissions:
+                break
+            last_id = commissions[-1].id
+            
+            agents = {
+                agent.id: agent
+                for agent in Agent.query.filter(
+                    Agent.id.in_({c.agent_id for c in commissions})
+                ).order_by(Agent.id).with_for_update()
+            }
+            payable = [c for c in commissions if c.agent_id in agents]
+            failed.extend(c.id for c in commissions if c.agent_id not in agents)
+            
+            try:
+                results = LedgerService.post([
+                    Posting(
+                        entry_type='commission',
+                        legs=(
+                            Leg.wallet(agents[c.agent_id].user_id, c.commission_amount, 'commission',
+                                       type='commission'),
+                            Leg.to_system(SYSTEM_COMMISSIONS, -c.commission_amount),
+                        ),
+                        description=f'Commission #{c.id}',
+                        reference_type='commission',
+                        reference_id=c.id,
+                        created_by=created_by
+                    )
+                    for c in payable
+                ], commit=False)
+                
+                now = datetime.utcnow()
+                for commission, result in zip(payable, results):
+                    agent = agents[commission.agent_id]
+                    commission.status = 'paid'
+                    commission.paid_at = now
+                    commission.payment_method = 'wallet'
+                    commission.transaction_id = f'ledger:{result.entry.id}'
+                    agent.pending_balance = (agent.pending_balance or Decimal('0')) - commission.commission_amount
+                    agent.total_earned = (agent.total_earned or Decimal('0')) + commission.commission_amount
+                    agent.total_withdrawn = (agent.total_withdrawn or Decimal('0')) + commission.commission_amount
+                    total += commission.commission_amount
+                
+                db.session.commit()
+                paid += len(payable)
+                
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error paying commission batch after #{last_id}: {str(e)}")
+                failed.extend(c.id for c in payable)
+        
+        logger.info(f"Paid {paid} commission(s) to wallets, total {total}")
+        return {'paid': paid, 'amount': float(total), 'failed': failed}
+    
     @staticmethod
     def get_agent_commissions(agent_id, status=None, page=1, per_page=20):
         """
@@ -0,0 +1,154 @@
+"""
+CRM Query Service
+Aggregate and pipeline queries behind the CRM stats and pipeline views,
+always scoped by the viewer's lead permissions
+"""
+from datetime import datetime, timedelta
+import logging
+
+from sqlalchemy import func
+
+from src.models.lead import Lead
+from src.models.user import User
+from src.utils.batch_loader import get_loader
+from src.utils.permissions import PermissionManager
+
+logger = logging.getLogger(__name__)
+
+# Pipeline columns, in board order
+PIPELINE_STATUSES = ('new', 'contacted', 'qualified', 'proposal', 'negotiation', 'converted', 'lost')
+
+# Leads returned per pipeline column
+DEFAULT_COLUMN_SIZE = 25
+MAX_COLUMN_SIZE = 100
+
+RECENT_DAYS = 30
+
+
+def _scoped_leads(user):
+    """Lead query filtered by what the user may see"""
+    return PermissionManager.filter_leads_by_permission(user, Lead.query)
+
+
+class CRMQueryService:
+    """Query layer for CRM reports"""
+
+    @staticmethod
+    def status_summary(user, now=None):
+        """
+        Lead counts, recent counts and score sums per status
+
+        One GROUP BY over the permission-scoped leads.
+
+        Returns:
+            Dict status -> {'count', 'recent', 'score_sum', 'scored'}
+        """
+        since = (now or datetime.utcnow()) - timedelta(days=RECENT_DAYS)
+        rows = _scoped_leads(user).with_entities(
+            Lead.status,
+            func.count(Lead.id),
+            func.count(Lead.id).filter(Lead.created_at >= since),
+            func.coalesce(func.sum(Lead.score), 0),
+            func.count(Lead.score),
+        ).group_by(Lead.status).all()
+
+        return {
+            status: {'count': count, 'recent': recent, 'score_sum': int(score_sum), 'scored': scored}
+            for status, count, recent, score_sum, scored in rows
+        }
+
+    @staticmethod
+    def get_stats(user, now=None):
+        """CRM dashboard statistics for the user's visible leads"""
+        summary = CRMQueryService.status_summary(user, now=now)
+
+        def count(status):
+            return summary.get(status, {}).get('count', 0)
+
+        total_leads = sum(row['count'] for row in summary.values())
+        scored = sum(row['scored'] for row in summary.values())
+        score_sum = sum(row['score_sum'] for row in summary.values())
+        converted_leads = count('converted')
+
+        return {
+            'total_leads': total_leads,
+            'new_leads': count('new'),
+            'contacted_leads': count('contacted'),
+            'qualified_leads': count('qualified'),
+            'converted_leads': converted_leads,
+            'lost_leads': count('lost'),
+            'conversion_rate': round(converted_leads / total_leads * 100, 2) if total_leads else 0,
+            'recent_leads_30d': sum(row['recent'] for row in summary.values()),
+            'average_score': round(score_sum / scored, 2) if scored else 0,
+        }
+
+    @staticmethod
+    def assignees(user_ids, include_email=False):
+        """
+        Assigned-user summaries for a set of user IDs, in one query per request
+
+        Returns:
+            Dict user_id -> {'id', 'name'[, 'email']}
+        """
+        result = {}
+        for user_id, user in get_loader(User).get_many(user_ids).items():
+            data = {'id': user_id, 'name': f"{user.first_name} {user.last_name}"}
+            if include_email:
+                data['email'] = user.email
+            result[user_id] = data
+        return result
+
+    @staticmethod
+    def serialize_leads(leads, include_email=False):
+        """Lead dicts with 'assigned_user' attached from one batched lookup"""
+        users = CRMQueryService.assignees((lead.assigned_to for lead in leads), include_email=include_email)
+        result = []
+        for lead in leads:
+            data = lead.to_dict()
+            if lead.assigned_to in users:
+                data['assigned_user'] = users[lead.assigned_to]
+            result.append(data)
+        return result
+
+    @staticmethod
+    def get_pipeline(user, per_column=DEFAULT_COLUMN_SIZE, status=None, page=1):
+        """
+        Pipeline board: the top leads of each column plus column totals
+
+        Without `status`, returns the first `per_column` leads (by score)
+        of every column using one windowed query. With `status`, returns
+        page `page` of that column only, for "load more".
+        """
+        per_column = max(1, min(per_column, MAX_COLUMN_SIZE))
+        page = max(1, page)
+        statuses = (status,) if status else PIPELINE_STATUSES
+        order = (Lead.score.desc().nullslast(), Lead.id.desc())
+
+        summary = CRMQueryService.status_summary(user)
+        counts = {s: summary.get(s, {}).get('count', 0) for s in statuses}
+
+        scoped = _scoped_leads(user).filter(Lead.status.in_(statuses))
+        if status:
+            leads = scoped.order_by(*order).offset((page - 1) * per_column).limit(per_column).all()
+        else:
+            ranked = scoped.with_entities(
+                Lead.id.label('lead_id'),
+                func.row_number().over(partition_by=Lead.status, order_by=order).label('position'),
+            ).subquery()
+            leads = Lead.query.join(
+                ranked, ranked.c.lead_id == Lead.id
+            ).filter(
+                ranked.c.position <= per_column
+            ).order_by(*order).all()
+
+        pipeline = {s: [] for s in statuses}
+        for data in CRMQueryService.serialize_leads(leads):
+            pipeline[data['status']].append(data)
+
+        return {
+            'pipeline': pipeline,
+            'counts': counts,
+            'has_more': {s: page * per_column < counts[s] for s in statuses},
+            'page': page,
+            'per_column': per_column,
+        }
@@ -0,0 +1,264 @@
+"""
+Email Queue Service
+Consumer for the email_queue table. Batches are claimed with
+FOR UPDATE SKIP LOCKED, so any number of workers can drain the queue
+without sending a row twice; rows with the same subject and body are sent
+as one SendGrid request with one personalization per recipient, requests
+go out through a bounded thread pool and each batch's statuses are
+committed together. Failed sends are rescheduled with exponential backoff.
+"""
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sendgrid import SendGridAPIClient
+from sendgrid.helpers.mail import Mail, To
+from sqlalchemy import or_
+
+from src.database import db
+from src.models.notification import EmailQueue
+from src.utils.fake_sendgrid import get_fake_client
+from src.utils.metrics import EventCounter
+
+logger = logging.getLogger(__name__)
+
+# Rows claimed (and locked) per batch
+CLAIM_BATCH_SIZE = 500
+# Concurrent SendGrid requests per worker
+SEND_CONCURRENCY = 8
+# SendGrid accepts up to 1000 personalizations per request
+MAX_PERSONALIZATIONS = 1000
+# Seconds a worker keeps claiming batches before returning
+DEFAULT_TIME_BUDGET = 8.0
+
+# Retry backoff: RETRY_BASE_SECONDS * 2 ** (attempts - 1), capped, +0-10% jitter
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 3600
+
+_events = EventCounter('email_queue', 'Email queue batches, sends and send time')
+
+
+def retry_delay(attempts, jitter=0.1):
+    """Seconds to wait before the next attempt after `attempts` failures"""
+    delay = min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS)
+    return delay * (1 + random.uniform(0, jitter))
+
+
+def group_for_sending(emails):
+    """
+    Split queued rows into SendGrid requests
+
+    Rows with the same subject and body share a request, up to
+    MAX_PERSONALIZATIONS recipients; a recipient appearing twice in a group
+    goes to a later request so every personalization is distinct.
+
+    Returns:
+        List of (subject, content, [rows]) in first-seen order
+    """
+    groups = {}
+    for email in emails:
+        content = email.html_body or email.body
+        chunks = groups.setdefault((email.subject, content), [])
+        for rows, recipients in chunks:
+            if len(rows) < MAX_PERSONALIZATIONS and email.to_email.lower() not in recipients:
+                break
+        else:
+            rows, recipients = [], set()
+            chunks.append((rows, recipients))
+        rows.append(email)
+        recipients.add(email.to_email.lower())
+
+    return [
+        (subject, content, rows)
+        for (subject, content), chunks in groups.items()
+        for rows, _ in chunks
+    ]
+
+
+def get_email_client():
+    """SendGrid client for the configured backend, or None when not configured"""
+    if current_app.config.get('EMAIL_BACKEND') == 'fake':
+        return get_fake_client()
+    api_key = current_app.config.get('SENDGRID_API_KEY')
+    if not api_key:
+        return None
+    return SendGridAPIClient(api_key)
+
+
+def _send(client, from_email, subject, content, rows):
+    """Send one grouped request; returns None on success, else the error"""
+    message = Mail(
+        from_email=from_email,
+        to_emails=[To(email.to_email) for email in rows],
+        subject=subject,
+        html_content=content,
+        is_multiple=True
+    )
+    try:
+        response = client.send(message)
+        if response.status_code >= 300:
+            return f'SendGrid status {response.status_code}'
+        return None
+    except Exception as e:
+        return str(e) or e.__class__.__name__
+
+
+class EmailQueueService:
+    """Drains the email queue"""
+
+    @staticmethod
+    def claim(batch_size=CLAIM_BATCH_SIZE, now=None):
+        """Lock up to batch_size due pending rows no other worker holds"""
+        now = now or datetime.utcnow()
+        return EmailQueue.query.filter(
+            EmailQueue.status == 'pending',
+            or_(EmailQueue.next_attempt_at.is_(None), EmailQueue.next_attempt_at <= now)
+        ).order_by(EmailQueue.id).limit(batch_size).with_for_update(skip_locked=True).all()
+
+    @staticmethod
+    def process(batch_size=CLAIM_BATCH_SIZE, concurrency=SEND_CONCURRENCY,
+                time_budget=DEFAULT_TIME_BUDGET, max_batches=None, client=None):
+        """
+        Send due emails until the queue is empty or the time budget is spent
+
+        Args:
+            batch_size: Rows claimed per batch (one transaction each)
+            concurrency: Parallel SendGrid requests
+            time_budget: Seconds after which no new batch is claimed
+            max_batches: Stop after this many batches
+            client: SendGrid client (default: configured backend)
+
+        Returns:
+            Dict with processed/sent/failed/retried counts, batches, seconds
+            and rate (emails sent per second)
+        """
+        result = {'processed': 0, 'sent': 0, 'failed': 0, 'retried': 0, 'batches': 0, 'requests': 0}
+        client = client or get_email_client()
+        if client is None:
+            logger.error('Cannot process email queue: SendGrid not configured')
+            result['error'] = 'SendGrid not configured'
+            return result
+
+        from_email = current_app.config.get('SENDGRID_FROM_EMAIL', 'info@marketedgepros.com')
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='email-send') as pool:
+            while max_batches is None or result['batches'] < max_batches:
+                try:
+                    batch = EmailQueueService._process_batch(pool, client, from_email, batch_size)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Error processing email queue batch: {str(e)}")
+                    result['error'] = str(e)
+                    break
+                if batch is None:
+                    break
+                for key, value in batch.items():
+                    result[key] += value
+                result['batches'] += 1
+                if time.monotonic() - started >= time_budget:
+                    break
+
+        seconds = time.monotonic() - started
+        result['seconds'] = round(seconds, 3)
+        result['rate'] = round(result['sent'] / seconds, 1) if seconds else 0
+        if result['processed']:
+            logger.info(
+                f"Email queue: sent {result['sent']}, retrying {result['retried']}, "
+                f"failed {result['failed']} in {result['batches']} batch(es), {result['rate']}/s"
+            )
+        return result
+
+    @staticmethod
+    def _process_batch(pool, client, from_email, batch_size):
+        """Claim, send and commit one batch; None when nothing is due"""
+        now = datetime.utcnow()
+        emails = EmailQueueService.claim(batch_size, now=now)
+        if not emails:
+            db.session.rollback()
+            return None
+
+        counts = {'processed': len(emails), 'sent': 0, 'failed': 0, 'retried': 0, 'requests': 0}
+
+        sendable = []
+        for email in emails:
+            if (email.attempts or 0) >= (email.max_attempts or 0):
+                email.status = 'failed'
+                email.error_message = email.error_message or 'Max attempts reached'
+                counts['failed'] += 1
+            else:
+                sendable.append(email)
+
+        groups = group_for_sending(sendable)
+        sent_at = time.monotonic()
+        errors = list(pool.map(lambda group: _send(client, from_email, *group), groups))
+        send_seconds = time.monotonic() - sent_at
+        counts['requests'] = len(groups)
+
+        now = datetime.utcnow()
+        for (_, _, rows), error in zip(groups, errors):
+            for email in rows:
+                email.attempts = (email.attempts or 0) + 1
+                if error is None:
+                    email.status = 'sent'
+                    email.sent_at = now
+                    email.error_message = None
+                    counts['sent'] += 1
+                elif email.attempts >= (email.max_attempts or 0):
+                    email.status = 'failed'
+                    email.error_message = error[:1000]
+                    counts['failed'] += 1
+                else:
+                    email.next_attempt_at = now + timedelta(seconds=retry_delay(email.attempts))
+                    email.error_message = error[:1000]
+                    counts['retried'] += 1
+
+        db.session.commit()
+        _events.count(batches=1, send_seconds=send_seconds, **counts)
+        return counts
+
+    @staticmethod
+    def queue_depth(now=None):
+        """Pending, due and failed counts plus the age of the oldest pending row"""
+        now = now or datetime.utcnow()
+        pending = EmailQueue.status == 'pending'
+        total, due, oldest, failed = db.session.query(
+            db.func.count(EmailQueue.id).filter(pending),
+            db.func.count(EmailQueue.id).filter(
+                pending, or_(EmailQueue.next_attempt_at.is_(None), EmailQueue.next_attempt_at <= now)
+            ),
+            db.func.min(EmailQueue.created_at).filter(pending),
+            db.func.count(EmailQueue.id).filter(EmailQueue.status == 'failed'),
+        ).filter(EmailQueue.status.in_(('pending', 'failed'))).one()
+        return {
+            'pending': total,
+            'due': due,
+            'failed': failed,
+            'oldest_pending_age_seconds': round((now - oldest).total_seconds(), 1) if oldest else 0,
+        }
+
+    @staticmethod
+    def get_stats():
+        """Queue depth and age plus this process's throughput counters"""
+        stats = _events.values()
+        send_seconds = stats.get('send_seconds', 0)
+        requests = stats.get('requests', 0)
+        return {
+            **EmailQueueService.queue_depth(),
+            'worker': {
+                'batches': stats.get('batches', 0),
+                'sent': stats.get('sent', 0),
+                'retried': stats.get('retried', 0),
+                'failed': stats.get('failed', 0),
+                'requests': requests,
+                'recipients_per_request': round(stats.get('sent', 0) / requests, 1) if requests else 0,
+                'send_rate': round(stats.get('sent', 0) / send_seconds, 1) if send_seconds else 0,
+            },
+        }
+
+    @staticmethod
+    def reset_stats():
+        _events.reset()
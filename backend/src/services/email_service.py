@@ -830,7 +830,7 @@ class EmailService:
     @staticmethod
     def process_email_queue(batch_size=10):
         """
-        Process pending emails in queue
+        Process one batch of pending emails in queue
         
         Args:
             batch_size: Number of emails to process in this batch
@@ -838,41 +838,9 @@ class EmailService:
         Returns:
             dict: Statistics about processed emails
         """
-        from src.models.notification import EmailQueue
-        
-        # Get pending emails
-        pending_emails = EmailQueue.query.filter_by(status='pending').limit(batch_size).all()
-        
-        stats = {
-            'processed': 0,
-            'sent': 0,
-            'failed': 0
-        }
+        from src.services.email_queue_service import EmailQueueService
         
-        for email in pending_emails:
-            stats['processed'] += 1
-            
-            # Skip if max attempts reached
-            if email.attempts >= email.max_attempts:
-                email.mark_as_failed('Max attempts reached')
-                stats['failed'] += 1
-                continue
-            
-            # Try to send
-            success = EmailService._send_email(
-                to_email=email.to_email,
-                subject=email.subject,
-                html_content=email.html_body or email.body
-            )
-            
-            if success:
-                email.mark_as_sent()
-                stats['sent'] += 1
-            else:
-                email.mark_as_failed('SendGrid error')
-                stats['failed'] += 1
-        
-        return stats
+        return EmailQueueService.process(batch_size=batch_size, max_batches=1)
 
 
 
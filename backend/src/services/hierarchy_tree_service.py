@@ -0,0 +1,206 @@
+"""
+Hierarchy Tree Service
+Builds nested downline trees from one closure-table query instead of
+walking user.children node by node
+"""
+import logging
+import uuid
+
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+
+from src import cache
+from src.database import db
+from src.models.user import User
+from src.models.user_closure import UserClosure
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached tree snapshot is served
+SNAPSHOT_TTL = 300
+GENERATION_KEY = 'hierarchy_tree:generation'
+
+
+def compact_node(user):
+    """Node fields used by /hierarchy/tree"""
+    return {
+        'id': user.id,
+        'email': user.email,
+        'name': f"{user.first_name} {user.last_name}",
+        'role': user.role,
+        'level': user.level,
+        'is_active': user.is_active,
+    }
+
+
+def full_node(user):
+    """Node fields used by /admin/users/hierarchy"""
+    return {
+        'id': user.id,
+        'email': user.email,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'role': user.role,
+        'is_active': user.is_active,
+        'is_verified': user.is_verified or False,
+        'kyc_status': user.kyc_status,
+        'phone': user.phone,
+        'country_code': user.country_code,
+        'parent_id': user.parent_id,
+        'level': user.level or 0,
+        'tree_path': user.tree_path,
+        'referral_code': user.referral_code,
+        'created_at': user.created_at.isoformat() if user.created_at else None,
+        'last_login_at': user.last_login_at.isoformat() if user.last_login_at else None,
+    }
+
+
+NODE_SERIALIZERS = {
+    'compact': compact_node,
+    'full': full_node,
+}
+
+
+def _generation():
+    """Current snapshot generation; bumping it drops every cached tree"""
+    try:
+        generation = cache.get(GENERATION_KEY)
+        if generation is None:
+            generation = uuid.uuid4().hex
+            cache.set(GENERATION_KEY, generation, timeout=0)
+        return generation
+    except Exception as e:
+        logger.warning(f"Hierarchy tree cache unavailable: {e}")
+        return None
+
+
+def invalidate_hierarchy_trees():
+    """Drop all cached tree snapshots (called when users are created or moved)"""
+    try:
+        cache.set(GENERATION_KEY, uuid.uuid4().hex, timeout=0)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate hierarchy trees: {e}")
+
+
+class HierarchyTreeService:
+    """Assemble downline trees in memory"""
+
+    @staticmethod
+    def build_forest(root_ids, max_depth=None, node='compact'):
+        """
+        Build one nested tree per root from a single query
+
+        Args:
+            root_ids: User IDs to build trees for (order is kept)
+            max_depth: Number of levels to include, the root being level 1
+                (None = whole subtree)
+            node: 'compact' or 'full' node fields
+
+        Returns:
+            List of nested node dicts. Nodes at the depth limit that still
+            have children are marked collapsed and carry a cursor for
+            expand_node().
+        """
+        root_ids = list(root_ids)
+        if not root_ids or max_depth == 0:
+            return []
+
+        serialize = NODE_SERIALIZERS[node]
+        child = aliased(User)
+        children_count = db.session.query(func.count(child.id)).filter(
+            child.parent_id == User.id
+        ).correlate(User).scalar_subquery()
+
+        query = db.session.query(
+            UserClosure.ancestor_id, UserClosure.depth, User, children_count
+        ).join(
+            User, User.id == UserClosure.descendant_id
+        ).filter(
+            UserClosure.ancestor_id.in_(root_ids)
+        )
+        if max_depth is not None:
+            query = query.filter(UserClosure.depth < max_depth)
+
+        # Parents always come before their children
+        rows = query.order_by(
+            UserClosure.ancestor_id, UserClosure.depth, User.created_at, User.id
+        ).all()
+
+        # (root_id, user_id) -> node
+        nodes = {}
+        roots = {}
+        for root_id, depth, user, count in rows:
+            data = serialize(user)
+            data['children_count'] = count
+            data['children'] = []
+            if max_depth is not None and depth == max_depth - 1 and count:
+                data['collapsed'] = True
+                data['cursor'] = str(user.id)
+            nodes[(root_id, user.id)] = data
+
+            if depth == 0:
+                roots[root_id] = data
+            else:
+                parent = nodes.get((root_id, user.parent_id))
+                if parent is not None:
+                    parent['children'].append(data)
+
+        return [roots[root_id] for root_id in root_ids if root_id in roots]
+
+    @staticmethod
+    def build_tree(root_id, max_depth=None, node='compact'):
+        """Build the tree under a single user (None if the user is not visible)"""
+        forest = HierarchyTreeService.build_forest([root_id], max_depth, node)
+        return forest[0] if forest else None
+
+    @staticmethod
+    def expand_node(viewer, cursor, max_depth=None, node='compact'):
+        """
+        Expand a collapsed node returned by an earlier build
+
+        Args:
+            viewer: User requesting the expansion
+            cursor: The collapsed node's cursor
+            max_depth: Levels to load below (and including) the node
+
+        Returns:
+            Node dict, or None if the cursor is invalid or outside the
+            viewer's downline
+        """
+        try:
+            node_id = int(cursor)
+        except (TypeError, ValueError):
+            return None
+
+        if node_id != viewer.id and not UserClosure.is_ancestor(viewer.id, node_id):
+            return None
+        return HierarchyTreeService.build_tree(node_id, max_depth, node)
+
+    @staticmethod
+    def get_snapshot(viewer_id, key, builder):
+        """
+        Serve a per-user tree snapshot from cache, building it on a miss
+
+        Args:
+            viewer_id: User the snapshot belongs to
+            key: Distinguishes variants (depth, cursor, node fields)
+            builder: Callable returning the JSON-serializable snapshot
+        """
+        generation = _generation()
+        if generation is None:
+            return builder()
+
+        cache_key = f"hierarchy_tree:{generation}:{viewer_id}:{key}"
+        try:
+            snapshot = cache.get(cache_key)
+        except Exception:
+            snapshot = None
+        if snapshot is not None:
+            return snapshot
+
+        snapshot = builder()
+        try:
+            cache.set(cache_key, snapshot, timeout=SNAPSHOT_TTL)
+        except Exception as e:
+            logger.warning(f"Failed to cache hierarchy tree: {e}")
+        return snapshot
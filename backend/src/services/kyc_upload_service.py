@@ -0,0 +1,302 @@
+"""
+KYC Upload Service
+Direct-to-bucket KYC uploads. The browser asks for a presigned POST (or,
+for large files, presigned multipart part URLs), sends the file straight to
+Spaces and then calls back; web workers only handle those small JSON
+requests. The callback checks the stored object's size and type, records
+the document and queues background processing (SHA-256, magic-byte check,
+thumbnail for images).
+"""
+from datetime import datetime, timedelta
+import hashlib
+import io
+import logging
+import uuid
+
+from src.database import db
+from src.models.kyc_document import KycDocument
+from src.services.storage_service import storage_service
+
+try:
+    from PIL import Image
+except ImportError:  # Thumbnails are skipped without Pillow
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Document type -> prefix of its kyc_<prefix>_* user columns
+DOCUMENT_FIELDS = {
+    'id_proof': 'id',
+    'address_proof': 'address',
+    'selfie': 'selfie',
+    'bank_statement': 'bank',
+}
+# Documents that must be uploaded before the submission is pending review
+REQUIRED_DOCUMENTS = ('id_proof', 'address_proof', 'selfie')
+
+ALLOWED_CONTENT_TYPES = {
+    'application/pdf': 'pdf',
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+}
+MAX_SIZE = 16 * 1024 * 1024
+# Files above this size are uploaded in parts
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+# Seconds presigned upload URLs stay valid
+UPLOAD_URL_EXPIRES = 900
+
+THUMBNAIL_SIZE = (320, 320)
+
+# Leading bytes of each allowed type
+MAGIC_BYTES = {
+    'application/pdf': (b'%PDF',),
+    'image/jpeg': (b'\xff\xd8\xff',),
+    'image/png': (b'\x89PNG\r\n\x1a\n',),
+}
+
+
+def key_prefix(user_id, document_type):
+    return f'kyc/{user_id}/{document_type}_'
+
+
+def new_key(user_id, document_type, content_type):
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    return f'{key_prefix(user_id, document_type)}{timestamp}_{uuid.uuid4().hex}.{ALLOWED_CONTENT_TYPES[content_type]}'
+
+
+def sniff_content_type(data):
+    """Allowed content type matching the file's leading bytes, or None"""
+    for content_type, signatures in MAGIC_BYTES.items():
+        if any(data.startswith(signature) for signature in signatures):
+            return content_type
+    return None
+
+
+def validate_upload_request(document_type, content_type, size):
+    """Raise ValueError unless the declared upload is acceptable"""
+    if document_type not in DOCUMENT_FIELDS:
+        raise ValueError('Invalid document type')
+    if content_type not in ALLOWED_CONTENT_TYPES:
+        raise ValueError(f'Invalid file type. Allowed: {", ".join(sorted(set(ALLOWED_CONTENT_TYPES.values())))}')
+    if not isinstance(size, int) or size <= 0:
+        raise ValueError('File size is required')
+    if size > MAX_SIZE:
+        raise ValueError(f'File too large. Maximum size is {MAX_SIZE // (1024 * 1024)} MB')
+
+
+def apply_document_to_user(user, document_type, storage_key, now=None):
+    """Point the user's current document of this type at a new upload"""
+    now = now or datetime.utcnow()
+    prefix = DOCUMENT_FIELDS[document_type]
+    setattr(user, f'kyc_{prefix}_status', 'pending')
+    setattr(user, f'kyc_{prefix}_uploaded_at', now)
+    setattr(user, f'kyc_{prefix}_url', storage_key)
+
+    # Overall status goes to pending once every required document is in
+    if all(getattr(user, f'kyc_{DOCUMENT_FIELDS[doc]}_status') == 'pending' for doc in REQUIRED_DOCUMENTS):
+        user.kyc_status = 'pending'
+        user.kyc_submitted_at = now
+    user.updated_at = now
+
+
+def reject_document_on_user(user, document_type, storage_key, reason, now=None):
+    """
+    Flag the user's current document of this type as rejected and clear it
+    Does nothing if a newer upload already replaced that document
+    """
+    prefix = DOCUMENT_FIELDS[document_type]
+    if getattr(user, f'kyc_{prefix}_url') != storage_key:
+        return
+    setattr(user, f'kyc_{prefix}_status', 'rejected')
+    setattr(user, f'kyc_{prefix}_url', None)
+    setattr(user, f'kyc_{prefix}_notes', reason)
+
+    # The submission is incomplete again until the document is re-uploaded
+    if user.kyc_status == 'pending' and document_type in REQUIRED_DOCUMENTS:
+        user.kyc_status = 'not_submitted'
+        user.kyc_submitted_at = None
+    user.updated_at = now or datetime.utcnow()
+
+
+class KycUploadService:
+    """Presigned KYC uploads and their post-processing"""
+
+    @staticmethod
+    def start_upload(user, document_type, content_type, size):
+        """
+        Presign an upload of one document
+
+        Returns:
+            dict: {'key', 'method': 'POST', 'url', 'fields'} or
+                  {'key', 'method': 'MULTIPART', 'upload_id', 'part_size', 'parts'}
+
+        Raises:
+            ValueError: Invalid request, or storage unavailable
+        """
+        validate_upload_request(document_type, content_type, size)
+        if not storage_service.supports_direct_upload:
+            raise ValueError('Direct uploads are not available')
+
+        key = new_key(user.id, document_type, content_type)
+        if size > MULTIPART_THRESHOLD:
+            upload = storage_service.create_multipart_upload(
+                key, content_type, size, PART_SIZE, expires_in=UPLOAD_URL_EXPIRES
+            )
+            if upload is None:
+                raise ValueError('Could not start the upload')
+            return {'key': key, 'method': 'MULTIPART', 'expires_in': UPLOAD_URL_EXPIRES, **upload}
+
+        post = storage_service.create_presigned_post(key, content_type, MAX_SIZE, expires_in=UPLOAD_URL_EXPIRES)
+        if post is None:
+            raise ValueError('Could not start the upload')
+        return {'key': key, 'method': 'POST', 'expires_in': UPLOAD_URL_EXPIRES, 'url': post['url'], 'fields': post['fields']}
+
+    @staticmethod
+    def complete_upload(user, document_type, key, upload_id=None, parts=None):
+        """
+        Completion callback: verify the stored object and record the document
+
+        Returns:
+            KycDocument
+
+        Raises:
+            ValueError: The key is not the user's, the object is missing, or
+                its size or type is not allowed (the object is deleted)
+        """
+        if document_type not in DOCUMENT_FIELDS:
+            raise ValueError('Invalid document type')
+        if not key or not key.startswith(key_prefix(user.id, document_type)) or '..' in key:
+            raise ValueError('Invalid upload key')
+        if KycDocument.query.filter_by(storage_key=key).first():
+            raise ValueError('Upload already completed')
+
+        if upload_id:
+            if not parts or not storage_service.complete_multipart_upload(key, upload_id, parts):
+                raise ValueError('Could not complete the upload')
+
+        head = storage_service.head_file(key)
+        if head is None:
+            raise ValueError('Uploaded file not found')
+        content_type = (head['content_type'] or '').split(';')[0].strip().lower()
+        error = None
+        if content_type not in ALLOWED_CONTENT_TYPES:
+            error = 'Invalid file type'
+        elif not 0 < head['size'] <= MAX_SIZE:
+            error = 'Invalid file size'
+        if error:
+            storage_service.delete_file(key)
+            raise ValueError(error)
+
+        now = datetime.utcnow()
+        document = KycDocument(
+            user_id=user.id,
+            document_type=document_type,
+            storage_key=key,
+            content_type=content_type,
+            size=head['size'],
+        )
+        db.session.add(document)
+        apply_document_to_user(user, document_type, key, now=now)
+        db.session.commit()
+
+        from src.tasks.kyc_tasks import process_kyc_document
+        try:
+            process_kyc_document.delay(document.id)
+        except Exception as e:
+            # process_pending_kyc_documents picks it up later
+            logger.error(f"Could not queue processing of KYC document {document.id}: {str(e)}")
+
+        return document
+
+    @staticmethod
+    def process(document_id):
+        """
+        Hash the file, check its leading bytes and write a thumbnail
+
+        Returns:
+            KycDocument, or None if it does not exist
+        """
+        document = KycDocument.query.get(document_id)
+        if document is None or document.processing_status == 'processed':
+            return document
+
+        data = storage_service.read_file(document.storage_key)
+        if data is None:
+            document.processing_status = 'failed'
+            document.processing_error = 'File could not be read'
+            db.session.commit()
+            return document
+
+        document.sha256 = hashlib.sha256(data).hexdigest()
+        actual_type = sniff_content_type(data)
+        if actual_type != document.content_type:
+            document.processing_status = 'failed'
+            document.processing_error = f'Content does not match {document.content_type}'
+            # Same commit, so the user never points at an unverified file
+            reject_document_on_user(document.user, document.document_type, document.storage_key,
+                                    'File content does not match its type')
+            db.session.commit()
+            logger.warning(f"KYC document {document.id}: content does not match {document.content_type}")
+            return document
+
+        if Image is not None and document.content_type.startswith('image/'):
+            thumbnail = KycUploadService._thumbnail(data)
+            if thumbnail is not None:
+                thumbnail_key = f'{document.storage_key}.thumb.jpg'
+                if storage_service.put_file(thumbnail_key, thumbnail, 'image/jpeg'):
+                    document.thumbnail_key = thumbnail_key
+
+        document.processing_status = 'processed'
+        document.processing_error = None
+        document.processed_at = datetime.utcnow()
+        db.session.commit()
+        return document
+
+    @staticmethod
+    def _thumbnail(data):
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image.thumbnail(THUMBNAIL_SIZE)
+                out = io.BytesIO()
+                image.convert('RGB').save(out, format='JPEG', quality=80)
+                return out.getvalue()
+        except Exception as e:
+            logger.error(f"Thumbnail generation failed: {str(e)}")
+            return None
+
+    @staticmethod
+    def pending_document_ids(older_than=300, limit=100):
+        """Documents still unprocessed some time after upload (lost or failed task)"""
+        cutoff = datetime.utcnow() - timedelta(seconds=older_than)
+        return [
+            document_id for (document_id,) in db.session.query(KycDocument.id).filter(
+                KycDocument.processing_status == 'pending',
+                KycDocument.created_at < cutoff
+            ).order_by(KycDocument.id).limit(limit)
+        ]
+
+
+def _is_url(value):
+    return value.startswith(('http://', 'https://', '/'))
+
+
+def document_urls(users, expires_in=3600):
+    """
+    Viewable URLs of every user's documents, signed in one batch
+    The kyc_<doc>_url columns hold storage keys; older rows hold a presigned
+    URL from upload time, which is returned as is
+
+    Returns:
+        dict: user ID -> {document_type: URL or None}
+    """
+    values = {
+        user.id: {doc: getattr(user, f'kyc_{prefix}_url', None) for doc, prefix in DOCUMENT_FIELDS.items()}
+        for user in users
+    }
+    keys = [value for docs in values.values() for value in docs.values() if value and not _is_url(value)]
+    signed = storage_service.get_file_urls(keys, expires_in=expires_in) if keys else {}
+    return {
+        user_id: {doc: signed.get(value, value) if value else None for doc, value in docs.items()}
+        for user_id, docs in values.items()
+    }
@@ -0,0 +1,313 @@
+"""
+Ledger Service
+Double-entry posting engine for wallets. A batch of postings is applied in
+one transaction: every wallet involved is locked with a single
+SELECT ... ORDER BY id FOR UPDATE (so concurrent batches always lock in the
+same order and cannot deadlock), balances are computed with Decimal and the
+journal, statement rows and balance snapshots are written together.
+"""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+from typing import NamedTuple, Optional, Tuple
+import logging
+
+from sqlalchemy import case, func
+from sqlalchemy.dialects.postgresql import insert
+
+from src.database import db
+from src.models.ledger import JournalEntry, JournalLine
+from src.models.wallet import Wallet, Transaction
+
+logger = logging.getLogger(__name__)
+
+BALANCE_TYPES = ('main', 'commission', 'bonus')
+
+# Counter-accounts for money entering or leaving the wallets
+SYSTEM_CASH = 'cash'
+SYSTEM_COMMISSIONS = 'commission_expense'
+SYSTEM_ADJUSTMENTS = 'adjustments'
+SYSTEM_OPENING = 'opening_balances'
+
+CENT = Decimal('0.01')
+
+
+def to_amount(value):
+    """Exact two-decimal amount from a number or string"""
+    try:
+        return Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, ValueError):
+        raise ValueError(f'Invalid amount: {value}')
+
+
+def wallet_account(wallet_id, balance_type):
+    return f'wallet:{wallet_id}:{balance_type}'
+
+
+def system_account(name):
+    return f'system:{name}'
+
+
+class Leg(NamedTuple):
+    """
+    One side of a posting
+
+    Either user_id (the user's wallet, created if missing) or system (a
+    system account name). amount is signed: positive credits the account.
+    """
+    amount: Decimal
+    user_id: Optional[int] = None
+    balance_type: str = 'main'
+    system: Optional[str] = None
+    type: Optional[str] = None  # statement type for wallet legs; default deposit/withdrawal
+    description: Optional[str] = None
+
+    @classmethod
+    def wallet(cls, user_id, amount, balance_type='main', type=None, description=None):
+        return cls(amount=to_amount(amount), user_id=user_id, balance_type=balance_type,
+                   type=type, description=description)
+
+    @classmethod
+    def to_system(cls, name, amount):
+        return cls(amount=to_amount(amount), system=name)
+
+
+class Posting(NamedTuple):
+    """A balanced set of legs applied atomically"""
+    entry_type: str
+    legs: Tuple[Leg, ...]
+    description: Optional[str] = None
+    reference_type: Optional[str] = None
+    reference_id: Optional[int] = None
+    created_by: Optional[int] = None
+    allow_overdraft: bool = False
+
+
+class PostingResult(NamedTuple):
+    entry: JournalEntry
+    transactions: Tuple[Transaction, ...]
+
+
+def _validate(posting):
+    if not posting.legs:
+        raise ValueError('A posting needs at least one leg')
+    total = Decimal('0')
+    for leg in posting.legs:
+        if (leg.user_id is None) == (leg.system is None):
+            raise ValueError('Each leg needs exactly one of user_id or system')
+        if leg.user_id is not None and leg.balance_type not in BALANCE_TYPES:
+            raise ValueError(f'Invalid balance type: {leg.balance_type}')
+        if leg.amount == 0:
+            raise ValueError('Amount must be non-zero')
+        total += leg.amount
+    if total != 0:
+        raise ValueError(f'Unbalanced posting ({posting.entry_type}): legs sum to {total}')
+
+
+class LedgerService:
+    """Posting, balance and reconciliation operations on the wallet ledger"""
+
+    # ------------------------------------------------------------------
+    # Posting
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def lock_wallets(user_ids):
+        """
+        Lock (creating when missing) the wallets of the given users
+
+        Returns:
+            Dict user_id -> Wallet, locked until the transaction ends
+        """
+        user_ids = sorted(set(user_ids))
+        if not user_ids:
+            return {}
+        now = datetime.utcnow()
+        db.session.execute(
+            insert(Wallet.__table__).values([
+                {'user_id': user_id, 'main_balance': 0, 'commission_balance': 0, 'bonus_balance': 0,
+                 'is_active': True, 'created_at': now, 'updated_at': now}
+                for user_id in user_ids
+            ]).on_conflict_do_nothing(index_elements=['user_id'])
+        )
+        wallets = Wallet.query.filter(
+            Wallet.user_id.in_(user_ids)
+        ).order_by(Wallet.id).with_for_update().populate_existing().all()
+        return {wallet.user_id: wallet for wallet in wallets}
+
+    @staticmethod
+    def post(postings, commit=True):
+        """
+        Apply postings atomically
+
+        Args:
+            postings: Iterable of Posting, applied in order
+            commit: Commit when done (otherwise the caller commits)
+
+        Returns:
+            List of PostingResult, one per posting
+
+        Raises:
+            ValueError: Invalid or unbalanced posting, or a wallet leg would
+                overdraw its balance; nothing is written
+        """
+        postings = list(postings)
+        for posting in postings:
+            _validate(posting)
+
+        try:
+            wallets = LedgerService.lock_wallets(
+                leg.user_id for posting in postings for leg in posting.legs if leg.user_id is not None
+            )
+            # Running balances, from the locked snapshot
+            balances = {
+                (wallet.user_id, balance_type): to_amount(getattr(wallet, f'{balance_type}_balance') or 0)
+                for wallet in wallets.values() for balance_type in BALANCE_TYPES
+            }
+            touched = set()
+            now = datetime.utcnow()
+
+            results = []
+            for posting in postings:
+                entry = JournalEntry(
+                    entry_type=posting.entry_type,
+                    reference_type=posting.reference_type,
+                    reference_id=posting.reference_id,
+                    description=posting.description,
+                    created_by=posting.created_by,
+                    created_at=now,
+                )
+                transactions = []
+                for leg in posting.legs:
+                    if leg.system is not None:
+                        entry.lines.append(JournalLine(account=system_account(leg.system), amount=leg.amount))
+                        continue
+
+                    wallet = wallets[leg.user_id]
+                    key = (leg.user_id, leg.balance_type)
+                    before = balances[key]
+                    after = before + leg.amount
+                    if after < 0 and leg.amount < 0 and not posting.allow_overdraft:
+                        raise ValueError(
+                            f'Insufficient {leg.balance_type} balance. Available: {before}, Required: {-leg.amount}'
+                        )
+                    balances[key] = after
+                    touched.add(key)
+
+                    entry.lines.append(JournalLine(
+                        account=wallet_account(wallet.id, leg.balance_type),
+                        wallet_id=wallet.id,
+                        balance_type=leg.balance_type,
+                        amount=leg.amount,
+                    ))
+                    transactions.append(Transaction(
+                        wallet_id=wallet.id,
+                        entry=entry,
+                        type=leg.type or ('deposit' if leg.amount > 0 else 'withdrawal'),
+                        amount=abs(leg.amount),
+                        balance_type=leg.balance_type,
+                        balance_before=before,
+                        balance_after=after,
+                        reference_type=posting.reference_type,
+                        reference_id=posting.reference_id,
+                        description=leg.description or posting.description,
+                        created_by=posting.created_by,
+                    ))
+                results.append(PostingResult(entry, tuple(transactions)))
+
+            # Everything validated: write the journal and statement rows
+            for result in results:
+                db.session.add(result.entry)
+                db.session.add_all(result.transactions)
+
+            # Snapshots: one UPDATE per wallet, however many legs it had
+            for user_id, balance_type in touched:
+                wallet = wallets[user_id]
+                setattr(wallet, f'{balance_type}_balance', balances[(user_id, balance_type)])
+                wallet.last_transaction_at = now
+
+            db.session.flush()
+            if commit:
+                db.session.commit()
+            return results
+        except Exception:
+            if commit:
+                db.session.rollback()
+            raise
+
+    # ------------------------------------------------------------------
+    # Reconciliation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def verify(repair=False):
+        """
+        Compare wallet balance snapshots with journal sums
+
+        One statement per check, so each sees a consistent snapshot.
+
+        Args:
+            repair: Reset drifted snapshots to the journal sums
+
+        Returns:
+            Dict with 'drift' (wallet balances that differ from the journal)
+            and 'unbalanced' (journal entry IDs whose lines do not sum to 0)
+        """
+        sums = [
+            func.coalesce(func.sum(case((JournalLine.balance_type == balance_type, JournalLine.amount))), 0)
+            for balance_type in BALANCE_TYPES
+        ]
+        rows = db.session.query(
+            Wallet.id, Wallet.main_balance, Wallet.commission_balance, Wallet.bonus_balance, *sums
+        ).outerjoin(
+            JournalLine, JournalLine.wallet_id == Wallet.id
+        ).group_by(Wallet.id).all()
+
+        drift = []
+        for row in rows:
+            wallet_id = row[0]
+            for i, balance_type in enumerate(BALANCE_TYPES):
+                stored = to_amount(row[1 + i] or 0)
+                journal = to_amount(row[4 + i] or 0)
+                if stored != journal:
+                    drift.append({
+                        'wallet_id': wallet_id,
+                        'balance_type': balance_type,
+                        'stored': str(stored),
+                        'journal': str(journal),
+                    })
+
+        unbalanced = [
+            entry_id for (entry_id,) in db.session.query(JournalLine.entry_id).group_by(
+                JournalLine.entry_id
+            ).having(func.sum(JournalLine.amount) != 0).limit(1000)
+        ]
+
+        if drift:
+            logger.warning(f"Wallet ledger drift in {len(drift)} balance(s)")
+        if unbalanced:
+            logger.error(f"{len(unbalanced)} unbalanced journal entries: {unbalanced[:20]}")
+
+        if repair and drift:
+            LedgerService._repair([item['wallet_id'] for item in drift])
+
+        return {'wallets': len(rows), 'drift': drift, 'unbalanced': unbalanced}
+
+    @staticmethod
+    def _repair(wallet_ids):
+        """Reset snapshots of the given wallets to their journal sums, under lock"""
+        wallets = Wallet.query.filter(
+            Wallet.id.in_(set(wallet_ids))
+        ).order_by(Wallet.id).with_for_update().populate_existing().all()
+        sums = defaultdict(Decimal)
+        for wallet_id, balance_type, amount in db.session.query(
+            JournalLine.wallet_id, JournalLine.balance_type, func.sum(JournalLine.amount)
+        ).filter(JournalLine.wallet_id.in_([w.id for w in wallets])).group_by(
+            JournalLine.wallet_id, JournalLine.balance_type
+        ):
+            sums[(wallet_id, balance_type)] = to_amount(amount)
+        for wallet in wallets:
+            for balance_type in BALANCE_TYPES:
+                setattr(wallet, f'{balance_type}_balance', sums[(wallet.id, balance_type)])
+        db.session.commit()
+        logger.warning(f"Reset {len(wallets)} wallet snapshot(s) to journal sums")
@@ -0,0 +1,356 @@
+"""
+MT5 API Broker
+One MT5 API token and one request budget for the whole cluster, shared
+through Redis by every gunicorn and Celery worker.
+
+- The JWT is cached in Redis for its lifetime. When it is missing one worker
+  takes a short refresh lock and authenticates; the others wait for the new
+  token to appear instead of authenticating too.
+- The request budget is a token bucket in Redis, refilled and drawn
+  atomically by a Lua script. Interactive requests (user-facing routes) may
+  empty the bucket; background requests (sync engine, monitoring and refresh
+  tasks) must leave RESERVED_FRACTION of it, so user requests are served
+  first while a sync cycle is saturating the API.
+
+Without Redis each process falls back to its own token and a local bucket
+with the same priority rules.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+
+from src.database import get_redis
+from src.utils.metrics import EventCounter
+
+logger = logging.getLogger(__name__)
+
+TOKEN_KEY = 'mt5:broker:token'
+REFRESH_LOCK_KEY = 'mt5:broker:token:refreshing'
+BUCKET_KEY = 'mt5:broker:bucket'
+
+# Seconds a token is used (MT5 tokens expire after 2 minutes)
+TOKEN_LIFETIME = 90
+# Shared tokens closer than this to expiry are refreshed
+MIN_TOKEN_TTL = 2
+# Seconds the refresh lock is held at most
+REFRESH_LOCK_SECONDS = 30
+# Seconds to wait for another worker's refresh before authenticating directly
+REFRESH_WAIT_SECONDS = 15
+REFRESH_POLL_SECONDS = 0.05
+
+# Requests per second allowed by the MT5 API, for all workers together. Also
+# the bucket capacity. Read once here so every worker refills the shared
+# bucket at the same rate.
+RATE = float(os.getenv('MT5_API_RATE', '10'))
+# Share of the bucket background requests must leave for interactive ones
+RESERVED_FRACTION = 0.3
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BACKGROUND = 'background'
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND)
+
+# KEYS: bucket hash; ARGV: rate, capacity, floor, tokens requested.
+# Returns 0 if the tokens were taken, else milliseconds until they could be.
+# Uses the server clock so every worker refills the bucket the same way.
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local floor = tonumber(ARGV[3])
+local requested = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local wait_ms = 0
+if tokens - requested >= floor then
+    tokens = tokens - requested
+else
+    wait_ms = math.ceil((requested + floor - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return wait_ms
+"""
+
+# KEYS: lock; ARGV: owner. Deletes the lock only if the caller still owns it.
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_events = EventCounter('mt5_broker', 'MT5 request budget waits, token refreshes and Redis fallbacks')
+
+
+def _average_ms(total_seconds, count):
+    return round(total_seconds / count * 1000, 1) if count else None
+
+
+def get_stats():
+    """
+    Budget waits and token refreshes of this process
+
+    Returns:
+        Dict with per-priority request and queue-wait figures, token
+        refresh figures and the number of Redis fallbacks
+    """
+    stats = _events.values()
+    budget = {}
+    for priority in PRIORITIES:
+        waited = stats.get(f'{priority}_waited', 0)
+        budget[priority] = {
+            'requests': stats.get(f'{priority}_requests', 0),
+            'waited': waited,
+            'avg_wait_ms': _average_ms(stats.get(f'{priority}_wait_seconds', 0.0), waited),
+            'timeouts': stats.get(f'{priority}_timeouts', 0),
+        }
+    refreshes = stats.get('token_refreshes', 0)
+    token_waits = stats.get('token_waits', 0)
+    return {
+        'budget': budget,
+        'token': {
+            'shared_hits': stats.get('token_hits', 0),
+            'refreshes': refreshes,
+            'avg_refresh_ms': _average_ms(stats.get('token_refresh_seconds', 0.0), refreshes),
+            'refresh_errors': stats.get('token_refresh_errors', 0),
+            'waits': token_waits,
+            'avg_wait_ms': _average_ms(stats.get('token_wait_seconds', 0.0), token_waits),
+        },
+        'fallbacks': stats.get('fallbacks', 0),
+    }
+
+
+def reset_stats():
+    _events.reset()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by concurrent MT5 callers
+
+    Drop-in replacement for RateLimiter: any number of threads can call
+    wait_if_needed() and the combined request rate stays within the budget.
+    """
+
+    def __init__(self, rate=10.0, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated_at = now
+
+    def acquire(self, tokens=1, timeout=None, floor=0):
+        """
+        Block until `tokens` are available
+
+        Args:
+            tokens: Tokens to take
+            timeout: Seconds to wait at most (None waits indefinitely)
+            floor: Tokens that must be left in the bucket afterwards
+
+        Returns:
+            True if acquired, False if timeout elapsed first
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens - tokens >= floor:
+                    self.tokens -= tokens
+                    return True
+                sleep_time = (tokens + floor - self.tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                sleep_time = min(sleep_time, remaining)
+
+            time.sleep(sleep_time)
+
+    def wait_if_needed(self):
+        """RateLimiter-compatible interface"""
+        self.acquire()
+
+
+class SharedRateBudget(TokenBucket):
+    """
+    Cluster-wide MT5 request budget for one priority class
+
+    Drop-in replacement for TokenBucket and RateLimiter. Every budget with
+    the same key draws from one bucket in Redis at RATE requests per second,
+    the limit for all workers together; without Redis this process's own
+    bucket is used.
+    """
+
+    def __init__(self, priority=PRIORITY_INTERACTIVE, key=BUCKET_KEY):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown MT5 request priority: {priority}")
+        super().__init__(rate=RATE)
+        self.priority = priority
+        self.key = key
+
+    def floor(self, tokens=1):
+        """Tokens a request of this priority must leave in the bucket"""
+        if self.priority == PRIORITY_INTERACTIVE:
+            return 0.0
+        return max(0.0, min(self.capacity * RESERVED_FRACTION, self.capacity - tokens))
+
+    def _take_shared(self, tokens, floor):
+        """Seconds until the shared bucket can serve the request (0: taken), None without Redis"""
+        redis_client = get_redis()
+        if not redis_client:
+            return None
+        try:
+            wait_ms = redis_client.eval(_TAKE_SCRIPT, 1, self.key, self.rate, self.capacity, floor, tokens)
+            return int(wait_ms) / 1000.0
+        except Exception as e:
+            logger.error(f"MT5 rate budget unavailable: {str(e)}")
+            return None
+
+    def acquire(self, tokens=1, timeout=None, floor=None):
+        """
+        Block until `tokens` are granted by the shared budget
+
+        Returns:
+            True if acquired, False if timeout elapsed first
+        """
+        floor = self.floor(tokens) if floor is None else floor
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else None
+
+        while True:
+            wait = self._take_shared(tokens, floor)
+            if wait is None:
+                _events.count(fallbacks=1)
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                acquired = super().acquire(tokens, remaining, floor=floor)
+                break
+            if wait == 0:
+                acquired = True
+                break
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    acquired = False
+                    break
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+        waited = time.monotonic() - started
+        counts = {f'{self.priority}_requests': 1}
+        if not acquired:
+            counts[f'{self.priority}_timeouts'] = 1
+        elif waited > 0.001:
+            counts[f'{self.priority}_waited'] = 1
+            counts[f'{self.priority}_wait_seconds'] = waited
+        _events.count(**counts)
+        return acquired
+
+
+class MT5TokenBroker:
+    """One MT5 API token for the whole cluster, refreshed by one worker at a time"""
+
+    def __init__(self, lifetime=TOKEN_LIFETIME, key=TOKEN_KEY, lock_key=REFRESH_LOCK_KEY):
+        self.lifetime = lifetime
+        self.key = key
+        self.lock_key = lock_key
+
+    def _request(self, request_token):
+        started = time.monotonic()
+        try:
+            token = request_token()
+        except Exception:
+            _events.count(token_refresh_errors=1)
+            raise
+        _events.count(token_refreshes=1, token_refresh_seconds=time.monotonic() - started)
+        return token
+
+    def _read(self, redis_client):
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.get(self.key)
+        pipe.pttl(self.key)
+        token, ttl_ms = pipe.execute()
+        if token and ttl_ms is not None and ttl_ms > MIN_TOKEN_TTL * 1000:
+            return token, ttl_ms / 1000.0
+        return None, 0.0
+
+    def _release(self, redis_client, owner):
+        try:
+            redis_client.eval(_RELEASE_SCRIPT, 1, self.lock_key, owner)
+        except Exception as e:
+            logger.error(f"MT5 token refresh lock release failed: {str(e)}")
+
+    def _refresh(self, redis_client, owner, request_token):
+        try:
+            token = self._request(request_token)
+            try:
+                redis_client.set(self.key, token, ex=self.lifetime)
+            except Exception as e:
+                logger.error(f"MT5 token could not be shared: {str(e)}")
+            return token, float(self.lifetime)
+        finally:
+            self._release(redis_client, owner)
+
+    def get_token(self, request_token):
+        """
+        Shared token, requesting a new one if there is none
+
+        Args:
+            request_token: Callable that authenticates against MT5 and
+                returns a new JWT
+
+        Returns:
+            Tuple (token, seconds it stays valid)
+        """
+        redis_client = get_redis()
+        if not redis_client:
+            return self._request(request_token), float(self.lifetime)
+
+        owner = uuid.uuid4().hex
+        started = time.monotonic()
+        waiting = False
+        while True:
+            try:
+                token, expires_in = self._read(redis_client)
+                claimed = token is None and redis_client.set(
+                    self.lock_key, owner, nx=True, ex=REFRESH_LOCK_SECONDS
+                )
+            except Exception as e:
+                logger.error(f"MT5 token broker unavailable: {str(e)}")
+                _events.count(fallbacks=1)
+                return self._request(request_token), float(self.lifetime)
+
+            if token:
+                if waiting:
+                    _events.count(token_waits=1, token_wait_seconds=time.monotonic() - started)
+                else:
+                    _events.count(token_hits=1)
+                return token, expires_in
+            if claimed:
+                return self._refresh(redis_client, owner, request_token)
+
+            # Another worker is refreshing
+            waiting = True
+            if time.monotonic() - started >= REFRESH_WAIT_SECONDS:
+                logger.warning("Timed out waiting for MT5 token refresh, authenticating directly")
+                _events.count(fallbacks=1)
+                return self._request(request_token), float(self.lifetime)
+            time.sleep(REFRESH_POLL_SECONDS)
+
+
+# Global instance
+token_broker = MT5TokenBroker()
@@ -0,0 +1,624 @@
+"""
+MT5 Ingestion Pipeline
+Buffers deal, account and position messages from the MT5 WebSocket streams,
+coalesces them per ticket / login and writes each flush window with a few
+set-based statements and a single commit
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Callable, Dict, NamedTuple, Optional
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from src.models.challenge_trade_stats import ChallengeTradeStats, TradeStatsDelta
+from src.models.mt5_models import MT5Account, MT5Trade, MT5Position
+from src.utils.realtime import user_room
+
+logger = logging.getLogger(__name__)
+
+STREAMS = ('deal', 'account', 'position')
+
+# Messages buffered between the sockets and the writer; producers wait
+# (and stop reading their socket) while it is full
+DEFAULT_QUEUE_SIZE = 10000
+# Seconds messages are collected before a flush
+DEFAULT_FLUSH_INTERVAL = 0.25
+# A flush starts early once this many messages are waiting
+DEFAULT_MAX_BATCH = 5000
+# Rows per multi-row INSERT statement
+INSERT_CHUNK_SIZE = 1000
+
+# Seconds between full reloads of the login -> account map
+ACCOUNT_REFRESH_INTERVAL = 300
+# Seconds an unknown login is remembered before it is looked up again
+UNKNOWN_LOGIN_TTL = 60
+
+# Columns a position tick may change; absent keys keep the stored value
+POSITION_TICK_FIELDS = {
+    'price_current': 'price_current',
+    'profit': 'profit',
+    'swap': 'swap',
+    'stop_loss': 'sl',
+    'take_profit': 'tp',
+}
+ACCOUNT_FIELDS = ('balance', 'equity', 'margin', 'free_margin', 'margin_level')
+
+_STOP = object()
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value) if value else datetime.utcnow()
+
+
+class AccountRef(NamedTuple):
+    id: int
+    user_id: int
+    challenge_id: Optional[int]
+
+
+class AccountDirectory:
+    """
+    In-memory MT5 login -> account map
+
+    Loaded with one query and refreshed periodically. Logins missing from
+    the map are looked up together once per flush; logins that do not exist
+    are remembered for UNKNOWN_LOGIN_TTL seconds. Only used from the writer
+    thread.
+    """
+
+    def __init__(self, refresh_interval=ACCOUNT_REFRESH_INTERVAL, unknown_ttl=UNKNOWN_LOGIN_TTL):
+        self.refresh_interval = refresh_interval
+        self.unknown_ttl = unknown_ttl
+        self._accounts: Dict[str, AccountRef] = {}
+        self._unknown: Dict[str, float] = {}
+        self._loaded_at = None
+
+    def __len__(self):
+        return len(self._accounts)
+
+    def load(self, session):
+        """Replace the map with every account in the database"""
+        rows = session.query(
+            MT5Account.mt5_login, MT5Account.id, MT5Account.user_id, MT5Account.challenge_id
+        ).all()
+        self._accounts = {str(login): AccountRef(*ref) for login, *ref in rows}
+        self._unknown.clear()
+        self._loaded_at = time.monotonic()
+        logger.info(f"Loaded {len(self._accounts)} MT5 accounts into the ingestion directory")
+
+    def resolve(self, session, logins):
+        """
+        Map logins to accounts
+
+        Returns:
+            Dict login -> AccountRef for the logins that exist
+        """
+        now = time.monotonic()
+        if self._loaded_at is None or now - self._loaded_at > self.refresh_interval:
+            self.load(session)
+
+        missing = [
+            login for login in logins
+            if login not in self._accounts and self._unknown.get(login, 0) <= now
+        ]
+        if missing:
+            rows = session.query(
+                MT5Account.mt5_login, MT5Account.id, MT5Account.user_id, MT5Account.challenge_id
+            ).filter(MT5Account.mt5_login.in_(missing)).all()
+            for login, *ref in rows:
+                self._accounts[str(login)] = AccountRef(*ref)
+            for login in missing:
+                if login not in self._accounts:
+                    self._unknown[login] = now + self.unknown_ttl
+
+        return {login: self._accounts[login] for login in logins if login in self._accounts}
+
+
+class IngestionBatch:
+    """
+    Messages collected during one flush window, coalesced
+
+    - deals: per ticket, the first message (opens the trade if it is new)
+      and the last later message (closes it)
+    - accounts: per login, the fields of all updates merged, latest wins
+    - positions: per ticket, ticks merged, latest wins; a close discards
+      the ticks before it
+    """
+
+    def __init__(self):
+        self.deals = {}
+        self.accounts = {}
+        self.positions = {}
+        self.messages = 0
+
+    def __len__(self):
+        return len(self.deals) + len(self.accounts) + len(self.positions)
+
+    @property
+    def coalesced(self):
+        """Messages absorbed into an earlier message of the same key"""
+        return self.messages - len(self)
+
+    def logins(self):
+        logins = {entry['login'] for entry in self.deals.values()}
+        logins.update(self.accounts)
+        logins.update(entry['login'] for entry in self.positions.values())
+        return logins
+
+    def add(self, stream, data):
+        self.messages += 1
+        login = str(data.get('login'))
+
+        if stream == 'deal':
+            entry = self.deals.get(data.get('ticket'))
+            if entry is None:
+                self.deals[data.get('ticket')] = {'login': login, 'first': data, 'close': None}
+            else:
+                entry['close'] = data
+
+        elif stream == 'account':
+            self.accounts.setdefault(login, {}).update(data)
+
+        elif stream == 'position':
+            ticket = data.get('ticket')
+            entry = self.positions.get(ticket)
+            if data.get('action') == 'close':
+                self.positions[ticket] = {'login': login, 'data': data, 'closed': True}
+            elif entry is None:
+                self.positions[ticket] = {'login': login, 'data': dict(data), 'closed': False}
+            elif not entry['closed']:
+                entry['data'].update(data)
+
+        else:
+            raise ValueError(f"Unknown MT5 stream: {stream}")
+
+
+class IngestionStats:
+    """Counters for the pipeline, updated from the event loop only"""
+
+    def __init__(self):
+        self.counters = Counter()
+        self.max_queue_depth = 0
+        self.blocked_seconds = 0.0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def snapshot(self, queue_depth=0, queue_size=0):
+        counters = dict(self.counters)
+        flushes = counters.get('flushes', 0)
+        return {
+            'received': {stream: counters.get(f'received_{stream}', 0) for stream in STREAMS},
+            'invalid_messages': counters.get('invalid', 0),
+            'queue_depth': queue_depth,
+            'queue_size': queue_size,
+            'max_queue_depth': self.max_queue_depth,
+            'blocked_puts': counters.get('blocked_puts', 0),
+            'blocked_seconds': round(self.blocked_seconds, 3),
+            'flushes': flushes,
+            'failed_flushes': counters.get('failed_flushes', 0),
+            'messages_flushed': counters.get('messages_flushed', 0),
+            'messages_coalesced': counters.get('messages_coalesced', 0),
+            'messages_dropped': counters.get('messages_dropped', 0),
+            'unknown_login_updates': counters.get('unknown_login_updates', 0),
+            'rows_written': counters.get('rows_written', 0),
+            'avg_batch_messages': round(counters.get('messages_flushed', 0) / flushes, 1) if flushes else 0,
+            'last_flush_ms': round(self.last_flush_ms, 2),
+            'max_flush_ms': round(self.max_flush_ms, 2),
+        }
+
+
+class MT5IngestionPipeline:
+    """
+    Bounded queue between the MT5 streams and the database
+
+    Producers call submit() from the event loop. One consumer task collects
+    messages for `flush_interval` seconds (or until `max_batch` are waiting),
+    then hands the coalesced batch to a single writer thread so the loop keeps
+    reading sockets while the batch is written. Socket.IO events are emitted
+    once per coalesced item after the commit.
+    """
+
+    def __init__(
+        self,
+        db_session,
+        emit: Optional[Callable] = None,
+        app=None,
+        on_challenge_activity: Optional[Callable] = None,
+        queue_size=DEFAULT_QUEUE_SIZE,
+        flush_interval=DEFAULT_FLUSH_INTERVAL,
+        max_batch=DEFAULT_MAX_BATCH,
+        directory: Optional[AccountDirectory] = None,
+    ):
+        """
+        Args:
+            db_session: SQLAlchemy session used by the writer thread
+            emit: socketio.emit-compatible callable (None disables events)
+            app: Flask app; when given each flush runs in its app context
+            on_challenge_activity: Coroutine function called with the
+                challenge ID of every account that received deals
+            queue_size: Maximum buffered messages before producers wait
+            flush_interval: Seconds to collect messages per flush
+            max_batch: Messages that trigger an early flush
+        """
+        self.db = db_session
+        self.emit = emit
+        self.app = app
+        self.on_challenge_activity = on_challenge_activity
+        self.queue_size = queue_size
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.directory = directory or AccountDirectory()
+        self.stats = IngestionStats()
+        self.queue: Optional[asyncio.Queue] = None
+        self._pressure: Optional[asyncio.Event] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._executor = None
+
+    @property
+    def running(self):
+        return self._consumer is not None and not self._consumer.done()
+
+    async def start(self):
+        """Create the queue and start the consumer (call from the event loop)"""
+        if self.running:
+            return
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._pressure = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mt5-ingest')
+        self._consumer = asyncio.create_task(self._consume())
+
+    async def stop(self):
+        """Flush what is buffered and stop the consumer"""
+        if not self.running:
+            return
+        await self.queue.put(_STOP)
+        self._pressure.set()
+        await self._consumer
+        self._executor.shutdown(wait=True)
+
+    async def submit(self, stream, message):
+        """
+        Queue one stream message
+
+        Args:
+            stream: 'deal', 'account' or 'position'
+            message: JSON string or already decoded dict
+
+        Returns:
+            False if the message could not be decoded
+        """
+        if stream not in STREAMS:
+            raise ValueError(f"Unknown MT5 stream: {stream}")
+        try:
+            data = json.loads(message) if isinstance(message, (str, bytes)) else message
+        except ValueError:
+            self.stats.counters['invalid'] += 1
+            return False
+        if not isinstance(data, dict):
+            self.stats.counters['invalid'] += 1
+            return False
+
+        self.stats.counters[f'received_{stream}'] += 1
+        if self.queue.full():
+            # Backpressure: wait for the writer instead of dropping messages
+            self.stats.counters['blocked_puts'] += 1
+            self._pressure.set()
+            started = time.monotonic()
+            await self.queue.put((stream, data))
+            self.stats.blocked_seconds += time.monotonic() - started
+        else:
+            self.queue.put_nowait((stream, data))
+
+        depth = self.queue.qsize()
+        if depth > self.stats.max_queue_depth:
+            self.stats.max_queue_depth = depth
+        if depth >= self.max_batch:
+            self._pressure.set()
+        return True
+
+    def get_stats(self):
+        depth = self.queue.qsize() if self.queue is not None else 0
+        return self.stats.snapshot(queue_depth=depth, queue_size=self.queue_size)
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if item is _STOP:
+                break
+
+            # Let the window fill, unless producers are already waiting
+            self._pressure.clear()
+            try:
+                await asyncio.wait_for(self._pressure.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+
+            batch = IngestionBatch()
+            batch.add(*item)
+            while batch.messages < self.max_batch:
+                try:
+                    item = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.add(*item)
+
+            await self._flush(loop, batch)
+
+    async def _flush(self, loop, batch):
+        started = time.monotonic()
+        try:
+            result = await loop.run_in_executor(self._executor, self.write_batch, batch)
+        except Exception as e:
+            # The periodic MT5 sync reconciles balances and trades that were lost here
+            self.stats.counters['failed_flushes'] += 1
+            self.stats.counters['messages_dropped'] += batch.messages
+            logger.error(f"Failed to write MT5 batch of {batch.messages} messages: {e}")
+            return
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        counters = self.stats.counters
+        counters['flushes'] += 1
+        counters['messages_flushed'] += batch.messages
+        counters['messages_coalesced'] += batch.coalesced
+        counters['rows_written'] += result['rows']
+        counters['unknown_login_updates'] += result['unknown']
+        self.stats.last_flush_ms = elapsed_ms
+        self.stats.max_flush_ms = max(self.stats.max_flush_ms, elapsed_ms)
+
+        if self.emit is not None:
+            for event, payload, room in result['events']:
+                try:
+                    self.emit(event, payload, room=room)
+                except Exception as e:
+                    logger.error(f"Failed to emit {event}: {e}")
+
+        if self.on_challenge_activity is not None:
+            for challenge_id in result['challenge_ids']:
+                await self.on_challenge_activity(challenge_id)
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def write_batch(self, batch):
+        """
+        Write one coalesced batch and commit
+
+        Returns:
+            Dict with rows written, messages for unknown logins, Socket.IO
+            events to emit and challenge IDs that received deals
+        """
+        with self.app.app_context() if self.app is not None else nullcontext():
+            session = self.db
+            try:
+                accounts = self.directory.resolve(session, batch.logins())
+                unknown = self._drop_unknown(batch, accounts)
+                now = datetime.utcnow()
+
+                rows = self._write_deals(session, batch, accounts, now)
+                rows += self._write_accounts(session, batch, accounts, now)
+                rows += self._write_positions(session, batch, accounts, now)
+                session.commit()
+
+                events = self._collect_events(session, batch, accounts) if self.emit is not None else []
+                challenge_ids = {
+                    accounts[entry['login']].challenge_id for entry in batch.deals.values()
+                } - {None}
+                return {'rows': rows, 'unknown': unknown, 'events': events, 'challenge_ids': challenge_ids}
+            except Exception:
+                session.rollback()
+                raise
+
+    @staticmethod
+    def _drop_unknown(batch, accounts):
+        """Remove items for logins with no account; returns how many were removed"""
+        unknown = 0
+        for items in (batch.deals, batch.positions):
+            for key in [key for key, entry in items.items() if entry['login'] not in accounts]:
+                del items[key]
+                unknown += 1
+        for login in [login for login in batch.accounts if login not in accounts]:
+            del batch.accounts[login]
+            unknown += 1
+        if unknown:
+            logger.debug(f"Skipped {unknown} MT5 updates for unknown accounts")
+        return unknown
+
+    @staticmethod
+    def _write_deals(session, batch, accounts, now):
+        if not batch.deals:
+            return 0
+        table = MT5Trade.__table__
+
+        # 1. New tickets open a trade; existing ones are left alone here
+        opened = []
+        for ticket, entry in batch.deals.items():
+            data = entry['first']
+            opened.append({
+                'mt5_account_id': accounts[entry['login']].id,
+                'ticket': ticket,
+                'symbol': data.get('symbol'),
+                'trade_type': data.get('type', 'buy').lower(),
+                'volume': data.get('volume', 0),
+                'open_price': data.get('price', 0),
+                'stop_loss': data.get('sl', 0),
+                'take_profit': data.get('tp', 0),
+                'open_time': _parse_time(data.get('time')),
+                'status': 'open',
+                'created_at': now,
+                'updated_at': now,
+            })
+        inserted = set()
+        for i in range(0, len(opened), INSERT_CHUNK_SIZE):
+            stmt = insert(table).values(opened[i:i + INSERT_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_nothing(index_elements=['ticket']).returning(table.c.ticket)
+            inserted.update(session.execute(stmt).scalars())
+
+        # 2. A deal for an existing trade, or a later deal in the window, closes it
+        already_closed = set(session.execute(
+            select(table.c.ticket).where(
+                table.c.ticket.in_([t for t in batch.deals if t not in inserted]),
+                table.c.status == 'closed',
+            )
+        ).scalars()) if len(inserted) < len(batch.deals) else set()
+        closed = []
+        stats = {}
+        for ticket, entry in batch.deals.items():
+            data = entry['close'] if ticket in inserted else (entry['close'] or entry['first'])
+            if data is None:
+                continue
+            closed.append({
+                'b_ticket': ticket,
+                'b_close_price': data.get('close_price', data.get('price')),
+                'b_close_time': _parse_time(data.get('close_time')),
+                'b_profit': data.get('profit', 0),
+                'b_commission': data.get('commission', 0),
+                'b_swap': data.get('swap', 0),
+            })
+            challenge_id = accounts[entry['login']].challenge_id
+            if challenge_id is not None and ticket not in already_closed:
+                stats.setdefault(challenge_id, []).append(closed[-1])
+        if closed:
+            session.execute(
+                table.update().where(table.c.ticket == bindparam('b_ticket')).values(
+                    close_price=bindparam('b_close_price'),
+                    close_time=bindparam('b_close_time'),
+                    profit=bindparam('b_profit'),
+                    commission=bindparam('b_commission'),
+                    swap=bindparam('b_swap'),
+                    status='closed',
+                    updated_at=now,
+                ),
+                closed
+            )
+
+        # 3. First closes feed the per-challenge statistics in the same transaction
+        if stats:
+            deltas = {}
+            for challenge_id, closes in stats.items():
+                delta = deltas[challenge_id] = TradeStatsDelta()
+                for close in sorted(closes, key=lambda c: c['b_close_time']):
+                    delta.add(close['b_profit'] or 0, close['b_close_time'])
+            ChallengeTradeStats.apply(session, deltas)
+        return len(inserted) + len(closed)
+
+    @staticmethod
+    def _write_accounts(session, batch, accounts, now):
+        if not batch.accounts:
+            return 0
+        table = MT5Account.__table__
+        params = [
+            {
+                'b_id': accounts[login].id,
+                'b_updated_at': now,
+                **{f'b_{field}': data.get(field) for field in ACCOUNT_FIELDS},
+            }
+            for login, data in batch.accounts.items()
+        ]
+        # Fields missing from the merged update keep their stored value
+        session.execute(
+            table.update().where(table.c.id == bindparam('b_id')).values(
+                updated_at=bindparam('b_updated_at'),
+                **{
+                    field: func.coalesce(bindparam(f'b_{field}'), table.c[field])
+                    for field in ACCOUNT_FIELDS
+                }
+            ),
+            params
+        )
+        return len(params)
+
+    @staticmethod
+    def _write_positions(session, batch, accounts, now):
+        if not batch.positions:
+            return 0
+        table = MT5Position.__table__
+
+        closed = [ticket for ticket, entry in batch.positions.items() if entry['closed']]
+        if closed:
+            session.execute(table.delete().where(table.c.ticket.in_(closed)))
+
+        rows = []
+        for ticket, entry in batch.positions.items():
+            if entry['closed']:
+                continue
+            data = entry['data']
+            row = {
+                'mt5_account_id': accounts[entry['login']].id,
+                'ticket': ticket,
+                'symbol': data.get('symbol'),
+                'position_type': data.get('type', 'buy').lower(),
+                'volume': data.get('volume', 0),
+                'price_open': data.get('price_open', 0),
+                'commission': data.get('commission', 0),
+                'open_time': _parse_time(data.get('time')),
+                'updated_at': now,
+            }
+            row.update({column: data.get(key) for column, key in POSITION_TICK_FIELDS.items()})
+            rows.append(row)
+
+        for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+            stmt = insert(table).values(rows[i:i + INSERT_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['ticket'],
+                set_={
+                    'updated_at': stmt.excluded.updated_at,
+                    **{
+                        column: func.coalesce(stmt.excluded[column], table.c[column])
+                        for column in POSITION_TICK_FIELDS
+                    }
+                }
+            )
+            session.execute(stmt)
+        return len(closed) + len(rows)
+
+    @staticmethod
+    def _collect_events(session, batch, accounts):
+        """Socket.IO events for everything the batch changed, one query per table"""
+        by_account_id = {ref.id: ref for ref in accounts.values()}
+        events = []
+
+        if batch.deals:
+            trades = session.query(MT5Trade).filter(MT5Trade.ticket.in_(list(batch.deals))).all()
+            for trade in trades:
+                user_id = by_account_id[trade.mt5_account_id].user_id
+                events.append(('trade_update', {'user_id': user_id, 'trade': trade.to_dict()}, user_room(user_id)))
+
+        if batch.accounts:
+            ids = [accounts[login].id for login in batch.accounts]
+            for account in session.query(MT5Account).filter(MT5Account.id.in_(ids)).all():
+                events.append((
+                    'account_update',
+                    {'user_id': account.user_id, 'account': account.to_dict()},
+                    user_room(account.user_id)
+                ))
+
+        if batch.positions:
+            open_tickets = [ticket for ticket, entry in batch.positions.items() if not entry['closed']]
+            positions = session.query(MT5Position).filter(MT5Position.ticket.in_(open_tickets)).all() if open_tickets else []
+            for position in positions:
+                user_id = by_account_id[position.mt5_account_id].user_id
+                events.append(('position_update', {'user_id': user_id, 'position': position.to_dict()}, user_room(user_id)))
+            for ticket, entry in batch.positions.items():
+                if entry['closed']:
+                    user_id = accounts[entry['login']].user_id
+                    events.append((
+                        'position_update',
+                        {'user_id': user_id, 'position': {'ticket': ticket, 'action': 'closed'}},
+                        user_room(user_id)
+                    ))
+
+        session.expunge_all()
+        return events
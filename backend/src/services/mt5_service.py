@@ -5,6 +5,7 @@ Synchronous version for compatibility with existing routes
 import os
 import requests
 import logging
+import threading
 import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
@@ -12,6 +13,11 @@ from functools import wraps
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from src.services.mt5_broker import PRIORITY_INTERACTIVE, SharedRateBudget
+from src.services.mt5_broker import token_broker as shared_token_broker
+from src.services.mt5_broker import TokenBucket  # noqa: F401 - imported from here by callers
+from src.utils.instrumentation import mt5_response_hook
+
 logger = logging.getLogger(__name__)
 
 
@@ -110,13 +116,23 @@ def retry_on_failure(max_retries=3, delay=1, backoff=2):
 class MT5Service:
     """Improved Service for interacting with MT5 API"""
     
-    def __init__(self):
+    def __init__(self, rate_limiter=None, pool_maxsize=20, priority=None, token_broker=None):
+        """
+        Args:
+            rate_limiter: Request budget (default: the cluster-wide MT5 budget)
+            pool_maxsize: HTTP connections kept per host
+            priority: 'interactive' (user requests) or 'background' (sync and
+                monitoring) share of the default budget
+            token_broker: Source of the JWT (default: the cluster-wide token)
+        """
         self.api_url = os.getenv('MT5_API_URL', "http://57.129.52.174:6710")
         self.username = os.getenv('MT5_USERNAME', "backofficeApi")
         self.password = os.getenv('MT5_PASSWORD', "Trade@2022")
         self.token = None
         self.token_expires_at = None
-        self.rate_limiter = RateLimiter(max_requests=10, time_window=1.0)
+        self.rate_limiter = rate_limiter or SharedRateBudget(priority=priority or PRIORITY_INTERACTIVE)
+        self.token_broker = token_broker or shared_token_broker
+        self._auth_lock = threading.Lock()
         
         # Setup session with connection pooling and retries
         self.session = requests.Session()
@@ -126,20 +142,33 @@ class MT5Service:
             allowed_methods=["HEAD", "GET", "OPTIONS", "POST"],
             backoff_factor=1
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=10, pool_maxsize=20)
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=10, pool_maxsize=pool_maxsize)
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
+        self.session.hooks['response'].append(mt5_response_hook)
     
     @retry_on_failure(max_retries=3, delay=1, backoff=2)
     def authenticate(self) -> str:
         """
         Get JWT token from MT5 API with retry logic
-        Token expires in 2 minutes, refresh 30 seconds before expiration
+        The token is shared by all workers through the token broker and kept
+        here until it expires there
         """
         # Check if token is still valid
         if self.token and self.token_expires_at and datetime.now() < self.token_expires_at:
             return self.token
         
+        # Concurrent callers share one lookup
+        with self._auth_lock:
+            if self.token and self.token_expires_at and datetime.now() < self.token_expires_at:
+                return self.token
+            token, expires_in = self.token_broker.get_token(self._request_token)
+            self.token = token
+            self.token_expires_at = datetime.now() + timedelta(seconds=expires_in)
+            return self.token
+    
+    def _request_token(self) -> str:
+        """Request a fresh JWT token from the MT5 API"""
         self.rate_limiter.wait_if_needed()
         
         try:
@@ -157,16 +186,13 @@ class MT5Service:
             response.raise_for_status()
             
             data = response.json()
-            self.token = data.get('token')
+            token = data.get('token')
             
-            if not self.token:
+            if not token:
                 raise MT5AuthenticationError("No token received from API")
             
-            # Token expires in 2 minutes, refresh 30 seconds before
-            self.token_expires_at = datetime.now() + timedelta(seconds=90)
-            
             logger.info("MT5 API authentication successful")
-            return self.token
+            return token
             
         except requests.exceptions.Timeout:
             logger.error("MT5 authentication timeout")
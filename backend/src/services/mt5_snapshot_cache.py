@@ -0,0 +1,202 @@
+"""
+MT5 Snapshot Cache
+Latest MT5 account snapshot per login, with the time it was fetched, shared
+by every reader of live account data (admin challenge list, /mt5/accounts,
+the monitoring API) and written by everything that fetches it (the sync
+engine, per-challenge syncs, on-demand refreshes).
+
+Readers never call MT5. They render whatever snapshot exists, falling back
+to the balances stored on the MT5Account row, and report its age. Snapshots
+older than FRESH_SECONDS are refreshed in the background: one task per
+request fetches all of them concurrently, and a short per-login claim keeps
+concurrent page loads from queueing the same login twice.
+"""
+from datetime import datetime
+import json
+import logging
+import time
+
+from src.database import get_redis
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = 'mt5:snapshot:{login}'
+REFRESH_CLAIM_KEY = 'mt5:snapshot:refreshing:{login}'
+# Snapshots younger than this are served without a refresh (one sync cycle)
+FRESH_SECONDS = 30
+# Snapshots are kept this long; staleness is judged by age, not expiry
+SNAPSHOT_TTL = 86400
+# Seconds a login stays claimed by a queued refresh
+REFRESH_CLAIM_SECONDS = 60
+
+# MT5 getAccount fields kept in a snapshot
+SNAPSHOT_FIELDS = ('balance', 'equity', 'margin', 'freeMargin', 'marginLevel', 'commission', 'swap')
+
+
+def _float(value):
+    return float(value) if value is not None else None
+
+
+def snapshot_from_mt5(mt5_data, fetched_at=None):
+    """Snapshot dict from an MT5 getAccount response"""
+    snapshot = {field: _float(mt5_data.get(field)) for field in SNAPSHOT_FIELDS if field in mt5_data}
+    snapshot['fetched_at'] = fetched_at if fetched_at is not None else time.time()
+    return snapshot
+
+
+def snapshot_from_account(account):
+    """Snapshot dict from the balances stored on an MT5Account row"""
+    return {
+        'balance': _float(account.balance),
+        'equity': _float(account.equity),
+        'margin': _float(account.margin),
+        'freeMargin': _float(account.free_margin),
+        'marginLevel': _float(account.margin_level),
+        'fetched_at': (account.updated_at - datetime(1970, 1, 1)).total_seconds() if account.updated_at else None,
+        'source': 'database',
+    }
+
+
+def apply_snapshot_to_account(account, mt5_data, now=None):
+    """Copy MT5 getAccount balances onto an MT5Account row (no commit)"""
+    account.balance = mt5_data.get('balance', account.balance)
+    account.equity = mt5_data.get('equity', account.equity)
+    account.margin = mt5_data.get('margin', account.margin)
+    account.free_margin = mt5_data.get('freeMargin', account.free_margin)
+    account.margin_level = mt5_data.get('marginLevel', account.margin_level)
+    account.updated_at = now or datetime.utcnow()
+
+
+def freshness(snapshot, now=None):
+    """Age fields for API responses"""
+    fetched_at = snapshot.get('fetched_at') if snapshot else None
+    if fetched_at is None:
+        return {'fetched_at': None, 'data_age_seconds': None, 'stale': True}
+    age = max(0.0, (now if now is not None else time.time()) - fetched_at)
+    return {
+        'fetched_at': datetime.utcfromtimestamp(fetched_at).isoformat(),
+        'data_age_seconds': round(age, 1),
+        'stale': age > FRESH_SECONDS,
+    }
+
+
+class MT5SnapshotCache:
+    """Redis-backed MT5 account snapshots"""
+
+    @staticmethod
+    def get_many(logins):
+        """
+        Cached snapshots
+
+        Returns:
+            Dict login -> snapshot dict, for logins that have one
+        """
+        logins = [str(login) for login in dict.fromkeys(logins) if login]
+        redis_client = get_redis()
+        if not redis_client or not logins:
+            return {}
+        try:
+            values = redis_client.mget([SNAPSHOT_KEY.format(login=login) for login in logins])
+        except Exception as e:
+            logger.error(f"MT5 snapshot cache read failed: {str(e)}")
+            return {}
+        snapshots = {}
+        for login, value in zip(logins, values):
+            if value:
+                try:
+                    snapshots[login] = json.loads(value)
+                except ValueError:
+                    pass
+        return snapshots
+
+    @staticmethod
+    def put_many(mt5_data_by_login, fetched_at=None):
+        """Store fresh MT5 responses (login -> getAccount dict)"""
+        redis_client = get_redis()
+        if not redis_client or not mt5_data_by_login:
+            return
+        fetched_at = fetched_at if fetched_at is not None else time.time()
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for login, mt5_data in mt5_data_by_login.items():
+                snapshot = snapshot_from_mt5(mt5_data, fetched_at)
+                pipe.set(SNAPSHOT_KEY.format(login=login), json.dumps(snapshot), ex=SNAPSHOT_TTL)
+                pipe.delete(REFRESH_CLAIM_KEY.format(login=login))
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"MT5 snapshot cache write failed: {str(e)}")
+
+    @staticmethod
+    def put(login, mt5_data):
+        MT5SnapshotCache.put_many({str(login): mt5_data})
+
+    @staticmethod
+    def claim_refresh(logins):
+        """
+        Claim logins for a background refresh
+
+        Returns:
+            Logins not already claimed by another queued refresh
+        """
+        logins = [str(login) for login in dict.fromkeys(logins) if login]
+        redis_client = get_redis()
+        if not redis_client:
+            return logins
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for login in logins:
+                pipe.set(REFRESH_CLAIM_KEY.format(login=login), '1', nx=True, ex=REFRESH_CLAIM_SECONDS)
+            return [login for login, claimed in zip(logins, pipe.execute()) if claimed]
+        except Exception as e:
+            logger.error(f"MT5 snapshot refresh claim failed: {str(e)}")
+            return []
+
+    @staticmethod
+    def release_refresh(logins):
+        redis_client = get_redis()
+        if not redis_client or not logins:
+            return
+        try:
+            redis_client.delete(*[REFRESH_CLAIM_KEY.format(login=login) for login in logins])
+        except Exception as e:
+            logger.error(f"MT5 snapshot refresh release failed: {str(e)}")
+
+    @staticmethod
+    def snapshots_for(accounts, refresh=True, now=None):
+        """
+        Current snapshot of each account, queueing one refresh for stale ones
+
+        Args:
+            accounts: MT5Account rows
+            refresh: Queue a background refresh of stale active accounts
+
+        Returns:
+            Tuple (dict login -> snapshot with freshness fields, number of
+            logins queued for refresh)
+        """
+        now = now if now is not None else time.time()
+        cached = MT5SnapshotCache.get_many(account.mt5_login for account in accounts)
+
+        snapshots = {}
+        stale = []
+        for account in accounts:
+            login = str(account.mt5_login)
+            snapshot = cached.get(login) or snapshot_from_account(account)
+            snapshot.setdefault('source', 'cache')
+            snapshot.update(freshness(snapshot, now))
+            snapshots[login] = snapshot
+            if snapshot['stale'] and account.status == 'active':
+                stale.append(login)
+
+        queued = 0
+        if refresh and stale:
+            claimed = MT5SnapshotCache.claim_refresh(stale)
+            if claimed:
+                from src.tasks.mt5_tasks import refresh_mt5_snapshots
+                try:
+                    refresh_mt5_snapshots.delay(claimed)
+                    queued = len(claimed)
+                except Exception as e:
+                    logger.error(f"Could not queue MT5 snapshot refresh: {str(e)}")
+                    MT5SnapshotCache.release_refresh(claimed)
+        return snapshots, queued
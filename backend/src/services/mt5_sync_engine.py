@@ -0,0 +1,333 @@
+"""
+Batched MT5 Account Sync Engine
+Concurrent account fetching with a shared rate budget and one commit per batch
+"""
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy.orm import joinedload
+
+from src.database import db, get_redis
+from src.models.trading_program import Challenge
+from src.models.mt5_models import MT5Account
+from src.models.monitoring_models import MonitoringEvent
+from src.models.challenge_drawdown import ChallengeDailyDrawdown
+from src.services.mt5_broker import PRIORITY_BACKGROUND, SharedRateBudget
+from src.services.mt5_service import MT5Service
+from src.services.mt5_snapshot_cache import MT5SnapshotCache
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('active', 'in_progress')
+
+# Redis keys
+CYCLE_LOCK_KEY = 'mt5_sync:cycle_lock'
+LAST_CYCLE_KEY = 'mt5_sync:last_cycle'
+
+# Deletes the cycle lock only if ARGV[1] still owns it
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def apply_account_snapshot(challenge, mt5_data, persist=True):
+    """
+    Apply an MT5 account snapshot to a challenge (no commit)
+
+    Args:
+        challenge: Challenge instance (program should be loaded)
+        mt5_data: Dict returned by MT5Service.get_account_info
+        persist: Upsert today's drawdown row now (False when the caller
+            writes a whole batch with ChallengeDailyDrawdown.upsert_many)
+
+    Returns:
+        Dict with balance, equity, open_pnl and daily_stats
+    """
+    balance = float(mt5_data.get('balance', 0))
+    equity = float(mt5_data.get('equity', 0))
+    open_pnl = equity - balance
+
+    # Get commissions and swaps
+    commissions = float(mt5_data.get('commission', 0))
+    swaps = float(mt5_data.get('swap', 0))
+
+    challenge.current_balance = balance
+    challenge.current_equity = equity
+
+    day_data = challenge.update_daily_drawdown(
+        current_balance=balance,
+        current_equity=equity,
+        open_pnl=open_pnl,
+        commissions=commissions,
+        swaps=swaps,
+        persist=persist
+    )
+
+    # Update total profit/loss
+    if challenge.initial_balance:
+        total_pnl = equity - float(challenge.initial_balance)
+        if total_pnl >= 0:
+            challenge.total_profit = total_pnl
+            challenge.total_loss = 0
+        else:
+            challenge.total_profit = 0
+            challenge.total_loss = abs(total_pnl)
+
+    return {
+        'balance': balance,
+        'equity': equity,
+        'open_pnl': open_pnl,
+        'daily_stats': day_data
+    }
+
+
+def _percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class MT5SyncEngine:
+    """
+    Sync all active challenges against MT5 in concurrent batches
+
+    Active challenges are sharded into batches of `batch_size`. For each batch
+    the challenges, programs and MT5 accounts are loaded in one query, the
+    accounts are fetched concurrently over the pooled HTTP session (all workers
+    draw from the cluster-wide MT5 budget at background priority, so the
+    combined rate stays within the MT5 API limit and user requests go
+    first), and every update for the batch is written in a single commit.
+    """
+
+    def __init__(self, mt5_service=None, batch_size=200, max_workers=16, interval=30.0):
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.interval = interval
+        self.rate_budget = SharedRateBudget(priority=PRIORITY_BACKGROUND)
+
+        if mt5_service is None:
+            mt5_service = MT5Service(rate_limiter=self.rate_budget, pool_maxsize=max_workers)
+        else:
+            mt5_service.rate_limiter = self.rate_budget
+        self.mt5_service = mt5_service
+        self.last_metrics = None
+
+    def get_active_challenge_ids(self) -> List[int]:
+        """IDs of active challenges that have an MT5 account"""
+        rows = db.session.query(Challenge.id).join(
+            MT5Account, MT5Account.challenge_id == Challenge.id
+        ).filter(
+            Challenge.status.in_(ACTIVE_STATUSES)
+        ).order_by(Challenge.id).all()
+        return [row[0] for row in rows]
+
+    def _fetch_one(self, mt5_login):
+        started = time.monotonic()
+        try:
+            data = self.mt5_service.get_account_info(mt5_login)
+            return mt5_login, data, None, time.monotonic() - started
+        except Exception as e:
+            return mt5_login, None, str(e), time.monotonic() - started
+
+    def fetch_accounts(self, mt5_logins) -> Dict[str, tuple]:
+        """
+        Fetch account info for many logins concurrently
+
+        Returns:
+            Dict of login -> (data, error, latency_seconds)
+        """
+        if not mt5_logins:
+            return {}
+
+        # Authenticate once up front so workers don't race for a token
+        self.mt5_service.authenticate()
+
+        workers = min(self.max_workers, len(mt5_logins))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(self._fetch_one, mt5_logins)
+            return {login: (data, error, latency) for login, data, error, latency in results}
+
+    def sync_batch(self, challenge_ids, metrics, on_snapshot=None):
+        """
+        Sync one batch of challenges and commit once
+
+        Args:
+            on_snapshot: Optional callback receiving (challenge_id, snapshot)
+                for each synced challenge after the commit
+        """
+        rows = db.session.query(Challenge, MT5Account).join(
+            MT5Account, MT5Account.challenge_id == Challenge.id
+        ).options(
+            joinedload(Challenge.program)
+        ).filter(
+            Challenge.id.in_(challenge_ids),
+            Challenge.status.in_(ACTIVE_STATUSES)
+        ).all()
+
+        now = datetime.utcnow()
+        for _, account in rows:
+            if account.updated_at:
+                lag = (now - account.updated_at).total_seconds()
+                metrics['max_data_age_seconds'] = max(metrics['max_data_age_seconds'], lag)
+
+        fetched = self.fetch_accounts([account.mt5_login for _, account in rows])
+        # Readers (admin lists, account pages) render from these snapshots
+        MT5SnapshotCache.put_many({login: data for login, (data, error, _) in fetched.items() if data and not error})
+
+        # Today's drawdown rows for the whole batch in one query
+        days = {challenge.id: challenge.get_current_date() for challenge, _ in rows}
+        ChallengeDailyDrawdown.prime_cache(days.items())
+
+        events = []
+        drawdown_rows = []
+        synced = []
+        for challenge, account in rows:
+            data, error, latency = fetched.get(account.mt5_login, (None, 'not fetched', 0))
+            metrics['fetch_latencies'].append(latency)
+
+            if error or not data:
+                logger.error(f"Error syncing challenge {challenge.id}: {error or 'Failed to fetch MT5 data'}")
+                metrics['errors'] += 1
+                continue
+
+            try:
+                snapshot = apply_account_snapshot(challenge, data, persist=False)
+            except Exception as e:
+                logger.error(f"Error applying MT5 data to challenge {challenge.id}: {str(e)}")
+                metrics['errors'] += 1
+                continue
+
+            account.balance = snapshot['balance']
+            account.equity = snapshot['equity']
+            account.updated_at = now
+
+            events.append(MonitoringEvent(
+                challenge_id=challenge.id,
+                event_type='sync',
+                event_data=snapshot
+            ))
+            drawdown_rows.append((challenge.id, days[challenge.id], snapshot['daily_stats']))
+            synced.append((challenge.id, snapshot))
+
+        ChallengeDailyDrawdown.upsert_many(drawdown_rows)
+        db.session.add_all(events)
+        db.session.commit()
+
+        if on_snapshot:
+            for challenge_id, snapshot in synced:
+                on_snapshot(challenge_id, snapshot)
+
+        metrics['synced'] += len(synced)
+        metrics['batches'] += 1
+        return [challenge_id for challenge_id, _ in synced]
+
+    def _acquire_cycle_lock(self):
+        """Owner token of the cycle lock, or None if another cycle holds it"""
+        owner = uuid.uuid4().hex
+        redis_client = get_redis()
+        if not redis_client:
+            return owner
+        try:
+            if redis_client.set(CYCLE_LOCK_KEY, owner, nx=True, ex=int(self.interval * 4)):
+                return owner
+            return None
+        except Exception as e:
+            logger.warning(f"MT5 sync lock unavailable: {e}")
+            return owner
+
+    def _release_cycle_lock(self, owner):
+        """Release the lock only if it is still ours (it may have expired and been taken)"""
+        redis_client = get_redis()
+        if redis_client:
+            try:
+                redis_client.eval(_RELEASE_SCRIPT, 1, CYCLE_LOCK_KEY, owner)
+            except Exception as e:
+                logger.warning(f"MT5 sync lock release failed: {e}")
+
+    def _publish_metrics(self, result):
+        redis_client = get_redis()
+        if redis_client:
+            try:
+                redis_client.set(LAST_CYCLE_KEY, json.dumps(result))
+            except Exception as e:
+                logger.warning(f"Could not publish MT5 sync metrics: {e}")
+
+    def run_cycle(self, on_synced=None, on_snapshot=None):
+        """
+        Run one full sync cycle
+
+        Args:
+            on_synced: Optional callback receiving the list of synced challenge
+                IDs after each batch commit (e.g. to queue violation checks)
+            on_snapshot: Optional callback receiving (challenge_id, snapshot)
+                for each synced challenge after each batch commit
+
+        Returns:
+            Dict with per-cycle counts, throughput and lag metrics
+        """
+        owner = self._acquire_cycle_lock()
+        if owner is None:
+            logger.warning("Previous MT5 sync cycle still running, skipping")
+            return {'skipped': True, 'reason': 'previous cycle still running'}
+
+        started = time.monotonic()
+        metrics = {
+            'synced': 0,
+            'errors': 0,
+            'batches': 0,
+            'fetch_latencies': [],
+            'max_data_age_seconds': 0.0
+        }
+        challenge_ids = []
+
+        try:
+            challenge_ids = self.get_active_challenge_ids()
+            logger.info(f"Syncing {len(challenge_ids)} active challenges in batches of {self.batch_size}")
+
+            for i in range(0, len(challenge_ids), self.batch_size):
+                batch = challenge_ids[i:i + self.batch_size]
+                try:
+                    synced_ids = self.sync_batch(batch, metrics, on_snapshot=on_snapshot)
+                    if on_synced and synced_ids:
+                        on_synced(synced_ids)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Error syncing batch starting at challenge {batch[0]}: {str(e)}")
+                    metrics['errors'] += len(batch)
+        finally:
+            self._release_cycle_lock(owner)
+
+        duration = time.monotonic() - started
+        latencies = metrics.pop('fetch_latencies')
+        result = {
+            'total': len(challenge_ids),
+            'synced': metrics['synced'],
+            'errors': metrics['errors'],
+            'batches': metrics['batches'],
+            'duration_seconds': round(duration, 3),
+            'throughput_per_second': round(metrics['synced'] / duration, 2) if duration > 0 else 0,
+            'fetch_latency_p50': round(_percentile(latencies, 50), 3),
+            'fetch_latency_p95': round(_percentile(latencies, 95), 3),
+            'max_data_age_seconds': round(metrics['max_data_age_seconds'], 1),
+            'cycle_lag_seconds': round(max(0.0, duration - self.interval), 3),
+            'finished_at': datetime.utcnow().isoformat()
+        }
+
+        self.last_metrics = result
+        self._publish_metrics(result)
+        logger.info(
+            f"Sync completed: {result['synced']} success, {result['errors']} errors, "
+            f"{result['throughput_per_second']}/s, {result['duration_seconds']}s"
+        )
+        return result
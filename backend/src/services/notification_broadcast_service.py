@@ -0,0 +1,125 @@
+"""
+Notification Broadcast Service
+Creates a notification for every targeted user with chunked
+INSERT ... SELECT statements over users joined with their notification
+preferences, so a platform-wide broadcast never loads users or builds ORM
+objects. Cached unread counters are bumped per chunk; clients learn about
+the broadcast from one Socket.IO room event.
+"""
+from datetime import datetime
+import logging
+
+from sqlalchemy import and_, func, insert, literal, null, or_, select
+
+from src.database import db
+from src.models.notification import Notification, NotificationPreference
+from src.models.user import User
+from src.services.unread_count_service import UnreadCountService
+from src.utils.realtime import BROADCAST_ROOM, emit_to_room, role_room
+
+logger = logging.getLogger(__name__)
+
+# Users per INSERT ... SELECT (one commit each)
+CHUNK_SIZE = 5000
+
+BROADCAST_EVENT = 'notification:broadcast'
+
+
+def _preference_column(notification_type):
+    """in_app_<type> preference column, or None for types without one"""
+    return getattr(NotificationPreference, f'in_app_{notification_type}', None)
+
+
+def recipients_query(notification_type, role=None):
+    """
+    SELECT of the IDs of active users who accept in-app notifications of
+    this type; users without a preferences row get the default (on)
+    """
+    query = select(User.id).where(User.is_active.is_(True))
+    if role:
+        query = query.where(User.role == role)
+
+    column = _preference_column(notification_type)
+    if column is not None:
+        query = query.outerjoin(
+            NotificationPreference, NotificationPreference.user_id == User.id
+        ).where(or_(NotificationPreference.id.is_(None), func.coalesce(column, True).is_(True)))
+    return query
+
+
+class NotificationBroadcastService:
+    """Set-based bulk notifications"""
+
+    @staticmethod
+    def count_recipients(notification_type, role=None):
+        query = recipients_query(notification_type, role).subquery()
+        return db.session.execute(select(func.count()).select_from(query)).scalar()
+
+    @staticmethod
+    def broadcast(notification_type, title, message, data=None, priority='normal', role=None,
+                  chunk_size=CHUNK_SIZE, after_user_id=0, progress=None):
+        """
+        Insert the notification for every recipient, one user-ID range per chunk
+
+        Args:
+            notification_type, title, message, data, priority: Notification fields
+            role: Only users with this role (default: everyone)
+            chunk_size: Users per statement
+            after_user_id: Resume after this user ID (from a previous run's progress)
+            progress: Callable(dict) invoked after every committed chunk
+
+        Returns:
+            Dict with 'total' recipients, 'created' notifications and
+            'last_user_id' (the resume point)
+        """
+        total = NotificationBroadcastService.count_recipients(notification_type, role)
+        now = datetime.utcnow()
+        state = {'total': total, 'created': 0, 'last_user_id': after_user_id}
+
+        recipients = recipients_query(notification_type, role)
+        table = Notification.__table__
+        columns = ['user_id', 'type', 'title', 'message', 'data', 'priority',
+                   'is_read', 'is_deleted', 'created_at', 'updated_at']
+
+        while True:
+            # Upper bound of the next chunk: the chunk_size-th recipient ID
+            bounds = recipients.where(User.id > state['last_user_id']).order_by(User.id).limit(chunk_size).subquery()
+            upper = db.session.execute(select(func.max(bounds.c.id))).scalar()
+            if upper is None:
+                break
+
+            chunk = recipients.where(and_(User.id > state['last_user_id'], User.id <= upper)).with_only_columns(
+                User.id,
+                literal(notification_type),
+                literal(title),
+                literal(message),
+                literal(data, type_=table.c.data.type) if data is not None else null(),
+                literal(priority),
+                literal(False),
+                literal(False),
+                literal(now),
+                literal(now),
+            )
+            user_ids = db.session.execute(
+                insert(table).from_select(columns, chunk).returning(table.c.user_id)
+            ).scalars().all()
+            db.session.commit()
+            UnreadCountService.increment(user_ids, notification_type)
+
+            state['created'] += len(user_ids)
+            state['last_user_id'] = upper
+            if progress:
+                progress(dict(state))
+
+        payload = {
+            'type': notification_type,
+            'title': title,
+            'message': message,
+            'data': data,
+            'priority': priority,
+            'created_at': now.isoformat(),
+        }
+        emit_to_room(BROADCAST_EVENT, payload, role_room(role) if role else BROADCAST_ROOM)
+
+        logger.info(f"Broadcast '{title}' created {state['created']} notifications")
+        return state
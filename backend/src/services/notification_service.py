@@ -10,6 +10,11 @@ from datetime import datetime
 from flask_mail import Mail, Message
 from twilio.rest import Client
 
+from src.database import db
+from src.models.notification import Notification
+from src.services.unread_count_service import UnreadCountService
+from src.utils.session_hooks import collect
+
 logger = logging.getLogger(__name__)
 
 
@@ -262,7 +267,7 @@ Time: {datetime.utcnow().isoformat()}
             return False
     
     @staticmethod
-    def create_notification(user_id, notification_type, title, message, metadata=None):
+    def create_notification(user_id, notification_type, title, message, data=None, priority='normal', metadata=None):
         """Create a notification for a user
         
         Args:
@@ -270,21 +275,21 @@ Time: {datetime.utcnow().isoformat()}
             notification_type: Type of notification (commission, payment, withdrawal, etc.)
             title: Notification title
             message: Notification message
-            metadata: Optional JSON metadata
+            data: Optional JSON data
+            priority: low, normal, high or urgent
+            metadata: Deprecated alias for data
             
         Returns:
             Notification object if created, None otherwise
         """
         try:
-            from src.models import Notification
-            from src.database import db
-            
             notification = Notification(
                 user_id=user_id,
-                notification_type=notification_type,
+                type=notification_type,
                 title=title,
                 message=message,
-                metadata=metadata
+                data=data if data is not None else metadata,
+                priority=priority
             )
             
             db.session.add(notification)
@@ -298,6 +303,55 @@ Time: {datetime.utcnow().isoformat()}
             db.session.rollback()
             return None
     
+    @staticmethod
+    def get_user_notifications(user_id, filters=None, page=1, per_page=50):
+        """Paginated notifications of a user"""
+        return Notification.get_user_notifications(user_id, filters=filters, page=page, per_page=per_page)
+    
+    @staticmethod
+    def get_unread_count(user_id):
+        """Unread notification count, served from the counter cache"""
+        return UnreadCountService.get_count(user_id)
+    
+    @staticmethod
+    def get_unread_counts(user_id):
+        """Unread counts: {'total': n, <type>: n, ...}"""
+        return UnreadCountService.get(user_id)
+    
+    @staticmethod
+    def _get_own(notification_id, user_id):
+        notification = Notification.query.filter_by(
+            id=notification_id, user_id=user_id, is_deleted=False
+        ).first()
+        if not notification:
+            raise ValueError('Notification not found')
+        return notification
+    
+    @staticmethod
+    def mark_as_read(notification_id, user_id):
+        """Mark one of the user's notifications as read"""
+        notification = NotificationService._get_own(notification_id, user_id)
+        notification.mark_as_read()
+        return notification
+    
+    @staticmethod
+    def mark_all_as_read(user_id):
+        """Mark all of the user's notifications as read; returns how many changed"""
+        count = Notification.query.filter_by(
+            user_id=user_id, is_read=False, is_deleted=False
+        ).update({'is_read': True, 'read_at': datetime.utcnow()}, synchronize_session=False)
+        # Bulk UPDATE bypasses the mapper hooks: reset the counter on commit
+        collect(db.session, 'unread_resets').add(user_id)
+        db.session.commit()
+        return count
+    
+    @staticmethod
+    def delete_notification(notification_id, user_id):
+        """Soft delete one of the user's notifications"""
+        notification = NotificationService._get_own(notification_id, user_id)
+        notification.soft_delete()
+        return notification
+    
     def send_approaching_limit_warning(self, challenge, usage_pct):
         """Send warning when approaching limit (80%+)"""
         try:
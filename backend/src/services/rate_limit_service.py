@@ -0,0 +1,363 @@
+"""
+Rate Limit Service
+Sliding-window request counters and temporary blocks, shared by every
+worker through Redis.
+
+A limit of N requests per W seconds is checked with the sliding-window
+counter approximation: the count of the current fixed window plus the count
+of the previous one, weighted by how much of it still falls within the last
+W seconds. Each (scope, identity, window) has one Redis hash holding both
+counts. One Lua script reads, checks and increments all the limits of a
+request, so concurrent requests on different workers can never both take
+the last slot, and a request rejected by one limit is not counted by the
+others.
+
+When Redis is unavailable the same algorithm runs in process memory, in an
+LRU of at most LOCAL_MAX_KEYS counters (and as many blocks); limits are then
+enforced per worker until Redis is back.
+"""
+from collections import OrderedDict, namedtuple
+import logging
+import math
+import re
+import threading
+import time
+
+from src.database import get_redis
+from src.utils.metrics import EventCounter
+
+logger = logging.getLogger(__name__)
+
+COUNTER_KEY = 'ratelimit:{scope}:{window}:{identity}'
+BLOCK_KEY = 'ratelimit:block:{scope}:{identity}'
+
+# Counters and blocks kept in memory while Redis is down
+LOCAL_MAX_KEYS = 10000
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+_LIMIT_PATTERN = re.compile(r'^\s*(\d+)\s*(?:per|/)\s*(\d+)?\s*(second|minute|hour|day)s?\s*$', re.IGNORECASE)
+
+RateLimit = namedtuple('RateLimit', 'amount window')
+RateLimitResult = namedtuple('RateLimitResult', 'allowed limit remaining reset_after')
+
+# KEYS: counter hashes; ARGV: cost, then limit and window of each key.
+# Counts only if every limit has room; a cost of 0 only reads. Returns {allowed, index (1-based) of
+# the tightest limit, requests left under it, ms until it resets (allowed)
+# or until the request would fit (rejected)}.
+_HIT_SCRIPT = """
+local cost = tonumber(ARGV[1])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local allowed = 1
+local tightest = 1
+local remaining = nil
+local reset = 0
+local windows = {}
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[i * 2])
+    local window = tonumber(ARGV[i * 2 + 1])
+    local index = math.floor(now / window)
+    local elapsed = now - index * window
+    local current = tonumber(redis.call('HGET', key, tostring(index))) or 0
+    local previous = tonumber(redis.call('HGET', key, tostring(index - 1))) or 0
+    local count = previous * (window - elapsed) / window + current
+    windows[i] = index
+    if count + cost > limit then
+        local wait = window - elapsed
+        if previous > 0 and current + cost <= limit then
+            wait = math.min(wait, (count + cost - limit) * window / previous)
+        end
+        if allowed == 1 or wait > reset then
+            tightest = i
+            reset = wait
+        end
+        allowed = 0
+        remaining = 0
+    elseif allowed == 1 and (remaining == nil or limit - count - cost < remaining) then
+        tightest = i
+        remaining = limit - count - cost
+        reset = window - elapsed
+    end
+end
+if allowed == 1 and cost > 0 then
+    for i, key in ipairs(KEYS) do
+        local window = tonumber(ARGV[i * 2 + 1])
+        redis.call('HINCRBY', key, tostring(windows[i]), cost)
+        redis.call('HDEL', key, tostring(windows[i] - 2), tostring(windows[i] - 3))
+        redis.call('PEXPIRE', key, math.ceil(window * 2000))
+    end
+end
+return {allowed, tightest, math.floor(remaining or 0), math.ceil(reset * 1000)}
+"""
+
+_events = EventCounter('rate_limit', 'Rate limit decisions and Redis fallbacks')
+
+_local_lock = threading.Lock()
+_local_counters = OrderedDict()  # key -> {window index: count}
+_local_blocks = OrderedDict()  # key -> expires at (epoch seconds)
+
+
+def get_stats():
+    """
+    Rate limit decisions of this process
+
+    Returns:
+        Dict with allowed and rejected requests, Redis fallbacks and the
+        number of counters and blocks held locally
+    """
+    stats = _events.values()
+    with _local_lock:
+        local_counters, local_blocks = len(_local_counters), len(_local_blocks)
+    return {
+        'allowed': stats.get('allowed', 0),
+        'rejected': stats.get('rejected', 0),
+        'fallbacks': stats.get('fallbacks', 0),
+        'local_counters': local_counters,
+        'local_blocks': local_blocks,
+    }
+
+
+def reset_stats():
+    _events.reset()
+
+
+def reset_local():
+    """Drop the in-process counters and blocks"""
+    with _local_lock:
+        _local_counters.clear()
+        _local_blocks.clear()
+
+
+def parse_limit(value):
+    """
+    Parse one limit such as '5 per minute', '100/hour' or '10 per 5 minutes'
+
+    Returns:
+        RateLimit(amount, window seconds)
+
+    Raises:
+        ValueError: If the limit cannot be parsed
+    """
+    match = _LIMIT_PATTERN.match(value or '')
+    if not match:
+        raise ValueError(f"Invalid rate limit: {value!r}")
+    amount, multiple, period = match.groups()
+    return RateLimit(int(amount), int(multiple or 1) * _PERIODS[period.lower()])
+
+
+def parse_limits(value):
+    """Parse limits separated by ';' (or a list of limit strings)"""
+    if isinstance(value, str):
+        value = value.split(';')
+    return [parse_limit(item) for item in value if item and item.strip()]
+
+
+def _counter_key(scope, identity, window):
+    return COUNTER_KEY.format(scope=scope, window=window, identity=identity)
+
+
+def _block_key(scope, identity):
+    return BLOCK_KEY.format(scope=scope, identity=identity)
+
+
+def _remember(store, key, value):
+    """Insert into a local LRU store, evicting the least recently used key (caller holds the lock)"""
+    store[key] = value
+    store.move_to_end(key)
+    while len(store) > LOCAL_MAX_KEYS:
+        store.popitem(last=False)
+
+
+def _hit_local(keys, limits, cost, now):
+    """In-process version of _HIT_SCRIPT"""
+    with _local_lock:
+        allowed, tightest, remaining, reset = True, 0, None, 0.0
+        indexes = []
+        for i, (key, limit) in enumerate(zip(keys, limits)):
+            counts = _local_counters.get(key, {})
+            index = int(now // limit.window)
+            elapsed = now - index * limit.window
+            current, previous = counts.get(index, 0), counts.get(index - 1, 0)
+            count = previous * (limit.window - elapsed) / limit.window + current
+            indexes.append(index)
+            if count + cost > limit.amount:
+                wait = limit.window - elapsed
+                if previous > 0 and current + cost <= limit.amount:
+                    wait = min(wait, (count + cost - limit.amount) * limit.window / previous)
+                if allowed or wait > reset:
+                    tightest, reset = i, wait
+                allowed, remaining = False, 0
+            elif allowed and (remaining is None or limit.amount - count - cost < remaining):
+                tightest, remaining, reset = i, limit.amount - count - cost, limit.window - elapsed
+        if allowed and cost:
+            for key, index in zip(keys, indexes):
+                counts = _local_counters.get(key, {})
+                counts = {index - 1: counts.get(index - 1, 0), index: counts.get(index, 0) + cost}
+                _remember(_local_counters, key, counts)
+        return allowed, tightest, int(math.floor(remaining or 0)), reset
+
+
+def _check(scope, identity, limits, cost, now):
+    """(RateLimitResult, whether the in-process counters were used)"""
+    keys = [_counter_key(scope, identity, limit.window) for limit in limits]
+
+    outcome = None
+    redis_client = get_redis()
+    if redis_client:
+        try:
+            args = [cost]
+            for limit in limits:
+                args.extend((limit.amount, limit.window))
+            allowed, tightest, remaining, reset_ms = redis_client.eval(_HIT_SCRIPT, len(keys), *keys, *args)
+            outcome = bool(allowed), int(tightest) - 1, int(remaining), int(reset_ms) / 1000.0
+        except Exception as e:
+            logger.error(f"Rate limit counters unavailable: {str(e)}")
+    fallback = outcome is None
+    if fallback:
+        outcome = _hit_local(keys, limits, cost, now if now is not None else time.time())
+
+    allowed, tightest, remaining, reset_after = outcome
+    return RateLimitResult(allowed, limits[tightest], remaining, reset_after), fallback
+
+
+def hit(scope, identity, limits, cost=1, now=None):
+    """
+    Count a request against one or more limits
+
+    Args:
+        scope: What is limited, e.g. an endpoint name
+        identity: Who is limited, e.g. a user id or IP address
+        limits: RateLimit tuples or limit strings; the request is counted
+            only if all of them have room
+        cost: Requests this call counts as
+
+    Returns:
+        RateLimitResult(allowed, limit (the tightest RateLimit), remaining,
+        reset_after seconds: until the window resets when allowed, until
+        the request would fit when rejected)
+    """
+    limits = [limit if isinstance(limit, RateLimit) else parse_limit(limit) for limit in limits]
+    if not limits:
+        return RateLimitResult(True, None, None, 0)
+
+    result, fallback = _check(scope, identity, limits, cost, now)
+    if fallback:
+        _events.count(fallbacks=1)
+    _events.count(**{'allowed' if result.allowed else 'rejected': 1})
+    return result
+
+
+def peek(scope, identity, limits, now=None):
+    """
+    Where an identity stands against limits, without counting a request
+    Nothing is written and the decision counters are left alone; for admin
+    views and reports
+
+    Returns:
+        RateLimitResult as hit() returns it for a request of cost 0
+    """
+    limits = [limit if isinstance(limit, RateLimit) else parse_limit(limit) for limit in limits]
+    if not limits:
+        return RateLimitResult(True, None, None, 0)
+    return _check(scope, identity, limits, 0, now)[0]
+
+
+def clear(scope, identity, windows):
+    """Forget the counters of an identity for the given window lengths"""
+    keys = [_counter_key(scope, identity, window) for window in windows]
+    with _local_lock:
+        for key in keys:
+            _local_counters.pop(key, None)
+    redis_client = get_redis()
+    if redis_client and keys:
+        try:
+            redis_client.delete(*keys)
+        except Exception as e:
+            logger.error(f"Rate limit counters could not be cleared: {str(e)}")
+
+
+def block(scope, identity, seconds):
+    """Block an identity for `seconds`"""
+    redis_client = get_redis()
+    if redis_client:
+        try:
+            redis_client.set(_block_key(scope, identity), '1', ex=int(math.ceil(seconds)))
+            return
+        except Exception as e:
+            logger.error(f"Rate limit block could not be stored: {str(e)}")
+    _events.count(fallbacks=1)
+    with _local_lock:
+        _remember(_local_blocks, _block_key(scope, identity), time.time() + seconds)
+
+
+def blocked_for(scope, identity):
+    """Seconds the identity remains blocked (0 if it is not blocked)"""
+    key = _block_key(scope, identity)
+    redis_client = get_redis()
+    if redis_client:
+        try:
+            ttl = redis_client.ttl(key)
+            return max(ttl, 0) if ttl is not None else 0
+        except Exception as e:
+            logger.error(f"Rate limit block lookup failed: {str(e)}")
+    with _local_lock:
+        expires_at = _local_blocks.get(key)
+        if expires_at is None:
+            return 0
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            del _local_blocks[key]
+            return 0
+        return remaining
+
+
+def unblock(scope, identity):
+    key = _block_key(scope, identity)
+    with _local_lock:
+        _local_blocks.pop(key, None)
+    redis_client = get_redis()
+    if redis_client:
+        try:
+            redis_client.delete(key)
+        except Exception as e:
+            logger.error(f"Rate limit block could not be removed: {str(e)}")
+
+
+def blocks(scope):
+    """
+    Identities currently blocked in a scope (scans Redis; for admin views)
+
+    Returns:
+        Dict identity -> seconds remaining
+    """
+    prefix = _block_key(scope, '')
+    now = time.time()
+    with _local_lock:
+        result = {key[len(prefix):]: expires_at - now for key, expires_at in _local_blocks.items() if expires_at > now}
+    redis_client = get_redis()
+    if redis_client:
+        try:
+            keys = list(redis_client.scan_iter(match=f'{prefix}*', count=500))
+            pipe = redis_client.pipeline(transaction=False)
+            for key in keys:
+                pipe.ttl(key)
+            for key, ttl in zip(keys, pipe.execute()):
+                if ttl and ttl > 0:
+                    result[key[len(prefix):]] = ttl
+        except Exception as e:
+            logger.error(f"Rate limit blocks could not be listed: {str(e)}")
+    return result
+
+
+def identities(scope, window):
+    """Identities with counters for a scope and window (scans Redis; for admin views)"""
+    prefix = _counter_key(scope, '', window)
+    with _local_lock:
+        result = {key[len(prefix):] for key in _local_counters if key.startswith(prefix)}
+    redis_client = get_redis()
+    if redis_client:
+        try:
+            result.update(key[len(prefix):] for key in redis_client.scan_iter(match=f'{prefix}*', count=500))
+        except Exception as e:
+            logger.error(f"Rate limit counters could not be listed: {str(e)}")
+    return result
@@ -0,0 +1,275 @@
+"""
+Vectorized Challenge Rule Evaluator
+Evaluates max-loss, daily-loss, profit-target and expiry rules for the whole
+book of active challenges in a single NumPy pass
+"""
+import logging
+import time
+from datetime import datetime
+
+import numpy as np
+import pytz
+from sqlalchemy.orm import joinedload
+
+from src.database import db
+from src.models.challenge_drawdown import ChallengeDailyDrawdown
+from src.models.trading_program import (
+    Challenge, CALC_METHOD_FTMO, CALC_METHOD_FXIFY, CALC_METHOD_THE5ERS,
+    TIMEZONE_CEST, TIMEZONE_EST, TIMEZONE_MT5
+)
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('active', 'in_progress')
+
+# Rule states; when several rules match, losses win over the profit target
+# (a breach must never be passed over because the target was also hit)
+STATE_OK = 0
+STATE_PROFIT_TARGET = 1
+STATE_MAX_LOSS = 2
+STATE_DAILY_LOSS = 3
+STATE_EXPIRED = 4
+
+STATE_NAMES = {
+    STATE_OK: 'ok',
+    STATE_PROFIT_TARGET: 'profit_target',
+    STATE_MAX_LOSS: 'max_loss',
+    STATE_DAILY_LOSS: 'daily_loss',
+    STATE_EXPIRED: 'expired',
+}
+
+_TIMEZONES = {
+    CALC_METHOD_FTMO: TIMEZONE_CEST,
+    CALC_METHOD_FXIFY: TIMEZONE_EST,
+    CALC_METHOD_THE5ERS: TIMEZONE_MT5,
+}
+
+
+def _today_for_method(method, today_by_tz):
+    """Current date string in the calculation method's timezone (cached per tz)"""
+    tz_name = _TIMEZONES.get(method, TIMEZONE_CEST)
+    if tz_name not in today_by_tz:
+        today_by_tz[tz_name] = datetime.now(pytz.timezone(tz_name)).date().isoformat()
+    return today_by_tz[tz_name]
+
+
+class VectorizedRuleEvaluator:
+    """
+    Columnar in-memory book of active challenges
+
+    load() reads every active challenge with its program limits once and keeps
+    the numbers in NumPy arrays. evaluate() then applies all rules to the whole
+    book at once and returns only the challenges whose state changed since the
+    previous pass, so healthy challenges never cost a database round trip.
+    A change is reported again on every pass until the caller acknowledges it
+    with acknowledge(), so a failed follow-up is retried on the next pass.
+
+    The book is reloaded every `reload_interval` seconds; in between, the sync
+    pushes fresh equities with update_equity().
+    """
+
+    def __init__(self, reload_interval=60.0):
+        self.reload_interval = reload_interval
+        self.loaded_at = None
+        self.ids = np.empty(0, dtype=np.int64)
+        self._index = {}
+        self._previous_states = {}
+        self._pending = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def load(self):
+        """Load thresholds, equities and program limits for all active challenges"""
+        challenges = Challenge.query.options(
+            joinedload(Challenge.program)
+        ).filter(
+            Challenge.status.in_(ACTIVE_STATUSES)
+        ).all()
+
+        # Today's equity/threshold for the whole book in one query
+        today_by_tz = {}
+        days = {}
+        for challenge in challenges:
+            program = challenge.program
+            rules = program.rules if program and program.rules else {}
+            days[challenge.id] = _today_for_method(rules.get('calculation_method', CALC_METHOD_FTMO), today_by_tz)
+
+        daily = {}
+        if challenges:
+            rows = db.session.query(
+                ChallengeDailyDrawdown.challenge_id,
+                ChallengeDailyDrawdown.date,
+                ChallengeDailyDrawdown.current_equity,
+                ChallengeDailyDrawdown.threshold
+            ).join(
+                Challenge, Challenge.id == ChallengeDailyDrawdown.challenge_id
+            ).filter(
+                Challenge.status.in_(ACTIVE_STATUSES),
+                ChallengeDailyDrawdown.date.in_({datetime.fromisoformat(d).date() for d in today_by_tz.values()})
+            ).all()
+            for challenge_id, day, current_equity, threshold in rows:
+                if days.get(challenge_id) == day.isoformat():
+                    daily[challenge_id] = {'current_equity': current_equity, 'threshold': threshold}
+
+        self.load_rows([self._row_from_challenge(c, daily.get(c.id)) for c in challenges])
+        return len(self)
+
+    @staticmethod
+    def _row_from_challenge(challenge, day_data):
+        program = challenge.program
+
+        def as_float(value):
+            return float(value) if value is not None else np.nan
+
+        return {
+            'id': challenge.id,
+            'initial_balance': as_float(challenge.initial_balance) if challenge.initial_balance else np.nan,
+            'current_balance': as_float(challenge.current_balance),
+            'total_profit': as_float(challenge.total_profit),
+            'total_loss': as_float(challenge.total_loss),
+            'profit_target': as_float(program.profit_target) if program and program.profit_target else np.nan,
+            'max_total_loss': as_float(program.max_total_loss) if program and program.max_total_loss else np.nan,
+            'max_daily_loss': as_float(program.max_daily_loss) if program and program.max_daily_loss else np.nan,
+            'daily_equity': as_float(day_data.get('current_equity')) if day_data else np.nan,
+            'daily_threshold': as_float(day_data.get('threshold')) if day_data else np.nan,
+            'end_date': challenge.end_date.timestamp() if challenge.end_date else np.nan,
+        }
+
+    def load_rows(self, rows):
+        """Build the columnar arrays from a list of row dicts"""
+        self.ids = np.array([r['id'] for r in rows], dtype=np.int64)
+        self._index = {int(cid): i for i, cid in enumerate(self.ids)}
+
+        def column(name):
+            return np.array([r[name] for r in rows], dtype=np.float64)
+
+        self.initial_balance = column('initial_balance')
+        self.current_balance = column('current_balance')
+        self.total_profit = column('total_profit')
+        self.total_loss = column('total_loss')
+        self.profit_target = column('profit_target')
+        self.max_total_loss = column('max_total_loss')
+        self.max_daily_loss = column('max_daily_loss')
+        self.daily_equity = column('daily_equity')
+        self.daily_threshold = column('daily_threshold')
+        self.end_date = column('end_date')
+
+        # Forget challenges that left the book
+        live = set(self._index)
+        self._previous_states = {cid: s for cid, s in self._previous_states.items() if cid in live}
+        self._pending = {}
+        self.loaded_at = time.monotonic()
+
+    def needs_reload(self):
+        return self.loaded_at is None or time.monotonic() - self.loaded_at >= self.reload_interval
+
+    def update_equity(self, challenge_id, equity, daily_threshold=None, total_profit=None, total_loss=None):
+        """
+        Push a fresh equity reading for one challenge between reloads
+
+        Total profit/loss follow the equity as in apply_account_snapshot
+        unless given explicitly.
+        """
+        i = self._index.get(challenge_id)
+        if i is None:
+            return False
+        self.daily_equity[i] = equity
+        if daily_threshold is not None:
+            self.daily_threshold[i] = daily_threshold
+        if total_profit is None and total_loss is None and not np.isnan(self.initial_balance[i]):
+            total_pnl = equity - self.initial_balance[i]
+            total_profit, total_loss = max(total_pnl, 0.0), max(-total_pnl, 0.0)
+        if total_profit is not None:
+            self.total_profit[i] = total_profit
+        if total_loss is not None:
+            self.total_loss[i] = total_loss
+        return True
+
+    def compute_states(self, now=None):
+        """
+        Evaluate every rule for the whole book
+
+        Returns:
+            int8 array of STATE_* codes aligned with self.ids
+        """
+        now_ts = (now or datetime.utcnow()).timestamp()
+
+        with np.errstate(invalid='ignore'):
+            # Profit target: total_profit >= initial * target%
+            target_amount = self.initial_balance * self.profit_target / 100
+            target_hit = (target_amount != 0) & (self.total_profit >= target_amount)
+
+            # Max loss: absolute loss or equity beyond the floor
+            max_loss_amount = self.initial_balance * self.max_total_loss / 100
+            equity = np.where(np.isnan(self.daily_equity), self.current_balance, self.daily_equity)
+            max_loss_hit = (
+                (np.abs(self.total_loss) >= max_loss_amount)
+                | (equity <= self.initial_balance - max_loss_amount)
+            )
+
+            # Daily loss: today's equity at or below today's threshold
+            daily_loss_hit = (
+                ~np.isnan(self.max_daily_loss)
+                & (self.daily_threshold > 0)
+                & (self.daily_equity <= self.daily_threshold)
+            )
+
+            expired = self.end_date < now_ts
+
+        # np.select picks the first matching condition: losses before the target
+        return np.select(
+            [max_loss_hit, daily_loss_hit, target_hit, expired],
+            [STATE_MAX_LOSS, STATE_DAILY_LOSS, STATE_PROFIT_TARGET, STATE_EXPIRED],
+            default=STATE_OK
+        ).astype(np.int8)
+
+    def evaluate(self, now=None):
+        """
+        Run one pass, reloading the book first if it is stale
+
+        Returns:
+            Dict mapping state name -> list of challenge IDs that entered that
+            state since the last acknowledged pass
+        """
+        if self.needs_reload():
+            self.load()
+
+        states = self.compute_states(now)
+        changes = {name: [] for name in STATE_NAMES.values()}
+        self._pending = {}
+
+        if len(states) == 0:
+            return changes
+
+        for i in np.flatnonzero(states):
+            cid = int(self.ids[i])
+            state = int(states[i])
+            if self._previous_states.get(cid) != state:
+                changes[STATE_NAMES[state]].append(cid)
+                self._pending[cid] = state
+
+        # Challenges that recovered are reported as 'ok'
+        for cid, previous in list(self._previous_states.items()):
+            i = self._index.get(cid)
+            if i is not None and states[i] == STATE_OK and previous != STATE_OK:
+                changes['ok'].append(cid)
+                self._pending[cid] = STATE_OK
+
+        return changes
+
+    def acknowledge(self, challenge_ids):
+        """
+        Record the new state of challenges whose change has been handled
+
+        Changes from the last evaluate() that are not acknowledged are
+        reported again on the next pass.
+        """
+        for cid in challenge_ids:
+            state = self._pending.pop(cid, None)
+            if state is None:
+                continue
+            if state == STATE_OK:
+                self._previous_states.pop(cid, None)
+            else:
+                self._previous_states[cid] = state
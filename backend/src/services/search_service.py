@@ -0,0 +1,190 @@
+"""
+Search Service
+Full-text search over published blog posts and support articles.
+
+Both tables carry a weighted tsvector column generated by Postgres (title,
+tags, excerpt, body text) with a GIN index, so a search is an index lookup
+instead of ILIKE scans over the HTML bodies. Results are ranked, the last
+word of the query matches as a prefix (search-as-you-type) and each hit
+comes with highlighted title and snippet. Result pages are cached per
+query; publishing, editing or removing content starts a new cache
+generation.
+"""
+from collections import namedtuple
+import hashlib
+import logging
+import re
+
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from src import cache
+from src.database import db
+from src.models.blog_post import BlogPost
+from src.models.support_article import SupportArticle
+from src.utils.conditional_requests import bump_generation, generation, track_changes
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'english'
+# Words of a query that are used; the rest is ignored
+MAX_TERMS = 8
+# Seconds a result page is served from cache
+RESULT_TTL = 300
+
+HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=12, MaxFragments=2, FragmentDelimiter=" … "'
+TITLE_HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, HighlightAll=true'
+
+SearchResults = namedtuple('SearchResults', 'results total')
+
+# Columns whose changes alter search results
+_SEARCHED_COLUMNS = {
+    'blog': ('title', 'excerpt', 'content', 'tags', 'category', 'status', 'published_at', 'featured'),
+    'articles': ('title', 'excerpt', 'content', 'tags', 'meta_keywords', 'category', 'status', 'published_at',
+                 'featured', 'order'),
+}
+_MODELS = {
+    'blog': BlogPost,
+    'articles': SupportArticle,
+}
+
+
+def build_tsquery(text, prefix=True):
+    """
+    to_tsquery() input for free text: every word must match, and the last
+    one also as a prefix unless the text ends with a space (the user has
+    finished typing it). Only letters and digits are kept, so the result is
+    always valid tsquery syntax.
+
+    Returns:
+        str, or None if the text has no searchable words
+    """
+    terms = re.findall(r'[^\W_]+', (text or '').lower())[:MAX_TERMS]
+    if not terms:
+        return None
+    if prefix and not text.endswith(' '):
+        terms[-1] += ':*'
+    return ' & '.join(terms)
+
+
+def _strip_tags(column):
+    return func.regexp_replace(func.coalesce(column, ''), '<[^>]*>', ' ', 'g')
+
+
+def _generation_name(kind):
+    return f'search:{kind}'
+
+
+def invalidate_search(kind):
+    """Drop every cached result page of 'blog' or 'articles'"""
+    bump_generation(_generation_name(kind))
+
+
+def _cached(kind, params, compute):
+    current = generation(_generation_name(kind))
+    if current is None:
+        return compute()
+    digest = hashlib.sha1(repr(sorted(params.items())).encode()).hexdigest()
+    key = f'search:{kind}:{current}:{digest}'
+    try:
+        hit = cache.get(key)
+        if hit is not None:
+            return SearchResults(*hit)
+    except Exception as e:
+        logger.warning(f"Search cache read failed: {e}")
+    result = compute()
+    try:
+        cache.set(key, tuple(result), timeout=RESULT_TTL)
+    except Exception as e:
+        logger.warning(f"Search cache write failed: {e}")
+    return result
+
+
+def _search(model, query, tsquery_text, page, per_page, serialize):
+    """Rank matches of query, then load and highlight only the requested page"""
+    page, per_page = max(page, 1), max(per_page, 1)
+    tsquery = func.to_tsquery(SEARCH_CONFIG, tsquery_text)
+    matches = query.filter(model.search_vector.op('@@')(tsquery))
+    total = matches.count()
+
+    rank = func.ts_rank_cd(model.search_vector, tsquery)
+    ids = [row_id for (row_id,) in matches.with_entities(model.id).order_by(
+        rank.desc(), model.published_at.desc(), model.id.desc()
+    ).offset((page - 1) * per_page).limit(per_page)]
+    if not ids:
+        return SearchResults([], total)
+
+    records = {record.id: record for record in model.query.options(joinedload(model.author)).filter(model.id.in_(ids))}
+    highlights = {
+        row_id: {'title': title, 'snippet': snippet}
+        for row_id, title, snippet in db.session.query(
+            model.id,
+            func.ts_headline(SEARCH_CONFIG, model.title, tsquery, TITLE_HEADLINE_OPTIONS),
+            func.ts_headline(SEARCH_CONFIG, _strip_tags(model.content), tsquery, HEADLINE_OPTIONS),
+        ).filter(model.id.in_(ids))
+    }
+
+    results = []
+    for row_id in ids:
+        if row_id in records:
+            data = serialize(records[row_id])
+            data['highlight'] = highlights.get(row_id)
+            results.append(data)
+    return SearchResults(results, total)
+
+
+class SearchService:
+    """Ranked full-text search of published content"""
+
+    @staticmethod
+    def search_posts(text, page=1, per_page=10, category=None):
+        """
+        Published blog posts matching text, best first
+
+        Returns:
+            SearchResults(results=[post summary + 'highlight'], total=n)
+        """
+        tsquery_text = build_tsquery(text)
+        if tsquery_text is None:
+            return SearchResults([], 0)
+
+        def compute():
+            query = BlogPost.query.filter_by(status='published')
+            if category:
+                query = query.filter_by(category=category)
+            return _search(BlogPost, query, tsquery_text, page, per_page, lambda post: post.to_dict_summary())
+
+        params = {'q': tsquery_text, 'page': page, 'per_page': per_page, 'category': category}
+        return _cached('blog', params, compute)
+
+    @staticmethod
+    def search_articles(text, page=1, per_page=50, category=None, featured=False):
+        """
+        Published support articles matching text, best first
+
+        Returns:
+            SearchResults(results=[article without content + 'highlight'], total=n)
+        """
+        tsquery_text = build_tsquery(text)
+        if tsquery_text is None:
+            return SearchResults([], 0)
+
+        def compute():
+            query = SupportArticle.query.filter_by(status='published')
+            if category:
+                query = query.filter_by(category=category)
+            if featured:
+                query = query.filter_by(featured=True)
+            return _search(SupportArticle, query, tsquery_text, page, per_page,
+                           lambda article: article.to_dict(include_content=False))
+
+        params = {'q': tsquery_text, 'page': page, 'per_page': per_page, 'category': category, 'featured': featured}
+        return _cached('articles', params, compute)
+
+
+# ============================================================================
+# Cache invalidation - ORM writes to searchable content
+# ============================================================================
+
+for _kind, _model in _MODELS.items():
+    track_changes(_generation_name(_kind), _model, columns=_SEARCHED_COLUMNS[_kind])
@@ -4,14 +4,78 @@ Handles file uploads for KYC documents and other assets
 """
 import os
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from flask import current_app
+from collections import OrderedDict
 import logging
+import threading
+import time
 from datetime import datetime
 import uuid
 
+from src.database import get_redis
+from src.utils.metrics import EventCounter
+
 logger = logging.getLogger(__name__)
 
+# Signed GET URLs are reused until this fraction of their lifetime has passed
+URL_REUSE_FRACTION = 0.8
+# One hash per object: URL lifetime -> "<reuse until>|<url>"
+URL_CACHE_KEY = 'storage:url:{key}'
+# Signed URLs held by this worker (LRU)
+URL_LOCAL_MAX_SIZE = 10000
+# Seconds a URL found in Redis is kept locally at most (bounds how long
+# another worker's forget_file_urls goes unnoticed here)
+URL_LOCAL_TTL = 60
+
+# (key, expires_in) -> (url, reuse_until)
+_url_cache = OrderedDict()
+_url_cache_lock = threading.Lock()
+_url_events = EventCounter('storage_urls', 'Signed URL cache hits, signatures and signing time')
+
+
+def _url_cache_key(key):
+    return URL_CACHE_KEY.format(key=key)
+
+
+def _remember_url(key, expires_in, url, reuse_until):
+    with _url_cache_lock:
+        _url_cache[(key, expires_in)] = (url, reuse_until)
+        _url_cache.move_to_end((key, expires_in))
+        while len(_url_cache) > URL_LOCAL_MAX_SIZE:
+            _url_cache.popitem(last=False)
+
+
+def get_url_stats():
+    """
+    Signed URL cache counters and signing latency for this process
+
+    Returns:
+        Dict with local/redis hits, signatures made, hit rate and signing
+        latency (average and max, in milliseconds)
+    """
+    stats = _url_events.values()
+    with _url_cache_lock:
+        cached = len(_url_cache)
+    hits = stats.get('local_hits', 0) + stats.get('redis_hits', 0)
+    signed = stats.get('signed', 0)
+    return {
+        'local_hits': stats.get('local_hits', 0),
+        'redis_hits': stats.get('redis_hits', 0),
+        'signed': signed,
+        'hit_rate': round(hits / (hits + signed), 4) if hits + signed else None,
+        'sign_ms_avg': round(stats.get('sign_seconds', 0) * 1000 / signed, 3) if signed else None,
+        'sign_ms_max': round(stats.get('sign_seconds_max', 0) * 1000, 3),
+        'cached': cached,
+    }
+
+
+def reset_url_cache():
+    with _url_cache_lock:
+        _url_cache.clear()
+    _url_events.reset()
+
 
 class StorageService:
     """Storage service for uploading files to DigitalOcean Spaces"""
@@ -21,7 +85,9 @@ class StorageService:
         self.spaces_secret = os.getenv('DO_SPACES_SECRET') or os.getenv('SPACES_SECRET_KEY')
         self.spaces_name = os.getenv('DO_SPACES_BUCKET') or os.getenv('SPACES_NAME', 'marketedgepros-storage')
         self.spaces_region = os.getenv('DO_SPACES_REGION') or os.getenv('SPACES_REGION', 'ams3')
-        self.spaces_endpoint = f'https://{self.spaces_region}.digitaloceanspaces.com'
+        # STORAGE_ENDPOINT_URL points at any S3-compatible server (e.g. a local MinIO)
+        self.custom_endpoint = os.getenv('STORAGE_ENDPOINT_URL')
+        self.spaces_endpoint = self.custom_endpoint or f'https://{self.spaces_region}.digitaloceanspaces.com'
         self.cdn_endpoint = f'https://{self.spaces_name}.{self.spaces_region}.cdn.digitaloceanspaces.com'
         
         if not self.spaces_key or not self.spaces_secret:
@@ -34,7 +100,8 @@ class StorageService:
                     region_name=self.spaces_region,
                     endpoint_url=self.spaces_endpoint,
                     aws_access_key_id=self.spaces_key,
-                    aws_secret_access_key=self.spaces_secret
+                    aws_secret_access_key=self.spaces_secret,
+                    config=Config(s3={'addressing_style': 'path'}) if self.custom_endpoint else None
                 )
                 logger.info(f"DigitalOcean Spaces client initialized: {self.spaces_name}")
             except Exception as e:
@@ -171,6 +238,7 @@ class StorageService:
                 Bucket=self.spaces_name,
                 Key=key
             )
+            self.forget_file_urls(key)
             
             logger.info(f"File deleted successfully: {key}")
             return True
@@ -211,26 +279,226 @@ class StorageService:
         Returns:
             str: Presigned URL or None if failed
         """
+        return self.get_file_urls([key], expires_in=expires_in).get(key)
+    
+    def get_file_urls(self, keys, expires_in=3600):
+        """
+        Presigned URLs for many files, reusing cached signatures
+        
+        A signed URL is reused until URL_REUSE_FRACTION of its lifetime has
+        passed, so callers always get at least the rest of the lifetime.
+        Lookups go to this worker's cache, then Redis (one pipelined HGET
+        per miss); only what neither holds is signed.
+        
+        Args:
+            keys (iterable): File keys; empty values are skipped
+            expires_in (int): URL expiration time in seconds
+        
+        Returns:
+            dict: key -> URL (None where signing failed)
+        """
+        keys = list(dict.fromkeys(key for key in keys if key))
+        if not self.client:
+            # Return local URLs
+            return {key: f"/uploads/{key}" for key in keys}
+        
+        urls = {}
+        now = time.time()
+        with _url_cache_lock:
+            for key in keys:
+                cached = _url_cache.get((key, expires_in))
+                if cached and cached[1] > now:
+                    _url_cache.move_to_end((key, expires_in))
+                    urls[key] = cached[0]
+        _url_events.count(local_hits=len(urls))
+        
+        missing = [key for key in keys if key not in urls]
+        reuse_for = int(expires_in * URL_REUSE_FRACTION)
+        redis_client = get_redis() if missing else None
+        if redis_client:
+            try:
+                pipe = redis_client.pipeline(transaction=False)
+                for key in missing:
+                    pipe.hget(_url_cache_key(key), expires_in)
+                redis_hits = 0
+                for key, value in zip(missing, pipe.execute()):
+                    reuse_until, _, url = (value or '').partition('|')
+                    if url and float(reuse_until) > now:
+                        urls[key] = url
+                        redis_hits += 1
+                        _remember_url(key, expires_in, url, min(float(reuse_until), now + URL_LOCAL_TTL))
+                _url_events.count(redis_hits=redis_hits)
+            except Exception as e:
+                logger.error(f"Signed URL cache read failed: {str(e)}")
+                redis_client = None
+        
+        signed = {}
+        for key in keys:
+            if key in urls:
+                continue
+            started = time.perf_counter()
+            try:
+                url = self.client.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': self.spaces_name, 'Key': key},
+                    ExpiresIn=expires_in
+                )
+            except Exception as e:
+                logger.error(f"Failed to generate presigned URL: {str(e)}")
+                url = None
+            sign_seconds = time.perf_counter() - started
+            _url_events.count(signed=1, sign_seconds=sign_seconds)
+            _url_events.record_max('sign_seconds_max', sign_seconds)
+            urls[key] = url
+            if url:
+                signed[key] = url
+                _remember_url(key, expires_in, url, now + reuse_for)
+        
+        if signed and redis_client:
+            try:
+                pipe = redis_client.pipeline(transaction=False)
+                for key, url in signed.items():
+                    # A shorter lifetime may expire the hash early; that only costs a signature
+                    pipe.hset(_url_cache_key(key), expires_in, f'{now + reuse_for}|{url}')
+                    pipe.expire(_url_cache_key(key), reuse_for)
+                pipe.execute()
+            except Exception as e:
+                logger.error(f"Signed URL cache write failed: {str(e)}")
+        
+        return urls
+    
+    def forget_file_urls(self, key):
+        """Drop cached signed URLs of a deleted or replaced object"""
+        with _url_cache_lock:
+            for cache_key in [cache_key for cache_key in _url_cache if cache_key[0] == key]:
+                del _url_cache[cache_key]
+        redis_client = get_redis()
+        if redis_client:
+            try:
+                redis_client.delete(_url_cache_key(key))
+            except Exception as e:
+                logger.error(f"Signed URL cache invalidation failed: {str(e)}")
+    
+    # ------------------------------------------------------------------
+    # Direct-to-bucket uploads: the browser sends the bytes, we only sign
+    # ------------------------------------------------------------------
+    
+    @property
+    def supports_direct_upload(self):
+        return self.client is not None
+    
+    def create_presigned_post(self, key, content_type, max_size, expires_in=900):
+        """
+        Presigned POST for one object; the policy pins the key and content
+        type and caps the size
+        
+        Returns:
+            dict: {'url': str, 'fields': dict} or None if failed
+        """
         try:
-            if not self.client:
-                # Return local URL
-                return f"/uploads/{key}"
-            
-            url = self.client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.spaces_name, 'Key': key},
+            return self.client.generate_presigned_post(
+                Bucket=self.spaces_name,
+                Key=key,
+                Fields={'Content-Type': content_type},
+                Conditions=[
+                    {'Content-Type': content_type},
+                    ['content-length-range', 1, max_size],
+                ],
                 ExpiresIn=expires_in
             )
-            
-            return url
-            
-        except ClientError as e:
-            logger.error(f"Failed to generate presigned URL: {str(e)}")
+        except Exception as e:
+            logger.error(f"Failed to generate presigned POST: {str(e)}")
+            return None
+    
+    def create_multipart_upload(self, key, content_type, size, part_size, expires_in=900):
+        """
+        Start a multipart upload and presign a PUT URL for every part
+        
+        Returns:
+            dict: {'upload_id': str, 'part_size': int, 'parts': [{'part_number', 'url'}]}
+            or None if failed
+        """
+        try:
+            upload = self.client.create_multipart_upload(
+                Bucket=self.spaces_name, Key=key, ContentType=content_type
+            )
+            upload_id = upload['UploadId']
+            part_count = max(1, -(-size // part_size))
+            parts = [{
+                'part_number': number,
+                'url': self.client.generate_presigned_url(
+                    'upload_part',
+                    Params={'Bucket': self.spaces_name, 'Key': key, 'UploadId': upload_id, 'PartNumber': number},
+                    ExpiresIn=expires_in
+                )
+            } for number in range(1, part_count + 1)]
+            return {'upload_id': upload_id, 'part_size': part_size, 'parts': parts}
+        except Exception as e:
+            logger.error(f"Failed to start multipart upload: {str(e)}")
+            return None
+    
+    def complete_multipart_upload(self, key, upload_id, parts):
+        """
+        Assemble uploaded parts
+        
+        Args:
+            parts: [{'part_number': int, 'etag': str}] as returned by the part PUTs
+        
+        Returns:
+            bool: True if completed
+        """
+        try:
+            self.client.complete_multipart_upload(
+                Bucket=self.spaces_name,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': [
+                    {'PartNumber': int(part['part_number']), 'ETag': part['etag']}
+                    for part in sorted(parts, key=lambda part: int(part['part_number']))
+                ]}
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Failed to complete multipart upload {key}: {str(e)}")
+            try:
+                self.client.abort_multipart_upload(Bucket=self.spaces_name, Key=key, UploadId=upload_id)
+            except Exception:
+                pass
+            return False
+    
+    def head_file(self, key):
+        """
+        Stored size and content type of an object
+        
+        Returns:
+            dict: {'size': int, 'content_type': str} or None if missing
+        """
+        try:
+            head = self.client.head_object(Bucket=self.spaces_name, Key=key)
+            return {'size': head['ContentLength'], 'content_type': head.get('ContentType')}
+        except ClientError:
+            return None
+        except Exception as e:
+            logger.error(f"Failed to read object metadata {key}: {str(e)}")
             return None
+    
+    def read_file(self, key):
+        """Object contents as bytes, or None if failed"""
+        try:
+            return self.client.get_object(Bucket=self.spaces_name, Key=key)['Body'].read()
         except Exception as e:
-            logger.error(f"Unexpected error generating URL: {str(e)}")
+            logger.error(f"Failed to read object {key}: {str(e)}")
             return None
     
+    def put_file(self, key, data, content_type):
+        """Write small generated objects (thumbnails); returns True on success"""
+        try:
+            self.client.put_object(Bucket=self.spaces_name, Key=key, Body=data, ContentType=content_type)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to write object {key}: {str(e)}")
+            return False
+    
     def upload_kyc_document(self, file, user_id, document_type):
         """
         Upload a KYC document
@@ -0,0 +1,263 @@
+"""
+Tenant Resolver
+Resolves request hosts and tenant IDs without querying the database per
+request: all active tenants are indexed in memory with one query (on worker
+boot, then every TENANT_TTL seconds) and host results are kept in an LRU.
+Tenant writes publish an invalidation on Redis so every worker drops its
+copy; the TTL bounds staleness if a message is missed.
+"""
+from collections import OrderedDict
+import logging
+import os
+import threading
+import time
+
+from src.database import get_redis
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'tenant_cache:invalidate'
+
+# Seconds the tenant index and resolved hosts are served
+TENANT_TTL = 300
+# Seconds a host that matched no tenant (and got the default) is remembered
+NEGATIVE_TTL = 60
+# Hosts kept per worker
+MAX_HOSTS = 10000
+
+# Subdomains that never name a tenant
+RESERVED_SUBDOMAINS = ('www', 'api', 'admin', 'app')
+DEFAULT_SUBDOMAIN = 'main'
+
+_MISSING = object()
+
+
+class TenantSnapshot:
+    """
+    Read-only copy of a tenant, safe to share between requests
+
+    Exposes the fields that to_dict() serializes as attributes.
+    """
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data):
+        self._data = data
+
+    @classmethod
+    def from_tenant(cls, tenant):
+        return cls(tenant.to_dict())
+
+    def __getattr__(self, name):
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def to_dict(self):
+        """Same shape as Tenant.to_dict()"""
+        data = dict(self._data)
+        data['branding'] = dict(data['branding'])
+        data['contact'] = dict(data['contact'])
+        return data
+
+    def __repr__(self):
+        return f"<TenantSnapshot {self._data['id']} {self._data['subdomain']}>"
+
+
+class TenantResolver:
+    """Resolve tenants from hosts and IDs, zero queries in steady state"""
+
+    def __init__(self, ttl=TENANT_TTL, negative_ttl=NEGATIVE_TTL, max_hosts=MAX_HOSTS):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_hosts = max_hosts
+        self._lock = threading.Lock()
+        self._index = None
+        self._hosts = OrderedDict()  # host -> (expires_at, TenantSnapshot or None)
+        # Bumped on every invalidation so loads that started before it are not kept
+        self._generation = 0
+        self._listener_pid = None
+        self._listener = None
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    # ------------------------------------------------------------------
+    # Tenant index
+    # ------------------------------------------------------------------
+
+    def warm_up(self):
+        """
+        Index every active tenant with one query
+
+        Returns:
+            Number of tenants loaded
+        """
+        from src.models.tenant import Tenant
+
+        generation = self._generation
+        tenants = Tenant.query.filter_by(status='active').order_by(Tenant.id).all()
+
+        by_id = {}
+        by_domain = {}
+        by_subdomain = {}
+        for tenant in tenants:
+            snapshot = TenantSnapshot.from_tenant(tenant)
+            by_id[tenant.id] = snapshot
+            by_subdomain[tenant.subdomain] = snapshot
+            if tenant.custom_domain:
+                by_domain[tenant.custom_domain.lower()] = snapshot
+
+        index = {
+            'by_id': by_id,
+            'by_domain': by_domain,
+            'by_subdomain': by_subdomain,
+            # Main platform tenant, else the first active one
+            'default': by_subdomain.get(DEFAULT_SUBDOMAIN) or (by_id[tenants[0].id] if tenants else None),
+            'expires_at': time.monotonic() + self.ttl,
+        }
+
+        with self._lock:
+            self.loads += 1
+            if generation == self._generation:
+                self._index = index
+                self._hosts.clear()
+
+        logger.info(f"Tenant resolver indexed {len(tenants)} active tenants")
+        return len(tenants)
+
+    def _current_index(self):
+        index = self._index
+        if index is None or index['expires_at'] <= time.monotonic():
+            self.warm_up()
+            index = self._index or index
+        return index
+
+    # ------------------------------------------------------------------
+    # Resolution
+    # ------------------------------------------------------------------
+
+    def by_id(self, tenant_id):
+        """Active tenant with this ID, or None"""
+        return self._current_index()['by_id'].get(tenant_id)
+
+    def default(self):
+        """The main platform tenant, or the first active tenant"""
+        return self._current_index()['default']
+
+    def by_host(self, host):
+        """
+        Tenant for a request host (lowercase, port removed)
+
+        Custom domain first, then subdomain, then the default tenant.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._hosts.get(host)
+            if entry is not None and entry[0] > now:
+                self._hosts.move_to_end(host)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        generation = self._generation
+        index = self._current_index()
+        snapshot = index['by_domain'].get(host)
+
+        parts = host.split('.')
+        if snapshot is None and len(parts) >= 2 and parts[0] not in RESERVED_SUBDOMAINS:
+            snapshot = index['by_subdomain'].get(parts[0])
+
+        ttl = self.ttl
+        if snapshot is None:
+            # Unknown host: remembered for a shorter time
+            snapshot = index['default']
+            ttl = self.negative_ttl
+
+        with self._lock:
+            if generation == self._generation:
+                self._hosts[host] = (now + ttl, snapshot)
+                self._hosts.move_to_end(host)
+                while len(self._hosts) > self.max_hosts:
+                    self._hosts.popitem(last=False)
+        return snapshot
+
+    def stats(self):
+        with self._lock:
+            hosts = len(self._hosts)
+            tenants = len(self._index['by_id']) if self._index else 0
+        total = self.hits + self.misses
+        return {
+            'tenants': tenants,
+            'hosts': hosts,
+            'hits': self.hits,
+            'misses': self.misses,
+            'index_loads': self.loads,
+            'hit_rate': round(self.hits / total, 4) if total else None,
+        }
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def invalidate(self):
+        """Drop this worker's index and hosts; the next request reloads"""
+        with self._lock:
+            self._index = None
+            self._hosts.clear()
+            self._generation += 1
+
+    def publish_invalidation(self, tenant_ids=()):
+        """Invalidate this worker and tell the other workers to do the same"""
+        self.invalidate()
+        redis_client = get_redis()
+        if not redis_client:
+            return False
+        try:
+            redis_client.publish(INVALIDATION_CHANNEL, ','.join(str(t) for t in sorted(tenant_ids)) or '*')
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to publish tenant cache invalidation: {e}")
+            return False
+
+    def _on_invalidation(self, message):
+        logger.debug(f"Tenant cache invalidated (tenants: {message.get('data')})")
+        self.invalidate()
+
+    def _on_listener_error(self, error, pubsub, thread):
+        # Changes may have been missed while disconnected
+        logger.warning(f"Tenant invalidation listener error: {error}")
+        self.invalidate()
+        time.sleep(1)
+
+    def ensure_listener(self):
+        """
+        Subscribe this process to invalidations, once per worker
+
+        Called per request and cheap after the first call. Started lazily
+        because threads do not survive the fork after preload_app.
+        """
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+        with self._lock:
+            if self._listener_pid == pid:
+                return
+            self._listener_pid = pid
+
+        redis_client = get_redis()
+        if not redis_client:
+            return
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{INVALIDATION_CHANNEL: self._on_invalidation})
+            self._listener = pubsub.run_in_thread(
+                sleep_time=1.0, daemon=True, exception_handler=self._on_listener_error
+            )
+        except Exception as e:
+            logger.warning(f"Tenant invalidation listener not started: {e}")
+
+
+# Shared per-process resolver
+tenant_resolver = TenantResolver()
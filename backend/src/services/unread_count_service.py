@@ -0,0 +1,288 @@
+"""
+Unread Count Service
+Per-user unread notification counters in Redis, so the unread badge polled
+by every open tab does not COUNT(*) the notifications table.
+
+Each user has a hash notifications:unread:<user_id> with a 'total' field
+and one field per notification type. A missing hash is filled from the
+database on first read; ORM writes adjust existing hashes once they are
+committed (increments never create a hash, so a concurrent fill cannot be
+double counted) and a periodic reconciliation corrects any drift left by
+writes that bypass the ORM. Without Redis every read goes to the database.
+"""
+from collections import defaultdict
+import logging
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func
+
+from src.database import db, get_redis
+from src.models.notification import Notification
+from src.utils.realtime import emit_to_room, user_room
+from src.utils.session_hooks import collect, on_commit
+
+logger = logging.getLogger(__name__)
+
+UNREAD_KEY = 'notifications:unread:{user_id}'
+# Idle hashes expire; the next read refills them
+UNREAD_TTL = 86400
+TOTAL_FIELD = 'total'
+
+# Users per reconciliation query
+RECONCILE_CHUNK_SIZE = 500
+
+UNREAD_EVENT = 'notification:unread'
+
+# KEYS: hashes; ARGV: delta, type for each key. Only existing hashes are
+# changed. Returns the new totals (-1 for hashes that were not cached).
+_INCREMENT_SCRIPT = """
+local totals = {}
+for i, key in ipairs(KEYS) do
+    local delta = tonumber(ARGV[i * 2 - 1])
+    if redis.call('EXISTS', key) == 1 then
+        local total = redis.call('HINCRBY', key, 'total', delta)
+        redis.call('HINCRBY', key, ARGV[i * 2], delta)
+        if total < 0 then
+            redis.call('DEL', key)
+            total = -1
+        end
+        totals[i] = total
+    else
+        totals[i] = -1
+    end
+end
+return totals
+"""
+
+
+def _key(user_id):
+    return UNREAD_KEY.format(user_id=user_id)
+
+
+def _unread_query():
+    return db.session.query(
+        Notification.user_id, Notification.type, func.count(Notification.id)
+    ).filter(
+        Notification.is_read.is_(False),
+        Notification.is_deleted.is_(False)
+    ).group_by(Notification.user_id, Notification.type)
+
+
+def _counts_from_db(user_ids):
+    """Dict user_id -> {'total': n, <type>: n, ...} for the given users"""
+    counts = {user_id: {TOTAL_FIELD: 0} for user_id in user_ids}
+    for user_id, notification_type, count in _unread_query().filter(Notification.user_id.in_(user_ids)):
+        counts[user_id][notification_type] = count
+        counts[user_id][TOTAL_FIELD] += count
+    return counts
+
+
+def _store(redis_client, counts):
+    pipe = redis_client.pipeline(transaction=False)
+    for user_id, fields in counts.items():
+        key = _key(user_id)
+        pipe.delete(key)
+        pipe.hset(key, mapping=fields)
+        pipe.expire(key, UNREAD_TTL)
+    pipe.execute()
+
+
+def _push_enabled():
+    return has_app_context() and current_app.config.get('NOTIFICATION_PUSH_ENABLED', True)
+
+
+class UnreadCountService:
+    """Cached unread notification counters"""
+
+    @staticmethod
+    def get(user_id):
+        """Unread counts: {'total': n, <type>: n, ...}"""
+        redis_client = get_redis()
+        if redis_client:
+            try:
+                cached = redis_client.hgetall(_key(user_id))
+                if cached:
+                    return {field: int(value) for field, value in cached.items()}
+            except Exception as e:
+                logger.error(f"Unread count cache read failed: {str(e)}")
+                redis_client = None
+
+        counts = _counts_from_db([user_id])
+        if redis_client:
+            try:
+                _store(redis_client, counts)
+            except Exception as e:
+                logger.error(f"Unread count cache fill failed: {str(e)}")
+        return counts[user_id]
+
+    @staticmethod
+    def get_count(user_id):
+        return UnreadCountService.get(user_id)[TOTAL_FIELD]
+
+    @staticmethod
+    def apply(deltas):
+        """
+        Adjust cached counters
+
+        Args:
+            deltas: Dict user_id -> {type: delta}
+
+        Returns:
+            Dict user_id -> new total, for users whose counter is cached
+        """
+        redis_client = get_redis()
+        if not redis_client or not deltas:
+            return {}
+        keys, args, owners = [], [], []
+        for user_id, by_type in deltas.items():
+            for notification_type, delta in by_type.items():
+                if delta:
+                    keys.append(_key(user_id))
+                    args.extend((delta, notification_type))
+                    owners.append(user_id)
+        if not keys:
+            return {}
+        try:
+            totals = redis_client.eval(_INCREMENT_SCRIPT, len(keys), *keys, *args)
+        except Exception as e:
+            # Drop the affected counters so the next read recounts
+            logger.error(f"Unread count cache update failed: {str(e)}")
+            UnreadCountService.invalidate(deltas.keys())
+            return {}
+        result = {}
+        for user_id, total in zip(owners, totals):
+            if int(total) >= 0:
+                result[user_id] = int(total)
+        return result
+
+    @staticmethod
+    def increment(user_ids, notification_type, delta=1):
+        """Add delta to many users' counters (bulk inserts)"""
+        return UnreadCountService.apply({user_id: {notification_type: delta} for user_id in user_ids})
+
+    @staticmethod
+    def reset(user_ids):
+        """Counters of users who just read everything"""
+        redis_client = get_redis()
+        if not redis_client:
+            return
+        try:
+            _store(redis_client, {user_id: {TOTAL_FIELD: 0} for user_id in user_ids})
+        except Exception as e:
+            logger.error(f"Unread count cache reset failed: {str(e)}")
+            UnreadCountService.invalidate(user_ids)
+
+    @staticmethod
+    def invalidate(user_ids):
+        redis_client = get_redis()
+        if not redis_client:
+            return
+        try:
+            keys = [_key(user_id) for user_id in user_ids]
+            if keys:
+                redis_client.delete(*keys)
+        except Exception as e:
+            logger.error(f"Unread count cache invalidation failed: {str(e)}")
+
+    @staticmethod
+    def push(totals):
+        """Send new unread totals to the users' Socket.IO rooms"""
+        if not _push_enabled():
+            return
+        for user_id, total in totals.items():
+            emit_to_room(UNREAD_EVENT, {'count': total}, user_room(user_id))
+
+    @staticmethod
+    def reconcile():
+        """
+        Compare every cached counter with the database and correct drift
+
+        Returns:
+            Dict with 'checked' counters and 'drift' (user IDs corrected)
+        """
+        redis_client = get_redis()
+        if not redis_client:
+            return {'checked': 0, 'drift': []}
+
+        prefix = UNREAD_KEY.format(user_id='')
+        user_ids = [
+            int(key[len(prefix):])
+            for key in redis_client.scan_iter(match=f'{prefix}*', count=1000)
+            if key[len(prefix):].isdigit()
+        ]
+
+        drift = []
+        for i in range(0, len(user_ids), RECONCILE_CHUNK_SIZE):
+            chunk = user_ids[i:i + RECONCILE_CHUNK_SIZE]
+            pipe = redis_client.pipeline(transaction=False)
+            for user_id in chunk:
+                pipe.hgetall(_key(user_id))
+            cached = dict(zip(chunk, pipe.execute()))
+
+            actual = _counts_from_db(chunk)
+            stale = {}
+            for user_id in chunk:
+                if not cached[user_id]:
+                    continue  # expired meanwhile
+                stored = {field: int(value) for field, value in cached[user_id].items() if int(value)}
+                expected = {field: value for field, value in actual[user_id].items() if value}
+                if stored != expected:
+                    stale[user_id] = actual[user_id]
+            if stale:
+                _store(redis_client, stale)
+                drift.extend(stale)
+
+        if drift:
+            logger.warning(f"Corrected {len(drift)} drifted unread counter(s)")
+        return {'checked': len(user_ids), 'drift': drift}
+
+
+# ============================================================================
+# Counter maintenance - ORM writes to notifications
+# ============================================================================
+
+def _deltas(session):
+    return collect(session, 'unread_deltas', lambda: defaultdict(lambda: defaultdict(int)))
+
+
+def _previous(state, name):
+    history = state.attrs[name].history
+    return history.deleted[0] if history.deleted else getattr(state.object, name)
+
+
+def _is_unread(is_read, is_deleted):
+    return not is_read and not is_deleted
+
+
+@event.listens_for(Notification, 'after_insert')
+def _notification_inserted(mapper, connection, target):
+    session = db.inspect(target).session
+    if session is not None and _is_unread(target.is_read, target.is_deleted):
+        _deltas(session)[target.user_id][target.type] += 1
+
+
+@event.listens_for(Notification, 'after_update')
+def _notification_updated(mapper, connection, target):
+    state = db.inspect(target)
+    if state.session is None:
+        return
+    was = _is_unread(_previous(state, 'is_read'), _previous(state, 'is_deleted'))
+    now = _is_unread(target.is_read, target.is_deleted)
+    if was != now:
+        _deltas(state.session)[target.user_id][target.type] += 1 if now else -1
+
+
+@event.listens_for(Notification, 'after_delete')
+def _notification_deleted(mapper, connection, target):
+    session = db.inspect(target).session
+    if session is not None and _is_unread(target.is_read, target.is_deleted):
+        _deltas(session)[target.user_id][target.type] -= 1
+
+
+@on_commit('unread_deltas', 'unread_resets')
+def _apply_on_commit(deltas, resets):
+    totals = UnreadCountService.apply(deltas) if deltas else {}
+    if resets:
+        UnreadCountService.reset(resets)
+        totals.update(dict.fromkeys(resets, 0))
+    UnreadCountService.push(totals)
@@ -1,11 +1,18 @@
 """
 Wallet service for managing user balances and transactions
+All balance changes are posted through the double-entry ledger
 """
-from datetime import datetime
-from decimal import Decimal
 from src.database import db
 from src.models.wallet import Wallet, Transaction
-from src.models.user import User
+from src.services.ledger_service import (
+    BALANCE_TYPES,
+    SYSTEM_ADJUSTMENTS,
+    SYSTEM_CASH,
+    LedgerService,
+    Leg,
+    Posting,
+    to_amount,
+)
 
 
 class WalletService:
@@ -39,124 +46,73 @@ class WalletService:
         
         return 0.0
     
+    @staticmethod
+    def _check(amount, balance_type):
+        if balance_type not in BALANCE_TYPES:
+            raise ValueError(f"Invalid balance type: {balance_type}")
+        if to_amount(amount) <= 0:
+            raise ValueError("Amount must be positive")
+    
     @staticmethod
     def add_funds(user_id, amount, balance_type='main', description=None, 
                   reference_type=None, reference_id=None, created_by=None):
         """Add funds to wallet"""
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-        
-        wallet = WalletService.get_or_create_wallet(user_id)
-        
-        # Get current balance
-        if balance_type == 'main':
-            balance_before = float(wallet.main_balance)
-            wallet.main_balance = Decimal(str(balance_before + amount))
-        elif balance_type == 'commission':
-            balance_before = float(wallet.commission_balance)
-            wallet.commission_balance = Decimal(str(balance_before + amount))
-        elif balance_type == 'bonus':
-            balance_before = float(wallet.bonus_balance)
-            wallet.bonus_balance = Decimal(str(balance_before + amount))
-        else:
-            raise ValueError(f"Invalid balance type: {balance_type}")
-        
-        balance_after = balance_before + amount
-        
-        # Create transaction record
-        transaction = Transaction(
-            wallet_id=wallet.id,
-            type='deposit',
-            amount=Decimal(str(amount)),
-            balance_type=balance_type,
-            balance_before=Decimal(str(balance_before)),
-            balance_after=Decimal(str(balance_after)),
+        WalletService._check(amount, balance_type)
+        
+        result, = LedgerService.post([Posting(
+            entry_type='deposit',
+            legs=(
+                Leg.wallet(user_id, amount, balance_type),
+                Leg.to_system(SYSTEM_CASH, -to_amount(amount)),
+            ),
+            description=description or f"Added {amount} to {balance_type} balance",
             reference_type=reference_type,
             reference_id=reference_id,
-            description=description or f"Added {amount} to {balance_type} balance",
             created_by=created_by
-        )
-        
-        wallet.last_transaction_at = datetime.utcnow()
-        
-        db.session.add(transaction)
-        db.session.commit()
+        )])
         
-        return wallet, transaction
+        transaction = result.transactions[0]
+        return transaction.wallet, transaction
     
     @staticmethod
     def deduct_funds(user_id, amount, balance_type='main', description=None,
                      reference_type=None, reference_id=None, created_by=None):
         """Deduct funds from wallet"""
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-        
-        wallet = WalletService.get_or_create_wallet(user_id)
-        
-        # Get current balance
-        if balance_type == 'main':
-            balance_before = float(wallet.main_balance)
-            if balance_before < amount:
-                raise ValueError("Insufficient main balance")
-            wallet.main_balance = Decimal(str(balance_before - amount))
-        elif balance_type == 'commission':
-            balance_before = float(wallet.commission_balance)
-            if balance_before < amount:
-                raise ValueError("Insufficient commission balance")
-            wallet.commission_balance = Decimal(str(balance_before - amount))
-        elif balance_type == 'bonus':
-            balance_before = float(wallet.bonus_balance)
-            if balance_before < amount:
-                raise ValueError("Insufficient bonus balance")
-            wallet.bonus_balance = Decimal(str(balance_before - amount))
-        else:
-            raise ValueError(f"Invalid balance type: {balance_type}")
-        
-        balance_after = balance_before - amount
-        
-        # Create transaction record
-        transaction = Transaction(
-            wallet_id=wallet.id,
-            type='withdrawal',
-            amount=Decimal(str(amount)),
-            balance_type=balance_type,
-            balance_before=Decimal(str(balance_before)),
-            balance_after=Decimal(str(balance_after)),
+        WalletService._check(amount, balance_type)
+        
+        result, = LedgerService.post([Posting(
+            entry_type='withdrawal',
+            legs=(
+                Leg.wallet(user_id, -to_amount(amount), balance_type),
+                Leg.to_system(SYSTEM_CASH, amount),
+            ),
+            description=description or f"Deducted {amount} from {balance_type} balance",
             reference_type=reference_type,
             reference_id=reference_id,
-            description=description or f"Deducted {amount} from {balance_type} balance",
             created_by=created_by
-        )
+        )])
         
-        wallet.last_transaction_at = datetime.utcnow()
-        
-        db.session.add(transaction)
-        db.session.commit()
-        
-        return wallet, transaction
+        transaction = result.transactions[0]
+        return transaction.wallet, transaction
     
     @staticmethod
     def transfer_funds(from_user_id, to_user_id, amount, balance_type='main',
                       description=None, reference_type=None, reference_id=None):
-        """Transfer funds between wallets"""
-        if amount <= 0:
-            raise ValueError("Amount must be positive")
-        
-        # Deduct from sender
-        WalletService.deduct_funds(
-            from_user_id, amount, balance_type,
-            description=f"Transfer to user {to_user_id}: {description or ''}",
-            reference_type=reference_type,
-            reference_id=reference_id
-        )
-        
-        # Add to recipient
-        WalletService.add_funds(
-            to_user_id, amount, balance_type,
-            description=f"Transfer from user {from_user_id}: {description or ''}",
+        """Transfer funds between wallets in one journal entry"""
+        WalletService._check(amount, balance_type)
+        
+        LedgerService.post([Posting(
+            entry_type='transfer',
+            legs=(
+                Leg.wallet(from_user_id, -to_amount(amount), balance_type, type='withdrawal',
+                           description=f"Transfer to user {to_user_id}: {description or ''}"),
+                Leg.wallet(to_user_id, amount, balance_type, type='deposit',
+                           description=f"Transfer from user {from_user_id}: {description or ''}"),
+            ),
+            description=description,
             reference_type=reference_type,
             reference_id=reference_id
-        )
+        )])
         
         return True
     
@@ -179,40 +135,23 @@ class WalletService:
     
     @staticmethod
     def adjust_balance(user_id, amount, balance_type='main', description=None, created_by=None):
-        """Manual balance adjustment (admin only)"""
-        wallet = WalletService.get_or_create_wallet(user_id)
-        
-        # Get current balance
-        if balance_type == 'main':
-            balance_before = float(wallet.main_balance)
-            wallet.main_balance = Decimal(str(balance_before + amount))
-        elif balance_type == 'commission':
-            balance_before = float(wallet.commission_balance)
-            wallet.commission_balance = Decimal(str(balance_before + amount))
-        elif balance_type == 'bonus':
-            balance_before = float(wallet.bonus_balance)
-            wallet.bonus_balance = Decimal(str(balance_before + amount))
-        else:
+        """Manual balance adjustment (admin only); may take a balance below zero"""
+        if balance_type not in BALANCE_TYPES:
             raise ValueError(f"Invalid balance type: {balance_type}")
-        
-        balance_after = balance_before + amount
-        
-        # Create transaction record
-        transaction = Transaction(
-            wallet_id=wallet.id,
-            type='adjustment',
-            amount=Decimal(str(abs(amount))),
-            balance_type=balance_type,
-            balance_before=Decimal(str(balance_before)),
-            balance_after=Decimal(str(balance_after)),
+        amount = to_amount(amount)
+        if amount == 0:
+            raise ValueError("Amount must be non-zero")
+        
+        result, = LedgerService.post([Posting(
+            entry_type='adjustment',
+            legs=(
+                Leg.wallet(user_id, amount, balance_type, type='adjustment'),
+                Leg.to_system(SYSTEM_ADJUSTMENTS, -amount),
+            ),
             description=description or f"Manual adjustment: {amount}",
-            created_by=created_by
-        )
+            created_by=created_by,
+            allow_overdraft=True
+        )])
         
-        wallet.last_transaction_at = datetime.utcnow()
-        
-        db.session.add(transaction)
-        db.session.commit()
-        
-        return wallet, transaction
-
+        transaction = result.transactions[0]
+        return transaction.wallet, transaction
@@ -1,3 +1,8 @@
 # Tasks module - import all tasks for Celery autodiscovery
 from src.tasks.email_tasks import *
 from src.tasks.course_drip_campaign import *
+from src.tasks.analytics_tasks import *
+from src.tasks.ledger_tasks import *
+from src.tasks.notification_tasks import *
+from src.tasks.kyc_tasks import *
+from src.tasks.mt5_tasks import *
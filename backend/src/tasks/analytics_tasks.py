@@ -0,0 +1,66 @@
+"""
+Analytics rollup tasks
+Keep analytics_daily_rollups fresh and verify it against the raw tables
+"""
+
+from src.celery_config import celery_app
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name='analytics.refresh_rollups')
+def refresh_analytics_rollups():
+    """
+    Recompute days marked dirty by the write hooks, plus today and yesterday
+    Runs every minute
+    """
+    from src.app import create_app
+    from src.database import db
+    from src.services.analytics_rollup_service import AnalyticsRollupService
+    
+    app = create_app()
+    
+    with app.app_context():
+        try:
+            result = AnalyticsRollupService.refresh()
+            logger.info(f"Refreshed analytics rollups for {len(result['days'])} day(s), {result['rows']} rows")
+            return {'success': True, **result}
+            
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error in refresh_analytics_rollups: {str(e)}")
+            return {'success': False, 'error': str(e)}
+
+
+@celery_app.task(name='analytics.verify_rollups')
+def verify_analytics_rollups(days=7):
+    """
+    Re-derive recent days from raw data, report drift and rebuild drifted days
+    Runs nightly; also picks up node rollups changed by hierarchy moves
+    """
+    from src.app import create_app
+    from src.database import db
+    from src.services.analytics_rollup_service import AnalyticsRollupService
+    
+    app = create_app()
+    
+    with app.app_context():
+        try:
+            result = AnalyticsRollupService.verify(days=days)
+            if result['drift']:
+                logger.warning(
+                    f"Analytics rollup drift in {len(result['repaired'])} day(s): "
+                    f"{len(result['drift'])} field(s) differed from raw data"
+                )
+            return {
+                'success': True,
+                'drift_count': len(result['drift']),
+                'drift': result['drift'][:100],
+                'repaired': result['repaired']
+            }
+            
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error in verify_analytics_rollups: {str(e)}")
+            return {'success': False, 'error': str(e)}
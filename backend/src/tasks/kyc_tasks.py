@@ -0,0 +1,56 @@
+"""
+KYC document tasks
+Post-processing of directly uploaded KYC documents
+"""
+
+from src.celery_config import celery_app
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name='kyc.process_document', autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
+def process_kyc_document(document_id):
+    """Hash, verify and thumbnail one uploaded document"""
+    from src.app import create_app
+    from src.database import db
+    from src.services.kyc_upload_service import KycUploadService
+    
+    app = create_app()
+    
+    with app.app_context():
+        try:
+            document = KycUploadService.process(document_id)
+            if document is None:
+                return {'success': False, 'error': 'Document not found'}
+            return {'success': True, 'document_id': document_id, 'status': document.processing_status}
+            
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error in process_kyc_document({document_id}): {str(e)}")
+            raise
+
+
+@celery_app.task(name='kyc.process_pending')
+def process_pending_kyc_documents():
+    """
+    Queue documents whose processing task was lost
+    Runs every 5 minutes
+    """
+    from src.app import create_app
+    from src.database import db
+    from src.services.kyc_upload_service import KycUploadService
+    
+    app = create_app()
+    
+    with app.app_context():
+        try:
+            document_ids = KycUploadService.pending_document_ids()
+            for document_id in document_ids:
+                process_kyc_document.delay(document_id)
+            return {'success': True, 'queued': len(document_ids)}
+            
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error in process_pending_kyc_documents: {str(e)}")
+            return {'success': False, 'error': str(e)}
@@ -0,0 +1,38 @@
+"""
+Wallet ledger tasks
+Reconcile wallet balance snapshots against the journal
+"""
+
+from src.celery_config import celery_app
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name='ledger.verify_balances')
+def verify_ledger_balances(repair=False):
+    """
+    Compare every wallet balance with the sum of its journal lines
+    Runs nightly; reports only unless repair is requested
+    """
+    from src.app import create_app
+    from src.database import db
+    from src.services.ledger_service import LedgerService
+    
+    app = create_app()
+    
+    with app.app_context():
+        try:
+            result = LedgerService.verify(repair=repair)
+            return {
+                'success': True,
+                'wallets': result['wallets'],
+                'drift_count': len(result['drift']),
+                'drift': result['drift'][:100],
+                'unbalanced': result['unbalanced'][:100]
+            }
+            
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error in verify_ledger_balances: {str(e)}")
+            return {'success': False, 'error': str(e)}
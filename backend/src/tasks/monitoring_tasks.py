@@ -7,54 +7,43 @@ from celery import shared_task
 from datetime import datetime, timedelta
 from src.database import db
 from src.models.trading_program import Challenge
-from src.models.mt5_account import MT5Account
+from src.models.mt5_models import MT5Account
+from src.services.mt5_broker import PRIORITY_BACKGROUND
 from src.services.mt5_service import MT5Service
+from src.services.mt5_sync_engine import MT5SyncEngine, apply_account_snapshot
+from src.services.mt5_snapshot_cache import MT5SnapshotCache
 from src.services.notification_service import NotificationService
+from src.services.rule_evaluator import VectorizedRuleEvaluator
 import logging
 
 logger = logging.getLogger(__name__)
 
 # Initialize services
-mt5_service = MT5Service()
+mt5_service = MT5Service(priority=PRIORITY_BACKGROUND)
 notification_service = NotificationService()
+sync_engine = MT5SyncEngine(mt5_service=mt5_service)
+rule_evaluator = VectorizedRuleEvaluator()
 
 
 @shared_task(name='monitoring.sync_mt5_trades')
 def sync_mt5_trades():
     """
     Sync trades from MT5 for all active challenges
-    Runs every 30 seconds
+    Runs every 30 seconds, in concurrent batches (see MT5SyncEngine)
     """
     try:
-        # Get all active challenges
-        active_challenges = Challenge.query.filter(
-            Challenge.status.in_(['active', 'in_progress'])
-        ).all()
-        
-        logger.info(f"Syncing {len(active_challenges)} active challenges")
+        def queue_violation_checks(challenge_ids):
+            for challenge_id in challenge_ids:
+                check_challenge_violations.delay(challenge_id)
         
-        synced_count = 0
-        error_count = 0
-        
-        for challenge in active_challenges:
-            try:
-                # Sync individual challenge
-                result = sync_challenge_data(challenge.id)
-                if result['success']:
-                    synced_count += 1
-                else:
-                    error_count += 1
-            except Exception as e:
-                logger.error(f"Error syncing challenge {challenge.id}: {str(e)}")
-                error_count += 1
+        def push_equity(challenge_id, snapshot):
+            rule_evaluator.update_equity(
+                challenge_id,
+                snapshot['equity'],
+                daily_threshold=(snapshot.get('daily_stats') or {}).get('threshold')
+            )
         
-        logger.info(f"Sync completed: {synced_count} success, {error_count} errors")
-        
-        return {
-            'synced': synced_count,
-            'errors': error_count,
-            'total': len(active_challenges)
-        }
+        return sync_engine.run_cycle(on_synced=queue_violation_checks, on_snapshot=push_equity)
         
     except Exception as e:
         logger.error(f"Error in sync_mt5_trades: {str(e)}")
@@ -84,38 +73,13 @@ def sync_challenge_data(challenge_id):
         
         if not mt5_data:
             return {'success': False, 'error': 'Failed to fetch MT5 data'}
+        MT5SnapshotCache.put(mt5_account.mt5_login, mt5_data)
         
-        # Calculate equity
-        balance = float(mt5_data.get('balance', 0))
-        equity = float(mt5_data.get('equity', 0))
-        open_pnl = equity - balance
-        
-        # Get commissions and swaps
-        commissions = float(mt5_data.get('commission', 0))
-        swaps = float(mt5_data.get('swap', 0))
-        
-        # Update challenge
-        challenge.current_balance = balance
-        challenge.current_equity = equity
-        
-        # Update daily drawdown
-        day_data = challenge.update_daily_drawdown(
-            current_balance=balance,
-            current_equity=equity,
-            open_pnl=open_pnl,
-            commissions=commissions,
-            swaps=swaps
-        )
-        
-        # Update total profit/loss
-        if challenge.initial_balance:
-            total_pnl = equity - float(challenge.initial_balance)
-            if total_pnl >= 0:
-                challenge.total_profit = total_pnl
-                challenge.total_loss = 0
-            else:
-                challenge.total_profit = 0
-                challenge.total_loss = abs(total_pnl)
+        snapshot = apply_account_snapshot(challenge, mt5_data)
+        balance = snapshot['balance']
+        equity = snapshot['equity']
+        open_pnl = snapshot['open_pnl']
+        day_data = snapshot['daily_stats']
         
         db.session.commit()
         
@@ -147,11 +111,18 @@ def sync_challenge_data(challenge_id):
 
 
 @shared_task(name='monitoring.check_all_violations')
-def check_all_violations():
+def check_all_violations(mode='vectorized'):
     """
     Check all active challenges for violations
     Runs every 10 seconds
+    
+    In 'vectorized' mode the whole book is evaluated in memory and only the
+    challenges that newly breached a loss rule are re-checked against the
+    database. 'per_challenge' re-queries every active challenge.
     """
+    if mode == 'vectorized':
+        return check_all_violations_vectorized()
+    
     try:
         active_challenges = Challenge.query.filter(
             Challenge.status.in_(['active', 'in_progress'])
@@ -185,6 +156,47 @@ def check_all_violations():
         return {'error': str(e)}
 
 
+def check_all_violations_vectorized():
+    """Evaluate all rules in one pass and act only on state changes"""
+    try:
+        changes = rule_evaluator.evaluate()
+        
+        # Only loss breaches need follow-up; the other changes are recorded now
+        rule_evaluator.acknowledge(
+            challenge_id
+            for state, ids in changes.items() if state not in ('max_loss', 'daily_loss')
+            for challenge_id in ids
+        )
+        
+        violations_found = 0
+        for state in ('max_loss', 'daily_loss'):
+            for challenge_id in changes[state]:
+                try:
+                    result = check_challenge_violations(challenge_id)
+                except Exception as e:
+                    logger.error(f"Error checking challenge {challenge_id}: {str(e)}")
+                    continue
+                if not result.get('success'):
+                    # Reported again on the next pass
+                    continue
+                rule_evaluator.acknowledge([challenge_id])
+                if result.get('violation_detected'):
+                    violations_found += 1
+        
+        if violations_found:
+            logger.info(f"Vectorized violation check: {len(rule_evaluator)} evaluated, {violations_found} violations")
+        
+        return {
+            'checked': len(rule_evaluator),
+            'violations': violations_found,
+            'changed': {state: ids for state, ids in changes.items() if ids}
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in vectorized violation check: {str(e)}")
+        return {'error': str(e)}
+
+
 @shared_task(name='monitoring.check_challenge_violations')
 def check_challenge_violations(challenge_id):
     """
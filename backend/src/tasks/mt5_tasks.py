@@ -0,0 +1,61 @@
+"""
+MT5 snapshot tasks
+Background refresh of stale MT5 account snapshots
+"""
+
+from datetime import datetime
+from src.celery_config import celery_app
+import logging
+
+logger = logging.getLogger(__name__)
+
+_sync_engine = None
+
+
+def get_sync_engine():
+    """Shared engine: pooled MT5 session and one rate budget per worker"""
+    global _sync_engine
+    if _sync_engine is None:
+        from src.services.mt5_sync_engine import MT5SyncEngine
+        _sync_engine = MT5SyncEngine()
+    return _sync_engine
+
+
+@celery_app.task(name='mt5.refresh_snapshots')
+def refresh_mt5_snapshots(logins):
+    """
+    Fetch the given MT5 logins concurrently and store their snapshots
+    Queued by readers that found stale snapshots
+    """
+    from src.app import create_app
+    from src.database import db
+    from src.models.mt5_models import MT5Account
+    from src.services.mt5_snapshot_cache import MT5SnapshotCache, apply_snapshot_to_account
+    
+    app = create_app()
+    
+    with app.app_context():
+        try:
+            fetched = get_sync_engine().fetch_accounts(logins)
+            fresh = {login: data for login, (data, error, _) in fetched.items() if data and not error}
+            failed = [login for login in logins if login not in fresh]
+        
+            MT5SnapshotCache.put_many(fresh)
+            MT5SnapshotCache.release_refresh(failed)
+        
+            # Keep the stored balances current for readers without Redis
+            now = datetime.utcnow()
+            if fresh:
+                for account in MT5Account.query.filter(MT5Account.mt5_login.in_(list(fresh))):
+                    apply_snapshot_to_account(account, fresh[account.mt5_login], now)
+                db.session.commit()
+        
+            if failed:
+                logger.warning(f"MT5 snapshot refresh failed for {len(failed)} login(s)")
+            return {'success': True, 'refreshed': len(fresh), 'errors': len(failed)}
+        
+        except Exception as e:
+            db.session.rollback()
+            MT5SnapshotCache.release_refresh(logins)
+            logger.error(f"Error in refresh_mt5_snapshots: {str(e)}")
+            return {'success': False, 'error': str(e)}
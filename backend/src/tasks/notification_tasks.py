@@ -0,0 +1,61 @@
+"""
+Celery tasks for bulk notifications
+"""
+import logging
+from src.celery_config import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(bind=True, name='src.tasks.notification_tasks.broadcast_notification', autoretry_for=(), max_retries=0)
+def broadcast_notification_task(self, notification_type, title, message, data=None, priority='normal',
+                                role=None, after_user_id=0):
+    """
+    Create a notification for every targeted user
+    
+    Progress (total, created, last_user_id) is reported as the PROGRESS
+    state after each chunk. Chunks already committed stay committed, so a
+    failed broadcast is not retried automatically; rerun it with
+    after_user_id set to the last reported last_user_id.
+    """
+    from src.app import create_app
+    from src.services.notification_broadcast_service import NotificationBroadcastService
+    
+    app = create_app()
+    
+    with app.app_context():
+        def report(state):
+            self.update_state(state='PROGRESS', meta=state)
+        
+        try:
+            return NotificationBroadcastService.broadcast(
+                notification_type=notification_type,
+                title=title,
+                message=message,
+                data=data,
+                priority=priority,
+                role=role,
+                after_user_id=after_user_id,
+                progress=report
+            )
+        except Exception as e:
+            from src.database import db
+            db.session.rollback()
+            logger.error(f'Broadcast "{title}" failed: {str(e)}')
+            raise
+
+
+@celery_app.task(name='src.tasks.notification_tasks.reconcile_unread_counts')
+def reconcile_unread_counts_task():
+    """
+    Correct cached unread counters that drifted from the database
+    Runs every 10 minutes
+    """
+    from src.app import create_app
+    from src.services.unread_count_service import UnreadCountService
+    
+    app = create_app()
+    
+    with app.app_context():
+        result = UnreadCountService.reconcile()
+        return {'checked': result['checked'], 'drift_count': len(result['drift'])}
@@ -0,0 +1,138 @@
+"""
+Batch loader for related rows of list endpoints
+DataLoader-style: keys of a page of results are queued, then resolved with
+one IN query per model on first access. Loaders are scoped to the request
+(on flask.g), so a user referenced from several rows or several places in
+the same request is fetched once.
+
+Usage:
+    users = get_loader(User)
+    users.prime(lead.assigned_to for lead in leads)
+    for lead in leads:
+        assigned = users.get(lead.assigned_to)  # first call runs the query
+
+    # Or fill many-to-one relationships so existing attribute access
+    # (challenge.user, challenge.program) does not lazy-load per row
+    prime_relationships(challenges, 'user', 'program')
+"""
+import logging
+
+from flask import g, has_app_context
+from sqlalchemy import inspect
+from sqlalchemy.orm.attributes import set_committed_value
+
+logger = logging.getLogger(__name__)
+
+# Keys per IN query
+CHUNK_SIZE = 1000
+
+
+class BatchLoader:
+    """
+    Load rows of one model by key, deduplicated and batched
+
+    Args:
+        model: Mapped class to load
+        key: Column attribute name to look rows up by (default primary key 'id')
+        options: Loader options applied to the query (e.g. load_only(...))
+    """
+
+    def __init__(self, model, key='id', options=()):
+        self.model = model
+        self.key = key
+        self.options = tuple(options)
+        self._rows = {}  # key -> row, or None when not found
+        self._pending = set()
+        self.queries = 0
+
+    def prime(self, keys):
+        """Queue keys for the next batch; None and already loaded keys are ignored"""
+        for key in keys:
+            if key is not None and key not in self._rows:
+                self._pending.add(key)
+        return self
+
+    def dispatch(self):
+        """Resolve every queued key"""
+        if not self._pending:
+            return
+        keys = list(self._pending)
+        self._pending.clear()
+
+        column = getattr(self.model, self.key)
+        for i in range(0, len(keys), CHUNK_SIZE):
+            chunk = keys[i:i + CHUNK_SIZE]
+            query = self.model.query.options(*self.options).filter(column.in_(chunk))
+            self.queries += 1
+            for row in query:
+                self._rows[getattr(row, self.key)] = row
+            for key in chunk:
+                self._rows.setdefault(key, None)
+
+    def get(self, key):
+        """Row for key, or None"""
+        if key is None:
+            return None
+        if key not in self._rows:
+            self._pending.add(key)
+            self.dispatch()
+        return self._rows.get(key)
+
+    def get_many(self, keys):
+        """Dict key -> row for the keys that exist"""
+        keys = [key for key in keys if key is not None]
+        self.prime(keys)
+        self.dispatch()
+        return {key: self._rows[key] for key in keys if self._rows.get(key) is not None}
+
+
+def get_loader(model, key='id', options=()):
+    """
+    Request-scoped loader for a model
+
+    Outside an application context a fresh, unshared loader is returned.
+    """
+    if not has_app_context():
+        return BatchLoader(model, key=key, options=options)
+    loaders = g.setdefault('_batch_loaders', {})
+    loader = loaders.get((model, key))
+    if loader is None:
+        loader = loaders[(model, key)] = BatchLoader(model, key=key, options=options)
+    return loader
+
+
+def prime_relationships(items, *names):
+    """
+    Populate many-to-one relationships of already loaded rows in one query each
+
+    Args:
+        items: Rows of one mapped class (e.g. a page of challenges)
+        names: Relationship attribute names (e.g. 'user', 'program')
+
+    Returns:
+        The items, for chaining
+    """
+    items = [item for item in items if item is not None]
+    if not items:
+        return items
+    mapper = inspect(type(items[0]))
+
+    for name in names:
+        relationship = mapper.relationships[name]
+        if relationship.uselist or len(relationship.local_columns) != 1:
+            raise ValueError(f"{mapper.class_.__name__}.{name} is not a simple many-to-one relationship")
+        (local_column,) = relationship.local_columns
+        (remote_column,) = [remote for local, remote in relationship.local_remote_pairs]
+        local_attr = mapper.get_property_by_column(local_column).key
+        remote_attr = relationship.mapper.get_property_by_column(remote_column).key
+
+        # Skip rows whose relationship is already loaded
+        todo = [item for item in items if name in inspect(item).unloaded]
+        if not todo:
+            continue
+
+        loader = get_loader(relationship.mapper.class_, key=remote_attr)
+        related = loader.get_many(getattr(item, local_attr) for item in todo)
+        for item in todo:
+            set_committed_value(item, name, related.get(getattr(item, local_attr)))
+    return items
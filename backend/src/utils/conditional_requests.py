@@ -0,0 +1,249 @@
+"""
+Conditional GET for PropTradePro
+Endpoints declare a cheap version of what they return, and If-None-Match is
+answered from it before the view runs, so a 304 costs one small query (or a
+cache read) instead of the view's queries and JSON serialization.
+
+A version is anything with a stable repr, usually one of:
+- query_version(): row count and latest updated_at of the queries the view
+  reads, fetched in a single SELECT
+- generation_version(): a cache generation that track_changes() bumps when a
+  model is inserted, updated or deleted through the ORM
+
+The ETag is derived from the endpoint, its arguments, the query string, the
+user (for private responses) and the version. The version is read before the
+view runs, so a change committed meanwhile only means one more full response,
+never a stale 304.
+"""
+from functools import wraps
+import hashlib
+import logging
+import time
+import uuid
+
+from flask import g, make_response, request
+from sqlalchemy import event, func, select
+
+from src import cache
+from src.database import db
+from src.utils.metrics import EventCounter
+from src.utils.session_hooks import collect, on_commit
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'conditional:{name}:generation'
+RESPONSE_KEY = 'conditional:response:{etag}'
+
+_events = EventCounter('conditional_requests', 'Conditional GETs answered, cached and rendered')
+
+
+def get_stats():
+    """
+    Conditional GETs of this process
+
+    Returns:
+        Dict with 304s sent, responses served from the response cache,
+        views rendered and requests without a version
+    """
+    stats = _events.values()
+    return {
+        'not_modified': stats.get('not_modified', 0),
+        'cached': stats.get('cached', 0),
+        'rendered': stats.get('rendered', 0),
+        'unversioned': stats.get('unversioned', 0),
+    }
+
+
+def reset_stats():
+    _events.reset()
+
+
+# ============================================================================
+# Versions
+# ============================================================================
+
+def query_version(*queries):
+    """
+    Row count and latest updated_at of each query, in one round trip
+
+    Args:
+        queries: Queries of models with an updated_at column, filtered like
+            the view's own queries (ordering and limits are ignored)
+    """
+    columns = []
+    for query in queries:
+        model = query.column_descriptions[0]['entity']
+        query = query.order_by(None).limit(None).offset(None)
+        columns.append(query.with_entities(func.count()).scalar_subquery())
+        columns.append(query.with_entities(func.max(model.updated_at)).scalar_subquery())
+    return tuple(db.session.execute(select(*columns)).one())
+
+
+def generation(name):
+    """Current change generation of name (None if the cache is unavailable)"""
+    try:
+        key = GENERATION_KEY.format(name=name)
+        current = cache.get(key)
+        if current is None:
+            current = uuid.uuid4().hex
+            cache.set(key, current, timeout=0)
+        return current
+    except Exception as e:
+        logger.warning(f"Generation of {name} unavailable: {e}")
+        return None
+
+
+def bump_generation(name):
+    """Start a new generation: every version derived from name changes"""
+    try:
+        cache.set(GENERATION_KEY.format(name=name), uuid.uuid4().hex, timeout=0)
+    except Exception as e:
+        logger.warning(f"Failed to bump generation of {name}: {e}")
+
+
+def generation_version(name, refresh=None):
+    """
+    Version function returning the generation of name
+
+    Args:
+        refresh: Seconds after which the version changes anyway, for responses
+            with counters (e.g. views) that track_changes() ignores
+    """
+    def version(**kwargs):
+        current = generation(name)
+        if current is None or refresh is None:
+            return current
+        return current, int(time.time() // refresh)
+    return version
+
+
+def track_changes(name, model, ignore=(), columns=None):
+    """
+    Bump the generation of name when rows of model are committed
+
+    Args:
+        ignore: Columns whose changes alone do not count, e.g. view counters
+        columns: Only changes to these columns count (default: every column
+            not ignored)
+    """
+    ignore = set(ignore) | {'updated_at'}
+
+    def mark(target, check_columns):
+        state = db.inspect(target)
+        if state.session is None:
+            return
+        attrs = [state.attrs[key] for key in columns] if columns is not None else state.attrs
+        if check_columns and not any(
+            attr.history.has_changes() for attr in attrs if attr.key not in ignore
+        ):
+            return
+        collect(state.session, 'conditional_changed').add(name)
+
+    @event.listens_for(model, 'after_insert')
+    def _inserted(mapper, connection, target):
+        mark(target, check_columns=False)
+
+    @event.listens_for(model, 'after_update')
+    def _updated(mapper, connection, target):
+        mark(target, check_columns=True)
+
+    @event.listens_for(model, 'after_delete')
+    def _deleted(mapper, connection, target):
+        mark(target, check_columns=False)
+
+
+@on_commit('conditional_changed')
+def _bump_on_commit(names):
+    for name in names:
+        bump_generation(name)
+
+
+# ============================================================================
+# Decorator
+# ============================================================================
+
+def _etag(version, private):
+    user = g.get('current_user') if private else None
+    key = (
+        request.endpoint,
+        sorted(request.view_args.items()) if request.view_args else (),
+        sorted(request.args.items(multi=True)),
+        getattr(user, 'id', None),
+        version,
+    )
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+def conditional(version, private=False, cache_timeout=None):
+    """
+    Answer conditional GETs from a version computed before the view runs
+
+    Args:
+        version: Called with the view arguments; returns the version of the
+            response, or None to run the view without a validator
+        private: The response depends on the current user (place below the
+            authentication decorator)
+        cache_timeout: Also cache rendered responses under their ETag for
+            this many seconds (for responses that are the same for everyone)
+
+    Usage:
+        @programs_bp.route('/', methods=['GET'])
+        @conditional(lambda **kwargs: query_version(TradingProgram.query))
+        def get_programs():
+            ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return f(*args, **kwargs)
+
+            try:
+                current = version(**kwargs)
+            except Exception as e:
+                logger.error(f"Version of {request.endpoint} unavailable: {str(e)}")
+                db.session.rollback()
+                current = None
+            if current is None:
+                _events.count(unversioned=1)
+                return f(*args, **kwargs)
+
+            etag = _etag(current, private)
+            if request.if_none_match.contains_weak(etag):
+                _events.count(not_modified=1)
+                response = make_response('', 304)
+                return _add_validators(response, etag, private)
+
+            key = RESPONSE_KEY.format(etag=etag)
+            if cache_timeout:
+                try:
+                    hit = cache.get(key)
+                    if hit is not None:
+                        _events.count(cached=1)
+                        data, content_type = hit
+                        return _add_validators(make_response(data, 200, {'Content-Type': content_type}), etag, private)
+                except Exception as e:
+                    logger.warning(f"Response cache read failed: {e}")
+
+            _events.count(rendered=1)
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            if cache_timeout:
+                try:
+                    cache.set(key, (response.get_data(), response.content_type), timeout=cache_timeout)
+                except Exception as e:
+                    logger.warning(f"Response cache write failed: {e}")
+            return _add_validators(response, etag, private)
+
+        return decorated
+    return decorator
+
+
+def _add_validators(response, etag, private):
+    # Weak: the body is equivalent, not byte-identical (e.g. after compression)
+    response.set_etag(etag, weak=True)
+    if private:
+        response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
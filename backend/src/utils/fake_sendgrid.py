@@ -0,0 +1,80 @@
+"""
+Fake SendGrid client
+Local sink with the SendGridAPIClient.send() interface for load tests and
+development: messages are accepted (after an optional simulated latency,
+with an optional simulated failure rate) and counted, never delivered.
+
+Enabled with EMAIL_BACKEND=fake; FAKE_SENDGRID_LATENCY_MS and
+FAKE_SENDGRID_FAILURE_RATE shape its behaviour.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+
+
+class FakeResponse(NamedTuple):
+    status_code: int
+    body: bytes = b''
+    headers: dict = {}
+
+
+class FakeSendGridError(Exception):
+    """Simulated API failure"""
+
+
+class FakeSendGridClient:
+    """
+    Thread-safe stand-in for SendGridAPIClient
+
+    Args:
+        latency: Seconds each send() call takes
+        failure_rate: Fraction of calls that raise FakeSendGridError
+        keep: Most recent message payloads kept for inspection
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, keep=1000, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.messages = deque(maxlen=keep)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.recipients = 0
+
+    def send(self, message):
+        payload = message if isinstance(message, dict) else message.get()
+        recipients = sum(len(p.get('to', [])) for p in payload.get('personalizations', []))
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            if self.failure_rate and self._random.random() < self.failure_rate:
+                self.failures += 1
+                raise FakeSendGridError('Simulated SendGrid failure')
+            self.recipients += recipients
+            self.messages.append(payload)
+        return FakeResponse(status_code=202)
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'failures': self.failures, 'recipients': self.recipients}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_fake_client():
+    """Process-wide fake client, configured from the environment on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = FakeSendGridClient(
+                latency=float(os.getenv('FAKE_SENDGRID_LATENCY_MS', '0')) / 1000,
+                failure_rate=float(os.getenv('FAKE_SENDGRID_FAILURE_RATE', '0')),
+            )
+        return _client
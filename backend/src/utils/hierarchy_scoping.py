@@ -60,9 +60,14 @@ class HierarchyScopedMixin:
         # Get FK column name
         fk_col = getattr(cls, cls.__hierarchy_user_fk__)
         
-        # Filter: user_id IN (SELECT id FROM users WHERE tree_path LIKE 'current_user_path%')
+        # Filter: user_id IN (SELECT descendant_id FROM user_closure WHERE ancestor_id = current_user.id)
+        user_id = getattr(current_user, 'id', None)
+        if user_id is not None:
+            from src.models.user_closure import UserClosure
+            return fk_col.in_(UserClosure.descendant_ids_query(user_id))
+        
+        # No ID available - fall back to the tree_path prefix scan
         # FIXED: Escape special characters to prevent SQL injection
-        from sqlalchemy import func
         safe_tree_path = current_user.tree_path.replace("%", "\\%").replace("_", "\\_")
         return fk_col.in_(
             User.query.filter(
@@ -91,6 +96,7 @@ def set_request_hierarchy_scope(session, current_user):
         g.hierarchy_scope_user = current_user
         # Store user data to avoid accessing current_user object in Event Hook
         g.hierarchy_scope_role = getattr(current_user, 'role', None)
+        g.hierarchy_scope_user_id = getattr(current_user, 'id', None)
         g.hierarchy_scope_tree_path = getattr(current_user, 'tree_path', None)
         g.hierarchy_scope_parent_id = getattr(current_user, 'parent_id', None)
         g.hierarchy_scope_enabled = True
@@ -169,6 +175,7 @@ def init_hierarchy_scoping(db, user_model):
         role_value = getattr(g, 'hierarchy_scope_role', None)
         tree_path = getattr(g, 'hierarchy_scope_tree_path', None)
         parent_id = getattr(g, 'hierarchy_scope_parent_id', None)
+        user_id = getattr(g, 'hierarchy_scope_user_id', None)
         
         if not role_value or not tree_path:
             return
@@ -198,14 +205,15 @@ def init_hierarchy_scoping(db, user_model):
                 continue
             
             # Get the filter for this model
-            # Create a simple object with tree_path, role, and parent_id to avoid accessing current_user
+            # Create a simple object with id, tree_path, role, and parent_id to avoid accessing current_user
             class _ScopeData:
-                def __init__(self, tree_path, role, parent_id):
+                def __init__(self, id, tree_path, role, parent_id):
+                    self.id = id
                     self.tree_path = tree_path
                     self.role = role
                     self.parent_id = parent_id
             
-            scope_data = _ScopeData(tree_path, role_value, parent_id)
+            scope_data = _ScopeData(user_id, tree_path, role_value, parent_id)
             filter_condition = model.hierarchy_filter_for_entity(scope_data)
             
             if filter_condition is not None:
@@ -0,0 +1,393 @@
+"""
+Request instrumentation for PropTradePro
+Per-endpoint cost of every request: SQL statements and time, Redis and MT5
+calls and response size, exported as Prometheus histograms next to the
+latency histograms of prometheus_flask_exporter (grouped by endpoint).
+
+Requests that run one SQL statement at least N_PLUS_ONE_THRESHOLD times (an
+N+1 query pattern) are aggregated per endpoint and statement, and requests
+slower than SLOW_REQUEST_SECONDS are kept with their SQL (at most one trace
+per endpoint every TRACE_INTERVAL seconds). Both are stored in Redis so the
+admin performance report covers every worker; without Redis each worker
+keeps its own bounded copy.
+"""
+from collections import OrderedDict, deque
+from datetime import datetime
+from functools import wraps
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from flask import g, has_request_context, request
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.database import get_redis
+
+logger = logging.getLogger(__name__)
+
+# A statement run this many times in one request is reported as N+1
+N_PLUS_ONE_THRESHOLD = 5
+# Requests slower than this are traced
+SLOW_REQUEST_SECONDS = 1.0
+# Seconds between two traces of the same endpoint
+TRACE_INTERVAL = 60
+# Statements kept per trace (slowest first) and their maximum length
+TRACE_STATEMENTS = 25
+STATEMENT_MAX_LENGTH = 2000
+# Distinct statements tracked per request
+MAX_STATEMENTS_PER_REQUEST = 500
+# Offenders and traces kept
+MAX_OFFENDERS = 200
+MAX_TRACES = 100
+REPORT_TTL = 7 * 86400
+
+OFFENDERS_KEY = 'perf:n_plus_one'
+OFFENDER_KEY = 'perf:n_plus_one:{digest}'
+TRACES_KEY = 'perf:slow_requests'
+TRACE_THROTTLE_KEY = 'perf:slow_requests:throttle:{endpoint}'
+
+# Endpoints that are not instrumented
+SKIPPED_ENDPOINTS = ('static', 'prometheus_metrics')
+
+SQL_STATEMENTS = Histogram(
+    'http_request_sql_statements', 'SQL statements executed per request', ['endpoint'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+)
+SQL_SECONDS = Histogram(
+    'http_request_sql_seconds', 'Time spent in SQL per request', ['endpoint'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+REDIS_CALLS = Histogram(
+    'http_request_redis_calls', 'Redis round trips per request', ['endpoint'],
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100)
+)
+MT5_CALLS = Histogram(
+    'http_request_mt5_calls', 'MT5 API calls per request', ['endpoint'],
+    buckets=(0, 1, 2, 5, 10, 25, 50)
+)
+RESPONSE_BYTES = Histogram(
+    'http_response_size_bytes', 'Response body size', ['endpoint'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+)
+
+_local_lock = threading.Lock()
+_local_offenders = OrderedDict()  # digest -> offender dict
+_local_traces = deque(maxlen=MAX_TRACES)
+_local_trace_times = {}  # endpoint -> last trace (monotonic)
+
+_installed = False
+
+
+class RequestCost:
+    """What one request has spent so far"""
+
+    __slots__ = ('started', 'sql_count', 'sql_seconds', 'statements', 'redis_calls', 'redis_seconds',
+                 'mt5_calls', 'mt5_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.statements = {}  # statement -> [executions, seconds]
+        self.redis_calls = 0
+        self.redis_seconds = 0.0
+        self.mt5_calls = 0
+        self.mt5_seconds = 0.0
+
+    def add_statement(self, statement, seconds):
+        self.sql_count += 1
+        self.sql_seconds += seconds
+        entry = self.statements.get(statement)
+        if entry is not None:
+            entry[0] += 1
+            entry[1] += seconds
+        elif len(self.statements) < MAX_STATEMENTS_PER_REQUEST:
+            self.statements[statement] = [1, seconds]
+
+    def repeated_statements(self):
+        """(statement, executions, seconds) run at least N_PLUS_ONE_THRESHOLD times"""
+        return [
+            (statement, count, seconds)
+            for statement, (count, seconds) in self.statements.items()
+            if count >= N_PLUS_ONE_THRESHOLD
+        ]
+
+
+def current_cost():
+    """RequestCost of the request being handled, or None"""
+    if has_request_context():
+        return g.get('_request_cost')
+    return None
+
+
+def record_call(kind, seconds=0.0):
+    """Count a call to an external service ('redis' or 'mt5') against the current request"""
+    cost = current_cost()
+    if cost is None:
+        return
+    if kind == 'redis':
+        cost.redis_calls += 1
+        cost.redis_seconds += seconds
+    elif kind == 'mt5':
+        cost.mt5_calls += 1
+        cost.mt5_seconds += seconds
+
+
+def mt5_response_hook(response, *args, **kwargs):
+    """requests response hook counting MT5 API calls"""
+    record_call('mt5', response.elapsed.total_seconds())
+
+
+# ============================================================================
+# Collectors
+# ============================================================================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which is dropped with a failed statement
+    if context is not None and current_cost() is not None:
+        context._request_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    cost = current_cost()
+    started = getattr(context, '_request_query_start', None)
+    if cost is not None and started is not None:
+        cost.add_statement(statement, time.perf_counter() - started)
+
+
+def _instrument_redis():
+    """Count Redis round trips: single commands and pipeline executions"""
+    import redis
+    from redis.client import Pipeline
+
+    def timed(method):
+        if getattr(method, '_instrumented', False):
+            return method
+
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            cost = current_cost()
+            if cost is None:
+                return method(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                cost.redis_calls += 1
+                cost.redis_seconds += time.perf_counter() - started
+
+        wrapper._instrumented = True
+        return wrapper
+
+    redis.Redis.execute_command = timed(redis.Redis.execute_command)
+    Pipeline.execute = timed(Pipeline.execute)
+
+
+# ============================================================================
+# Offenders and traces
+# ============================================================================
+
+def _statement_text(statement):
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= STATEMENT_MAX_LENGTH else statement[:STATEMENT_MAX_LENGTH] + '…'
+
+
+def _record_offenders(endpoint, repeated, now):
+    redis_client = get_redis()
+    offenders = []
+    for statement, count, seconds in repeated:
+        digest = hashlib.sha1(f'{endpoint}\0{statement}'.encode()).hexdigest()[:16]
+        offenders.append((digest, statement, count, seconds))
+
+    if redis_client:
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for digest, statement, count, seconds in offenders:
+                key = OFFENDER_KEY.format(digest=digest)
+                pipe.hset(key, mapping={
+                    'endpoint': endpoint,
+                    'statement': _statement_text(statement),
+                    'last_executions': count,
+                    'last_seen': now,
+                })
+                pipe.hincrby(key, 'requests', 1)
+                pipe.hincrby(key, 'executions', count)
+                pipe.hincrbyfloat(key, 'seconds', seconds)
+                pipe.expire(key, REPORT_TTL)
+                pipe.zincrby(OFFENDERS_KEY, count, digest)
+            pipe.zremrangebyrank(OFFENDERS_KEY, 0, -(MAX_OFFENDERS + 1))
+            pipe.expire(OFFENDERS_KEY, REPORT_TTL)
+            pipe.execute()
+            return
+        except Exception as e:
+            logger.error(f"Failed to record N+1 queries: {str(e)}")
+
+    with _local_lock:
+        for digest, statement, count, seconds in offenders:
+            offender = _local_offenders.setdefault(digest, {
+                'endpoint': endpoint,
+                'statement': _statement_text(statement),
+                'requests': 0,
+                'executions': 0,
+                'seconds': 0.0,
+            })
+            offender['requests'] += 1
+            offender['executions'] += count
+            offender['seconds'] += seconds
+            offender['last_executions'] = count
+            offender['last_seen'] = now
+        while len(_local_offenders) > MAX_OFFENDERS:
+            least = min(_local_offenders, key=lambda digest: _local_offenders[digest]['executions'])
+            del _local_offenders[least]
+
+
+def _record_trace(endpoint, trace):
+    redis_client = get_redis()
+    if redis_client:
+        try:
+            if not redis_client.set(TRACE_THROTTLE_KEY.format(endpoint=endpoint), '1', nx=True, ex=TRACE_INTERVAL):
+                return
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.lpush(TRACES_KEY, json.dumps(trace))
+            pipe.ltrim(TRACES_KEY, 0, MAX_TRACES - 1)
+            pipe.expire(TRACES_KEY, REPORT_TTL)
+            pipe.execute()
+            return
+        except Exception as e:
+            logger.error(f"Failed to record slow request trace: {str(e)}")
+
+    now = time.monotonic()
+    with _local_lock:
+        last = _local_trace_times.get(endpoint)
+        if last is not None and now - last < TRACE_INTERVAL:
+            return
+        _local_trace_times[endpoint] = now
+        _local_traces.appendleft(trace)
+
+
+def n_plus_one_report(limit=20):
+    """
+    Endpoints and statements with the most repeated executions
+
+    Returns:
+        List of dicts (endpoint, statement, requests, executions, seconds,
+        last_executions, last_seen), worst first
+    """
+    redis_client = get_redis()
+    if redis_client:
+        try:
+            digests = redis_client.zrevrange(OFFENDERS_KEY, 0, limit - 1)
+            pipe = redis_client.pipeline(transaction=False)
+            for digest in digests:
+                pipe.hgetall(OFFENDER_KEY.format(digest=digest))
+            report = []
+            for offender in pipe.execute():
+                if not offender:
+                    continue
+                for field in ('requests', 'executions', 'last_executions'):
+                    offender[field] = int(offender.get(field, 0))
+                offender['seconds'] = round(float(offender.get('seconds', 0)), 3)
+                offender['last_seen'] = float(offender.get('last_seen', 0))
+                report.append(offender)
+            return report
+        except Exception as e:
+            logger.error(f"Failed to read N+1 report: {str(e)}")
+
+    with _local_lock:
+        offenders = sorted(_local_offenders.values(), key=lambda offender: -offender['executions'])[:limit]
+        return [dict(offender, seconds=round(offender['seconds'], 3)) for offender in offenders]
+
+
+def slow_request_traces(limit=20):
+    """Most recent slow request traces, newest first"""
+    redis_client = get_redis()
+    if redis_client:
+        try:
+            return [json.loads(trace) for trace in redis_client.lrange(TRACES_KEY, 0, limit - 1)]
+        except Exception as e:
+            logger.error(f"Failed to read slow request traces: {str(e)}")
+    with _local_lock:
+        return list(_local_traces)[:limit]
+
+
+def reset_local():
+    """Drop this worker's offenders and traces"""
+    with _local_lock:
+        _local_offenders.clear()
+        _local_traces.clear()
+        _local_trace_times.clear()
+
+
+# ============================================================================
+# Flask integration
+# ============================================================================
+
+def _start_request():
+    if request.endpoint not in SKIPPED_ENDPOINTS:
+        g._request_cost = RequestCost()
+
+
+def _finish_request(response):
+    cost = g.pop('_request_cost', None)
+    if cost is None:
+        return response
+    duration = time.perf_counter() - cost.started
+    endpoint = request.endpoint or 'unmatched'
+
+    SQL_STATEMENTS.labels(endpoint).observe(cost.sql_count)
+    SQL_SECONDS.labels(endpoint).observe(cost.sql_seconds)
+    REDIS_CALLS.labels(endpoint).observe(cost.redis_calls)
+    MT5_CALLS.labels(endpoint).observe(cost.mt5_calls)
+    size = response.calculate_content_length()
+    if size is not None:
+        RESPONSE_BYTES.labels(endpoint).observe(size)
+
+    now = time.time()
+    repeated = cost.repeated_statements()
+    if repeated:
+        _record_offenders(endpoint, repeated, now)
+
+    if duration >= SLOW_REQUEST_SECONDS:
+        statements = sorted(cost.statements.items(), key=lambda item: -item[1][1])[:TRACE_STATEMENTS]
+        _record_trace(endpoint, {
+            'endpoint': endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'at': datetime.utcfromtimestamp(now).isoformat(),
+            'duration_ms': round(duration * 1000, 1),
+            'sql_count': cost.sql_count,
+            'sql_ms': round(cost.sql_seconds * 1000, 1),
+            'redis_calls': cost.redis_calls,
+            'redis_ms': round(cost.redis_seconds * 1000, 1),
+            'mt5_calls': cost.mt5_calls,
+            'mt5_ms': round(cost.mt5_seconds * 1000, 1),
+            'response_bytes': size,
+            'statements': [
+                {'statement': _statement_text(statement), 'executions': count, 'ms': round(seconds * 1000, 2)}
+                for statement, (count, seconds) in statements
+            ],
+        })
+    return response
+
+
+def init_instrumentation(app):
+    """
+    Instrument every request of app
+
+    Register before other after_request handlers so their time is included
+    (Flask runs after_request handlers in reverse order).
+    """
+    global _installed
+    if not _installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _instrument_redis()
+        _installed = True
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
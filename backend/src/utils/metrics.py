@@ -0,0 +1,47 @@
+"""
+Shared event counters for PropTradePro
+Components count their events (cache hits, fallbacks, seconds spent) on an
+EventCounter: each one is a Prometheus counter labelled by event, so every
+worker's totals are scraped, plus this process's totals for the summaries
+shown by /health.
+"""
+from collections import Counter as Totals
+import threading
+
+from prometheus_client import Counter
+
+
+class EventCounter:
+    """Event totals of one component, exported as <name>_events_total{event=...}"""
+
+    def __init__(self, name, description):
+        self.name = name
+        self._counter = Counter(f'{name}_events', description, ['event'])
+        self._totals = Totals()
+        self._maxima = {}
+        self._lock = threading.Lock()
+
+    def count(self, **values):
+        """Add to the named events, e.g. count(hits=1, wait_seconds=0.2)"""
+        with self._lock:
+            self._totals.update(values)
+        for event, value in values.items():
+            if value:
+                self._counter.labels(event).inc(value)
+
+    def record_max(self, event, value):
+        """Keep the largest value seen for event (this process only)"""
+        with self._lock:
+            if value > self._maxima.get(event, 0):
+                self._maxima[event] = value
+
+    def values(self):
+        """This process's totals and maxima"""
+        with self._lock:
+            return {**self._totals, **self._maxima}
+
+    def reset(self):
+        """Clear this process's totals (the Prometheus counters are monotonic)"""
+        with self._lock:
+            self._totals.clear()
+            self._maxima.clear()
@@ -2,8 +2,10 @@
 Hierarchical permissions system
 Each role can see more data based on their position in the hierarchy
 """
+from src.database import db
 from src.models.user import User
-from sqlalchemy import or_, and_
+from src.models.user_closure import UserClosure
+from sqlalchemy import or_, and_, select
 
 
 class PermissionManager:
@@ -45,30 +47,34 @@ class PermissionManager:
             return viewer.id == target_user.id
         
         # Check if target is in viewer's downline
-        target_ancestors = target_user.get_ancestors()
-        return viewer in target_ancestors
+        return UserClosure.is_ancestor(viewer.id, target_user.id)
     
     @staticmethod
     def get_viewable_user_ids(user):
         """Get list of user IDs that this user can view"""
         
+        return db.session.execute(
+            PermissionManager.get_viewable_user_ids_query(user)
+        ).scalars().all()
+    
+    @staticmethod
+    def get_viewable_user_ids_query(user):
+        """Get a SELECT of viewable user IDs, for use in `.in_()` filters"""
+        
         # Admin sees all
         if user.role == 'master':
-            all_users = User.query.all()
-            return [u.id for u in all_users]
+            return select(User.id)
         
         # Guest sees none
         if user.role == 'guest':
-            return []
+            return select(User.id).where(User.id == -1)
         
         # Trader sees only self
         if user.role == 'trader':
-            return [user.id]
+            return select(User.id).where(User.id == user.id)
         
         # Others see self + all downline
-        descendants = user.get_all_descendants()
-        viewable_ids = [user.id] + [d.id for d in descendants]
-        return viewable_ids
+        return UserClosure.descendant_ids_query(user.id)
     
     @staticmethod
     def get_viewable_users_query(user):
@@ -86,16 +92,8 @@ class PermissionManager:
         if user.role == 'trader':
             return User.query.filter(User.id == user.id)
         
-        # Others see self + downline using tree_path
-        if user.tree_path:
-            return User.query.filter(
-                or_(
-                    User.id == user.id,
-                    User.tree_path.like(f"{user.tree_path}/%")
-                )
-            )
-        else:
-            return User.query.filter(User.id == user.id)
+        # Others see self + downline
+        return User.query.filter(User.id.in_(UserClosure.descendant_ids_query(user.id)))
     
     @staticmethod
     def can_create_role(creator, target_role):
@@ -136,8 +134,7 @@ class PermissionManager:
             return editor.id == target_user.id
         
         # Can edit users in downline
-        target_ancestors = target_user.get_ancestors()
-        return editor in target_ancestors
+        return UserClosure.is_ancestor(editor.id, target_user.id)
     
     @staticmethod
     def can_delete_user(deleter, target_user):
@@ -156,8 +153,7 @@ class PermissionManager:
             return False
         
         # Can delete users in downline
-        target_ancestors = target_user.get_ancestors()
-        return deleter in target_ancestors
+        return UserClosure.is_ancestor(deleter.id, target_user.id)
     
     @staticmethod
     def get_data_scope(user):
@@ -190,7 +186,7 @@ class PermissionManager:
             return query.filter(Challenge.user_id == user.id)
         
         # Others see challenges of viewable users
-        viewable_ids = PermissionManager.get_viewable_user_ids(user)
+        viewable_ids = PermissionManager.get_viewable_user_ids_query(user)
         return query.filter(Challenge.user_id.in_(viewable_ids))
     
     @staticmethod
@@ -211,7 +207,7 @@ class PermissionManager:
             return query.filter(Payment.user_id == user.id)
         
         # Others see payments of viewable users
-        viewable_ids = PermissionManager.get_viewable_user_ids(user)
+        viewable_ids = PermissionManager.get_viewable_user_ids_query(user)
         return query.filter(Payment.user_id.in_(viewable_ids))
     
     @staticmethod
@@ -232,7 +228,7 @@ class PermissionManager:
             return query.filter(Withdrawal.user_id == user.id)
         
         # Others see withdrawals of viewable users
-        viewable_ids = PermissionManager.get_viewable_user_ids(user)
+        viewable_ids = PermissionManager.get_viewable_user_ids_query(user)
         return query.filter(Withdrawal.user_id.in_(viewable_ids))
     
     @staticmethod
@@ -253,7 +249,7 @@ class PermissionManager:
             return query.filter(Lead.id == -1)
         
         # Others see leads assigned to them or their downline
-        viewable_ids = PermissionManager.get_viewable_user_ids(user)
+        viewable_ids = PermissionManager.get_viewable_user_ids_query(user)
         return query.filter(
             or_(
                 Lead.assigned_to.in_(viewable_ids),
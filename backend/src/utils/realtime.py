@@ -0,0 +1,88 @@
+"""
+Realtime events
+Emit Socket.IO events from any process (web workers, Celery) through the
+Socket.IO message queue, so the Socket.IO server fans them out to the
+connected clients. Events go to rooms rather than to individual sockets:
+
+    notifications        every signed-in client
+    role:<role>          clients of users with that role
+    user_<user_id>       one user's clients (all tabs)
+
+The Socket.IO server joins each client to its rooms on connect: it calls
+register_socketio_handlers(socketio) once, and clients connect with their
+access token (the access_token cookie, or {"token": ...} as the auth payload).
+Connections without a valid token are refused.
+"""
+import logging
+import threading
+
+from flask import current_app, has_app_context, request
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_ROOM = 'notifications'
+
+_emitter = None
+_emitter_lock = threading.Lock()
+
+
+def role_room(role):
+    return f'role:{role}'
+
+
+def user_room(user_id):
+    return f'user_{user_id}'
+
+
+def rooms_for(user):
+    """Rooms a signed-in user's clients belong to"""
+    return [BROADCAST_ROOM, role_room(user.role), user_room(user.id)]
+
+
+def register_socketio_handlers(socketio):
+    """Authenticate Socket.IO connections and join them to their rooms"""
+    from flask_socketio import join_room
+    from src.middleware.auth import user_from_token
+
+    @socketio.on('connect')
+    def join_rooms_on_connect(auth=None):
+        token = (auth or {}).get('token') or request.cookies.get('access_token')
+        user = user_from_token(token) if token else None
+        if user is None:
+            return False
+        for room in rooms_for(user):
+            join_room(room)
+        return True
+
+    return join_rooms_on_connect
+
+
+def _get_emitter():
+    """Write-only Socket.IO client on the message queue, created on first use"""
+    global _emitter
+    with _emitter_lock:
+        if _emitter is None:
+            from flask_socketio import SocketIO
+            url = current_app.config.get('SOCKETIO_MESSAGE_QUEUE') or current_app.config.get('REDIS_URL')
+            _emitter = SocketIO(message_queue=url)
+        return _emitter
+
+
+def emit_to_room(event, payload, room):
+    """
+    Emit one event to a room
+
+    Failures are logged and swallowed: realtime events are a hint to
+    refresh, never the only copy of the data.
+
+    Returns:
+        True if the event was queued
+    """
+    if not has_app_context():
+        return False
+    try:
+        _get_emitter().emit(event, payload, room=room)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to emit {event} to {room}: {str(e)}")
+        return False
@@ -0,0 +1,72 @@
+"""
+Commit hooks for ORM write listeners
+Mapper listeners collect what a transaction changed in session.info; the
+collected values are handed to a callback once the transaction commits and
+dropped if it rolls back. One pair of session listeners serves every key.
+
+Usage:
+    @event.listens_for(Tenant, 'after_update')
+    def _changed(mapper, connection, target):
+        session = db.inspect(target).session
+        if session is not None:
+            collect(session, 'changed_tenants').add(target.id)
+
+    @on_commit('changed_tenants')
+    def _publish(tenant_ids):
+        tenant_resolver.publish_invalidation(tenant_ids)
+"""
+import logging
+
+from sqlalchemy import event
+
+from src.database import db
+
+logger = logging.getLogger(__name__)
+
+# (keys, callback) in registration order
+_commit_hooks = []
+# Every session.info key dropped on rollback
+_rollback_keys = set()
+
+
+def collect(session, key, factory=set):
+    """The value collected under key in this transaction, created on first use"""
+    return session.info.setdefault(key, factory())
+
+
+def on_commit(*keys):
+    """
+    Decorator: call f(*values) after a commit that collected any of keys
+
+    Values are popped from session.info (None for keys with nothing
+    collected) and dropped on rollback. A failing callback is logged, so it
+    cannot keep the others from running.
+    """
+    def decorator(f):
+        _commit_hooks.append((keys, f))
+        _rollback_keys.update(keys)
+        return f
+    return decorator
+
+
+def discard_on_rollback(*keys):
+    """Drop keys consumed before commit (e.g. in after_flush) if the transaction rolls back"""
+    _rollback_keys.update(keys)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _run_commit_hooks(session):
+    for keys, callback in _commit_hooks:
+        values = [session.info.pop(key, None) for key in keys]
+        if not any(values):
+            continue
+        try:
+            callback(*values)
+        except Exception:
+            logger.exception(f"Commit hook {callback.__qualname__} failed")
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_on_rollback(session):
+    for key in _rollback_keys:
+        session.info.pop(key, None)
@@ -0,0 +1,237 @@
+"""
+Query-count regression tests for list endpoints
+Each endpoint is called with a small and a larger page of rows; the number
+of SQL statements must not grow with the number of rows (no N+1)
+"""
+import pytest
+import uuid
+from flask import g
+from src.models.agent import Agent
+from src.models.commission import Commission
+from src.models.lead import Lead
+from src.models.payment_approval import PaymentApprovalRequest
+from src.models.referral import Referral
+from src.models.tenant import Tenant
+from src.models.trading_program import Challenge, TradingProgram
+from src.models.user import User
+from src.models.withdrawal import Withdrawal
+
+
+def extract_cookie_value(response, cookie_name):
+    """Helper to extract cookie value from response"""
+    for cookie in response.headers.getlist('Set-Cookie'):
+        if cookie.startswith(f'{cookie_name}='):
+            return cookie.split(';')[0].split('=', 1)[1]
+    return None
+
+
+def make_user(session, role='trader'):
+    user = User(
+        email=f'{role}_{uuid.uuid4().hex[:8]}@test.com',
+        first_name='Test',
+        last_name=role.title(),
+        role=role
+    )
+    user.set_password('Test123!')
+    user.is_verified = True
+    session.add(user)
+    session.commit()
+    return user
+
+
+def login(client, user):
+    response = client.post('/api/v1/auth/login', json={'email': user.email, 'password': 'Test123!'})
+    return {'Authorization': f"Bearer {extract_cookie_value(response, 'access_token')}"}
+
+
+def add_leads(session, count):
+    """Leads each assigned to a different user"""
+    for _ in range(count):
+        assignee = make_user(session, role='agent')
+        session.add(Lead(
+            first_name='Lead',
+            last_name='Test',
+            email=f'lead_{uuid.uuid4().hex[:8]}@test.com',
+            status='new',
+            score=50,
+            assigned_to=assignee.id
+        ))
+    session.commit()
+
+
+def make_agent(session):
+    agent = Agent(agent_code=uuid.uuid4().hex[:8].upper(), user_id=make_user(session, role='agent').id)
+    session.add(agent)
+    session.commit()
+    return agent
+
+
+def make_challenge(session, program):
+    challenge = Challenge(user_id=make_user(session).id, program_id=program.id, status='active')
+    session.add(challenge)
+    session.commit()
+    return challenge
+
+
+def add_commissions(session, count, program):
+    """Commissions each with its own agent, referral and challenge"""
+    for _ in range(count):
+        agent = make_agent(session)
+        referral = Referral(agent_id=agent.id, referred_user_id=make_user(session).id,
+                            referral_code=agent.agent_code)
+        session.add(referral)
+        session.flush()
+        session.add(Commission(
+            agent_id=agent.id,
+            referral_id=referral.id,
+            challenge_id=make_challenge(session, program).id,
+            sale_amount=100,
+            commission_rate=10,
+            commission_amount=10
+        ))
+    session.commit()
+
+
+def add_approval_requests(session, count, program, requested_by=None):
+    """Pending cash approvals, each for a different trader and challenge"""
+    for _ in range(count):
+        challenge = make_challenge(session, program)
+        session.add(PaymentApprovalRequest(
+            challenge_id=challenge.id,
+            requested_by=requested_by.id if requested_by else make_user(session, role='master').id,
+            requested_for=challenge.user_id,
+            reviewed_by=make_user(session, role='supermaster').id if requested_by else None,
+            amount=100,
+            payment_type='cash'
+        ))
+    session.commit()
+
+
+def add_withdrawals(session, count):
+    """Withdrawals alternating between agents and traders"""
+    for i in range(count):
+        owner = {'agent_id': make_agent(session).id} if i % 2 else {'user_id': make_user(session).id}
+        session.add(Withdrawal(amount=100, net_amount=100, payment_method='bank_transfer', **owner))
+    session.commit()
+
+
+def forget_loaded_rows(session):
+    """
+    Start the next request cold
+
+    Requests here share the test's app context, so request-scoped batch
+    loaders (on g) and the identity map would otherwise carry over.
+    """
+    g.pop('_batch_loaders', None)
+    session.expunge_all()
+
+
+def assert_queries_do_not_grow(client, session, count_queries, path, headers, add_rows):
+    """Two and then twelve rows must cost the same number of statements"""
+    add_rows(2)
+    # Warm-up request, so one-off work (e.g. caching the principal) is not counted
+    assert client.get(path, headers=headers).status_code == 200
+    forget_loaded_rows(session)
+    with count_queries() as few:
+        assert client.get(path, headers=headers).status_code == 200
+
+    add_rows(10)
+    forget_loaded_rows(session)
+    with count_queries(max_queries=few.count) as many:
+        assert client.get(path, headers=headers).status_code == 200
+
+    assert many.count == few.count
+
+
+@pytest.fixture
+def master_headers(client, session):
+    return login(client, make_user(session, role='master'))
+
+
+@pytest.fixture
+def supermaster(session):
+    return make_user(session, role='supermaster')
+
+
+@pytest.fixture
+def supermaster_headers(client, supermaster):
+    return login(client, supermaster)
+
+
+@pytest.fixture
+def program(session):
+    tenant = Tenant(name='Test Tenant', subdomain=f'test_{uuid.uuid4().hex[:8]}')
+    session.add(tenant)
+    session.flush()
+    program = TradingProgram(tenant_id=tenant.id, name='Test Program', type='one_phase',
+                             account_size=10000, profit_target=10, price=100)
+    session.add(program)
+    session.commit()
+    return program
+
+
+class TestCRMQueryCounts:
+    """CRM lists hydrate assignees in one query"""
+
+    @pytest.mark.parametrize('path', [
+        '/api/v1/crm/leads?per_page=50',
+        '/api/v1/crm/pipeline?per_column=50',
+    ])
+    def test_queries_do_not_grow_with_rows(self, client, session, master_headers, count_queries, path):
+        add_leads(session, 2)
+        with count_queries() as few:
+            assert client.get(path, headers=master_headers).status_code == 200
+
+        add_leads(session, 10)
+        with count_queries(max_queries=few.count) as many:
+            assert client.get(path, headers=master_headers).status_code == 200
+
+        assert many.count == few.count
+
+    def test_stats_is_one_aggregate(self, client, session, master_headers, count_queries):
+        add_leads(session, 5)
+        with count_queries() as baseline:
+            client.get('/api/v1/crm/leads?per_page=1', headers=master_headers)
+        with count_queries() as stats:
+            assert client.get('/api/v1/crm/stats', headers=master_headers).status_code == 200
+
+        # Same auth overhead as the baseline request, plus the single aggregate
+        assert stats.count <= baseline.count
+
+
+class TestCommissionQueryCounts:
+    """The commission list loads agents, referrals, challenges and users in one query each"""
+
+    def test_queries_do_not_grow_with_rows(self, client, session, supermaster_headers, program, count_queries):
+        assert_queries_do_not_grow(
+            client, session, count_queries, '/api/v1/commissions/?per_page=50', supermaster_headers,
+            lambda count: add_commissions(session, count, program)
+        )
+
+
+class TestPaymentApprovalQueryCounts:
+    """Approval lists load users and challenges in one query each"""
+
+    def test_pending_queries_do_not_grow_with_rows(self, client, session, supermaster_headers, program,
+                                                   count_queries):
+        assert_queries_do_not_grow(
+            client, session, count_queries, '/api/v1/payment-approvals/pending', supermaster_headers,
+            lambda count: add_approval_requests(session, count, program)
+        )
+
+    def test_my_requests_queries_do_not_grow_with_rows(self, client, session, supermaster, supermaster_headers,
+                                                       program, count_queries):
+        assert_queries_do_not_grow(
+            client, session, count_queries, '/api/v1/payment-approvals/my-requests', supermaster_headers,
+            lambda count: add_approval_requests(session, count, program, requested_by=supermaster)
+        )
+
+
+class TestWalletQueryCounts:
+    """The admin withdrawal list loads users and agents in one query each"""
+
+    def test_queries_do_not_grow_with_rows(self, client, session, supermaster_headers, count_queries):
+        assert_queries_do_not_grow(
+            client, session, count_queries, '/api/v1/wallet/admin/withdrawals?per_page=50', supermaster_headers,
+            lambda count: add_withdrawals(session, count)
+        )
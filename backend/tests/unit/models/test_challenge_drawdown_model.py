@@ -0,0 +1,115 @@
+"""
+Tests for ChallengeDailyDrawdown model helpers
+Tests row conversion, the upsert statement and the in-memory "today" cache
+"""
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from src.database import db
+from src.models import challenge_drawdown
+from src.models.challenge_drawdown import (
+    ChallengeDailyDrawdown,
+    NUMERIC_FIELDS,
+    _cache_get,
+    _cache_put,
+    clear_drawdown_cache
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_drawdown_cache()
+    yield
+    clear_drawdown_cache()
+
+
+class TestTodayCache:
+    """Test the per-process today cache"""
+
+    def test_hit_for_same_day(self):
+        """Test cached row is returned for the same day"""
+        _cache_put(1, '2026-01-05', {'threshold': 9500.0})
+        assert _cache_get(1, '2026-01-05', max_age=None) == {'threshold': 9500.0}
+
+    def test_miss_for_other_day(self):
+        """Test a new trading day never reuses yesterday's row"""
+        _cache_put(1, '2026-01-05', {'threshold': 9500.0})
+        assert _cache_get(1, '2026-01-06', max_age=None) is None
+
+    def test_miss_when_stale(self):
+        """Test max_age rejects old entries"""
+        _cache_put(1, '2026-01-05', {'threshold': 9500.0})
+        assert _cache_get(1, '2026-01-05', max_age=-1) is None
+
+    def test_primed_miss_is_not_looked_up_again(self):
+        """Test a day prime_cache found no row for is answered from the cache"""
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(app)
+        with app.app_context():
+            ChallengeDailyDrawdown.__table__.create(db.engine)
+            statements = []
+            event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+            assert ChallengeDailyDrawdown.prime_cache([(1, '2026-01-05')]) == 0
+            assert ChallengeDailyDrawdown.get_day(1, '2026-01-05') is None
+            assert len(statements) == 1
+            db.session.remove()
+
+
+class TestRowConversion:
+    """Test day_data <-> row conversion"""
+
+    def test_row_values_from_day_data(self):
+        """Test JSONB-style day_data maps onto table columns"""
+        values = ChallengeDailyDrawdown._row_values(7, '2026-01-05', {
+            'current_equity': 9800.0,
+            'threshold': 9500.0,
+            'calculation_method': 'ftmo',
+            'last_update': '2026-01-05T10:00:00+01:00'
+        })
+
+        assert values['challenge_id'] == 7
+        assert values['date'] == date(2026, 1, 5)
+        assert values['current_equity'] == 9800.0
+        assert values['starting_balance'] == 0
+        assert isinstance(values['last_update'], datetime)
+        assert set(NUMERIC_FIELDS) <= set(values)
+
+    def test_to_day_data(self):
+        """Test a row converts back to floats and ISO strings"""
+        row = ChallengeDailyDrawdown(
+            challenge_id=7,
+            date=date(2026, 1, 5),
+            current_equity=Decimal('9800.00'),
+            threshold=Decimal('9500.00'),
+            calculation_method='ftmo',
+            last_update=datetime(2026, 1, 5, 10, 0)
+        )
+
+        day_data = row.to_day_data()
+
+        assert day_data['current_equity'] == 9800.0
+        assert day_data['threshold'] == 9500.0
+        assert day_data['min_equity'] == 0.0
+        assert day_data['last_update'] == '2026-01-05T10:00:00'
+
+
+class TestUpsertMany:
+    """Test the INSERT .. ON CONFLICT statement"""
+
+    def test_extremes_merge_with_stored_row(self, monkeypatch):
+        """Test highs and lows never narrow on conflict"""
+        statements = []
+        monkeypatch.setattr(challenge_drawdown, 'db', SimpleNamespace(session=SimpleNamespace(execute=statements.append)))
+
+        ChallengeDailyDrawdown.upsert_many([(7, '2026-01-05', {'max_equity': 9900.0, 'min_equity': 9700.0})])
+
+        sql = str(statements[0].compile(dialect=postgresql.dialect()))
+        assert 'max_equity = greatest(challenge_daily_drawdowns.max_equity, excluded.max_equity)' in sql
+        assert 'min_equity = least(challenge_daily_drawdowns.min_equity, excluded.min_equity)' in sql
+        assert 'current_equity = excluded.current_equity' in sql
@@ -0,0 +1,94 @@
+"""
+Tests for ChallengeTradeStats helpers
+Tests the closed-trade summary that is merged into the stored row
+"""
+from datetime import date, datetime
+from src.models.challenge_trade_stats import ChallengeTradeStats, TradeStatsDelta
+
+
+def summarize(profits):
+    delta = TradeStatsDelta()
+    for profit in profits:
+        delta.add(profit)
+    return delta
+
+
+class TestTradeStatsDelta:
+    """Test folding closes into a summary"""
+
+    def test_counts_and_sums(self):
+        delta = summarize([10, -4, 0, 6])
+
+        assert delta.total == 4
+        assert delta.wins == 2
+        assert delta.losses == 1
+        assert delta.gross_profit == 16
+        assert delta.gross_loss == -4
+        assert delta.sum_sq == 152
+        assert delta.best == 10
+        assert delta.worst == -4
+
+    def test_uniform_run(self):
+        delta = summarize([1, 2, 3])
+
+        assert delta.uniform is True
+        assert delta.lead == 3
+        assert delta.trail == 3
+        assert delta.max_win_run == 3
+
+    def test_mixed_runs(self):
+        delta = summarize([1, 1, -1, -1, -1, 2])
+
+        assert delta.uniform is False
+        assert delta.lead == 2
+        assert delta.trail == 1
+        assert delta.max_win_run == 2
+        assert delta.max_loss_run == 3
+
+    def test_breakeven_resets_streak(self):
+        delta = summarize([-1, -1, 0])
+
+        assert delta.uniform is False
+        assert delta.lead == -2
+        assert delta.trail == 0
+        assert delta.max_loss_run == 2
+
+    def test_trading_days(self):
+        delta = TradeStatsDelta()
+        for close_time in (datetime(2026, 6, 1, 9), datetime(2026, 6, 1, 17), datetime(2026, 6, 3, 8)):
+            delta.add(1, close_time)
+
+        assert delta.days == 2
+        assert delta.first_day == date(2026, 6, 1)
+        assert delta.last_day == date(2026, 6, 3)
+
+
+class TestToDict:
+    """Test derived dashboard figures"""
+
+    def test_empty(self):
+        data = ChallengeTradeStats.empty_dict()
+
+        assert data['total_trades'] == 0
+        assert data['win_rate'] == 0
+        assert data['profit_factor'] == 0
+        assert data['std_dev'] == 0
+
+    def test_derived_figures(self):
+        stats = ChallengeTradeStats(
+            challenge_id=1, total_trades=4, winning_trades=2, losing_trades=1,
+            gross_profit=16, gross_loss=-4, sum_profit_squared=152,
+            best_trade=10, worst_trade=-4, current_streak=1,
+            max_win_streak=1, max_loss_streak=1,
+        )
+
+        data = stats.to_dict()
+
+        assert data['win_rate'] == 50.0
+        assert data['average_win'] == 8.0
+        assert data['average_loss'] == -4.0
+        assert data['profit_factor'] == 4.0
+        assert data['net_profit'] == 12.0
+        assert data['breakeven_trades'] == 1
+        # Sample standard deviation of 10, -4, 0, 6
+        assert data['std_dev'] == 6.22
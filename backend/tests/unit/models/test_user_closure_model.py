@@ -0,0 +1,136 @@
+"""
+Tests for UserClosure maintenance statements
+Runs the closure SQL against an in-memory SQLite copy of the two tables, and
+the User move listener against an in-memory SQLite database
+"""
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+from src import cache
+from src.database import db
+from src.models.user import User
+from src.models.user_closure import UserClosure
+
+
+@pytest.fixture
+def connection():
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, parent_id INTEGER)"))
+        conn.execute(text(
+            "CREATE TABLE user_closure (ancestor_id INTEGER, descendant_id INTEGER, depth INTEGER, "
+            "PRIMARY KEY (ancestor_id, descendant_id))"
+        ))
+        yield conn
+    engine.dispose()
+
+
+def add_user(conn, user_id, parent_id=None):
+    conn.execute(text("INSERT INTO users (id, parent_id) VALUES (:id, :parent_id)"),
+                 {'id': user_id, 'parent_id': parent_id})
+    UserClosure.insert_node(conn, user_id, parent_id)
+
+
+def closure(conn):
+    return set(conn.execute(text("SELECT ancestor_id, descendant_id, depth FROM user_closure")).all())
+
+
+@pytest.fixture
+def tree(connection):
+    """1 -> 2 -> 3 -> 4, and 1 -> 5"""
+    add_user(connection, 1)
+    add_user(connection, 2, 1)
+    add_user(connection, 3, 2)
+    add_user(connection, 4, 3)
+    add_user(connection, 5, 1)
+    return connection
+
+
+class TestInsertNode:
+    """Test closure rows for new users"""
+
+    def test_links_to_every_ancestor(self, tree):
+        """Test a new leaf is linked to itself and its whole upline"""
+        rows = {r for r in closure(tree) if r[1] == 4}
+        assert rows == {(4, 4, 0), (3, 4, 1), (2, 4, 2), (1, 4, 3)}
+
+    def test_root_has_only_self_link(self, tree):
+        """Test a root user has just the depth-0 row"""
+        assert {r for r in closure(tree) if r[1] == 1} == {(1, 1, 0)}
+
+
+class TestMoveSubtree:
+    """Test re-parenting a subtree"""
+
+    def test_move_under_other_branch(self, tree):
+        """Test moving 3 (with child 4) under 5 matches a full rebuild"""
+        tree.execute(text("UPDATE users SET parent_id = 5 WHERE id = 3"))
+        UserClosure.move_subtree(tree, 3, 5)
+        moved = closure(tree)
+
+        assert (2, 3, 1) not in moved
+        assert (2, 4, 2) not in moved
+        assert (5, 4, 2) in moved
+        assert (1, 4, 3) in moved
+
+        UserClosure.rebuild(tree)
+        assert closure(tree) == moved
+
+    def test_detach_to_root(self, tree):
+        """Test moving a subtree to the top keeps only its internal links"""
+        tree.execute(text("UPDATE users SET parent_id = NULL WHERE id = 3"))
+        UserClosure.move_subtree(tree, 3, None)
+
+        assert {r for r in closure(tree) if r[1] in (3, 4)} == {(3, 3, 0), (4, 4, 0), (3, 4, 1)}
+
+
+@pytest.fixture
+def orm_tree():
+    """Same tree as User rows: 1 -> 2 -> 3 -> 4, and 1 -> 5"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    with app.app_context():
+        User.__table__.create(db.engine)
+        UserClosure.__table__.create(db.engine)
+        for user_id, parent_id in ((1, None), (2, 1), (3, 2), (4, 3), (5, 1)):
+            user = User(id=user_id, email=f'{user_id}@example.com', password_hash='x',
+                        first_name='Test', last_name='User', parent_id=parent_id)
+            db.session.add(user)
+            db.session.flush()
+            user.update_tree_path()
+            db.session.commit()
+        yield
+        db.session.remove()
+
+
+def paths():
+    db.session.expire_all()
+    return {user.id: (user.tree_path, user.level) for user in User.query}
+
+
+class TestMoveListener:
+    """Test tree_path/level rewrite when a user's parent changes"""
+
+    def test_move_to_root_after_update_tree_path(self, orm_tree):
+        """Test the subtree keeps the right prefix when the mover's path was rewritten first"""
+        user = db.session.get(User, 3)
+        user.parent_id = None
+        user.update_tree_path()
+        db.session.commit()
+
+        result = paths()
+        assert result[3] == ('3', 0)
+        assert result[4] == ('3/4', 1)
+        assert result[2] == ('1/2', 1)
+
+    def test_move_under_other_branch(self, orm_tree):
+        """Test only parent_id changes: paths and levels follow the new parent"""
+        user = db.session.get(User, 3)
+        user.parent_id = 5
+        db.session.commit()
+
+        result = paths()
+        assert result[3] == ('1/5/3', 2)
+        assert result[4] == ('1/5/3/4', 3)
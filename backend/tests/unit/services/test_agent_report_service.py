@@ -0,0 +1,222 @@
+"""
+Tests for Agent Report Service
+Tests the CTE aggregates and the per-agent summary cache invalidation on an
+in-memory SQLite database
+"""
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from src import cache
+from src.database import db
+from src.models.agent import Agent
+from src.models.commission import Commission
+from src.models.referral import Referral
+from src.models.trade import Trade
+from src.models.trading_program import Challenge, TradingProgram
+from src.models.user import User
+from src.models.user_closure import UserClosure
+from src.services.agent_report_service import AgentReportService
+
+
+@compiles(JSONB, 'sqlite')
+def _jsonb_on_sqlite(element, compiler, **kw):
+    return 'JSON'
+
+
+NOW = datetime(2026, 6, 15, 12, 0)
+
+
+@pytest.fixture
+def app():
+    """
+    Agent 1 (user 1) refers traders 2 and 3; agent 2 (user 4) refers trader 5
+
+    Trader 2: funded challenge (+1000, trades +50, -20, +30) and a failed one
+    Trader 3: one active challenge, inactive account, joined long ago
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    with app.app_context():
+        for model in (User, UserClosure, Agent, Referral, TradingProgram, Challenge, Trade, Commission):
+            model.__table__.create(db.engine)
+
+        for user_id, active, created_at in (
+            (1, True, NOW), (2, True, NOW - timedelta(days=3)), (3, False, NOW - timedelta(days=90)),
+            (4, True, NOW), (5, True, NOW),
+        ):
+            db.session.add(User(id=user_id, email=f'{user_id}@example.com', password_hash='x',
+                                first_name='User', last_name=str(user_id), is_active=active,
+                                created_at=created_at))
+        db.session.add_all([
+            Agent(id=1, user_id=1, agent_code='A1'),
+            Agent(id=2, user_id=4, agent_code='A2'),
+        ])
+        db.session.add_all([
+            Referral(id=1, agent_id=1, referred_user_id=2, referral_code='A1'),
+            Referral(id=2, agent_id=1, referred_user_id=3, referral_code='A1'),
+            Referral(id=3, agent_id=2, referred_user_id=5, referral_code='A2'),
+        ])
+        db.session.add(TradingProgram(id=1, tenant_id=1, name='10k', type='two_phase',
+                                      account_size=10000, price=100))
+        for challenge_id, user_id, status, current in (
+            (1, 2, 'funded', 11000), (2, 2, 'failed', 9000), (3, 3, 'active', 10000), (4, 5, 'funded', 12000),
+        ):
+            db.session.add(Challenge(id=challenge_id, user_id=user_id, program_id=1, status=status,
+                                     initial_balance=10000, current_balance=current))
+        db.session.commit()
+
+        # Core inserts: the trade stats hooks are not under test here
+        db.session.execute(Trade.__table__.insert(), [
+            {'challenge_id': challenge_id, 'symbol': 'EURUSD', 'trade_type': 'buy', 'volume': 1,
+             'open_price': 1, 'open_time': NOW, 'profit': profit}
+            for challenge_id, profit in ((1, 50), (1, -20), (1, 30), (4, 10))
+        ])
+        db.session.add_all([
+            Commission(agent_id=1, referral_id=1, challenge_id=1, sale_amount=100, commission_rate=10,
+                       commission_amount=Decimal('10.00'), status='paid', created_at=NOW - timedelta(days=2)),
+            Commission(agent_id=1, referral_id=2, challenge_id=3, sale_amount=100, commission_rate=10,
+                       commission_amount=Decimal('15.00'), status='pending', created_at=NOW - timedelta(days=40)),
+            Commission(agent_id=2, referral_id=3, challenge_id=4, sale_amount=100, commission_rate=10,
+                       commission_amount=Decimal('99.00'), status='paid', created_at=NOW),
+        ])
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def statements(app):
+    """Statements run while the test body executes"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+class TestAggregates:
+    """Test the single-statement aggregates"""
+
+    def test_trader_stats(self, app, statements):
+        """Test trader, challenge and trade figures come from one statement"""
+        stats = AgentReportService.trader_stats(1, now=NOW)
+
+        assert len(statements) == 1
+        assert stats == {
+            'total_traders': 2,
+            'active_traders': 1,
+            'new_traders': 1,
+            'funded_traders': 1,
+            'total_challenges': 3,
+            'completed_challenges': 1,
+            'funded_accounts': 1,
+            'funded_profit': 1000.0,
+            'total_trades': 3,
+            'winning_trades': 2,
+        }
+
+    def test_trader_stats_without_traders(self, app):
+        """Test an agent with no referrals gets zeros"""
+        db.session.add(Agent(id=3, user_id=5, agent_code='A3'))
+        db.session.commit()
+
+        stats = AgentReportService.trader_stats(3, now=NOW)
+
+        assert stats['total_traders'] == 0
+        assert stats['total_challenges'] == 0
+        assert stats['total_trades'] == 0
+
+    def test_commission_stats(self, app, statements):
+        """Test commission sums are split by status and month in one aggregate"""
+        stats = AgentReportService.commission_stats(1, now=NOW)
+
+        assert len(statements) == 1
+        assert stats == {
+            'count': 2,
+            'total': 25.0,
+            'pending': 15.0,
+            'paid': 10.0,
+            'this_month': 10.0,
+            'this_month_paid': 10.0,
+        }
+
+    def test_top_traders(self, app):
+        """Test ranking by funded profit with win rates"""
+        top = AgentReportService.top_traders(1)
+
+        assert [row['trader_id'] for row in top] == [2]
+        assert top[0]['profit'] == 1000.0
+        assert top[0]['win_rate'] == round(2 / 3 * 100, 2)
+
+    def test_challenge_info_for(self, app):
+        """Test per-trader counts and the active challenge"""
+        info = AgentReportService.challenge_info_for([2, 3])
+
+        assert info[2]['total'] == 2
+        assert info[2]['completed'] == 1
+        assert info[3]['active_challenge'].id == 3
+
+
+class TestSummaryCache:
+    """Test the per-agent summary cache"""
+
+    def test_summary_is_cached(self, app, statements):
+        """Test a second read runs no queries"""
+        first = AgentReportService.get_summary(1)
+        count = len(statements)
+        second = AgentReportService.get_summary(1)
+
+        assert second == first
+        assert len(statements) == count
+
+    def test_commission_write_invalidates_own_agent(self, app):
+        """Test a committed commission drops only its agent's summary"""
+        AgentReportService.get_summary(1)
+        other = AgentReportService.get_summary(2)
+
+        db.session.add(Commission(agent_id=1, referral_id=1, challenge_id=1, sale_amount=100,
+                                  commission_rate=10, commission_amount=Decimal('5.00')))
+        db.session.commit()
+
+        assert AgentReportService.get_summary(1)['commissions']['count'] == 3
+        assert cache.get('agent_report:2:summary') == other
+
+    def test_challenge_status_change_invalidates_referring_agent(self, app):
+        """Test a status change drops the summary of the agent who referred the trader"""
+        AgentReportService.get_summary(1)
+
+        challenge = db.session.get(Challenge, 3)
+        challenge.status = 'funded'
+        db.session.commit()
+
+        assert AgentReportService.get_summary(1)['traders']['funded_accounts'] == 2
+
+    def test_balance_update_keeps_summary(self, app):
+        """Test MT5 balance updates are left to the TTL"""
+        AgentReportService.get_summary(1)
+
+        challenge = db.session.get(Challenge, 1)
+        challenge.current_balance = 12000
+        db.session.commit()
+
+        assert cache.get('agent_report:1:summary') is not None
+
+    def test_rollback_keeps_summary(self, app):
+        """Test a rolled back write does not invalidate"""
+        AgentReportService.get_summary(1)
+
+        db.session.add(Commission(agent_id=1, referral_id=1, challenge_id=1, sale_amount=100,
+                                  commission_rate=10, commission_amount=Decimal('5.00')))
+        db.session.flush()
+        db.session.rollback()
+
+        assert cache.get('agent_report:1:summary') is not None
@@ -0,0 +1,73 @@
+"""
+Tests for Analytics Rollup Service
+Tests that the refresh task keeps dirty days queued when a rebuild fails
+"""
+import pytest
+from datetime import date
+from flask import Flask
+from src.database import db
+from src.models.analytics_rollup import DIRTY_DAYS_KEY
+from src.services import analytics_rollup_service
+from src.services.analytics_rollup_service import AnalyticsRollupService
+
+
+class SetRedis:
+    """In-memory sets for the dirty-day queue"""
+
+    def __init__(self):
+        self.sets = {}
+
+    def spop(self, key, count):
+        members = sorted(self.sets.get(key, set()))[:count]
+        self.sets.get(key, set()).difference_update(members)
+        return members
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    client = SetRedis()
+    monkeypatch.setattr(analytics_rollup_service, 'get_redis', lambda: client)
+    return client
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+class TestRefresh:
+    """Test the refresh of dirty days"""
+
+    def test_rebuilds_dirty_days(self, app, redis_client, monkeypatch):
+        redis_client.sadd(DIRTY_DAYS_KEY, '2026-01-01', '2026-01-02')
+        rebuilt = []
+        monkeypatch.setattr(AnalyticsRollupService, 'rebuild_day', lambda day: rebuilt.append(day) or 1)
+
+        result = AnalyticsRollupService.refresh(lookback_days=0)
+
+        assert rebuilt == [date(2026, 1, 1), date(2026, 1, 2)]
+        assert result['rows'] == 2
+        assert redis_client.sets[DIRTY_DAYS_KEY] == set()
+
+    def test_failure_requeues_unprocessed_days(self, app, redis_client, monkeypatch):
+        """Test the failing day and every day after it stay queued"""
+        redis_client.sadd(DIRTY_DAYS_KEY, '2026-01-01', '2026-01-02', '2026-01-03')
+
+        def rebuild_day(day):
+            if day == date(2026, 1, 2):
+                raise RuntimeError('database gone')
+            return 1
+        monkeypatch.setattr(AnalyticsRollupService, 'rebuild_day', rebuild_day)
+
+        with pytest.raises(RuntimeError):
+            AnalyticsRollupService.refresh(lookback_days=0)
+
+        assert redis_client.sets[DIRTY_DAYS_KEY] == {'2026-01-02', '2026-01-03'}
@@ -0,0 +1,201 @@
+"""
+Tests for Auth Cache Service
+Tests revocation lookups and cached principals against a mocked Redis
+"""
+import json
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+from flask import Flask
+from src.services import auth_cache_service
+from src.services.auth_cache_service import (
+    AuthCacheService,
+    UserPrincipal,
+    PRINCIPAL_TTL,
+    REVOCATION_SYNCED_KEY,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    auth_cache_service.reset_stats()
+    yield
+    auth_cache_service.reset_stats()
+
+
+@pytest.fixture
+def redis_client():
+    client = MagicMock()
+    with patch.object(auth_cache_service, 'get_redis', return_value=client):
+        yield client
+
+
+def principal_data(**overrides):
+    data = {
+        'id': 7,
+        'email': 'agent@example.com',
+        'role': 'agent',
+        'tree_path': '1/7',
+        'parent_id': 1,
+        'tenant_id': None,
+        'token_version': 0,
+        'is_active': True,
+    }
+    data.update(overrides)
+    return data
+
+
+class TestTokenRevocation:
+    """Test the Redis revocation list"""
+
+    def test_revoked_jti_answered_from_redis(self, redis_client):
+        redis_client.mget.return_value = ['1', None]
+
+        with patch('src.models.token_blacklist.TokenBlacklist.is_token_revoked') as db_lookup:
+            assert AuthCacheService.is_token_revoked('jti-1') is True
+            db_lookup.assert_not_called()
+
+        redis_client.mget.assert_called_once_with('blacklist:jti-1', REVOCATION_SYNCED_KEY)
+        assert auth_cache_service.get_stats()['revocation']['hits'] == 1
+
+    def test_unknown_jti_is_not_revoked_once_synced(self, redis_client):
+        redis_client.mget.return_value = [None, '2026-01-01T00:00:00']
+
+        with patch('src.models.token_blacklist.TokenBlacklist.is_token_revoked') as db_lookup:
+            assert AuthCacheService.is_token_revoked('jti-2') is False
+            db_lookup.assert_not_called()
+
+    def test_falls_back_to_database_before_sync(self, redis_client):
+        redis_client.mget.return_value = [None, None]
+
+        with patch.object(AuthCacheService, 'sync_revocations') as sync, \
+                patch('src.models.token_blacklist.TokenBlacklist.is_token_revoked', return_value=True) as db_lookup:
+            assert AuthCacheService.is_token_revoked('jti-3') is True
+            sync.assert_called_once()
+            db_lookup.assert_called_once_with('jti-3')
+
+        assert auth_cache_service.get_stats()['revocation']['misses'] == 1
+
+    def test_falls_back_to_database_on_redis_error(self, redis_client):
+        redis_client.mget.side_effect = ConnectionError('down')
+
+        with patch('src.models.token_blacklist.TokenBlacklist.is_token_revoked', return_value=False):
+            assert AuthCacheService.is_token_revoked('jti-4') is False
+
+        stats = auth_cache_service.get_stats()['revocation']
+        assert stats['errors'] == 1
+        assert stats['misses'] == 1
+
+    def test_mark_revoked_expires_with_token(self, redis_client):
+        expires_at = datetime.utcnow() + timedelta(minutes=10)
+
+        assert AuthCacheService.mark_token_revoked('jti-5', expires_at) is True
+
+        key, ttl, value = redis_client.setex.call_args[0]
+        assert key == 'blacklist:jti-5'
+        assert 595 <= ttl <= 600
+        assert value == '1'
+
+    def test_mark_revoked_skips_expired_token(self, redis_client):
+        expires_at = datetime.utcnow() - timedelta(minutes=1)
+
+        assert AuthCacheService.mark_token_revoked('jti-6', expires_at) is True
+        redis_client.setex.assert_not_called()
+
+    def test_failed_write_through_unmarks_sync(self, redis_client):
+        """A revocation missing from Redis sends every lookup to the database"""
+        redis_client.setex.side_effect = ConnectionError('down')
+        expires_at = datetime.utcnow() + timedelta(minutes=10)
+
+        assert AuthCacheService.mark_token_revoked('jti-7', expires_at) is False
+        redis_client.delete.assert_called_once_with(REVOCATION_SYNCED_KEY)
+
+    def test_worker_without_redis_unmarks_sync(self):
+        """A worker running without Redis still clears the marker the others read"""
+        client = MagicMock()
+        app = Flask(__name__)
+        app.config['REDIS_URL'] = 'redis://cache:6379/0'
+        expires_at = datetime.utcnow() + timedelta(minutes=10)
+
+        with app.app_context(), patch.object(auth_cache_service, 'get_redis', return_value=None), \
+                patch.object(auth_cache_service.redis, 'from_url', return_value=client) as from_url:
+            assert AuthCacheService.mark_token_revoked('jti-8', expires_at) is False
+
+        from_url.assert_called_once_with('redis://cache:6379/0', decode_responses=True)
+        client.delete.assert_called_once_with(REVOCATION_SYNCED_KEY)
+
+
+class TestPrincipalCache:
+    """Test cached user principals"""
+
+    def test_cache_hit_skips_database(self, redis_client):
+        redis_client.get.return_value = json.dumps(principal_data())
+
+        with patch.object(auth_cache_service.db.session, 'get') as db_get:
+            principal = AuthCacheService.get_principal(7)
+            db_get.assert_not_called()
+
+        assert principal.id == 7
+        assert principal.role == 'agent'
+        assert principal.tree_path == '1/7'
+        assert auth_cache_service.get_stats()['principal']['hit_rate'] == 1.0
+
+    def test_cache_miss_loads_and_stores(self, redis_client):
+        redis_client.get.return_value = None
+        user = MagicMock(**principal_data())
+
+        with patch.object(auth_cache_service.db.session, 'get', return_value=user):
+            principal = AuthCacheService.get_principal(7)
+
+        key, ttl, payload = redis_client.setex.call_args[0]
+        assert key == 'auth:principal:7'
+        assert ttl == PRINCIPAL_TTL
+        assert json.loads(payload) == principal_data()
+        assert principal.user is user
+
+    def test_missing_user_returns_none(self, redis_client):
+        redis_client.get.return_value = None
+
+        with patch.object(auth_cache_service.db.session, 'get', return_value=None):
+            assert AuthCacheService.get_principal(99) is None
+        redis_client.setex.assert_not_called()
+
+    def test_invalidate_deletes_keys(self, redis_client):
+        redis_client.delete.return_value = 2
+
+        assert AuthCacheService.invalidate_principals([7, 8]) == 2
+        redis_client.delete.assert_called_once_with('auth:principal:7', 'auth:principal:8')
+
+
+class TestUserPrincipal:
+    """Test the lazy principal proxy"""
+
+    def test_other_attributes_load_full_user(self):
+        user = MagicMock(first_name='Ada')
+        principal = UserPrincipal(principal_data())
+
+        with patch.object(auth_cache_service.db.session, 'get', return_value=user) as db_get:
+            assert principal.first_name == 'Ada'
+            assert principal.first_name == 'Ada'
+            db_get.assert_called_once()
+
+    def test_loaded_user_takes_precedence(self):
+        user = MagicMock(role='admin')
+        principal = UserPrincipal(principal_data(), user)
+
+        assert principal.role == 'admin'
+
+    def test_writes_go_to_user(self):
+        user = MagicMock()
+        principal = UserPrincipal(principal_data(), user)
+
+        principal.available_balance = 10
+
+        assert user.available_balance == 10
+
+    def test_compares_by_id(self):
+        principal = UserPrincipal(principal_data())
+
+        assert principal == MagicMock(id=7)
+        assert principal != MagicMock(id=8)
+        assert hash(principal) == hash(7)
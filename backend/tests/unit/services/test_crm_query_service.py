@@ -0,0 +1,155 @@
+"""
+Tests for CRM Query Service
+Tests the grouped stats and the paginated pipeline on an in-memory SQLite
+database, scoped by lead permissions
+"""
+import pytest
+from datetime import datetime, timedelta
+from flask import Flask
+from sqlalchemy import event
+from src.database import db
+from src.models.lead import Lead
+from src.models.user import User
+from src.models.user_closure import UserClosure
+from src.services.crm_query_service import PIPELINE_STATUSES, CRMQueryService
+
+
+NOW = datetime(2026, 6, 15, 12, 0)
+
+
+@pytest.fixture
+def app():
+    """
+    Master 1; agent 2 with sub-agent 3; agent 4 in another branch
+
+    Leads 1-6 are assigned to 3, leads 7-8 to 4 and lead 9 to nobody.
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        for model in (User, UserClosure, Lead):
+            model.__table__.create(db.engine)
+        for user_id, parent_id, role in ((1, None, 'master'), (2, None, 'agent'), (3, 2, 'agent'), (4, None, 'agent')):
+            db.session.add(User(id=user_id, email=f'{user_id}@example.com', password_hash='x', role=role,
+                                first_name='User', last_name=str(user_id), parent_id=parent_id))
+            db.session.flush()
+        for lead_id, status, score, assigned_to, age_days in (
+            (1, 'new', 50, 3, 1),
+            (2, 'new', 90, 3, 1),
+            (3, 'new', 0, 3, 60),
+            (4, 'new', 70, 3, 2),
+            (5, 'converted', 80, 3, 40),
+            (6, 'lost', 10, 3, 5),
+            (7, 'new', 100, 4, 1),
+            (8, 'converted', 60, 4, 1),
+            (9, 'contacted', 30, None, 1),
+        ):
+            db.session.add(Lead(id=lead_id, first_name='Lead', last_name=str(lead_id), email=f'lead{lead_id}@example.com',
+                                status=status, score=score, assigned_to=assigned_to,
+                                created_at=NOW - timedelta(days=age_days)))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def statements(app):
+    """Statements run while the test body executes"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def user(user_id):
+    return db.session.get(User, user_id)
+
+
+class TestStats:
+    """Test the grouped status summary"""
+
+    def test_status_summary_is_one_query(self, app, statements):
+        """Test counts, recent counts and score sums come from one GROUP BY"""
+        master = user(1)
+        statements.clear()
+
+        summary = CRMQueryService.status_summary(master, now=NOW)
+
+        assert len(statements) == 1
+        assert summary['new'] == {'count': 5, 'recent': 4, 'score_sum': 310, 'scored': 5}
+        assert summary['contacted']['count'] == 1
+
+    def test_stats_for_master(self, app):
+        """Test dashboard figures over every lead"""
+        stats = CRMQueryService.get_stats(user(1), now=NOW)
+
+        assert stats['total_leads'] == 9
+        assert stats['new_leads'] == 5
+        assert stats['converted_leads'] == 2
+        assert stats['lost_leads'] == 1
+        assert stats['conversion_rate'] == round(2 / 9 * 100, 2)
+        assert stats['recent_leads_30d'] == 7
+        assert stats['average_score'] == round(490 / 9, 2)
+
+    def test_stats_scoped_to_downline(self, app):
+        """Test an agent sees its downline's and unassigned leads only"""
+        stats = CRMQueryService.get_stats(user(2), now=NOW)
+
+        assert stats['total_leads'] == 7
+        assert stats['converted_leads'] == 1
+
+    def test_stats_for_trader(self, app):
+        """Test a trader sees no leads"""
+        trader = User(id=5, email='5@example.com', password_hash='x', role='trader', first_name='T', last_name='5')
+        db.session.add(trader)
+        db.session.commit()
+
+        assert CRMQueryService.get_stats(trader, now=NOW)['total_leads'] == 0
+
+
+class TestPipeline:
+    """Test the pipeline board"""
+
+    def test_board_keeps_top_of_each_column(self, app):
+        """Test each column holds its best-scored leads"""
+        board = CRMQueryService.get_pipeline(user(2), per_column=2)
+
+        assert set(board['pipeline']) == set(PIPELINE_STATUSES)
+        assert [lead['id'] for lead in board['pipeline']['new']] == [2, 4]
+        assert [lead['id'] for lead in board['pipeline']['converted']] == [5]
+        assert board['counts']['new'] == 4
+        assert board['has_more'] == {**{s: False for s in PIPELINE_STATUSES}, 'new': True}
+
+    def test_column_pages(self, app):
+        """Test "load more" pages through one column"""
+        first = CRMQueryService.get_pipeline(user(2), per_column=3, status='new')
+        second = CRMQueryService.get_pipeline(user(2), per_column=3, status='new', page=2)
+
+        assert list(first['pipeline']) == ['new']
+        assert [lead['id'] for lead in first['pipeline']['new']] == [2, 4, 1]
+        assert [lead['id'] for lead in second['pipeline']['new']] == [3]
+        assert first['has_more'] == {'new': True}
+        assert second['has_more'] == {'new': False}
+
+    def test_assignees_attached_in_one_query(self, app, statements):
+        """Test the board costs column totals, the leads and one assignee lookup"""
+        master = user(1)
+        statements.clear()
+
+        board = CRMQueryService.get_pipeline(master)
+
+        assert len(statements) == 3
+        assert board['pipeline']['new'][0]['assigned_user'] == {'id': 4, 'name': 'User 4'}
+        assert 'assigned_user' not in board['pipeline']['contacted'][0]
+
+    def test_page_size_is_clamped(self, app):
+        """Test out-of-range sizes and pages are clamped"""
+        board = CRMQueryService.get_pipeline(user(1), per_column=1000, status='new', page=0)
+
+        assert board['per_column'] == 100
+        assert board['page'] == 1
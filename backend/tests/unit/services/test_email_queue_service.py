@@ -0,0 +1,108 @@
+"""
+Unit tests for Email Queue Service
+Tests retry backoff, request grouping and the fake SendGrid sink
+"""
+import pytest
+from types import SimpleNamespace
+from sendgrid.helpers.mail import Mail, To
+from src.services import email_queue_service
+from src.services.email_queue_service import (
+    MAX_PERSONALIZATIONS,
+    RETRY_BASE_SECONDS,
+    RETRY_MAX_SECONDS,
+    group_for_sending,
+    retry_delay,
+)
+from src.utils.fake_sendgrid import FakeSendGridClient, FakeSendGridError
+
+
+def make_email(to_email, subject='Subject', html_body='<p>Body</p>'):
+    return SimpleNamespace(to_email=to_email, subject=subject, html_body=html_body, body='')
+
+
+class TestRetryDelay:
+    """Test exponential backoff"""
+    
+    def test_doubles_per_attempt(self):
+        """Delay doubles with each failed attempt"""
+        assert retry_delay(1, jitter=0) == RETRY_BASE_SECONDS
+        assert retry_delay(2, jitter=0) == RETRY_BASE_SECONDS * 2
+        assert retry_delay(4, jitter=0) == RETRY_BASE_SECONDS * 8
+    
+    def test_capped(self):
+        """Delay never exceeds the cap"""
+        assert retry_delay(50, jitter=0) == RETRY_MAX_SECONDS
+    
+    def test_jitter(self):
+        """Jitter only lengthens the delay, by at most the given fraction"""
+        for _ in range(20):
+            assert RETRY_BASE_SECONDS <= retry_delay(1) <= RETRY_BASE_SECONDS * 1.1
+
+
+class TestGroupForSending:
+    """Test batching of queued rows into SendGrid requests"""
+    
+    def test_same_content_shares_request(self):
+        """Rows with the same subject and body go out together"""
+        emails = [make_email(f'user{n}@example.com') for n in range(3)] + [make_email('x@example.com', 'Other')]
+        groups = group_for_sending(emails)
+        
+        assert [len(rows) for _, _, rows in groups] == [3, 1]
+        assert groups[0][:2] == ('Subject', '<p>Body</p>')
+    
+    def test_chunks_at_personalization_limit(self):
+        """A request carries at most MAX_PERSONALIZATIONS recipients"""
+        emails = [make_email(f'user{n}@example.com') for n in range(MAX_PERSONALIZATIONS + 5)]
+        
+        assert [len(rows) for _, _, rows in group_for_sending(emails)] == [MAX_PERSONALIZATIONS, 5]
+    
+    def test_duplicate_recipient_goes_to_next_request(self):
+        """A recipient appears once per request"""
+        emails = [make_email('a@example.com'), make_email('A@example.com'), make_email('b@example.com')]
+        groups = group_for_sending(emails)
+        
+        assert [[e.to_email for e in rows] for _, _, rows in groups] == [
+            ['a@example.com', 'b@example.com'], ['A@example.com']
+        ]
+    
+    def test_falls_back_to_text_body(self):
+        """Rows without an HTML body are sent with their text body"""
+        email = SimpleNamespace(to_email='a@example.com', subject='S', html_body=None, body='plain')
+        
+        assert group_for_sending([email])[0][1] == 'plain'
+
+
+class TestFakeSendGrid:
+    """Test the local SendGrid sink"""
+    
+    def test_counts_personalizations(self):
+        """Each recipient is a separate personalization"""
+        client = FakeSendGridClient()
+        message = Mail(
+            from_email='from@example.com',
+            to_emails=[To('a@example.com'), To('b@example.com')],
+            subject='S',
+            html_content='<p>x</p>',
+            is_multiple=True
+        )
+        
+        assert client.send(message).status_code == 202
+        assert client.stats() == {'calls': 1, 'failures': 0, 'recipients': 2}
+        assert len(client.messages[0]['personalizations']) == 2
+    
+    def test_simulated_failures(self):
+        """failure_rate=1 fails every call"""
+        client = FakeSendGridClient(failure_rate=1.0)
+        
+        with pytest.raises(FakeSendGridError):
+            client.send({'personalizations': [{'to': [{'email': 'a@example.com'}]}]})
+        assert client.stats()['failures'] == 1
+    
+    def test_send_reports_errors(self):
+        """_send returns the error instead of raising"""
+        rows = [make_email('a@example.com')]
+        
+        assert email_queue_service._send(FakeSendGridClient(), 'f@example.com', 'S', '<p>x</p>', rows) is None
+        assert 'Simulated' in email_queue_service._send(
+            FakeSendGridClient(failure_rate=1.0), 'f@example.com', 'S', '<p>x</p>', rows
+        )
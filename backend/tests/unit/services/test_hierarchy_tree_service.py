@@ -0,0 +1,145 @@
+"""
+Tests for Hierarchy Tree Service
+Tests the single-query tree build and cached snapshot invalidation on an
+in-memory SQLite database
+"""
+import pytest
+from flask import Flask
+from sqlalchemy import event
+from src import cache
+from src.database import db
+from src.models.user import User
+from src.models.user_closure import UserClosure
+from src.services.hierarchy_tree_service import HierarchyTreeService
+
+
+@pytest.fixture
+def app():
+    """1 -> 2 -> 3 -> 4, and 1 -> 5"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    with app.app_context():
+        User.__table__.create(db.engine)
+        UserClosure.__table__.create(db.engine)
+        for user_id, parent_id in ((1, None), (2, 1), (3, 2), (4, 3), (5, 1)):
+            user = User(id=user_id, email=f'{user_id}@example.com', password_hash='x',
+                        first_name='User', last_name=str(user_id), parent_id=parent_id)
+            db.session.add(user)
+            db.session.flush()
+            user.update_tree_path()
+            db.session.commit()
+        db.session.expire_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def statements(app):
+    """SELECT statements run while the test body executes"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def ids(node):
+    return {node['id']: [ids(child) for child in node['children']]}
+
+
+class TestBuildForest:
+    """Test assembling nested trees"""
+
+    def test_whole_tree_in_one_query(self, app, statements):
+        """Test every level is loaded by a single SELECT"""
+        tree = HierarchyTreeService.build_tree(1)
+
+        assert len(statements) == 1
+        assert tree['name'] == 'User 1'
+        assert [child['id'] for child in tree['children']] == [2, 5]
+        assert tree['children'][0]['children'][0]['children'][0]['id'] == 4
+        assert tree['children_count'] == 2
+
+    def test_depth_limit_collapses_nodes(self, app):
+        """Test nodes at the limit with children carry a cursor"""
+        tree = HierarchyTreeService.build_tree(1, max_depth=2)
+        node_2, node_5 = tree['children']
+
+        assert node_2['children'] == []
+        assert node_2['collapsed'] is True
+        assert node_2['cursor'] == '2'
+        assert 'collapsed' not in node_5
+
+    def test_forest_keeps_root_order(self, app):
+        """Test one tree per root, in the order asked for"""
+        forest = HierarchyTreeService.build_forest([3, 5, 2], node='full')
+
+        assert [root['id'] for root in forest] == [3, 5, 2]
+        assert forest[0]['children'][0]['tree_path'] == '1/2/3/4'
+
+    def test_expand_node_outside_downline(self, app):
+        """Test a viewer cannot expand a node outside their subtree"""
+        viewer = db.session.get(User, 5)
+
+        assert HierarchyTreeService.expand_node(viewer, '3') is None
+        assert HierarchyTreeService.expand_node(viewer, 'bad') is None
+        assert HierarchyTreeService.expand_node(db.session.get(User, 2), '3')['id'] == 3
+
+
+class TestSnapshots:
+    """Test cached snapshots"""
+
+    def test_snapshot_served_from_cache(self, app):
+        """Test the builder runs once per viewer and key"""
+        calls = []
+
+        def builder():
+            calls.append(1)
+            return {'calls': len(calls)}
+
+        HierarchyTreeService.get_snapshot(1, 'depth:3', builder)
+        snapshot = HierarchyTreeService.get_snapshot(1, 'depth:3', builder)
+        HierarchyTreeService.get_snapshot(2, 'depth:3', builder)
+
+        assert snapshot == {'calls': 1}
+        assert len(calls) == 2
+
+    def test_committed_move_drops_snapshots(self, app):
+        """Test moving a user invalidates cached trees once committed"""
+        def builder():
+            return ids(HierarchyTreeService.build_tree(1))
+
+        before = HierarchyTreeService.get_snapshot(1, 'tree', builder)
+        user = db.session.get(User, 3)
+        user.parent_id = 5
+        db.session.flush()
+        assert HierarchyTreeService.get_snapshot(1, 'tree', builder) == before
+
+        db.session.commit()
+        after = HierarchyTreeService.get_snapshot(1, 'tree', builder)
+
+        assert after != before
+        assert after == {1: [{2: []}, {5: [{3: [{4: []}]}]}]}
+
+    def test_rolled_back_move_keeps_snapshots(self, app):
+        """Test a rolled back move does not invalidate"""
+        calls = []
+
+        def builder():
+            calls.append(1)
+            return {}
+
+        HierarchyTreeService.get_snapshot(1, 'tree', builder)
+        user = db.session.get(User, 3)
+        user.parent_id = 5
+        db.session.flush()
+        db.session.rollback()
+        HierarchyTreeService.get_snapshot(1, 'tree', builder)
+
+        assert len(calls) == 1
@@ -0,0 +1,176 @@
+"""
+Unit tests for KYC Upload Service
+Tests upload validation, content sniffing, user field updates and the
+direct-upload storage calls against a local S3-compatible endpoint
+"""
+import pytest
+from types import SimpleNamespace
+from src.services import kyc_upload_service
+from src.services.kyc_upload_service import (
+    MAX_SIZE,
+    MULTIPART_THRESHOLD,
+    PART_SIZE,
+    KycUploadService,
+    apply_document_to_user,
+    key_prefix,
+    new_key,
+    reject_document_on_user,
+    sniff_content_type,
+    validate_upload_request,
+)
+from src.services.storage_service import StorageService
+
+
+def make_user(**fields):
+    user = SimpleNamespace(id=7, kyc_status='not_submitted', kyc_submitted_at=None, updated_at=None)
+    for prefix in ('id', 'address', 'selfie', 'bank'):
+        setattr(user, f'kyc_{prefix}_status', None)
+        setattr(user, f'kyc_{prefix}_uploaded_at', None)
+        setattr(user, f'kyc_{prefix}_url', None)
+        setattr(user, f'kyc_{prefix}_notes', None)
+    for name, value in fields.items():
+        setattr(user, name, value)
+    return user
+
+
+@pytest.fixture
+def minio_storage(monkeypatch):
+    """Storage service pointed at a MinIO-style endpoint (presigning is offline)"""
+    monkeypatch.setenv('DO_SPACES_KEY', 'minioadmin')
+    monkeypatch.setenv('DO_SPACES_SECRET', 'minioadmin')
+    monkeypatch.setenv('DO_SPACES_BUCKET', 'kyc-test')
+    monkeypatch.setenv('STORAGE_ENDPOINT_URL', 'http://localhost:9000')
+    storage = StorageService()
+    monkeypatch.setattr(kyc_upload_service, 'storage_service', storage)
+    return storage
+
+
+class TestValidateUploadRequest:
+    """Test checks on the declared upload"""
+
+    def test_valid_request(self):
+        """Allowed type and size passes"""
+        validate_upload_request('id_proof', 'application/pdf', 1024)
+
+    @pytest.mark.parametrize('document_type, content_type, size', [
+        ('passport', 'application/pdf', 1024),
+        ('id_proof', 'image/gif', 1024),
+        ('id_proof', 'application/pdf', 0),
+        ('id_proof', 'application/pdf', None),
+        ('id_proof', 'application/pdf', MAX_SIZE + 1),
+    ])
+    def test_invalid_request(self, document_type, content_type, size):
+        """Unknown documents, types and bad sizes are rejected"""
+        with pytest.raises(ValueError):
+            validate_upload_request(document_type, content_type, size)
+
+
+class TestSniffContentType:
+    """Test magic-byte detection"""
+
+    def test_known_signatures(self):
+        """PDF, JPEG and PNG are recognised from their leading bytes"""
+        assert sniff_content_type(b'%PDF-1.7\n...') == 'application/pdf'
+        assert sniff_content_type(b'\xff\xd8\xff\xe0JFIF') == 'image/jpeg'
+        assert sniff_content_type(b'\x89PNG\r\n\x1a\n\x00') == 'image/png'
+
+    def test_unknown_content(self):
+        """Anything else is not an allowed type"""
+        assert sniff_content_type(b'<html>') is None
+        assert sniff_content_type(b'') is None
+
+
+class TestKeys:
+    """Test storage key layout"""
+
+    def test_key_is_scoped_to_user_and_document(self):
+        """Keys live under the user's prefix and carry the type's extension"""
+        key = new_key(7, 'selfie', 'image/png')
+
+        assert key.startswith(key_prefix(7, 'selfie'))
+        assert key.endswith('.png')
+        assert new_key(7, 'selfie', 'image/png') != key
+
+
+class TestApplyDocumentToUser:
+    """Test user KYC field updates"""
+
+    def test_sets_document_fields(self):
+        """The document's own columns are updated, keyed by its prefix"""
+        user = make_user()
+        apply_document_to_user(user, 'address_proof', 'kyc/7/address_proof_x.pdf')
+
+        assert user.kyc_address_status == 'pending'
+        assert user.kyc_address_url == 'kyc/7/address_proof_x.pdf'
+        assert user.kyc_address_uploaded_at is not None
+        assert user.kyc_status == 'not_submitted'
+
+    def test_submission_pending_when_required_documents_uploaded(self):
+        """The last required document moves the submission to pending"""
+        user = make_user(kyc_id_status='pending', kyc_address_status='pending')
+        apply_document_to_user(user, 'selfie', 'kyc/7/selfie_x.jpg')
+
+        assert user.kyc_status == 'pending'
+        assert user.kyc_submitted_at is not None
+
+
+class TestRejectDocumentOnUser:
+    """Test clearing a document that failed processing"""
+
+    def test_rejects_current_document(self):
+        """The document is flagged, cleared and the submission is no longer pending"""
+        user = make_user(kyc_status='pending', kyc_selfie_status='pending', kyc_selfie_url='kyc/7/selfie_x.jpg')
+        reject_document_on_user(user, 'selfie', 'kyc/7/selfie_x.jpg', 'Bad file')
+
+        assert user.kyc_selfie_status == 'rejected'
+        assert user.kyc_selfie_url is None
+        assert user.kyc_selfie_notes == 'Bad file'
+        assert user.kyc_status == 'not_submitted'
+
+    def test_newer_upload_is_kept(self):
+        """A document already replaced by a newer upload is left alone"""
+        user = make_user(kyc_selfie_status='pending', kyc_selfie_url='kyc/7/selfie_new.jpg')
+        reject_document_on_user(user, 'selfie', 'kyc/7/selfie_old.jpg', 'Bad file')
+
+        assert user.kyc_selfie_status == 'pending'
+        assert user.kyc_selfie_url == 'kyc/7/selfie_new.jpg'
+
+
+class TestDirectUpload:
+    """Test presigned uploads against an S3-compatible endpoint"""
+
+    def test_small_file_gets_presigned_post(self, minio_storage):
+        """Small files are sent with one policy-restricted POST"""
+        upload = KycUploadService.start_upload(make_user(), 'id_proof', 'application/pdf', 1024)
+
+        assert upload['method'] == 'POST'
+        assert upload['url'].startswith('http://localhost:9000/kyc-test')
+        assert upload['fields']['key'] == upload['key']
+        assert upload['fields']['Content-Type'] == 'application/pdf'
+        assert 'policy' in upload['fields']
+
+    def test_large_file_gets_multipart_urls(self, minio_storage, monkeypatch):
+        """Large files get one presigned PUT URL per part"""
+        monkeypatch.setattr(minio_storage.client, 'create_multipart_upload', lambda **kwargs: {'UploadId': 'abc'})
+        size = MULTIPART_THRESHOLD + PART_SIZE
+        upload = KycUploadService.start_upload(make_user(), 'bank_statement', 'application/pdf', size)
+
+        assert upload['method'] == 'MULTIPART'
+        assert upload['upload_id'] == 'abc'
+        assert len(upload['parts']) == -(-size // PART_SIZE)
+        assert 'partNumber=1' in upload['parts'][0]['url']
+        assert 'uploadId=abc' in upload['parts'][0]['url']
+
+    def test_requires_object_storage(self, monkeypatch):
+        """Local-disk storage cannot take direct uploads"""
+        monkeypatch.setattr(kyc_upload_service, 'storage_service', SimpleNamespace(supports_direct_upload=False))
+
+        with pytest.raises(ValueError):
+            KycUploadService.start_upload(make_user(), 'id_proof', 'application/pdf', 1024)
+
+    def test_complete_rejects_foreign_key(self):
+        """Keys outside the user's prefix are refused before touching storage"""
+        with pytest.raises(ValueError):
+            KycUploadService.complete_upload(make_user(), 'id_proof', 'kyc/8/id_proof_x.pdf')
+        with pytest.raises(ValueError):
+            KycUploadService.complete_upload(make_user(), 'id_proof', 'kyc/7/id_proof_/../../8/x.pdf')
@@ -0,0 +1,79 @@
+"""
+Unit tests for Ledger Service
+Tests amount handling and posting validation (no database required)
+"""
+import pytest
+from decimal import Decimal
+from src.services.ledger_service import (
+    Leg,
+    Posting,
+    SYSTEM_CASH,
+    _validate,
+    system_account,
+    to_amount,
+    wallet_account,
+)
+
+
+class TestAmounts:
+    """Test exact amount conversion"""
+    
+    def test_float_is_exact(self):
+        """Floats are converted through their string form"""
+        assert to_amount(0.1) + to_amount(0.2) == Decimal('0.30')
+    
+    def test_rounds_half_up(self):
+        """Amounts are rounded to cents, half up"""
+        assert to_amount('10.005') == Decimal('10.01')
+        assert to_amount(Decimal('-2.345')) == Decimal('-2.35')
+    
+    def test_invalid_amount(self):
+        """Non-numeric amounts are rejected"""
+        with pytest.raises(ValueError, match='Invalid amount'):
+            to_amount('abc')
+    
+    def test_account_names(self):
+        """Account names identify wallet balances and system accounts"""
+        assert wallet_account(7, 'commission') == 'wallet:7:commission'
+        assert system_account(SYSTEM_CASH) == 'system:cash'
+
+
+class TestPostingValidation:
+    """Test double-entry validation"""
+    
+    def test_balanced_posting(self):
+        """A deposit against cash balances"""
+        _validate(Posting('deposit', (Leg.wallet(1, 25.5), Leg.to_system(SYSTEM_CASH, -25.5))))
+    
+    def test_multi_leg_posting(self):
+        """Several wallet legs may share one counter-leg"""
+        _validate(Posting('commission', (
+            Leg.wallet(1, '10.10', 'commission'),
+            Leg.wallet(2, '5.05', 'commission'),
+            Leg.to_system('commission_expense', '-15.15'),
+        )))
+    
+    def test_unbalanced_posting(self):
+        """Legs must sum to zero"""
+        with pytest.raises(ValueError, match='Unbalanced'):
+            _validate(Posting('deposit', (Leg.wallet(1, 10), Leg.to_system(SYSTEM_CASH, -9.99))))
+    
+    def test_invalid_balance_type(self):
+        """Wallet legs need a known balance type"""
+        with pytest.raises(ValueError, match='Invalid balance type'):
+            _validate(Posting('deposit', (Leg.wallet(1, 10, 'savings'), Leg.to_system(SYSTEM_CASH, -10))))
+    
+    def test_zero_leg(self):
+        """Zero legs are rejected"""
+        with pytest.raises(ValueError, match='non-zero'):
+            _validate(Posting('deposit', (Leg.wallet(1, 0), Leg.to_system(SYSTEM_CASH, 0))))
+    
+    def test_leg_needs_one_account(self):
+        """A leg is either a wallet or a system account"""
+        with pytest.raises(ValueError, match='exactly one'):
+            _validate(Posting('deposit', (Leg(amount=Decimal('1')), Leg.to_system(SYSTEM_CASH, -1))))
+    
+    def test_empty_posting(self):
+        """A posting needs legs"""
+        with pytest.raises(ValueError, match='at least one leg'):
+            _validate(Posting('deposit', ()))
@@ -0,0 +1,242 @@
+"""
+Unit tests for MT5 API Broker
+Tests the shared token refresh, the priority-aware rate budget and the
+local fallbacks when Redis is unavailable
+"""
+import threading
+import time
+import pytest
+from src.services import mt5_broker
+from src.services.mt5_broker import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    MT5TokenBroker,
+    SharedRateBudget,
+    get_stats,
+    reset_stats,
+)
+
+
+class FakeRedis:
+    """Thread-safe in-memory Redis covering the calls made by the broker"""
+
+    def __init__(self):
+        self.values = {}
+        self.expires = {}
+        self.hashes = {}
+        self.lock = threading.RLock()
+        self.clock = 1000.0
+
+    def _alive(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.values
+
+    def get(self, key):
+        with self.lock:
+            return self.values.get(key) if self._alive(key) else None
+
+    def pttl(self, key):
+        with self.lock:
+            if not self._alive(key):
+                return -2
+            return int((self.expires[key] - time.monotonic()) * 1000) if key in self.expires else -1
+
+    def set(self, key, value, nx=False, ex=None):
+        with self.lock:
+            if nx and self._alive(key):
+                return None
+            self.values[key] = value
+            if ex:
+                self.expires[key] = time.monotonic() + ex
+            return True
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def eval(self, script, numkeys, *args):
+        keys, argv = args[:numkeys], [str(arg) for arg in args[numkeys:]]
+        with self.lock:
+            if script == mt5_broker._RELEASE_SCRIPT:
+                if self.get(keys[0]) == argv[0]:
+                    self.values.pop(keys[0], None)
+                    return 1
+                return 0
+            # Token bucket, driven by self.clock like Redis TIME
+            rate, capacity, floor, requested = (float(arg) for arg in argv)
+            state = self.hashes.get(keys[0], {})
+            tokens = state.get('tokens', capacity)
+            updated_at = state.get('updated_at', self.clock)
+            tokens = min(capacity, tokens + max(0, self.clock - updated_at) * rate)
+            wait_ms = 0
+            if tokens - requested >= floor:
+                tokens -= requested
+            else:
+                wait_ms = -(-(requested + floor - tokens) / rate * 1000 // 1)
+            self.hashes[keys[0]] = {'tokens': tokens, 'updated_at': self.clock}
+            return int(wait_ms)
+
+
+class FakePipeline:
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return queue
+
+    def execute(self):
+        return [getattr(self.redis_client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(mt5_broker, 'get_redis', lambda: client)
+    reset_stats()
+    return client
+
+
+@pytest.fixture
+def no_redis(monkeypatch):
+    monkeypatch.setattr(mt5_broker, 'get_redis', lambda: None)
+    reset_stats()
+
+
+class TestTokenBroker:
+    """Test the shared MT5 token"""
+
+    def test_first_caller_refreshes_and_shares(self, fake_redis):
+        """A missing token is requested once and served to later callers"""
+        broker = MT5TokenBroker()
+        calls = []
+
+        def request_token():
+            calls.append(1)
+            return 'jwt-1'
+
+        assert broker.get_token(request_token) == ('jwt-1', 90.0)
+        token, expires_in = broker.get_token(request_token)
+
+        assert token == 'jwt-1'
+        assert 85 < expires_in <= 90
+        assert len(calls) == 1
+        assert fake_redis.get(mt5_broker.REFRESH_LOCK_KEY) is None
+        assert get_stats()['token']['refreshes'] == 1
+        assert get_stats()['token']['shared_hits'] == 1
+
+    def test_concurrent_callers_wait_for_one_refresh(self, fake_redis):
+        """Workers that find the refresh lock taken wait for its token"""
+        broker = MT5TokenBroker()
+        calls = []
+        results = []
+
+        def request_token():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'jwt-shared'
+
+        def worker():
+            results.append(broker.get_token(request_token)[0])
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == ['jwt-shared'] * 5
+        assert get_stats()['token']['waits'] == 4
+
+    def test_failed_refresh_releases_lock(self, fake_redis):
+        """An authentication error propagates and lets the next caller retry"""
+        broker = MT5TokenBroker()
+
+        def request_token():
+            raise RuntimeError('invalid credentials')
+
+        with pytest.raises(RuntimeError):
+            broker.get_token(request_token)
+
+        assert fake_redis.get(mt5_broker.REFRESH_LOCK_KEY) is None
+        assert broker.get_token(lambda: 'jwt-2')[0] == 'jwt-2'
+        assert get_stats()['token']['refresh_errors'] == 1
+
+    def test_without_redis_requests_directly(self, no_redis):
+        """Each process authenticates on its own without Redis"""
+        assert MT5TokenBroker().get_token(lambda: 'jwt-local') == ('jwt-local', 90.0)
+
+
+class TestSharedRateBudget:
+    """Test the cluster-wide request budget"""
+
+    def test_budgets_share_one_bucket(self, fake_redis, monkeypatch):
+        """Two workers' budgets together get `capacity` immediate requests"""
+        monkeypatch.setattr(mt5_broker, 'RATE', 4.0)
+        first = SharedRateBudget()
+        second = SharedRateBudget()
+
+        granted = [budget.acquire(timeout=0) for budget in (first, second, first, second, first)]
+
+        assert granted == [True, True, True, True, False]
+
+    def test_background_leaves_reserve_for_interactive(self, fake_redis):
+        """Background requests stop at the reserve; interactive ones use it"""
+        background = SharedRateBudget(priority=PRIORITY_BACKGROUND)
+        interactive = SharedRateBudget(priority=PRIORITY_INTERACTIVE)
+
+        taken = 0
+        while background.acquire(timeout=0):
+            taken += 1
+
+        assert taken == 7
+        assert all(interactive.acquire(timeout=0) for _ in range(3))
+        assert interactive.acquire(timeout=0) is False
+
+    def test_waits_for_refill(self, fake_redis, monkeypatch):
+        """A request sleeps for the time the bucket reports, then gets a token"""
+        monkeypatch.setattr(mt5_broker, 'RATE', 2.0)
+        budget = SharedRateBudget()
+        budget.acquire()
+        budget.acquire()
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            fake_redis.clock += seconds
+
+        monkeypatch.setattr(mt5_broker.time, 'sleep', sleep)
+
+        assert budget.acquire() is True
+        assert sleeps == [0.5]
+        assert get_stats()['budget'][PRIORITY_INTERACTIVE]['requests'] == 3
+
+    def test_small_bucket_has_no_reserve(self, monkeypatch):
+        """A reserve never makes background requests impossible"""
+        assert SharedRateBudget(priority=PRIORITY_BACKGROUND).floor() == 3.0
+        monkeypatch.setattr(mt5_broker, 'RATE', 1.0)
+        assert SharedRateBudget(priority=PRIORITY_BACKGROUND).floor() == 0.0
+
+    def test_unknown_priority(self):
+        """Only the known priority classes are accepted"""
+        with pytest.raises(ValueError):
+            SharedRateBudget(priority='urgent')
+
+    def test_local_fallback_keeps_priorities(self, no_redis):
+        """Without Redis the process bucket applies the same reserve"""
+        background = SharedRateBudget(priority=PRIORITY_BACKGROUND)
+
+        taken = 0
+        while background.acquire(timeout=0):
+            taken += 1
+
+        assert taken == 7
+        assert background.acquire(timeout=0, floor=0) is True
+        assert get_stats()['fallbacks'] == 9
+        assert get_stats()['budget'][PRIORITY_BACKGROUND]['timeouts'] == 1
@@ -0,0 +1,174 @@
+"""
+Tests for the MT5 Ingestion Pipeline
+Tests coalescing, the login directory and queue backpressure without a database
+"""
+import asyncio
+from unittest.mock import MagicMock
+from src.services.mt5_ingestion import (
+    AccountDirectory,
+    AccountRef,
+    IngestionBatch,
+    MT5IngestionPipeline,
+)
+
+
+class TestIngestionBatch:
+    """Test per-window coalescing"""
+
+    def test_position_ticks_coalesce_per_ticket(self):
+        batch = IngestionBatch()
+        batch.add('position', {'login': 1001, 'ticket': 7, 'price_current': 1.1, 'profit': 5})
+        batch.add('position', {'login': 1001, 'ticket': 7, 'profit': 8})
+        batch.add('position', {'login': 1001, 'ticket': 9, 'profit': 1})
+
+        assert len(batch.positions) == 2
+        assert batch.positions[7]['data']['price_current'] == 1.1
+        assert batch.positions[7]['data']['profit'] == 8
+        assert batch.messages == 3
+        assert batch.coalesced == 1
+
+    def test_position_close_discards_ticks(self):
+        batch = IngestionBatch()
+        batch.add('position', {'login': 1001, 'ticket': 7, 'profit': 5})
+        batch.add('position', {'login': 1001, 'ticket': 7, 'action': 'close'})
+        batch.add('position', {'login': 1001, 'ticket': 7, 'profit': 6})
+
+        assert batch.positions[7]['closed'] is True
+        assert 'profit' not in batch.positions[7]['data']
+
+    def test_deal_keeps_open_and_last_close(self):
+        batch = IngestionBatch()
+        batch.add('deal', {'login': 1001, 'ticket': 3, 'price': 1.0})
+        batch.add('deal', {'login': 1001, 'ticket': 3, 'close_price': 1.2})
+        batch.add('deal', {'login': 1001, 'ticket': 3, 'close_price': 1.3})
+
+        entry = batch.deals[3]
+        assert entry['first']['price'] == 1.0
+        assert entry['close']['close_price'] == 1.3
+
+    def test_account_updates_merge(self):
+        batch = IngestionBatch()
+        batch.add('account', {'login': 1001, 'balance': 100})
+        batch.add('account', {'login': 1001, 'equity': 95})
+
+        assert batch.accounts['1001'] == {'login': 1001, 'balance': 100, 'equity': 95}
+        assert batch.logins() == {'1001'}
+
+
+class TestAccountDirectory:
+    """Test the login -> account map"""
+
+    def make_session(self, all_rows, lookup_rows=()):
+        session = MagicMock()
+        query = session.query.return_value
+        query.all.return_value = list(all_rows)
+        query.filter.return_value.all.return_value = list(lookup_rows)
+        return session
+
+    def test_resolves_from_loaded_map(self):
+        session = self.make_session([('1001', 1, 10, 100)])
+        directory = AccountDirectory()
+
+        accounts = directory.resolve(session, {'1001'})
+
+        assert accounts == {'1001': AccountRef(1, 10, 100)}
+        session.query.return_value.filter.assert_not_called()
+
+    def test_unknown_login_is_remembered(self):
+        session = self.make_session([])
+        directory = AccountDirectory(unknown_ttl=60)
+
+        assert directory.resolve(session, {'2002'}) == {}
+        assert directory.resolve(session, {'2002'}) == {}
+
+        assert session.query.return_value.filter.call_count == 1
+
+    def test_new_login_found_on_miss(self):
+        session = self.make_session([], lookup_rows=[('3003', 3, 30, None)])
+        directory = AccountDirectory()
+
+        assert directory.resolve(session, {'3003'}) == {'3003': AccountRef(3, 30, None)}
+        assert len(directory) == 1
+
+
+class TestPipeline:
+    """Test queueing, flushing and backpressure"""
+
+    def make_pipeline(self, **kwargs):
+        emit = MagicMock()
+        pipeline = MT5IngestionPipeline(MagicMock(), emit=emit, **kwargs)
+        pipeline.write_batch = MagicMock(return_value={
+            'rows': 1,
+            'unknown': 0,
+            'events': [('account_update', {'user_id': 10}, 'user_10')],
+            'challenge_ids': set(),
+        })
+        return pipeline, emit
+
+    def test_messages_flush_in_one_batch(self):
+        pipeline, emit = self.make_pipeline(flush_interval=0.05)
+
+        async def run():
+            await pipeline.start()
+            for balance in range(50):
+                await pipeline.submit('account', {'login': 1001, 'balance': balance})
+            await pipeline.stop()
+
+        asyncio.run(run())
+
+        pipeline.write_batch.assert_called_once()
+        batch = pipeline.write_batch.call_args[0][0]
+        assert batch.messages == 50
+        assert batch.accounts['1001']['balance'] == 49
+        emit.assert_called_once_with('account_update', {'user_id': 10}, room='user_10')
+
+        stats = pipeline.get_stats()
+        assert stats['flushes'] == 1
+        assert stats['messages_coalesced'] == 49
+        assert stats['received']['account'] == 50
+
+    def test_full_queue_blocks_producer(self):
+        pipeline, _ = self.make_pipeline(queue_size=5, max_batch=5, flush_interval=0.05)
+
+        async def run():
+            await pipeline.start()
+            for ticket in range(20):
+                await pipeline.submit('position', {'login': 1001, 'ticket': ticket})
+            await pipeline.stop()
+
+        asyncio.run(run())
+
+        stats = pipeline.get_stats()
+        assert stats['blocked_puts'] > 0
+        assert stats['max_queue_depth'] <= 5
+        assert stats['messages_flushed'] == 20
+        assert stats['messages_dropped'] == 0
+
+    def test_invalid_json_is_counted(self):
+        pipeline, _ = self.make_pipeline()
+
+        async def run():
+            await pipeline.start()
+            accepted = await pipeline.submit('deal', 'not json')
+            await pipeline.stop()
+            return accepted
+
+        assert asyncio.run(run()) is False
+        assert pipeline.get_stats()['invalid_messages'] == 1
+        pipeline.write_batch.assert_not_called()
+
+    def test_failed_flush_counts_dropped_messages(self):
+        pipeline, emit = self.make_pipeline(flush_interval=0.01)
+        pipeline.write_batch.side_effect = RuntimeError('database down')
+
+        async def run():
+            await pipeline.start()
+            await pipeline.submit('account', {'login': 1001, 'balance': 1})
+            await pipeline.stop()
+
+        asyncio.run(run())
+
+        stats = pipeline.get_stats()
+        assert stats['failed_flushes'] == 1
+        assert stats['messages_dropped'] == 1
+        emit.assert_not_called()
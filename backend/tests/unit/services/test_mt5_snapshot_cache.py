@@ -0,0 +1,142 @@
+"""
+Unit tests for MT5 Snapshot Cache
+Tests snapshot freshness, database fallback, refresh claiming and queueing
+"""
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from src.services import mt5_snapshot_cache
+from src.services.mt5_snapshot_cache import FRESH_SECONDS, MT5SnapshotCache, freshness, snapshot_from_account
+
+
+class FakeRedis:
+    """String store with MGET, SET NX and pipelines"""
+
+    def __init__(self):
+        self.data = {}
+
+    def mget(self, names):
+        return [self.data.get(name) for name in names]
+
+    def set(self, name, value, ex=None, nx=False):
+        if nx and name in self.data:
+            return None
+        self.data[name] = value
+        return True
+
+    def delete(self, *names):
+        for name in names:
+            self.data.pop(name, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return queue
+
+    def execute(self):
+        return [getattr(self.redis_client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+def make_account(login='1001', balance=10000, updated_ago=None, status='active'):
+    return SimpleNamespace(
+        mt5_login=login,
+        balance=balance,
+        equity=balance,
+        margin=0,
+        free_margin=balance,
+        margin_level=None,
+        status=status,
+        updated_at=datetime.utcnow() - updated_ago if updated_ago is not None else None,
+    )
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(mt5_snapshot_cache, 'get_redis', lambda: client)
+    return client
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    """Capture refresh tasks instead of sending them to Celery"""
+    calls = []
+    from src.tasks import mt5_tasks
+    monkeypatch.setattr(mt5_tasks.refresh_mt5_snapshots, 'delay', lambda logins: calls.append(logins))
+    return calls
+
+
+class TestFreshness:
+    """Test age reporting"""
+
+    def test_fresh_and_stale(self):
+        now = time.time()
+
+        assert freshness({'fetched_at': now - 5}, now)['stale'] is False
+        assert freshness({'fetched_at': now - FRESH_SECONDS - 1}, now)['stale'] is True
+        assert freshness({'fetched_at': now - 5}, now)['data_age_seconds'] == 5.0
+
+    def test_never_fetched_is_stale(self):
+        assert freshness({'fetched_at': None}) == {'fetched_at': None, 'data_age_seconds': None, 'stale': True}
+
+    def test_database_fallback_age(self):
+        """Stored balances are as old as the row's last update"""
+        snapshot = snapshot_from_account(make_account(updated_ago=timedelta(minutes=10)))
+
+        assert snapshot['source'] == 'database'
+        assert freshness(snapshot)['data_age_seconds'] == pytest.approx(600, abs=2)
+
+
+class TestSnapshotsFor:
+    """Test list rendering from the cache"""
+
+    def test_cached_snapshot_served_without_refresh(self, redis_client, queued):
+        """Fresh cache entries are used as they are"""
+        MT5SnapshotCache.put('1001', {'balance': 10500.0, 'equity': 10400.0})
+        snapshots, refresh_queued = MT5SnapshotCache.snapshots_for([make_account()])
+
+        assert snapshots['1001']['balance'] == 10500.0
+        assert snapshots['1001']['source'] == 'cache'
+        assert snapshots['1001']['stale'] is False
+        assert refresh_queued == 0
+        assert queued == []
+
+    def test_stale_logins_queued_once(self, redis_client, queued):
+        """Stale accounts go into one refresh task; repeat loads do not queue them again"""
+        accounts = [make_account('1001'), make_account('1002'), make_account('1003', status='disabled')]
+        snapshots, refresh_queued = MT5SnapshotCache.snapshots_for(accounts)
+
+        assert snapshots['1002']['balance'] == 10000.0
+        assert refresh_queued == 2
+        assert queued == [['1001', '1002']]
+
+        MT5SnapshotCache.snapshots_for(accounts)
+        assert len(queued) == 1
+
+    def test_new_snapshot_releases_claim(self, redis_client, queued):
+        """Storing a snapshot lets the login be refreshed again once it goes stale"""
+        MT5SnapshotCache.snapshots_for([make_account()])
+        MT5SnapshotCache.put_many({'1001': {'balance': 1.0}}, fetched_at=time.time() - FRESH_SECONDS - 5)
+        MT5SnapshotCache.snapshots_for([make_account()])
+
+        assert queued == [['1001'], ['1001']]
+
+    def test_without_redis(self, monkeypatch):
+        """Without Redis the stored balances are rendered"""
+        monkeypatch.setattr(mt5_snapshot_cache, 'get_redis', lambda: None)
+        snapshots, _ = MT5SnapshotCache.snapshots_for([make_account(balance=9000)], refresh=False)
+
+        assert snapshots['1001']['balance'] == 9000.0
+        assert snapshots['1001']['stale'] is True
@@ -0,0 +1,131 @@
+"""
+Tests for MT5 Sync Engine
+Tests the shared rate budget, concurrent fetching, snapshot application and
+the cycle lock
+"""
+import time
+from unittest.mock import MagicMock
+from src.services import mt5_sync_engine
+from src.services.mt5_service import TokenBucket
+from src.services.mt5_sync_engine import MT5SyncEngine, apply_account_snapshot, _percentile
+
+
+class TestTokenBucket:
+    """Test the thread-safe token bucket"""
+
+    def test_initial_burst_within_capacity(self):
+        """Test that a full bucket serves `capacity` requests immediately"""
+        bucket = TokenBucket(rate=5)
+        started = time.monotonic()
+        for _ in range(5):
+            assert bucket.acquire() is True
+        assert time.monotonic() - started < 0.1
+
+    def test_acquire_times_out_when_empty(self):
+        """Test that acquire gives up after the timeout"""
+        bucket = TokenBucket(rate=1, capacity=1)
+        assert bucket.acquire() is True
+        assert bucket.acquire(timeout=0.01) is False
+
+    def test_ratelimiter_compatible_interface(self):
+        """Test wait_if_needed consumes a token"""
+        bucket = TokenBucket(rate=10)
+        bucket.wait_if_needed()
+        assert bucket.tokens < 10
+
+
+class TestApplyAccountSnapshot:
+    """Test applying MT5 account data to a challenge"""
+
+    def test_applies_loss(self):
+        """Test balance, equity and total loss are updated"""
+        challenge = MagicMock()
+        challenge.initial_balance = 10000
+        challenge.update_daily_drawdown.return_value = {'threshold': 9500}
+
+        snapshot = apply_account_snapshot(challenge, {'balance': 9800, 'equity': 9700})
+
+        assert challenge.current_balance == 9800.0
+        assert challenge.total_profit == 0
+        assert challenge.total_loss == 300.0
+        assert snapshot['open_pnl'] == -100.0
+        assert snapshot['daily_stats'] == {'threshold': 9500}
+
+
+class TestMT5SyncEngine:
+    """Test concurrent account fetching"""
+
+    def test_fetch_accounts_collects_errors_per_login(self):
+        """Test a failing login does not abort the batch"""
+        service = MagicMock()
+
+        def get_account_info(login):
+            if login == 'bad':
+                raise Exception('boom')
+            return {'login': login, 'balance': 100}
+
+        service.get_account_info.side_effect = get_account_info
+        engine = MT5SyncEngine(mt5_service=service, max_workers=4)
+
+        results = engine.fetch_accounts(['1', 'bad', '2'])
+
+        assert service.authenticate.call_count == 1
+        assert results['1'][0] == {'login': '1', 'balance': 100}
+        assert results['bad'][0] is None
+        assert results['bad'][1] == 'boom'
+        assert isinstance(service.rate_limiter, TokenBucket)
+
+    def test_percentile(self):
+        """Test nearest-rank percentile"""
+        assert _percentile([], 95) == 0.0
+        assert _percentile([1, 2, 3, 4], 50) == 2
+        assert _percentile([1, 2, 3, 4], 95) == 4
+
+
+class LockRedis:
+    """Redis stand-in for SET NX / EX and the compare-and-delete script"""
+
+    def __init__(self):
+        self.values = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def eval(self, script, numkeys, key, owner):
+        if self.values.get(key) == owner:
+            del self.values[key]
+            return 1
+        return 0
+
+
+class TestCycleLock:
+    """Test the cluster-wide cycle lock"""
+
+    def test_second_cycle_is_skipped(self, monkeypatch):
+        """Only one cycle runs at a time"""
+        redis_client = LockRedis()
+        monkeypatch.setattr(mt5_sync_engine, 'get_redis', lambda: redis_client)
+        engine = MT5SyncEngine(mt5_service=MagicMock())
+
+        owner = engine._acquire_cycle_lock()
+
+        assert owner is not None
+        assert engine._acquire_cycle_lock() is None
+
+    def test_release_keeps_next_owners_lock(self, monkeypatch):
+        """A cycle that outlived its lock does not release the next cycle's"""
+        redis_client = LockRedis()
+        monkeypatch.setattr(mt5_sync_engine, 'get_redis', lambda: redis_client)
+        engine = MT5SyncEngine(mt5_service=MagicMock())
+        expired_owner = engine._acquire_cycle_lock()
+        redis_client.values.clear()  # TTL ran out
+        next_owner = engine._acquire_cycle_lock()
+
+        engine._release_cycle_lock(expired_owner)
+
+        assert redis_client.values[mt5_sync_engine.CYCLE_LOCK_KEY] == next_owner
+        engine._release_cycle_lock(next_owner)
+        assert redis_client.values == {}
@@ -0,0 +1,34 @@
+"""
+Unit tests for Notification Broadcast Service
+Tests recipient selection SQL (no database required)
+"""
+from sqlalchemy.dialects import postgresql
+from src.services.notification_broadcast_service import recipients_query
+
+
+def compile_sql(query):
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+class TestRecipientsQuery:
+    """Test the SELECT behind INSERT ... SELECT broadcasts"""
+    
+    def test_respects_in_app_preference(self):
+        """Types with a preference column join preferences, defaulting to on"""
+        sql = compile_sql(recipients_query('system'))
+        
+        assert 'LEFT OUTER JOIN notification_preferences' in sql
+        assert 'coalesce(notification_preferences.in_app_system' in sql
+        assert 'notification_preferences.id IS NULL' in sql
+    
+    def test_type_without_preference(self):
+        """Types without a preference column go to every active user"""
+        sql = compile_sql(recipients_query('promotion'))
+        
+        assert 'notification_preferences' not in sql
+        assert 'users.is_active IS true' in sql
+    
+    def test_role_filter(self):
+        """A role narrows the recipients"""
+        assert 'users.role =' in compile_sql(recipients_query('system', role='trader'))
+        assert 'users.role' not in compile_sql(recipients_query('system'))
@@ -0,0 +1,205 @@
+"""
+Unit tests for Rate Limit Service
+Tests limit parsing, the sliding-window counters (in process memory, as used
+while Redis is down), the Redis script call and login brute-force tracking
+"""
+import pytest
+from src.middleware import login_monitor
+from src.services import rate_limit_service
+from src.services.rate_limit_service import (
+    RateLimit,
+    block,
+    blocked_for,
+    hit,
+    parse_limit,
+    parse_limits,
+    peek,
+)
+
+
+class RecordingRedis:
+    """Redis stand-in that records script calls and returns a fixed reply"""
+
+    def __init__(self, reply=None, error=None):
+        self.reply = reply
+        self.error = error
+        self.calls = []
+
+    def eval(self, script, numkeys, *args):
+        self.calls.append((numkeys, args))
+        if self.error:
+            raise self.error
+        return self.reply
+
+
+@pytest.fixture(autouse=True)
+def local_only(monkeypatch):
+    monkeypatch.setattr(rate_limit_service, 'get_redis', lambda: None)
+    rate_limit_service.reset_local()
+    rate_limit_service.reset_stats()
+    yield
+    rate_limit_service.reset_local()
+
+
+class TestParseLimit:
+    """Test limit strings"""
+
+    @pytest.mark.parametrize('value, expected', [
+        ('5 per minute', RateLimit(5, 60)),
+        ('100/hour', RateLimit(100, 3600)),
+        ('10 per 5 minutes', RateLimit(10, 300)),
+        ('1000 per Day', RateLimit(1000, 86400)),
+    ])
+    def test_valid(self, value, expected):
+        """Amounts and periods are read in the Flask-Limiter notation"""
+        assert parse_limit(value) == expected
+
+    @pytest.mark.parametrize('value', ['', 'five per minute', '5 per fortnight', None])
+    def test_invalid(self, value):
+        """Unparseable limits raise ValueError"""
+        with pytest.raises(ValueError):
+            parse_limit(value)
+
+    def test_several(self):
+        """Limits can be combined with ';'"""
+        assert parse_limits('5000 per day; 1000 per hour') == [RateLimit(5000, 86400), RateLimit(1000, 3600)]
+
+
+class TestSlidingWindow:
+    """Test the sliding-window counter"""
+
+    def test_allows_up_to_limit(self):
+        """The limit is exact within one window"""
+        results = [hit('login', '1.2.3.4', ['3 per minute'], now=600.0) for _ in range(4)]
+
+        assert [result.allowed for result in results] == [True, True, True, False]
+        assert [result.remaining for result in results[:3]] == [2, 1, 0]
+        assert results[3].reset_after == 60.0
+
+    def test_previous_window_is_weighted(self):
+        """Half-way through the next window, half of the previous count still applies"""
+        for _ in range(4):
+            hit('api', 'client', ['4 per minute'], now=60.0)
+
+        halfway = [hit('api', 'client', ['4 per minute'], now=150.0) for _ in range(3)]
+
+        assert [result.allowed for result in halfway] == [True, True, False]
+
+    def test_rejected_request_is_not_counted(self):
+        """A request over one limit does not use up the others"""
+        for _ in range(2):
+            hit('api', 'client', ['2 per minute', '10 per hour'], now=0.0)
+        assert hit('api', 'client', ['2 per minute', '10 per hour'], now=0.0).allowed is False
+
+        result = hit('api', 'client', ['10 per hour'], now=0.0)
+
+        assert result.remaining == 7
+
+    def test_reports_tightest_limit(self):
+        """The limit with the fewest requests left is reported"""
+        result = hit('api', 'client', ['100 per hour', '2 per minute'], now=0.0)
+
+        assert result.limit == RateLimit(2, 60)
+        assert result.remaining == 1
+
+    def test_identities_and_scopes_are_separate(self):
+        """Counters are per scope and identity"""
+        hit('login', 'a', ['1 per minute'], now=0.0)
+
+        assert hit('login', 'b', ['1 per minute'], now=0.0).allowed is True
+        assert hit('register', 'a', ['1 per minute'], now=0.0).allowed is True
+
+    def test_local_counters_are_bounded(self, monkeypatch):
+        """The in-process fallback evicts the least recently used counters"""
+        monkeypatch.setattr(rate_limit_service, 'LOCAL_MAX_KEYS', 3)
+        for n in range(10):
+            hit('api', f'client-{n}', ['1 per minute'], now=0.0)
+
+        assert rate_limit_service.get_stats()['local_counters'] == 3
+        assert hit('api', 'client-9', ['1 per minute'], now=0.0).allowed is False
+
+    def test_peek_does_not_count(self):
+        """Peeking reports the standing without using a slot or creating counters"""
+        hit('api', 'client', ['3 per minute'], now=0.0)
+
+        assert peek('api', 'client', ['3 per minute'], now=0.0).remaining == 2
+        assert peek('api', 'other', ['3 per minute'], now=0.0).remaining == 3
+        assert hit('api', 'client', ['3 per minute'], now=0.0).remaining == 1
+        stats = rate_limit_service.get_stats()
+        assert stats['allowed'] == 2
+        assert stats['local_counters'] == 1
+
+
+class TestRedisCounters:
+    """Test the shared counters"""
+
+    def test_script_receives_keys_and_limits(self, monkeypatch):
+        """All limits are checked in one script call with per-window keys"""
+        redis_client = RecordingRedis(reply=[1, 2, 4, 30000])
+        monkeypatch.setattr(rate_limit_service, 'get_redis', lambda: redis_client)
+
+        result = hit('auth.login', 'user:7', ['100 per hour', '5 per minute'])
+
+        numkeys, args = redis_client.calls[0]
+        assert numkeys == 2
+        assert args == ('ratelimit:auth.login:3600:user:7', 'ratelimit:auth.login:60:user:7', 1, 100, 3600, 5, 60)
+        assert result == (True, RateLimit(5, 60), 4, 30.0)
+
+    def test_peek_runs_script_with_zero_cost(self, monkeypatch):
+        """The script only reads when the cost is 0"""
+        redis_client = RecordingRedis(reply=[1, 1, 3, 30000])
+        monkeypatch.setattr(rate_limit_service, 'get_redis', lambda: redis_client)
+
+        peek('auth.login', 'user:7', ['5 per minute'])
+
+        assert redis_client.calls[0][1] == ('ratelimit:auth.login:60:user:7', 0, 5, 60)
+        assert rate_limit_service.get_stats()['allowed'] == 0
+
+    def test_falls_back_to_local_counters(self, monkeypatch):
+        """Redis errors are counted and the request is limited locally"""
+        redis_client = RecordingRedis(error=ConnectionError('down'))
+        monkeypatch.setattr(rate_limit_service, 'get_redis', lambda: redis_client)
+
+        assert hit('api', 'client', ['1 per minute']).allowed is True
+        assert hit('api', 'client', ['1 per minute']).allowed is False
+        assert rate_limit_service.get_stats()['fallbacks'] == 2
+
+
+class TestBlocks:
+    """Test temporary blocks"""
+
+    def test_block_expires(self, monkeypatch):
+        """Blocks report their remaining time and lapse on their own"""
+        clock = [1000.0]
+        monkeypatch.setattr(rate_limit_service.time, 'time', lambda: clock[0])
+        block('login', '1.2.3.4', 900)
+
+        assert blocked_for('login', '1.2.3.4') == 900
+        clock[0] += 901
+        assert blocked_for('login', '1.2.3.4') == 0
+
+
+class TestLoginMonitor:
+    """Test brute-force tracking on the shared counters"""
+
+    def test_blocks_after_max_attempts(self):
+        """The MAX_ATTEMPTS-th failure blocks the IP"""
+        blocked = [login_monitor.record_failed_login('5.6.7.8', 'a@b.c') for _ in range(login_monitor.MAX_ATTEMPTS)]
+
+        assert blocked == [False] * (login_monitor.MAX_ATTEMPTS - 1) + [True]
+        is_blocked, remaining = login_monitor.is_ip_blocked('5.6.7.8')
+        assert is_blocked is True
+        assert remaining > 0
+        stats = login_monitor.get_failed_attempts_stats()
+        assert stats['active_blocks'] == 1
+        assert stats['recent_attempts_1h'] == login_monitor.MAX_ATTEMPTS
+        assert login_monitor.get_failed_attempts_stats()['recent_attempts_1h'] == login_monitor.MAX_ATTEMPTS
+
+    def test_success_clears_attempts(self):
+        """A successful login resets the failure count"""
+        for _ in range(login_monitor.MAX_ATTEMPTS - 1):
+            login_monitor.record_failed_login('5.6.7.8')
+        login_monitor.record_successful_login('5.6.7.8')
+
+        assert login_monitor.record_failed_login('5.6.7.8') is False
+        assert login_monitor.is_ip_blocked('5.6.7.8') == (False, 0)
@@ -0,0 +1,132 @@
+"""
+Tests for Vectorized Rule Evaluator
+Tests rule precedence, change detection and acknowledgement on an in-memory book
+"""
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from src.services.rule_evaluator import (
+    VectorizedRuleEvaluator,
+    STATE_OK,
+    STATE_PROFIT_TARGET,
+    STATE_MAX_LOSS,
+    STATE_DAILY_LOSS,
+    STATE_EXPIRED
+)
+
+
+def make_row(challenge_id, **overrides):
+    """Healthy 10k challenge with 10% target, 10% max loss, 5% daily loss"""
+    row = {
+        'id': challenge_id,
+        'initial_balance': 10000.0,
+        'current_balance': 10000.0,
+        'total_profit': 0.0,
+        'total_loss': 0.0,
+        'profit_target': 10.0,
+        'max_total_loss': 10.0,
+        'max_daily_loss': 5.0,
+        'daily_equity': 10000.0,
+        'daily_threshold': 9500.0,
+        'end_date': np.nan,
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+def evaluator():
+    evaluator = VectorizedRuleEvaluator(reload_interval=3600)
+    evaluator.load_rows([
+        make_row(1),
+        make_row(2, total_profit=1000.0),
+        make_row(3, total_loss=1000.0, daily_equity=9000.0),
+        make_row(4, daily_equity=9400.0),
+        make_row(5, end_date=(datetime.utcnow() - timedelta(days=1)).timestamp()),
+        make_row(6, initial_balance=np.nan, profit_target=np.nan, max_total_loss=np.nan, max_daily_loss=np.nan),
+    ])
+    return evaluator
+
+
+class TestComputeStates:
+    """Test the vectorized rule pass"""
+
+    def test_states(self, evaluator):
+        """Test each rule is detected for the right challenge"""
+        states = evaluator.compute_states()
+        assert list(states) == [
+            STATE_OK, STATE_PROFIT_TARGET, STATE_MAX_LOSS, STATE_DAILY_LOSS, STATE_EXPIRED, STATE_OK
+        ]
+
+    def test_max_loss_from_balance_without_daily_row(self, evaluator):
+        """Test equity falls back to current balance when today has no data"""
+        evaluator.load_rows([make_row(1, current_balance=8900.0, daily_equity=np.nan, daily_threshold=np.nan)])
+        assert list(evaluator.compute_states()) == [STATE_MAX_LOSS]
+
+    def test_losses_win_over_profit_target(self, evaluator):
+        """Test a breach is reported even when the target is also hit"""
+        evaluator.load_rows([
+            make_row(1, total_profit=1000.0, total_loss=1000.0),
+            make_row(2, total_profit=1000.0, daily_equity=9400.0),
+        ])
+        assert list(evaluator.compute_states()) == [STATE_MAX_LOSS, STATE_DAILY_LOSS]
+
+
+class TestEvaluate:
+    """Test change detection between passes"""
+
+    @staticmethod
+    def evaluate_and_acknowledge(evaluator):
+        changes = evaluator.evaluate()
+        evaluator.acknowledge([cid for ids in changes.values() for cid in ids])
+        return changes
+
+    def test_only_changes_are_emitted(self, evaluator):
+        """Test a second pass with no changes emits nothing"""
+        first = self.evaluate_and_acknowledge(evaluator)
+        assert first['profit_target'] == [2]
+        assert first['max_loss'] == [3]
+        assert first['daily_loss'] == [4]
+        assert first['expired'] == [5]
+
+        second = evaluator.evaluate()
+        assert all(ids == [] for ids in second.values())
+
+    def test_unacknowledged_change_is_reported_again(self, evaluator):
+        """Test a change whose follow-up failed comes back on the next pass"""
+        first = evaluator.evaluate()
+        evaluator.acknowledge([cid for state, ids in first.items() if state != 'max_loss' for cid in ids])
+
+        second = evaluator.evaluate()
+        assert second['max_loss'] == [3]
+        assert second['daily_loss'] == []
+
+        evaluator.acknowledge([3])
+        assert evaluator.evaluate()['max_loss'] == []
+
+    def test_update_equity_triggers_change(self, evaluator):
+        """Test pushing an equity reading flags a new breach"""
+        self.evaluate_and_acknowledge(evaluator)
+        assert evaluator.update_equity(1, 9400.0) is True
+        assert evaluator.update_equity(99, 9400.0) is False
+
+        changes = evaluator.evaluate()
+        assert changes['daily_loss'] == [1]
+
+    def test_update_equity_follows_total_profit(self, evaluator):
+        """Test totals are derived from the pushed equity"""
+        self.evaluate_and_acknowledge(evaluator)
+        evaluator.update_equity(1, 11000.0)
+
+        changes = evaluator.evaluate()
+        assert changes['profit_target'] == [1]
+
+    def test_recovery_reported_as_ok(self, evaluator):
+        """Test a challenge leaving a breached state is reported until acknowledged"""
+        self.evaluate_and_acknowledge(evaluator)
+        evaluator.update_equity(4, 9600.0)
+
+        assert evaluator.evaluate()['ok'] == [4]
+        assert evaluator.evaluate()['ok'] == [4]
+        evaluator.acknowledge([4])
+        assert evaluator.evaluate()['ok'] == []
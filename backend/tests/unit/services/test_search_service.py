@@ -0,0 +1,119 @@
+"""
+Unit tests for Search Service
+Tests query building for search-as-you-type and the generation-keyed result cache
+"""
+import pytest
+from src.services import search_service
+from src.utils import conditional_requests
+from src.services.search_service import MAX_TERMS, SearchResults, build_tsquery, invalidate_search
+
+
+class DictCache:
+    """Flask-Caching stand-in backed by a dict"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, timeout=None):
+        self.data[key] = value
+
+
+@pytest.fixture
+def dict_cache(monkeypatch):
+    cache = DictCache()
+    monkeypatch.setattr(search_service, 'cache', cache)
+    monkeypatch.setattr(conditional_requests, 'cache', cache)
+    return cache
+
+
+class TestBuildTsquery:
+    """Test free text to tsquery conversion"""
+
+    def test_last_word_is_prefix(self):
+        """While typing, the last word matches as a prefix"""
+        assert build_tsquery('Risk manag') == 'risk & manag:*'
+
+    def test_trailing_space_ends_prefix(self):
+        """A trailing space means the last word is complete"""
+        assert build_tsquery('risk management ') == 'risk & management'
+
+    def test_prefix_disabled(self):
+        assert build_tsquery('drawdown', prefix=False) == 'drawdown'
+
+    def test_operators_are_stripped(self):
+        """tsquery syntax in user input never reaches to_tsquery"""
+        assert build_tsquery("risk' | !(drop) & <-> x_y:*") == 'risk & drop & x & y:*'
+
+    def test_no_words(self):
+        assert build_tsquery('') is None
+        assert build_tsquery('  !! ') is None
+        assert build_tsquery(None) is None
+
+    def test_term_limit(self):
+        """Only the first MAX_TERMS words are used"""
+        terms = build_tsquery(' '.join(f'w{n}' for n in range(MAX_TERMS + 5))).split(' & ')
+
+        assert len(terms) == MAX_TERMS
+
+
+class TestResultCache:
+    """Test cached result pages"""
+
+    def test_repeat_query_served_from_cache(self, dict_cache):
+        """The same query and page is computed once"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return SearchResults([{'id': 1}], 1)
+
+        first = search_service._cached('blog', {'q': 'risk:*', 'page': 1}, compute)
+        second = search_service._cached('blog', {'q': 'risk:*', 'page': 1}, compute)
+
+        assert first == second == SearchResults([{'id': 1}], 1)
+        assert len(calls) == 1
+
+    def test_invalidation_starts_new_generation(self, dict_cache):
+        """Content changes make cached pages unreachable"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return SearchResults([], 0)
+
+        search_service._cached('blog', {'q': 'risk:*'}, compute)
+        invalidate_search('blog')
+        search_service._cached('blog', {'q': 'risk:*'}, compute)
+
+        assert len(calls) == 2
+
+    def test_generations_are_per_kind(self, dict_cache):
+        """Editing an article does not drop cached blog searches"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return SearchResults([], 0)
+
+        search_service._cached('blog', {'q': 'risk:*'}, compute)
+        invalidate_search('articles')
+        search_service._cached('blog', {'q': 'risk:*'}, compute)
+
+        assert len(calls) == 1
+
+    def test_works_without_cache(self, monkeypatch):
+        """Cache errors fall back to computing the results"""
+        class BrokenCache:
+            def get(self, key):
+                raise ConnectionError('down')
+
+            def set(self, key, value, timeout=None):
+                raise ConnectionError('down')
+
+        monkeypatch.setattr(search_service, 'cache', BrokenCache())
+        monkeypatch.setattr(conditional_requests, 'cache', BrokenCache())
+
+        assert search_service._cached('blog', {'q': 'x'}, lambda: SearchResults([], 0)) == SearchResults([], 0)
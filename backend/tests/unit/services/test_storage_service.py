@@ -0,0 +1,140 @@
+"""
+Unit tests for Storage Service
+Tests reuse of signed document URLs, batch signing and the shared Redis layer
+"""
+import pytest
+from src.services import storage_service as storage_module
+from src.services.storage_service import StorageService, get_url_stats, reset_url_cache
+
+
+class FakeRedis:
+    """Minimal hash store with pipelined HGET and HSET"""
+
+    def __init__(self):
+        self.data = {}
+        self.results = []
+
+    def pipeline(self, transaction=True):
+        self.results = []
+        return self
+
+    def hget(self, name, field):
+        self.results.append(self.data.get(name, {}).get(str(field)))
+
+    def hset(self, name, field, value):
+        self.data.setdefault(name, {})[str(field)] = value
+
+    def expire(self, name, seconds):
+        pass
+
+    def execute(self):
+        return self.results
+
+    def delete(self, *names):
+        for name in names:
+            self.data.pop(name, None)
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    monkeypatch.setenv('DO_SPACES_KEY', 'minioadmin')
+    monkeypatch.setenv('DO_SPACES_SECRET', 'minioadmin')
+    monkeypatch.setenv('DO_SPACES_BUCKET', 'kyc-test')
+    monkeypatch.setenv('STORAGE_ENDPOINT_URL', 'http://localhost:9000')
+    monkeypatch.setattr(storage_module, 'get_redis', lambda: None)
+    reset_url_cache()
+    yield StorageService()
+    reset_url_cache()
+
+
+class TestSignedUrlCache:
+    """Test presigned URL reuse"""
+
+    def test_reuses_url_within_window(self, storage):
+        """A second request for the same key is served without signing"""
+        first = storage.get_file_url('kyc/1/id_proof_a.pdf')
+        second = storage.get_file_url('kyc/1/id_proof_a.pdf')
+
+        assert first == second
+        assert 'X-Amz-Signature' in first
+        stats = get_url_stats()
+        assert stats['signed'] == 1
+        assert stats['local_hits'] == 1
+        assert stats['sign_ms_avg'] is not None
+
+    def test_resigns_after_reuse_window(self, storage, monkeypatch):
+        """URLs are not handed out once 80% of their lifetime has passed"""
+        now = [1_000_000.0]
+        monkeypatch.setattr(storage_module.time, 'time', lambda: now[0])
+        storage.get_file_url('kyc/1/id_proof_a.pdf', expires_in=100)
+
+        now[0] += 79
+        storage.get_file_url('kyc/1/id_proof_a.pdf', expires_in=100)
+        assert get_url_stats()['signed'] == 1
+
+        now[0] += 2
+        storage.get_file_url('kyc/1/id_proof_a.pdf', expires_in=100)
+        assert get_url_stats()['signed'] == 2
+
+    def test_lifetime_is_part_of_cache_key(self, storage):
+        """A longer-lived URL is never served for a shorter request or vice versa"""
+        storage.get_file_url('kyc/1/id_proof_a.pdf', expires_in=60)
+        storage.get_file_url('kyc/1/id_proof_a.pdf', expires_in=3600)
+
+        assert get_url_stats()['signed'] == 2
+
+    def test_batch_signs_only_misses(self, storage):
+        """Batch lookups sign each missing key once"""
+        storage.get_file_url('kyc/1/a.pdf')
+        urls = storage.get_file_urls(['kyc/1/a.pdf', 'kyc/2/b.pdf', 'kyc/2/b.pdf', None])
+
+        assert set(urls) == {'kyc/1/a.pdf', 'kyc/2/b.pdf'}
+        assert get_url_stats()['signed'] == 2
+
+    def test_shared_through_redis(self, storage, monkeypatch):
+        """Workers reuse each other's URLs through Redis"""
+        redis_client = FakeRedis()
+        monkeypatch.setattr(storage_module, 'get_redis', lambda: redis_client)
+        url = storage.get_file_url('kyc/1/a.pdf')
+
+        reset_url_cache()  # another worker
+        assert storage.get_file_url('kyc/1/a.pdf') == url
+        stats = get_url_stats()
+        assert stats['redis_hits'] == 1
+        assert stats['signed'] == 0
+
+    def test_forget_drops_cached_urls(self, storage, monkeypatch):
+        """Invalidation removes the local and shared entries"""
+        redis_client = FakeRedis()
+        monkeypatch.setattr(storage_module, 'get_redis', lambda: redis_client)
+        storage.get_file_url('kyc/1/a.pdf')
+        storage.forget_file_urls('kyc/1/a.pdf')
+
+        assert redis_client.data == {}
+        storage.get_file_url('kyc/1/a.pdf')
+        assert get_url_stats()['signed'] == 2
+
+    def test_forget_is_not_a_pattern(self, storage, monkeypatch):
+        """Glob characters in a key only match that key"""
+        redis_client = FakeRedis()
+        monkeypatch.setattr(storage_module, 'get_redis', lambda: redis_client)
+        storage.get_file_url('kyc/1/a.pdf')
+        storage.forget_file_urls('kyc/1/*')
+
+        assert list(redis_client.data) == ['storage:url:kyc/1/a.pdf']
+
+    def test_expired_shared_url_is_resigned(self, storage, monkeypatch):
+        """A URL past its reuse window in Redis is not handed out"""
+        redis_client = FakeRedis()
+        monkeypatch.setattr(storage_module, 'get_redis', lambda: redis_client)
+        redis_client.hset('storage:url:kyc/1/a.pdf', 3600, '1|https://stale.example.com/a.pdf')
+
+        assert 'stale' not in storage.get_file_url('kyc/1/a.pdf')
+        assert get_url_stats()['signed'] == 1
+
+    def test_local_storage_urls(self, monkeypatch):
+        """Without object storage, files are served from /uploads"""
+        monkeypatch.delenv('DO_SPACES_KEY', raising=False)
+        monkeypatch.delenv('SPACES_ACCESS_KEY', raising=False)
+
+        assert StorageService().get_file_urls(['kyc/1/a.pdf']) == {'kyc/1/a.pdf': '/uploads/kyc/1/a.pdf'}
@@ -0,0 +1,200 @@
+"""
+Tests for Tenant Resolver
+Tests the in-process tenant index, host resolution and pub/sub invalidation
+on an in-memory SQLite database
+"""
+import pytest
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from src.database import db
+from src.models.tenant import Tenant
+from src.services import tenant_resolver as resolver_module
+from src.services.tenant_resolver import INVALIDATION_CHANNEL, TenantResolver, TenantSnapshot
+
+
+@compiles(JSONB, 'sqlite')
+def _jsonb_on_sqlite(element, compiler, **kw):
+    return 'JSON'
+
+
+class FakePubSub:
+    """Captures the subscription handler instead of starting a thread"""
+
+    def __init__(self):
+        self.handlers = {}
+        self.started = 0
+
+    def subscribe(self, **handlers):
+        self.handlers.update(handlers)
+
+    def run_in_thread(self, sleep_time, daemon, exception_handler):
+        self.started += 1
+        return object()
+
+
+class RecordingRedis:
+    """Records published messages"""
+
+    def __init__(self):
+        self.published = []
+        self.pubsubs = []
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        pubsub = FakePubSub()
+        self.pubsubs.append(pubsub)
+        return pubsub
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        Tenant.__table__.create(db.engine)
+        db.session.add_all([
+            Tenant(id=1, name='Main', subdomain='main'),
+            Tenant(id=2, name='Acme', subdomain='acme', custom_domain='trade.acme.com'),
+            Tenant(id=3, name='Gone', subdomain='gone', status='suspended'),
+        ])
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    client = RecordingRedis()
+    monkeypatch.setattr(resolver_module, 'get_redis', lambda: client)
+    return client
+
+
+@pytest.fixture
+def queries(app):
+    """Statements run while the test body executes"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+class TestIndex:
+    """Test resolution from the in-memory index"""
+
+    def test_resolution_runs_one_query(self, app, queries):
+        """Test every lookup after the first is served from memory"""
+        resolver = TenantResolver()
+
+        assert resolver.by_host('trade.acme.com').id == 2
+        assert resolver.by_host('acme.marketedgepros.com').id == 2
+        assert resolver.by_id(1).name == 'Main'
+        assert resolver.by_host('trade.acme.com').id == 2
+
+        assert len(queries) == 1
+        assert resolver.stats()['hits'] == 1
+        assert resolver.stats()['tenants'] == 2
+
+    def test_default_tenant(self, app):
+        """Test reserved and unknown subdomains fall back to the main tenant"""
+        resolver = TenantResolver()
+
+        assert resolver.by_host('www.marketedgepros.com').id == 1
+        assert resolver.by_host('unknown.example.com').id == 1
+        assert resolver.by_host('gone.marketedgepros.com').id == 1
+        assert resolver.by_id(3) is None
+
+    def test_snapshot_matches_to_dict(self, app):
+        """Test snapshots expose to_dict() fields and copy nested dicts"""
+        snapshot = TenantResolver().by_id(2)
+        data = snapshot.to_dict()
+        data['branding']['logo_url'] = 'changed'
+
+        assert isinstance(snapshot, TenantSnapshot)
+        assert snapshot.custom_domain == 'trade.acme.com'
+        assert data.keys() == db.session.get(Tenant, 2).to_dict().keys()
+        assert snapshot.branding.get('logo_url') != 'changed'
+        with pytest.raises(AttributeError):
+            snapshot.missing
+
+    def test_expired_index_reloads(self, app, queries):
+        """Test the TTL bounds staleness"""
+        resolver = TenantResolver(ttl=-1)
+        resolver.by_id(1)
+        resolver.by_id(1)
+
+        assert len(queries) == 2
+
+    def test_host_lru_is_bounded(self, app):
+        """Test the oldest hosts are evicted first"""
+        resolver = TenantResolver(max_hosts=2)
+        for host in ('a.example.com', 'b.example.com', 'c.example.com'):
+            resolver.by_host(host)
+
+        assert list(resolver._hosts) == ['b.example.com', 'c.example.com']
+
+
+class TestInvalidation:
+    """Test dropping the index on tenant changes"""
+
+    def test_committed_change_publishes(self, app, redis_client, monkeypatch):
+        """Test a committed tenant update drops the index and notifies other workers"""
+        resolver = TenantResolver()
+        monkeypatch.setattr(resolver_module, 'tenant_resolver', resolver)
+        assert resolver.by_host('acme.marketedgepros.com').name == 'Acme'
+
+        db.session.get(Tenant, 2).name = 'Acme Ltd'
+        db.session.commit()
+
+        assert redis_client.published == [(INVALIDATION_CHANNEL, '2')]
+        assert resolver.by_host('acme.marketedgepros.com').name == 'Acme Ltd'
+
+    def test_rollback_does_not_publish(self, app, redis_client, monkeypatch):
+        """Test a rolled back change keeps the index"""
+        resolver = TenantResolver()
+        monkeypatch.setattr(resolver_module, 'tenant_resolver', resolver)
+        resolver.warm_up()
+
+        db.session.get(Tenant, 2).name = 'Acme Ltd'
+        db.session.flush()
+        db.session.rollback()
+
+        assert redis_client.published == []
+        assert resolver._index is not None
+
+    def test_message_from_other_worker_invalidates(self, app, redis_client):
+        """Test the subscription handler drops this worker's index"""
+        resolver = TenantResolver()
+        resolver.ensure_listener()
+        resolver.ensure_listener()
+        resolver.by_host('acme.marketedgepros.com')
+
+        pubsub, = redis_client.pubsubs
+        pubsub.handlers[INVALIDATION_CHANNEL]({'data': '2'})
+
+        assert pubsub.started == 1
+        assert resolver._index is None
+        assert resolver.stats()['hosts'] == 0
+
+    def test_load_started_before_invalidation_is_dropped(self, app, monkeypatch):
+        """Test an index read before an invalidation is not installed"""
+        resolver = TenantResolver()
+        query_all = Tenant.query.__class__.all
+
+        def invalidate_during_load(query):
+            rows = query_all(query)
+            resolver.invalidate()
+            return rows
+
+        monkeypatch.setattr(Tenant.query.__class__, 'all', invalidate_during_load)
+        resolver.warm_up()
+
+        assert resolver._index is None
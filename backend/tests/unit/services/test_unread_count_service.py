@@ -0,0 +1,223 @@
+"""
+Tests for Unread Count Service
+Tests the Redis counters kept in step with committed notification writes,
+resets after "mark all as read" and the pushed totals, on an in-memory
+SQLite database
+"""
+import pytest
+from flask import Flask
+from src.database import db
+from src.models.notification import Notification
+from src.services import unread_count_service
+from src.services.unread_count_service import UnreadCountService
+
+
+class HashRedis:
+    """In-memory hashes; eval runs a Python port of _INCREMENT_SCRIPT"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.reads = 0
+
+    def hgetall(self, key):
+        self.reads += 1
+        return dict(self.hashes.get(key, {}))
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({field: str(value) for field, value in mapping.items()})
+
+    def expire(self, key, seconds):
+        pass
+
+    def delete(self, *keys):
+        for key in keys:
+            self.hashes.pop(key, None)
+
+    def scan_iter(self, match, count=None):
+        return [key for key in self.hashes if key.startswith(match.rstrip('*'))]
+
+    def pipeline(self, transaction=False):
+        return HashPipeline(self)
+
+    def eval(self, script, numkeys, *args):
+        assert script == unread_count_service._INCREMENT_SCRIPT
+        keys, argv = args[:numkeys], args[numkeys:]
+        totals = []
+        for i, key in enumerate(keys):
+            delta, field = int(argv[i * 2]), argv[i * 2 + 1]
+            counters = self.hashes.get(key)
+            if counters is None:
+                totals.append(-1)
+                continue
+            total = int(counters.get('total', 0)) + delta
+            counters['total'] = str(total)
+            counters[field] = str(int(counters.get(field, 0)) + delta)
+            if total < 0:
+                del self.hashes[key]
+                total = -1
+            totals.append(total)
+        return totals
+
+
+class HashPipeline:
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return queue
+
+    def execute(self):
+        return [getattr(self.redis_client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    client = HashRedis()
+    monkeypatch.setattr(unread_count_service, 'get_redis', lambda: client)
+    return client
+
+
+@pytest.fixture
+def pushed(monkeypatch):
+    """(event, payload, room) of every pushed total"""
+    events = []
+    monkeypatch.setattr(unread_count_service, 'emit_to_room',
+                        lambda event, payload, room: events.append((event, payload, room)))
+    return events
+
+
+@pytest.fixture
+def app(redis_client, pushed):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        Notification.__table__.create(db.engine)
+        yield app
+        db.session.remove()
+
+
+def notify(user_id, notification_type='system', **fields):
+    notification = Notification(user_id=user_id, type=notification_type, title='t', message='m', **fields)
+    db.session.add(notification)
+    return notification
+
+
+class TestCounters:
+    """Test reading and maintaining the cached counters"""
+
+    def test_miss_fills_from_database(self, app, redis_client):
+        """Test the first read counts in SQL and later reads come from the hash"""
+        notify(1)
+        notify(1, 'payment')
+        notify(1, is_read=True)
+        notify(2)
+        db.session.commit()
+        redis_client.hashes.clear()
+
+        assert UnreadCountService.get(1) == {'total': 2, 'system': 1, 'payment': 1}
+        assert redis_client.hashes['notifications:unread:1'] == {'total': '2', 'system': '1', 'payment': '1'}
+        assert UnreadCountService.get_count(1) == 2
+        assert UnreadCountService.get_count(3) == 0
+
+    def test_committed_writes_adjust_cached_counter(self, app, pushed):
+        """Test inserts and reads move the counter once committed, and push the total"""
+        UnreadCountService.get(1)
+        first = notify(1)
+        notify(1, 'payment')
+        db.session.commit()
+        assert UnreadCountService.get(1) == {'total': 2, 'system': 1, 'payment': 1}
+
+        first.is_read = True
+        db.session.commit()
+
+        assert UnreadCountService.get_count(1) == 1
+        assert pushed == [
+            ('notification:unread', {'count': 2}, 'user_1'),
+            ('notification:unread', {'count': 1}, 'user_1'),
+        ]
+
+    def test_uncached_counter_is_not_created(self, app, redis_client, pushed):
+        """Test increments never create a hash, so a later fill is not double counted"""
+        notify(1)
+        db.session.commit()
+
+        assert redis_client.hashes == {}
+        assert pushed == []
+        assert UnreadCountService.get_count(1) == 1
+
+    def test_rollback_leaves_counter(self, app):
+        """Test rolled back writes are not applied"""
+        UnreadCountService.get(1)
+        notify(1)
+        db.session.flush()
+        db.session.rollback()
+
+        assert UnreadCountService.get_count(1) == 0
+
+    def test_negative_total_drops_counter(self, app, redis_client):
+        """Test a counter that went below zero is dropped and recounted"""
+        UnreadCountService.get(1)
+
+        assert UnreadCountService.increment([1], 'system', delta=-1) == {}
+        assert 'notifications:unread:1' not in redis_client.hashes
+
+    def test_without_redis(self, app, monkeypatch):
+        """Test every read goes to the database"""
+        monkeypatch.setattr(unread_count_service, 'get_redis', lambda: None)
+        notify(1)
+        db.session.commit()
+
+        assert UnreadCountService.get_count(1) == 1
+
+
+class TestResets:
+    """Test "mark all as read" resets"""
+
+    def test_reset_on_commit(self, app, pushed):
+        """Test users queued for a reset get a zero counter and a zero push"""
+        notify(1)
+        notify(1, 'payment')
+        db.session.commit()
+        UnreadCountService.get(1)
+
+        # What mark_all_as_read does around its bulk UPDATE
+        Notification.query.filter_by(user_id=1).update({'is_read': True}, synchronize_session=False)
+        db.session.info.setdefault('unread_resets', set()).add(1)
+        db.session.commit()
+
+        assert UnreadCountService.get(1) == {'total': 0}
+        assert pushed[-1] == ('notification:unread', {'count': 0}, 'user_1')
+
+    def test_reset_dropped_on_rollback(self, app, pushed):
+        """Test a rolled back reset keeps the counter"""
+        notify(1)
+        db.session.commit()
+        UnreadCountService.get(1)
+
+        db.session.info.setdefault('unread_resets', set()).add(1)
+        db.session.rollback()
+
+        assert UnreadCountService.get_count(1) == 1
+        assert pushed == []
+
+
+class TestReconcile:
+    """Test drift correction"""
+
+    def test_drift_is_corrected(self, app, redis_client):
+        """Test counters that differ from the database are rewritten"""
+        notify(1)
+        notify(2)
+        db.session.commit()
+        UnreadCountService.get(1)
+        UnreadCountService.get(2)
+        redis_client.hashes['notifications:unread:2'] = {'total': '5', 'system': '5'}
+
+        result = UnreadCountService.reconcile()
+
+        assert result == {'checked': 2, 'drift': [2]}
+        assert UnreadCountService.get(2) == {'total': 1, 'system': 1}
@@ -0,0 +1,144 @@
+"""
+Unit tests for the trader and user dashboard routes
+Renders each dashboard once through token_required and the conditional GET
+decorator on an in-memory SQLite database
+"""
+import jwt
+import pytest
+from datetime import datetime
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from src import cache
+from src.database import db
+from src.models.challenge_trade_stats import ChallengeTradeStats
+from src.models.payment import Payment
+from src.models.referral import Referral
+from src.models.trade import Trade
+from src.models.trading_program import Challenge, TradingProgram
+from src.models.user import User
+from src.models.user_closure import UserClosure
+from src.routes.traders import traders_bp
+from src.routes.users import users_bp
+from src.services import auth_cache_service
+
+SECRET = 'test-secret'
+
+
+@compiles(JSONB, 'sqlite')
+def _jsonb_on_sqlite(element, compiler, **kw):
+    return 'JSON'
+
+
+def _register_greatest_least(dbapi_connection, connection_record):
+    """GREATEST/LEAST as on Postgres (NULLs ignored) for the trade stats upsert"""
+    def pick(choose):
+        return lambda *values: choose((v for v in values if v is not None), default=None)
+    dbapi_connection.create_function('greatest', -1, pick(max))
+    dbapi_connection.create_function('least', -1, pick(min))
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(auth_cache_service, 'get_redis', lambda: None)
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', JWT_SECRET_KEY=SECRET)
+    db.init_app(app)
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    app.register_blueprint(traders_bp, url_prefix='/api/v1/traders')
+    app.register_blueprint(users_bp, url_prefix='/api/v1/users')
+    with app.app_context():
+        event.listen(db.engine, 'connect', _register_greatest_least)
+        # Referral is read by the agent report listener on challenge inserts
+        for model in (User, UserClosure, Referral, TradingProgram, Challenge, Trade, ChallengeTradeStats, Payment):
+            model.__table__.create(db.engine)
+        db.session.add(User(id=1, email='1@example.com', password_hash='x', first_name='Test', last_name='User'))
+        db.session.add(TradingProgram(id=1, tenant_id=1, name='Starter', type='one_phase', account_size=10000,
+                                      profit_target=10, price=99))
+        db.session.add(Challenge(id=1, user_id=1, program_id=1, status='active',
+                                 initial_balance=10000, current_balance=10250))
+        for ticket, profit, close_time in (('1', 100, datetime(2026, 6, 1, 10)),
+                                           ('2', 150, datetime(2026, 6, 1, 15)),
+                                           ('3', None, None)):
+            db.session.add(Trade(challenge_id=1, ticket=ticket, symbol='EURUSD', trade_type='buy', volume=1,
+                                 open_price=1.1, profit=profit, status='closed' if close_time else 'open',
+                                 open_time=datetime(2026, 6, 1, 9), close_time=close_time))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    token = jwt.encode({'user_id': 1, 'type': 'access', 'jti': 'test'}, SECRET, algorithm='HS256')
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return client
+
+
+class TestDashboards:
+    """Test rendering the dashboards"""
+
+    def test_trader_dashboard(self, client):
+        response = client.get('/api/v1/traders/dashboard')
+
+        assert response.status_code == 200, response.get_json()
+        data = response.get_json()
+        assert data['has_challenge'] is True
+        assert data['account']['total_pnl'] == 250
+        assert data['progress']['profit']['target'] == 1000
+        assert data['statistics']['total_trades'] == 2
+        assert data['progress']['days']['completed'] == 1
+        assert [trade['id'] for trade in data['recent_trades']] == [2, 1]
+        assert response.headers['ETag']
+
+    def test_trader_dashboard_changes_with_a_close(self, client):
+        """Test a close on a new day changes the version and the trading days"""
+        etag = client.get('/api/v1/traders/dashboard').headers['ETag']
+        trade = db.session.get(Trade, 3)
+        trade.profit = -20
+        trade.close_time = datetime(2026, 6, 2, 11)
+        trade.status = 'closed'
+        db.session.commit()
+
+        response = client.get('/api/v1/traders/dashboard', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.get_json()['progress']['days']['completed'] == 2
+        assert response.get_json()['statistics']['total_trades'] == 3
+
+    def test_user_dashboard(self, client):
+        response = client.get('/api/v1/users/dashboard')
+
+        assert response.status_code == 200, response.get_json()
+        data = response.get_json()
+        assert data['user']['id'] == 1
+        assert data['statistics']['active_challenges'] == 1
+        assert data['recent_challenges'][0]['program_name'] == 'Starter'
+        assert response.headers['ETag']
+
+    def test_unchanged_dashboard_is_not_modified(self, client):
+        etag = client.get('/api/v1/users/dashboard').headers['ETag']
+
+        response = client.get('/api/v1/users/dashboard', headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
+
+
+class TestHistory:
+    """Test the trading history summary"""
+
+    def test_summary_counts_the_listed_trades(self, client):
+        """Test filtered and unfiltered summaries count the trades the list shows"""
+        # A streamed MT5 close counted by the accumulator but not listed here
+        ChallengeTradeStats.query.update({'total_trades': ChallengeTradeStats.total_trades + 1})
+        db.session.commit()
+
+        unfiltered = client.get('/api/v1/traders/history').get_json()
+        filtered = client.get('/api/v1/traders/history?symbol=EUR').get_json()
+
+        for data in (unfiltered, filtered):
+            assert data['statistics']['total_trades'] == 2
+            assert data['statistics']['total_profit'] == 250
+            assert data['pagination']['total'] == 3
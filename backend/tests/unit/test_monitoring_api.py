@@ -0,0 +1,105 @@
+"""
+Unit tests for the admin monitoring API lists
+Checks on an in-memory SQLite database that the challenge and violation
+lists run the same number of statements whatever the number of rows
+"""
+import pytest
+from datetime import datetime
+from flask import Flask, g
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from src.api.admin import monitoring_api
+from src.database import db
+from src.models.challenge_drawdown import ChallengeDailyDrawdown, clear_drawdown_cache
+from src.models.monitoring_models import ViolationLog
+from src.models.mt5_models import MT5Account
+from src.models.referral import Referral
+from src.models.trading_program import Challenge, TradingProgram
+from src.models.user import User
+from src.models.user_closure import UserClosure
+
+
+@compiles(JSONB, 'sqlite')
+def _jsonb_on_sqlite(element, compiler, **kw):
+    return 'JSON'
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(monitoring_api, 'get_jwt_identity', lambda: 1)
+    clear_drawdown_cache()
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        # Referral is read by the agent report listener on challenge inserts
+        for model in (User, UserClosure, Referral, TradingProgram, Challenge, ChallengeDailyDrawdown,
+                      MT5Account, ViolationLog):
+            model.__table__.create(db.engine)
+        db.session.add(User(id=1, email='admin@example.com', password_hash='x', role='supermaster',
+                            first_name='Admin', last_name='User'))
+        db.session.add(TradingProgram(id=1, tenant_id=1, name='Starter', type='one_phase', account_size=10000,
+                                      profit_target=10, price=99))
+        db.session.commit()
+        yield app
+        db.session.remove()
+    clear_drawdown_cache()
+
+
+@pytest.fixture
+def statements(app):
+    """Statements run while the test body executes"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def add_challenges(count):
+    """Active challenges of different traders, each with one violation"""
+    start = db.session.query(db.func.count(Challenge.id)).scalar()
+    for i in range(start + 2, start + 2 + count):
+        db.session.add(User(id=i, email=f'{i}@example.com', password_hash='x', first_name='Trader',
+                            last_name=str(i)))
+        db.session.add(Challenge(id=i, user_id=i, program_id=1, status='active',
+                                 initial_balance=10000, current_balance=10000))
+        db.session.add(ViolationLog(challenge_id=i, violation_type='daily_loss', created_at=datetime.utcnow()))
+    db.session.commit()
+    db.session.expunge_all()
+    clear_drawdown_cache()
+
+
+def call(app, view, path):
+    """Run a view under a request, skipping the JWT check (identity is patched)"""
+    # Each real request has its own app context; this test keeps one open
+    g.pop('_batch_loaders', None)
+    with app.test_request_context(path):
+        response, status = view.__wrapped__()
+    assert status == 200, response.get_json()
+    return response.get_json()
+
+
+class TestListQueryCounts:
+    """The challenge and violation lists load related rows in one query each"""
+
+    @pytest.mark.parametrize('view, path', [
+        (monitoring_api.get_monitored_challenges, '/api/admin/monitoring/challenges?per_page=50'),
+        (monitoring_api.get_violations, '/api/admin/monitoring/violations'),
+    ])
+    def test_queries_do_not_grow_with_rows(self, app, statements, view, path):
+        add_challenges(2)
+        statements.clear()
+        call(app, view, path)
+        few = len(statements)
+
+        add_challenges(10)
+        statements.clear()
+        data = call(app, view, path)
+
+        assert len(statements) == few, statements
+        assert len(data.get('challenges') or data.get('violations')) == 12
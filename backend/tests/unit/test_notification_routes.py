@@ -0,0 +1,162 @@
+"""
+Unit tests for the notification unread-count routes
+Tests the unread-count long poll and the counter reset of read-all on an
+in-memory SQLite database with cached counters
+"""
+import jwt
+import pytest
+from types import SimpleNamespace
+from flask import Flask
+from src.database import db
+from src.models.notification import Notification
+from src.models.user import User
+from src.models.user_closure import UserClosure
+from src.routes import notifications as notification_routes
+from src.routes.notifications import notifications_bp
+from src.services import auth_cache_service, unread_count_service
+
+SECRET = 'test-secret'
+
+
+class HashRedis:
+    """In-memory hashes for the unread counters (no increments needed here)"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.reads = 0
+
+    def hgetall(self, key):
+        self.reads += 1
+        return dict(self.hashes.get(key, {}))
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({field: str(value) for field, value in mapping.items()})
+
+    def expire(self, key, seconds):
+        pass
+
+    def delete(self, *keys):
+        for key in keys:
+            self.hashes.pop(key, None)
+
+    def eval(self, script, numkeys, *args):
+        # Counters of users polled in these tests are dropped and recounted
+        self.delete(*args[:numkeys])
+        return [-1] * numkeys
+
+    def pipeline(self, transaction=False):
+        return self
+
+    def execute(self):
+        return []
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    client = HashRedis()
+    monkeypatch.setattr(unread_count_service, 'get_redis', lambda: client)
+    monkeypatch.setattr(unread_count_service, 'emit_to_room', lambda event, payload, room: None)
+    monkeypatch.setattr(auth_cache_service, 'get_redis', lambda: None)
+    return client
+
+
+@pytest.fixture
+def app(redis_client):
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI='sqlite://', JWT_SECRET_KEY=SECRET)
+    db.init_app(app)
+    app.register_blueprint(notifications_bp, url_prefix='/api/v1/notifications')
+    with app.app_context():
+        for model in (User, UserClosure, Notification):
+            model.__table__.create(db.engine)
+        db.session.add(User(id=1, email='1@example.com', password_hash='x', first_name='Test', last_name='User'))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    token = jwt.encode({'user_id': 1, 'type': 'access'}, SECRET, algorithm='HS256')
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return client
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake time for the long poll; `on_sleep` runs on every poll interval"""
+    state = SimpleNamespace(now=0.0, sleeps=0, on_sleep=None)
+
+    def sleep(seconds):
+        state.now += seconds
+        state.sleeps += 1
+        if state.on_sleep:
+            state.on_sleep()
+
+    monkeypatch.setattr(notification_routes, 'time', SimpleNamespace(monotonic=lambda: state.now, sleep=sleep))
+    return state
+
+
+def notify(user_id=1, notification_type='system'):
+    db.session.add(Notification(user_id=user_id, type=notification_type, title='t', message='m'))
+    db.session.commit()
+
+
+class TestUnreadCount:
+    """Test GET /unread-count"""
+
+    def test_plain_request_answers_immediately(self, client, clock):
+        notify()
+
+        response = client.get('/api/v1/notifications/unread-count')
+
+        assert response.get_json() == {'count': 1, 'by_type': {'system': 1}}
+        assert clock.sleeps == 0
+
+    def test_long_poll_returns_on_change(self, client, clock):
+        """A held request returns as soon as the count differs from `since`"""
+        def new_notification():
+            if clock.sleeps == 2:
+                notify(notification_type='payment')
+        clock.on_sleep = new_notification
+
+        response = client.get('/api/v1/notifications/unread-count?wait=10&since=0')
+
+        assert response.get_json() == {'count': 1, 'by_type': {'payment': 1}}
+        assert clock.sleeps == 2
+
+    def test_long_poll_times_out(self, client, clock):
+        """Without a change the request is held for the wait and returns the same count"""
+        response = client.get('/api/v1/notifications/unread-count?wait=3&since=0')
+
+        assert response.get_json()['count'] == 0
+        assert clock.sleeps == 3
+
+    def test_wait_is_capped(self, client, clock):
+        client.get('/api/v1/notifications/unread-count?wait=600&since=0')
+
+        assert clock.now == notification_routes.LONG_POLL_MAX_WAIT
+
+    def test_polls_are_served_from_the_counter(self, client, clock, redis_client):
+        """Each poll reads the cached counter, not the notifications table"""
+        client.get('/api/v1/notifications/unread-count')
+        reads = redis_client.reads
+
+        client.get('/api/v1/notifications/unread-count?wait=3&since=0')
+
+        assert redis_client.reads - reads == 4
+
+
+class TestReadAll:
+    """Test POST /read-all"""
+
+    def test_resets_counter(self, client):
+        notify()
+        notify(notification_type='payment')
+        assert client.get('/api/v1/notifications/unread-count').get_json()['count'] == 2
+
+        response = client.post('/api/v1/notifications/read-all')
+
+        assert response.get_json()['count'] == 2
+        assert client.get('/api/v1/notifications/unread-count').get_json() == {'count': 0, 'by_type': {}}
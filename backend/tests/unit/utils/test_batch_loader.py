@@ -0,0 +1,89 @@
+"""
+Unit tests for the batch loader
+Tests batching, deduplication and request scoping without a database
+"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from flask import Flask
+from src.utils import batch_loader
+from src.utils.batch_loader import BatchLoader, get_loader
+
+
+def make_model(existing_ids):
+    """Mapped-class stand-in whose query returns rows for the requested IDs"""
+    model = MagicMock()
+    requested = []
+
+    def filter_(condition):
+        keys = model.id.in_.call_args[0][0]
+        requested.append(list(keys))
+        return [SimpleNamespace(id=key) for key in keys if key in existing_ids]
+
+    model.query.options.return_value.filter.side_effect = filter_
+    return model, requested
+
+
+@pytest.mark.unit
+class TestBatchLoader:
+    """Test key batching"""
+
+    def test_primed_keys_load_in_one_query(self):
+        model, requested = make_model({1, 2, 3})
+        loader = BatchLoader(model).prime([1, 2, 2, 3, None])
+
+        assert loader.get(1).id == 1
+        assert loader.get(3).id == 3
+        assert loader.queries == 1
+        assert sorted(requested[0]) == [1, 2, 3]
+
+    def test_loaded_keys_are_not_queried_again(self):
+        model, requested = make_model({1, 2})
+        loader = BatchLoader(model)
+
+        loader.get_many([1, 2])
+        loader.get_many([2, 1])
+
+        assert loader.queries == 1
+
+    def test_missing_key_is_remembered(self):
+        model, requested = make_model(set())
+        loader = BatchLoader(model)
+
+        assert loader.get(9) is None
+        assert loader.get(9) is None
+        assert loader.queries == 1
+
+    def test_get_many_skips_missing(self):
+        model, _ = make_model({1})
+        loader = BatchLoader(model)
+
+        assert list(loader.get_many([1, 5, None])) == [1]
+
+    def test_large_batches_are_chunked(self, monkeypatch):
+        monkeypatch.setattr(batch_loader, 'CHUNK_SIZE', 2)
+        model, requested = make_model({1, 2, 3, 4, 5})
+        loader = BatchLoader(model)
+
+        assert len(loader.get_many([1, 2, 3, 4, 5])) == 5
+        assert loader.queries == 3
+
+
+@pytest.mark.unit
+class TestGetLoader:
+    """Test request scoping"""
+
+    def test_same_loader_within_request(self):
+        app = Flask(__name__)
+        model = MagicMock()
+        with app.app_context():
+            assert get_loader(model) is get_loader(model)
+            assert get_loader(model) is not get_loader(model, key='email')
+
+    def test_new_loader_per_request(self):
+        app = Flask(__name__)
+        model = MagicMock()
+        with app.app_context():
+            first = get_loader(model)
+        with app.app_context():
+            assert get_loader(model) is not first
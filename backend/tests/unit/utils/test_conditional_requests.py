@@ -0,0 +1,178 @@
+"""
+Unit tests for conditional requests
+Tests If-None-Match answered before the view runs, the response cache keyed
+by version, and query and generation versions on an in-memory SQLite database
+"""
+import pytest
+from datetime import datetime
+from flask import Flask, jsonify, request
+from src import cache
+from src.database import db
+from src.models.notification import Notification
+from src.utils import conditional_requests
+from src.utils.conditional_requests import conditional, generation_version, query_version, track_changes
+
+
+class Item(db.Model):
+    """Tracked table for the generation tests"""
+
+    __tablename__ = 'conditional_test_items'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50))
+    views = db.Column(db.Integer, default=0)
+
+
+track_changes('conditional_test', Item, ignore=('views',))
+track_changes('conditional_test_names', Item, columns=('name',))
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    conditional_requests.reset_stats()
+    with app.app_context():
+        Item.__table__.create(db.engine)
+        Notification.__table__.create(db.engine)
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def view(app):
+    state = {'version': 1, 'calls': 0}
+
+    @app.route('/items')
+    @conditional(lambda: state['version'])
+    def items():
+        state['calls'] += 1
+        return jsonify({'page': request.args.get('page'), 'calls': state['calls']})
+
+    @app.route('/cached')
+    @conditional(lambda: state['version'], cache_timeout=60)
+    def cached():
+        state['calls'] += 1
+        return jsonify({'calls': state['calls']})
+
+    @app.route('/unversioned')
+    @conditional(lambda: None)
+    def unversioned():
+        state['calls'] += 1
+        return jsonify({})
+
+    return state
+
+
+@pytest.mark.unit
+class TestConditional:
+    """Test the decorator"""
+
+    def test_not_modified_skips_view(self, app, view):
+        """A matching If-None-Match is answered with 304 without running the view"""
+        client = app.test_client()
+        etag = client.get('/items').headers['ETag']
+
+        response = client.get('/items', headers={'If-None-Match': etag})
+
+        assert etag.startswith('W/"')
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+        assert view['calls'] == 1
+        assert conditional_requests.get_stats()['not_modified'] == 1
+
+    def test_new_version_renders(self, app, view):
+        """A changed version gets the full response and a new ETag"""
+        client = app.test_client()
+        etag = client.get('/items').headers['ETag']
+        view['version'] = 2
+
+        response = client.get('/items', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert view['calls'] == 2
+
+    def test_query_string_is_part_of_etag(self, app, view):
+        """Responses for other query parameters have other ETags"""
+        client = app.test_client()
+
+        assert client.get('/items?page=1').headers['ETag'] != client.get('/items?page=2').headers['ETag']
+
+    def test_without_version(self, app, view):
+        """No version: the view runs and no validator is sent"""
+        response = app.test_client().get('/unversioned', headers={'If-None-Match': '*'})
+
+        assert response.status_code == 200
+        assert 'ETag' not in response.headers
+        assert conditional_requests.get_stats()['unversioned'] == 1
+
+    def test_response_cache(self, app, view):
+        """Rendered responses are reused while the version is unchanged"""
+        client = app.test_client()
+        first = client.get('/cached')
+        second = client.get('/cached')
+        view['version'] = 2
+        third = client.get('/cached')
+
+        assert second.get_json() == first.get_json() == {'calls': 1}
+        assert second.headers['ETag'] == first.headers['ETag']
+        assert third.get_json() == {'calls': 2}
+
+
+@pytest.mark.unit
+class TestVersions:
+    """Test version sources"""
+
+    def test_query_version(self, app):
+        """Count and latest updated_at change with inserts and updates"""
+        query = Notification.query.filter_by(user_id=1)
+        assert query_version(query) == (0, None)
+
+        notification = Notification(user_id=1, type='system', title='t', message='m')
+        db.session.add(notification)
+        db.session.commit()
+        inserted = query_version(query)
+        notification.updated_at = datetime(2030, 1, 1)
+        db.session.commit()
+
+        assert inserted[0] == 1
+        assert query_version(query) == (1, datetime(2030, 1, 1))
+        assert query_version(Notification.query.filter_by(user_id=2)) == (0, None)
+
+    def test_generation_follows_commits(self, app):
+        """Commits bump the generation unless only ignored columns changed"""
+        version = generation_version('conditional_test')
+        before = version()
+
+        item = Item(name='a')
+        db.session.add(item)
+        db.session.commit()
+        after_insert = version()
+        item.views = 5
+        db.session.commit()
+        after_views = version()
+        item.name = 'b'
+        db.session.commit()
+
+        assert after_insert != before
+        assert after_views == after_insert
+        assert version() != after_views
+
+    def test_generation_of_listed_columns(self, app):
+        """With columns, only changes to those columns bump the generation"""
+        version = generation_version('conditional_test_names')
+        item = Item(name='a')
+        db.session.add(item)
+        db.session.commit()
+        after_insert = version()
+
+        item.views = 5
+        db.session.commit()
+        assert version() == after_insert
+
+        item.name = 'b'
+        db.session.commit()
+        assert version() != after_insert
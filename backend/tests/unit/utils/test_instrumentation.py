@@ -0,0 +1,118 @@
+"""
+Unit tests for request instrumentation
+Tests per-request SQL and call counting, N+1 aggregation and slow request
+traces on an in-memory SQLite engine, with the per-worker report storage
+"""
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+from src.utils import instrumentation
+from src.utils.instrumentation import init_instrumentation, n_plus_one_report, record_call, slow_request_traces
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(instrumentation, 'get_redis', lambda: None)
+    instrumentation.reset_local()
+    engine = create_engine('sqlite://')
+    app = Flask(__name__)
+    init_instrumentation(app)
+
+    @app.route('/items')
+    def items():
+        with engine.connect() as conn:
+            for item_id in range(6):
+                conn.execute(text('SELECT :id'), {'id': item_id})
+            conn.execute(text('SELECT 1'))
+        record_call('mt5', 0.2)
+        return jsonify({'items': 6})
+
+    @app.route('/single')
+    def single():
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+        return jsonify({})
+
+    yield app
+    instrumentation.reset_local()
+
+
+@pytest.mark.unit
+class TestInstrumentation:
+    """Test per-request cost recording"""
+
+    def test_repeated_statement_is_reported(self, app):
+        """A statement run N_PLUS_ONE_THRESHOLD or more times is an N+1 offender"""
+        client = app.test_client()
+        client.get('/items')
+        client.get('/items')
+        client.get('/single')
+
+        report = n_plus_one_report()
+
+        assert len(report) == 1
+        assert report[0]['endpoint'] == 'items'
+        assert report[0]['statement'] == 'SELECT ?'
+        assert report[0]['requests'] == 2
+        assert report[0]['executions'] == 12
+        assert report[0]['last_executions'] == 6
+
+    def test_slow_request_trace(self, app, monkeypatch):
+        """Slow requests are traced with their statements, once per interval and endpoint"""
+        monkeypatch.setattr(instrumentation, 'SLOW_REQUEST_SECONDS', 0)
+        client = app.test_client()
+        client.get('/items')
+        client.get('/items')
+
+        traces = slow_request_traces()
+
+        assert len(traces) == 1
+        assert traces[0]['path'] == '/items'
+        assert traces[0]['sql_count'] == 7
+        assert traces[0]['mt5_calls'] == 1
+        assert {statement['statement']: statement['executions'] for statement in traces[0]['statements']} == {
+            'SELECT ?': 6,
+            'SELECT 1': 1,
+        }
+
+    def test_queries_outside_requests_are_ignored(self, app):
+        """Statements run without a request context are not recorded"""
+        with create_engine('sqlite://').connect() as conn:
+            for _ in range(10):
+                conn.execute(text('SELECT 2'))
+        record_call('redis')
+
+        assert n_plus_one_report() == []
+
+    def test_failed_statement_leaves_no_start_time(self, app, monkeypatch):
+        """A statement that raises is not recorded and leaves nothing on the connection"""
+        monkeypatch.setattr(instrumentation, 'SLOW_REQUEST_SECONDS', 0)
+        engine = create_engine('sqlite://')
+        connection_info = []
+
+        @app.route('/failing')
+        def failing():
+            with engine.connect() as conn:
+                with pytest.raises(Exception):
+                    conn.execute(text('SELECT * FROM missing'))
+                conn.rollback()
+                conn.execute(text('SELECT 1'))
+                connection_info.append(dict(conn.info))
+            return jsonify({})
+
+        app.test_client().get('/failing')
+
+        trace, = slow_request_traces()
+        assert trace['sql_count'] == 1
+        assert connection_info == [{}]
+
+    def test_offenders_are_bounded(self, monkeypatch):
+        """The per-worker report keeps the MAX_OFFENDERS worst statements"""
+        monkeypatch.setattr(instrumentation, 'get_redis', lambda: None)
+        monkeypatch.setattr(instrumentation, 'MAX_OFFENDERS', 2)
+        instrumentation.reset_local()
+        for executions in (5, 9, 7):
+            instrumentation._record_offenders('items', [(f'SELECT {executions}', executions, 0.01)], 0.0)
+
+        assert [offender['executions'] for offender in n_plus_one_report()] == [9, 7]
+        instrumentation.reset_local()
@@ -0,0 +1,49 @@
+"""
+Unit tests for shared event counters
+Tests this process's totals and maxima next to the exported Prometheus
+counter
+"""
+import pytest
+from prometheus_client import REGISTRY
+from src.utils.metrics import EventCounter
+
+events = EventCounter('test_component', 'Test component events')
+
+
+def exported(event):
+    return REGISTRY.get_sample_value('test_component_events_total', {'event': event}) or 0
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    events.reset()
+    yield
+    events.reset()
+
+
+class TestEventCounter:
+    """Test counting events"""
+
+    def test_counts_are_totalled_and_exported(self):
+        before = exported('hits')
+
+        events.count(hits=1)
+        events.count(hits=2, wait_seconds=0.5)
+
+        assert events.values() == {'hits': 3, 'wait_seconds': 0.5}
+        assert exported('hits') - before == 3
+
+    def test_record_max(self):
+        events.record_max('wait_seconds_max', 0.2)
+        events.record_max('wait_seconds_max', 0.1)
+
+        assert events.values() == {'wait_seconds_max': 0.2}
+
+    def test_reset_keeps_exported_totals(self):
+        events.count(misses=1)
+        before = exported('misses')
+
+        events.reset()
+
+        assert events.values() == {}
+        assert exported('misses') == before
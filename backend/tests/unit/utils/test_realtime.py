@@ -0,0 +1,124 @@
+"""
+Unit tests for realtime events
+Tests room names, emitting through the message queue emitter and joining
+rooms on Socket.IO connect
+"""
+import pytest
+from types import SimpleNamespace
+from flask import Flask
+from src.middleware import auth
+from src.utils import realtime
+from src.utils.realtime import (
+    BROADCAST_ROOM,
+    emit_to_room,
+    register_socketio_handlers,
+    role_room,
+    rooms_for,
+    user_room
+)
+
+
+class RecordingEmitter:
+    def __init__(self, fail=False):
+        self.emitted = []
+        self.fail = fail
+
+    def emit(self, event, payload, room=None):
+        if self.fail:
+            raise ConnectionError('queue down')
+        self.emitted.append((event, payload, room))
+
+
+class FakeSocketIO:
+    """Keeps the registered handlers"""
+
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event):
+        def register(f):
+            self.handlers[event] = f
+            return f
+        return register
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+@pytest.fixture
+def emitter(monkeypatch):
+    emitter = RecordingEmitter()
+    monkeypatch.setattr(realtime, '_emitter', emitter)
+    return emitter
+
+
+class TestRooms:
+    """Test room names"""
+
+    def test_room_names(self):
+        """User rooms match the names the MT5 events are emitted to"""
+        assert user_room(42) == 'user_42'
+        assert role_room('trader') == 'role:trader'
+        assert BROADCAST_ROOM == 'notifications'
+
+    def test_rooms_for_user(self):
+        user = SimpleNamespace(id=42, role='agent')
+
+        assert rooms_for(user) == ['notifications', 'role:agent', 'user_42']
+
+
+class TestEmit:
+    """Test emitting to rooms"""
+
+    def test_emits_to_room(self, app, emitter):
+        with app.app_context():
+            assert emit_to_room('unread_count', {'count': 3}, user_room(7)) is True
+
+        assert emitter.emitted == [('unread_count', {'count': 3}, 'user_7')]
+
+    def test_without_app_context(self, emitter):
+        assert emit_to_room('unread_count', {}, user_room(7)) is False
+        assert emitter.emitted == []
+
+    def test_failures_are_swallowed(self, app, monkeypatch):
+        monkeypatch.setattr(realtime, '_emitter', RecordingEmitter(fail=True))
+        with app.app_context():
+            assert emit_to_room('unread_count', {}, user_room(7)) is False
+
+
+class TestConnect:
+    """Test joining rooms on connect"""
+
+    @pytest.fixture
+    def connect(self, monkeypatch):
+        joined = []
+        users = {'good': SimpleNamespace(id=42, role='trader')}
+        monkeypatch.setattr('flask_socketio.join_room', joined.append)
+        monkeypatch.setattr(auth, 'user_from_token', users.get)
+        socketio = FakeSocketIO()
+        register_socketio_handlers(socketio)
+        return socketio.handlers['connect'], joined
+
+    def test_token_in_auth_payload(self, app, connect):
+        handler, joined = connect
+        with app.test_request_context('/socket.io/'):
+            assert handler({'token': 'good'}) is True
+
+        assert joined == ['notifications', 'role:trader', 'user_42']
+
+    def test_token_in_cookie(self, app, connect):
+        handler, joined = connect
+        with app.test_request_context('/socket.io/', headers={'Cookie': 'access_token=good'}):
+            assert handler() is True
+
+        assert 'user_42' in joined
+
+    def test_invalid_token_is_refused(self, app, connect):
+        handler, joined = connect
+        with app.test_request_context('/socket.io/'):
+            assert handler({'token': 'bad'}) is False
+            assert handler(None) is False
+
+        assert joined == []
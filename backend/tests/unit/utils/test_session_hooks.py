@@ -0,0 +1,90 @@
+"""
+Unit tests for session commit hooks
+Tests values collected in session.info handed to their callback on commit,
+dropped on rollback, and a failing callback not blocking the others
+"""
+import pytest
+from flask import Flask
+from sqlalchemy import text
+from src.database import db
+from src.utils.session_hooks import collect, discard_on_rollback, on_commit
+
+calls = []
+
+
+@on_commit('session_hooks_test_failing')
+def _failing(values):
+    raise RuntimeError('publish failed')
+
+
+@on_commit('session_hooks_test_ids', 'session_hooks_test_flag')
+def _record(ids, flag):
+    calls.append((ids, flag))
+
+
+discard_on_rollback('session_hooks_test_flushed')
+
+
+@pytest.fixture
+def session():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    calls.clear()
+    with app.app_context():
+        db.session.execute(text('SELECT 1'))
+        yield db.session
+        db.session.remove()
+
+
+class TestCollect:
+    """Values built up within one transaction"""
+
+    def test_created_on_first_use(self, session):
+        collect(session, 'session_hooks_test_ids').add(1)
+        collect(session, 'session_hooks_test_ids').add(2)
+
+        assert session.info['session_hooks_test_ids'] == {1, 2}
+
+    def test_factory(self, session):
+        collect(session, 'session_hooks_test_list', list).append(1)
+
+        assert session.info.pop('session_hooks_test_list') == [1]
+
+
+class TestOnCommit:
+    """Callbacks run after commit with the popped values"""
+
+    def test_values_passed_on_commit(self, session):
+        collect(session, 'session_hooks_test_ids').add(7)
+
+        session.commit()
+
+        assert calls == [({7}, None)]
+        assert 'session_hooks_test_ids' not in session.info
+
+    def test_not_called_without_values(self, session):
+        session.commit()
+
+        assert calls == []
+
+    def test_dropped_on_rollback(self, session):
+        collect(session, 'session_hooks_test_ids').add(7)
+        session.info['session_hooks_test_flag'] = True
+        session.info['session_hooks_test_flushed'] = True
+
+        session.rollback()
+        session.execute(text('SELECT 1'))
+        session.commit()
+
+        assert calls == []
+        assert not {'session_hooks_test_ids', 'session_hooks_test_flag', 'session_hooks_test_flushed'} & set(session.info)
+
+    def test_failing_callback_does_not_block_others(self, session):
+        session.info['session_hooks_test_failing'] = True
+        session.info['session_hooks_test_flag'] = True
+
+        session.commit()
+
+        assert calls == [(None, True)]
+        assert 'session_hooks_test_failing' not in session.info